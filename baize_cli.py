@@ -0,0 +1,767 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+白泽AI - 命令行工具
+无需图形界面即可导入、搜索、导出和维护图库，适合在渲染服务器或定时任务中运行。
+只依赖 core 模块（不导入 PyQt5 / qfluentwidgets），较重的模块在子命令中按需导入。
+
+用法示例:
+    baize ingest ~/ComfyUI/output
+    baize search "1girl" --limit 20 --json
+    baize export records.ndjson.gz --format ndjson
+    baize export library.parquet
+    baize restore library.parquet
+    baize restore records.ndjson.gz --mode merge
+    baize export share.zip --query "1girl"
+    baize restore share.zip --extract-to ~/Pictures/shared
+    baize workflows ~/archive/workflows --query "project-x"
+    baize contact-sheet seeds.pdf --query "seed test" --columns 8 --rows 6
+    baize dataset ~/datasets/style --query "1girl" --trigger mystyle --resolution 1024
+    baize sync export to-studio.baizesync.gz --peer 5f0c...
+    baize sync import from-laptop.baizesync.gz
+    baize stats --json
+    baize relink --from /Volumes/old --to /Volumes/new
+    baize duplicates --distance 4
+    baize vacuum
+"""
+
+import os
+import sys
+import json
+import zipfile
+import argparse
+import contextlib
+from collections import namedtuple
+from itertools import islice
+
+# 作为脚本运行时保证可以导入 core
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.data_manager import DataManager
+from core.image_hash import DEFAULT_MAX_DISTANCE
+
+
+VERSION = '3.0.0'
+
+# 子命令结果：机器可读数据、文本输出、退出码
+CommandResult = namedtuple('CommandResult', ['data', 'text', 'exit_code'])
+
+# 导出格式
+EXPORT_CHOICES = ('json', 'ndjson', 'csv', 'xlsx', 'html', 'parquet', 'zip')
+
+
+class CLIError(Exception):
+    """命令行参数或运行错误（输出错误信息并以状态码1退出）"""
+
+
+def open_data_manager(args) -> DataManager:
+    """按命令行参数打开数据库，--library 只对本次运行生效"""
+    data_manager = DataManager(args.db, data_dir=args.data_dir)
+    if args.library and args.library != data_manager.active_library:
+        if not data_manager.switch_library(args.library, persist=False):
+            raise CLIError(f"图库不存在: {args.library}")
+    return data_manager
+
+
+def record_filter(data_manager: DataManager, query: str = None):
+    """关键词对应的 where 和 params（没有关键词时为全部记录）"""
+    if not query:
+        return None, ()
+    return data_manager.keyword_filter(query)
+
+
+# ===================== 子命令 =====================
+
+def cmd_ingest(data_manager: DataManager, args) -> CommandResult:
+    """导入文件夹（并行、增量，中断后再次运行会从断点继续）"""
+    from core.batch_processor import BatchProcessor
+    from core.batch_job import BatchJob
+    from core.concurrency_tuner import ConcurrencyTuner
+    from core.progress_reporter import ProgressReporter, format_duration
+    from core.result_sink import ResultSink, NDJSONResultSink
+
+    folder = os.path.abspath(args.folder)
+    if not os.path.isdir(folder):
+        raise CLIError(f"文件夹不存在: {folder}")
+
+    processor = BatchProcessor(data_manager)
+    job = None if args.restart else BatchJob.find_resumable(data_manager.db_path, folder)
+    if job is None:
+        job = BatchJob.create(data_manager.db_path, folder, {
+            'include_subdirs': args.recursive,
+            'incremental': args.incremental,
+            'source': 'cli',
+        })
+    elif not args.quiet:
+        print(f"继续未完成的任务 {job.job_id}", file=sys.stderr)
+
+    # 未指定线程数时自动调节
+    tuner = None if args.workers else ConcurrencyTuner()
+
+    def show_progress(snapshot):
+        line = (f"\r已处理 {snapshot['processed']}/{snapshot['total']}"
+                f"{'' if snapshot['scan_finished'] else '+'}"
+                f"  失败 {snapshot['failed']}"
+                f"  {snapshot['files_per_sec']:.1f} 文件/秒"
+                f"  剩余 {format_duration(snapshot['eta_seconds'])}")
+        sys.stderr.write(line.ljust(79))
+        sys.stderr.flush()
+
+    show = not args.quiet and sys.stderr.isatty()
+    reporter = ProgressReporter(callback=show_progress if show else None, refresh_interval=0.5)
+
+    # 默认只保留计数和失败样本；--log 时每个文件的结果写入 NDJSON 日志
+    result_sink = NDJSONResultSink(args.log) if args.log else ResultSink()
+
+    if args.incremental:
+        image_files = processor.iter_changed_images(folder, recursive=args.recursive, detect_missing=True)
+    else:
+        image_files = processor.iter_folder_images(folder, recursive=args.recursive)
+
+    stream = processor.process_stream(
+        image_files,
+        auto_save=True,
+        max_workers=args.workers or 4,
+        batch_size=args.batch_size,
+        job=job,
+        tuner=tuner,
+        reporter=reporter,
+        duplicate_policy=args.duplicates,
+        result_sink=result_sink
+    )
+    status = 'completed'
+    try:
+        for _ in stream:
+            pass
+    except KeyboardInterrupt:
+        # 停止后保留检查点，下次运行从断点继续
+        job.cancel()
+        status = 'stopped'
+    finally:
+        stream.close()
+        result_sink.close()
+    if show:
+        sys.stderr.write('\n')
+
+    reporter.finish(status)
+    report_path = args.report or os.path.join(data_manager.data_dir, 'batch_reports', f"{job.job_id}.json")
+    extra = {
+        'job_id': job.job_id,
+        'folder_path': folder,
+        'library': data_manager.active_library,
+        'skipped_completed': job.skipped_count,
+        'incremental': processor.incremental_stats if args.incremental else {},
+        'concurrency': tuner.get_decisions() if tuner else [],
+        'failure_samples': result_sink.failure_samples,
+        'results_log': args.log,
+    }
+    report = reporter.get_report()
+    report.update(extra)
+    report['report_path'] = reporter.write_report(report_path, extra)
+
+    incremental_stats = extra['incremental']
+    lines = [
+        f"{'导入完成' if status == 'completed' else '导入已停止（再次运行可继续）'}: "
+        f"成功 {report['successful']}，失败 {report['failed']}，"
+        f"用时 {format_duration(report['elapsed_seconds'])}"
+    ]
+    if report['skipped']:
+        lines.append(f"重复跳过: {report['skipped']}")
+    if incremental_stats.get('unchanged'):
+        lines.append(f"未变化跳过: {incremental_stats['unchanged']}")
+    if incremental_stats.get('missing'):
+        lines.append(f"文件已不存在的记录: {incremental_stats['missing']}")
+    for error_type, count in sorted(report['errors'].items(), key=lambda item: -item[1]):
+        lines.append(f"  {error_type}: {count}")
+    if report['report_path']:
+        lines.append(f"任务报告: {report['report_path']}")
+    return CommandResult(report, '\n'.join(lines), 0 if status == 'completed' else 130)
+
+
+def cmd_search(data_manager: DataManager, args) -> CommandResult:
+    """搜索记录"""
+    if args.all_libraries:
+        records = data_manager.search_all_libraries(args.query)
+        if args.limit:
+            records = records[:args.limit]
+    else:
+        where, params = record_filter(data_manager, args.query)
+        records = list(islice(data_manager.iter_records(where=where, params=params), args.limit or None))
+
+    lines = []
+    for record in records:
+        prompt = (record.get('prompt') or '').replace('\n', ' ')
+        if len(prompt) > 60:
+            prompt = prompt[:57] + '...'
+        library = f"[{record['library']}] " if 'library' in record else ''
+        lines.append(f"{record['id']:>7}  {library}{record.get('file_path', '')}")
+        if record.get('model') or prompt:
+            lines.append(f"         {record.get('model') or '-'} | {prompt}")
+    lines.append(f"共 {len(records)} 条记录")
+    return CommandResult(records, '\n'.join(lines), 0)
+
+
+def cmd_export(data_manager: DataManager, args) -> CommandResult:
+    """导出记录"""
+    output = os.path.abspath(args.output)
+    export_format = args.format
+    compress = args.gzip
+    if export_format is None and output.lower().endswith('.xlsx'):
+        export_format = 'xlsx'
+    elif export_format is None and output.lower().endswith('.parquet'):
+        export_format = 'parquet'
+    elif export_format is None and output.lower().endswith('.zip'):
+        export_format = 'zip'
+    elif export_format is None:
+        from core.streaming_exporter import detect_export_format
+        try:
+            export_format, compress = detect_export_format(output)
+        except ValueError as e:
+            raise CLIError(f"{e}，请使用 --format 指定格式")
+
+    where, params = record_filter(data_manager, args.query)
+
+    if export_format in ('json', 'ndjson', 'csv'):
+        from core.streaming_exporter import StreamingExporter
+        result = StreamingExporter().export(
+            data_manager.iter_records(where=where, params=params),
+            output,
+            export_format=export_format,
+            compress=compress or None,
+            fieldnames=data_manager.get_record_columns() if export_format == 'csv' else None,
+            total_rows=data_manager.count_records(where, params),
+            indent=2 if export_format == 'json' and not compress else None
+        )
+        data = {'format': export_format, 'output_path': result['output_path'],
+                'rows': result['rows'], 'bytes': result['bytes']}
+        return CommandResult(data, f"已导出 {result['rows']} 条记录到 {result['output_path']}", 0)
+
+    if export_format == 'parquet':
+        from core.parquet_io import PYARROW_AVAILABLE, ParquetExporter
+        if not PYARROW_AVAILABLE:
+            raise CLIError("导出Parquet需要安装 pyarrow")
+        result = data_manager.export_parquet(output, exporter=ParquetExporter(row_group_size=args.row_group_size),
+                                             where=where, params=params)
+        if result is None:
+            raise CLIError("导出Parquet失败")
+        data = {'format': 'parquet', 'output_path': output, 'rows': result['rows'],
+                'row_groups': result['row_groups'], 'bytes': result['bytes']}
+        return CommandResult(data, f"已导出 {result['rows']} 条记录到 {output}", 0)
+
+    if export_format == 'zip':
+        # zip：记录 + 原图 + 去重的ComfyUI工作流
+        from core.bundle_exporter import BundleExporter
+        exporter = BundleExporter(include_images=not args.no_images,
+                                  thumbnail_size=args.thumbnail_size if args.thumbnails else 0)
+        result = exporter.export(data_manager.iter_records(where=where, params=params, order_by='id'), output,
+                                 total=data_manager.count_records(where, params))
+        data = {key: result[key] for key in ('records', 'images', 'missing_images', 'thumbnails',
+                                             'workflows', 'bytes')}
+        data.update({'format': 'zip', 'output_path': output})
+        text = (f"已打包 {result['records']} 条记录、{result['images']} 张图片、"
+                f"{result['workflows']} 个工作流到 {output}")
+        if result['missing_images']:
+            text += f"，{result['missing_images']} 张图片不存在"
+        return CommandResult(data, text, 0)
+
+    if export_format == 'html':
+        # html：分页图库 + 每条记录一个详情页，输出为文件夹
+        from core.gallery_exporter import GalleryExporter
+        exporter = GalleryExporter(
+            page_size=args.page_size,
+            thumbnail_size=0 if args.no_images else args.thumbnail_size,
+            include_originals=args.originals,
+            max_workers=args.workers,
+            sprite_atlas=args.sprites
+        )
+        result = exporter.export(data_manager.iter_records(where=where, params=params), output,
+                                 total=data_manager.count_records(where, params))
+        data = {'format': 'html', 'output_path': output, 'index_path': result['index_path'],
+                'rows': result['records'], 'pages': result['pages'], 'thumbnails': result['thumbnails'],
+                'failed_images': result['failed_images'], 'bytes': result['bytes']}
+        text = f"已导出 {result['records']} 条记录（{result['pages']} 页）到 {result['index_path']}"
+        if result['failed_images']:
+            text += f"，{result['failed_images']} 张图片无法生成缩略图"
+        return CommandResult(data, text, 0)
+
+    # xlsx：只写模式流式写入，超过行数上限时拆分为多个文件
+    from core.excel_exporter import StreamingExcelExporter
+    exporter = StreamingExcelExporter(include_images=not args.no_images,
+                                      max_workers=args.workers,
+                                      max_rows_per_file=args.max_rows or None)
+    result = exporter.export(data_manager.iter_records(where=where, params=params), output,
+                             total_rows=data_manager.count_records(where, params))
+    data = {'format': 'xlsx', 'output_path': output, 'output_paths': result['output_paths'],
+            'rows': result['rows'], 'images': result['images'], 'failed_images': result['failed_images']}
+    text = f"已导出 {result['rows']} 条记录到 {', '.join(result['output_paths'])}"
+    return CommandResult(data, text, 0)
+
+
+def cmd_restore(data_manager: DataManager, args) -> CommandResult:
+    """从 Parquet 备份、ZIP 包或 JSON/NDJSON/CSV 导出文件恢复记录"""
+    if not os.path.isfile(args.input):
+        raise CLIError(f"文件不存在: {args.input}")
+
+    if args.input.lower().endswith('.zip'):
+        from core.bundle_exporter import import_bundle
+        extract_dir = args.extract_to or os.path.join(
+            data_manager.data_dir, 'bundles', os.path.splitext(os.path.basename(args.input))[0])
+        try:
+            result = import_bundle(data_manager, args.input, os.path.abspath(extract_dir))
+        except (ValueError, zipfile.BadZipFile) as e:
+            raise CLIError(str(e))
+        result['extract_dir'] = extract_dir
+        text = f"已导入 {result['imported']} 条记录，解压 {result['images']} 张图片到 {extract_dir}"
+        return CommandResult(result, text, 0)
+
+    if not args.input.lower().endswith('.parquet'):
+        from core.record_importer import RecordImporter
+        try:
+            importer = RecordImporter(mode=args.mode)
+            result = importer.import_file(data_manager, args.input)
+        except (ValueError, UnicodeDecodeError) as e:
+            raise CLIError(f"无法读取 {args.input}: {e}")
+        text = (f"已导入 {result['imported']} 条记录（新增 {result['added']}，更新 {result['updated']}），"
+                f"用时 {result['elapsed']:.1f} 秒")
+        if result['matched_by_content']:
+            text += f"，{result['matched_by_content']} 条按文件内容匹配到已有记录"
+        if result['skipped']:
+            text += f"，跳过 {result['skipped']} 条已有记录"
+        if result['invalid']:
+            text += f"，{result['invalid']} 条没有文件路径"
+        return CommandResult(result, text, 0)
+
+    from core.parquet_io import PYARROW_AVAILABLE
+    if not PYARROW_AVAILABLE:
+        raise CLIError("读取Parquet需要安装 pyarrow")
+    result = data_manager.import_parquet(args.input)
+    if result is None:
+        raise CLIError("导入Parquet失败")
+    text = f"已恢复 {result['imported']} 条记录"
+    if result['skipped']:
+        text += f"，跳过 {result['skipped']} 条没有文件路径的记录"
+    return CommandResult(result, text, 0)
+
+
+def cmd_workflows(data_manager: DataManager, args) -> CommandResult:
+    """批量导出去重后的ComfyUI工作流"""
+    from core.workflow_exporter import WorkflowExporter
+    exporter = WorkflowExporter(include_prompt=not args.no_prompt,
+                                dedupe_seeds=not args.keep_seeds,
+                                read_images=not args.db_only,
+                                max_workers=args.workers)
+    where, params = record_filter(data_manager, args.query)
+    output = os.path.abspath(args.output)
+    result = exporter.export(data_manager.iter_records(where=where, params=params, order_by='id'), output,
+                             total=data_manager.count_records(where, params))
+    text = (f"{result['images']} 张图片共用 {result['workflows']} 个工作流、{result['prompts']} 个执行格式，"
+            f"新写出 {result['written']} 个文件到 {output}")
+    if result['no_workflow']:
+        text += f"，{result['no_workflow']} 条记录没有工作流"
+    return CommandResult(result, text, 0)
+
+
+def cmd_contact_sheet(data_manager: DataManager, args) -> CommandResult:
+    """导出联系表（可选同时导出图集）"""
+    from core.contact_sheet import ContactSheetExporter, SHEET_FORMATS
+    extension = os.path.splitext(args.output)[1].lower().lstrip('.')
+    if extension not in SHEET_FORMATS:
+        raise CLIError(f"不支持的联系表格式: {args.output}（支持 .pdf/.png/.jpg）")
+    try:
+        exporter = ContactSheetExporter(
+            columns=args.columns,
+            rows=args.rows,
+            cell_size=args.cell_size,
+            caption_fields=[field for field in args.fields.split(',') if field],
+            show_names=not args.no_names,
+            font_path=args.font,
+            cache_dir=os.path.join(data_manager.data_dir, 'thumbnail_cache'),
+            max_workers=args.workers
+        )
+    except ImportError as e:
+        raise CLIError(str(e))
+
+    where, params = record_filter(data_manager, args.query)
+    total = data_manager.count_records(where, params)
+    output = os.path.abspath(args.output)
+    result = exporter.export(data_manager.iter_records(where=where, params=params), output, total=total)
+    text = f"已导出 {result['records']} 张图片的联系表（{result['pages']} 页）到 {', '.join(result['output_paths'])}"
+    if result['missing_images']:
+        text += f"，{result['missing_images']} 张图片不存在"
+
+    if args.atlas:
+        atlas = exporter.export_atlas(data_manager.iter_records(where=where, params=params),
+                                      os.path.abspath(args.atlas))
+        result['atlas'] = {'output_dir': os.path.abspath(args.atlas), 'sheets': len(atlas['sheets']),
+                           'sprites': len(atlas['sprites'])}
+        text += f"\n已导出图集（{len(atlas['sheets'])} 张）到 {os.path.abspath(args.atlas)}"
+    return CommandResult(result, text, 0)
+
+
+def cmd_dataset(data_manager: DataManager, args) -> CommandResult:
+    """导出训练数据集（图片 + 同名 .txt 标注），再次运行时只处理变化的记录"""
+    from core.dataset_exporter import DatasetExporter
+    try:
+        exporter = DatasetExporter(
+            caption_source=args.caption,
+            strip_weights=not args.keep_weights,
+            exclude_tokens=[token for value in args.exclude for token in value.split(',')],
+            max_tokens=args.max_tokens,
+            trigger_word=args.trigger or '',
+            resolution=args.resolution,
+            square_crop=args.square,
+            image_format=args.image_format,
+            quality=args.quality,
+            link_mode=args.link_mode,
+            max_workers=args.workers
+        )
+    except ValueError as e:
+        raise CLIError(str(e))
+
+    where, params = record_filter(data_manager, args.query)
+    output = os.path.abspath(args.output)
+    try:
+        result = exporter.export(data_manager.iter_records(where=where, params=params, order_by='id'), output,
+                                 total=data_manager.count_records(where, params))
+    except ImportError as e:
+        raise CLIError(str(e))
+    text = (f"已导出 {result['images']} 张图片到 {output}（链接 {result['linked']}、复制 {result['copied']}、"
+            f"转换 {result['converted']}），{result['unchanged']} 张未变化")
+    if result['missing']:
+        text += f"，{result['missing']} 张图片不存在"
+    if result['failed']:
+        text += f"，{result['failed']} 张处理失败"
+    return CommandResult(result, text, 1 if result['failed'] else 0)
+
+
+def cmd_sync(data_manager: DataManager, args) -> CommandResult:
+    """增量同步：查看状态、导出变更集、合并另一台机器的变更集"""
+    if args.action == 'status':
+        data = data_manager.get_sync_status()
+        lines = [f"图库ID: {data['library_id']}", f"当前版本: {data['version']}"]
+        for peer in data['peers']:
+            lines.append(f"  {peer['peer_id']}: 已导出到版本 {peer['exported_version']}，"
+                         f"已导入对端版本 {peer['imported_version']}（{peer['synced_at'] or '未导入'}）")
+        return CommandResult(data, '\n'.join(lines), 0)
+
+    if not args.file:
+        raise CLIError(f"sync {args.action} 需要指定变更集文件")
+    path = os.path.abspath(args.file)
+
+    if args.action == 'export':
+        result = data_manager.export_changeset(path, peer=args.peer, since=args.since)
+        if result is None:
+            raise CLIError("导出变更集失败")
+        text = (f"已导出版本 {result['since']} → {result['until']} 的变更："
+                f"{result['records']} 条记录（{result['fields']} 个字段）、{result['tombstones']} 条删除，"
+                f"{result['bytes'] / 1024:.1f} KB → {path}")
+        if result['skipped_tombstones']:
+            text += f"\n{result['skipped_tombstones']} 条删除在删除时文件已不存在、没有内容哈希，未导出"
+        return CommandResult(result, text, 0)
+
+    if not os.path.isfile(path):
+        raise CLIError(f"文件不存在: {args.file}")
+    result = data_manager.import_changeset(path)
+    if result is None:
+        raise CLIError("导入变更集失败")
+    lines = [f"已合并 {result['library_id']} 的变更（版本 {result['since']} → {result['until']}）："
+             f"新增 {result['added']}，更新 {result['updated']} 条记录（{result['fields']} 个字段），"
+             f"删除 {result['deleted']}"]
+    if result['unmatched']:
+        lines.append(f"{result['unmatched']} 条变更在本机找不到对应的图片")
+    if result['gap']:
+        lines.append("警告: 对端更早的变更集还没有导入，请按顺序导入或让对端从上次同步的版本重新导出")
+    for conflict in result['conflicts']:
+        lines.append(f"冲突 {conflict['file_path']} [{conflict['field']}]：采用"
+                     f"{'对端' if conflict['winner'] == 'remote' else '本机'}的修改")
+    return CommandResult(result, '\n'.join(lines), 0)
+
+
+def cmd_stats(data_manager: DataManager, args) -> CommandResult:
+    """图库统计"""
+    stats = data_manager.library_stats
+    data = {
+        'library': data_manager.active_library,
+        'total_records': stats.get_total_records(),
+        'missing_files': data_manager.count_records("missing_since IS NOT NULL"),
+        'top_models': stats.get_counts('model', args.top),
+        'top_samplers': stats.get_counts('sampler', args.top),
+        'top_loras': stats.get_counts('lora', args.top),
+        'daily': stats.get_daily_counts(args.days),
+        'database': data_manager.maintenance.get_db_stats(),
+    }
+
+    lines = [
+        f"图库: {data['library']}",
+        f"记录总数: {data['total_records']}（文件缺失 {data['missing_files']}）",
+        f"数据库大小: {data['database']['file_size'] / 1024 / 1024:.1f} MB",
+    ]
+    for title, key in (('模型', 'top_models'), ('采样器', 'top_samplers'), ('LoRA', 'top_loras')):
+        if data[key]:
+            lines.append(f"{title}:")
+            lines.extend(f"  {count:>7}  {value}" for value, count in data[key])
+    return CommandResult(data, '\n'.join(lines), 0)
+
+
+def cmd_relink(data_manager: DataManager, args) -> CommandResult:
+    """文件移动后重新关联记录"""
+    if args.old_folder:
+        if not args.new_folder:
+            raise CLIError("--from 需要与 --to 一起使用")
+        updated = data_manager.relink_folder(args.old_folder, args.new_folder,
+                                             require_exists=not args.force)
+        data = {'mode': 'folder', 'updated': updated}
+        return CommandResult(data, f"已更新 {updated} 条记录的路径", 0)
+
+    if not args.search:
+        raise CLIError("请指定 --from/--to 或 --search")
+
+    # 在搜索文件夹中按文件名（和大小）查找文件已不存在的记录
+    from core.folder_scanner import FolderScanner
+    candidates = {}
+    for scanned in FolderScanner().scan(args.search):
+        candidates.setdefault(os.path.basename(scanned.path), []).append(scanned)
+
+    new_paths = {}
+    missing = 0
+    ambiguous = 0
+    for record in data_manager.iter_records(order_by=None):
+        file_path = record['file_path']
+        if os.path.exists(file_path):
+            continue
+        missing += 1
+        matches = candidates.get(os.path.basename(file_path), [])
+        if record.get('file_size'):
+            matches = [item for item in matches if item.size == record['file_size']]
+        if len(matches) == 1:
+            new_paths[record['id']] = matches[0].path
+        elif matches:
+            ambiguous += 1
+
+    updated = 0 if args.dry_run else data_manager.relink_records(new_paths)
+    data = {'mode': 'search', 'missing': missing, 'matched': len(new_paths),
+            'ambiguous': ambiguous, 'updated': updated, 'dry_run': args.dry_run}
+    text = f"文件缺失 {missing} 条，找到 {len(new_paths)} 条，有多个候选 {ambiguous} 条"
+    text += "（仅预览，未修改）" if args.dry_run else f"，已更新 {updated} 条"
+    return CommandResult(data, text, 0)
+
+
+def cmd_duplicates(data_manager: DataManager, args) -> CommandResult:
+    """查找重复或相似的图片"""
+    backfilled = 0
+    if args.backfill:
+        from core.batch_processor import BatchProcessor
+        backfilled = BatchProcessor(data_manager).backfill_image_hashes(max_workers=args.workers)
+
+    groups = data_manager.find_duplicate_groups(args.distance)
+    columns = ('id', 'file_path', 'width', 'height', 'file_size', 'duplicate_of')
+    data = {
+        'distance': args.distance,
+        'hashed_records': data_manager.count_records("image_hash IS NOT NULL"),
+        'backfilled': backfilled,
+        'groups': [[{column: record.get(column) for column in columns} for record in group]
+                   for group in groups],
+    }
+
+    lines = [f"已计算哈希的记录: {data['hashed_records']}，相似图片 {len(groups)} 组"]
+    if backfilled:
+        lines.insert(0, f"补算哈希: {backfilled}")
+    for number, group in enumerate(data['groups'], 1):
+        lines.append(f"第 {number} 组（{len(group)} 张）:")
+        lines.extend(f"  {record['file_path']}" for record in group)
+    return CommandResult(data, '\n'.join(lines), 0)
+
+
+def cmd_vacuum(data_manager: DataManager, args) -> CommandResult:
+    """回收空间并优化数据库"""
+    maintenance = data_manager.maintenance
+    before = maintenance.get_db_stats()
+    if args.full:
+        reclaimed = maintenance.run_task('convert_vacuum')
+    else:
+        reclaimed = maintenance.run_task('vacuum') if not args.force else maintenance.incremental_vacuum()
+    maintenance.run_task('optimize')
+    data = {'reclaimed_pages': reclaimed, 'size_before': before['file_size']}
+    if args.check:
+        data['integrity'] = maintenance.run_task('integrity_check')
+    after = maintenance.get_db_stats()
+    data['size_after'] = after['file_size']
+
+    text = (f"回收 {reclaimed} 页，数据库 {before['file_size'] / 1024 / 1024:.1f} MB → "
+            f"{after['file_size'] / 1024 / 1024:.1f} MB")
+    if after['auto_vacuum'] != 'incremental':
+        text += "\n数据库尚未启用增量回收，使用 --full 重建一次（期间数据库被锁定）"
+    exit_code = 0
+    if args.check:
+        ok = data['integrity'] == ['ok']
+        text += "\n完整性检查: " + ("正常" if ok else "; ".join(data['integrity'][:10]))
+        exit_code = 0 if ok else 1
+    return CommandResult(data, text, exit_code)
+
+
+# ===================== 入口 =====================
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='baize', description='白泽AI 命令行工具')
+    parser.add_argument('--version', action='version', version=VERSION)
+    parser.add_argument('--db', help='数据库文件路径（默认为应用数据目录中的图库）')
+    parser.add_argument('--data-dir', help='数据目录（图库注册表、报告等）')
+    parser.add_argument('--library', help='本次使用的图库名称（不改变图形界面的当前图库）')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    parser.add_argument('-q', '--quiet', action='store_true', help='不显示进度')
+    subparsers = parser.add_subparsers(dest='command', metavar='<command>')
+    subparsers.required = True
+
+    ingest = subparsers.add_parser('ingest', help='导入文件夹中的图片')
+    ingest.add_argument('folder', help='图片文件夹')
+    ingest.add_argument('--no-recursive', dest='recursive', action='store_false', help='不包含子文件夹')
+    ingest.add_argument('--full', dest='incremental', action='store_false',
+                        help='重新处理所有文件（默认只处理新增或修改的文件）')
+    ingest.add_argument('--workers', type=int, help='固定提取线程数（默认自动调节）')
+    ingest.add_argument('--batch-size', type=int, default=200, help='每批写入数据库的记录数')
+    ingest.add_argument('--restart', action='store_true', help='忽略未完成的任务，重新开始')
+    ingest.add_argument('--report', help='任务报告路径（默认保存在数据目录的 batch_reports 中）')
+    ingest.add_argument('--log', help='把每个文件的处理结果写入 NDJSON 日志（.gz 结尾时压缩）')
+    ingest.add_argument('--duplicates', choices=('import', 'link', 'skip'), default='import',
+                        help='与图库中已有图片相似时：照常导入、导入并标记为重复或跳过')
+    ingest.set_defaults(handler=cmd_ingest)
+
+    search = subparsers.add_parser('search', help='搜索记录')
+    search.add_argument('query', help='关键词（文件名、提示词、模型、备注）')
+    search.add_argument('--limit', type=int, default=50, help='最多返回的记录数，0表示不限制')
+    search.add_argument('--all-libraries', action='store_true', help='搜索所有图库')
+    search.set_defaults(handler=cmd_search)
+
+    export = subparsers.add_parser('export', help='导出记录')
+    export.add_argument('output', help='输出文件（html格式为输出文件夹）')
+    export.add_argument('--format', choices=EXPORT_CHOICES, help='导出格式（默认根据扩展名判断）')
+    export.add_argument('--gzip', action='store_true', help='gzip压缩（json/ndjson/csv）')
+    export.add_argument('--query', help='只导出匹配关键词的记录')
+    export.add_argument('--no-images', action='store_true',
+                        help='xlsx 不嵌入图片，html 不生成缩略图，zip 不打包原图')
+    export.add_argument('--thumbnail-size', type=int, default=320, help='html 缩略图最长边（像素）')
+    export.add_argument('--page-size', type=int, default=120, help='html 每页记录数')
+    export.add_argument('--originals', action='store_true', help='html 同时复制原图')
+    export.add_argument('--sprites', action='store_true', help='html 每页的缩略图拼成一张图集')
+    export.add_argument('--thumbnails', action='store_true', help='zip 同时打包缩略图')
+    export.add_argument('--workers', type=int, default=4, help='xlsx/html 生成缩略图的线程数')
+    export.add_argument('--max-rows', type=int, default=0,
+                        help='xlsx 每个文件的最大行数，超过时拆分（默认含图片时每个文件 10000 行）')
+    export.add_argument('--row-group-size', type=int, default=50000, help='parquet 每个行组的记录数')
+    export.set_defaults(handler=cmd_export)
+
+    restore = subparsers.add_parser('restore', help='从 Parquet、ZIP 包或 JSON/NDJSON/CSV 导出文件恢复记录')
+    restore.add_argument('input', help='Parquet 文件、ZIP 包或 JSON/NDJSON/CSV 文件（可gzip压缩）')
+    restore.add_argument('--extract-to', help='ZIP 包中图片的解压目录（默认为数据目录的 bundles 中）')
+    restore.add_argument('--mode', choices=('update', 'merge', 'skip'), default='update',
+                         help='JSON/NDJSON/CSV 中已有的记录：覆盖、只补充为空的字段或跳过')
+    restore.set_defaults(handler=cmd_restore)
+
+    workflows = subparsers.add_parser('workflows', help='批量导出ComfyUI工作流（按内容去重）')
+    workflows.add_argument('output', help='输出文件夹')
+    workflows.add_argument('--query', help='只导出匹配关键词的记录')
+    workflows.add_argument('--no-prompt', action='store_true', help='不导出执行格式（prompt），只导出界面格式')
+    workflows.add_argument('--keep-seeds', action='store_true',
+                           help='种子不同的工作流分别保存（默认种子记录在 images.ndjson 中，工作流按其余内容去重）')
+    workflows.add_argument('--db-only', action='store_true', help='不读取图片，只使用数据库中保存的执行格式')
+    workflows.add_argument('--workers', type=int, default=8, help='读取图片的线程数')
+    workflows.set_defaults(handler=cmd_workflows)
+
+    sheet = subparsers.add_parser('contact-sheet', help='导出联系表（缩略图网格 + 参数标注）')
+    sheet.add_argument('output', help='输出文件：.pdf 为多页文件，.png/.jpg 每页一个文件')
+    sheet.add_argument('--query', help='只导出匹配关键词的记录')
+    sheet.add_argument('--columns', type=int, default=10, help='每页列数')
+    sheet.add_argument('--rows', type=int, default=10, help='每页行数')
+    sheet.add_argument('--cell-size', type=int, default=256, help='缩略图格子边长（像素）')
+    sheet.add_argument('--fields', default='seed,cfg_scale,steps', help='参数标注中的字段，逗号分隔')
+    sheet.add_argument('--no-names', action='store_true', help='不显示文件名')
+    sheet.add_argument('--font', help='标注字体文件')
+    sheet.add_argument('--atlas', help='同时把缩略图拼成图集，输出到该文件夹（含 atlas.json 位置表）')
+    sheet.add_argument('--workers', type=int, default=8, help='读取缩略图的线程数')
+    sheet.set_defaults(handler=cmd_contact_sheet)
+
+    dataset = subparsers.add_parser('dataset', help='导出训练数据集（图片 + .txt 标注）')
+    dataset.add_argument('output', help='输出文件夹')
+    dataset.add_argument('--query', help='只导出匹配关键词的记录')
+    dataset.add_argument('--caption', choices=('prompt', 'tags', 'both'), default='prompt', help='标注来源')
+    dataset.add_argument('--exclude', action='append', default=[],
+                         help='从标注中去掉的词，逗号分隔，支持通配符（可重复）')
+    dataset.add_argument('--keep-weights', action='store_true', help='保留 (word:1.2) 等权重语法和 <lora:...>')
+    dataset.add_argument('--max-tokens', type=int, default=0, help='标注最多保留的词数')
+    dataset.add_argument('--trigger', help='加在每条标注开头的触发词')
+    dataset.add_argument('--resolution', type=int, default=0, help='图片最长边上限（像素），默认不缩放')
+    dataset.add_argument('--square', action='store_true', help='居中裁剪为正方形')
+    dataset.add_argument('--format', dest='image_format', choices=('png', 'jpg', 'webp'),
+                         help='转换图片格式（默认保持原格式）')
+    dataset.add_argument('--quality', type=int, default=95, help='jpg/webp 质量')
+    dataset.add_argument('--link-mode', choices=('auto', 'reflink', 'hardlink', 'copy'), default='auto',
+                         help='不需要转换时的处理方式（auto: reflink → 硬链接 → 复制）')
+    dataset.add_argument('--workers', type=int, help='处理图片的进程数（默认为CPU核心数）')
+    dataset.set_defaults(handler=cmd_dataset)
+
+    sync = subparsers.add_parser('sync', help='通过变更集在两台机器之间增量同步图库')
+    sync.add_argument('action', choices=('status', 'export', 'import'), help='查看状态、导出或导入变更集')
+    sync.add_argument('file', nargs='?', help='变更集文件（.gz 结尾时压缩）')
+    sync.add_argument('--peer', help='export: 对端图库ID（见对端的 sync status），从上次导出给它的版本开始，'
+                                     '且不包含从它导入的变更')
+    sync.add_argument('--since', type=int, help='export: 起始版本（不含），默认导出全部或从上次导出的版本开始')
+    sync.set_defaults(handler=cmd_sync)
+
+    stats = subparsers.add_parser('stats', help='图库统计')
+    stats.add_argument('--top', type=int, default=10, help='每个维度显示的数量')
+    stats.add_argument('--days', type=int, default=30, help='每日统计的天数')
+    stats.set_defaults(handler=cmd_stats)
+
+    relink = subparsers.add_parser('relink', help='文件移动后重新关联记录')
+    relink.add_argument('--from', dest='old_folder', help='原文件夹')
+    relink.add_argument('--to', dest='new_folder', help='新文件夹')
+    relink.add_argument('--search', help='在该文件夹中按文件名查找缺失的文件')
+    relink.add_argument('--force', action='store_true', help='--from/--to 时不检查新文件是否存在')
+    relink.add_argument('--dry-run', action='store_true', help='只显示结果，不修改数据库')
+    relink.set_defaults(handler=cmd_relink)
+
+    duplicates = subparsers.add_parser('duplicates', help='查找重复或相似的图片')
+    duplicates.add_argument('--distance', type=int, default=DEFAULT_MAX_DISTANCE,
+                            help='最大汉明距离（0 只查找完全相同的图片）')
+    duplicates.add_argument('--backfill', action='store_true', help='先为没有感知哈希的旧记录补算哈希')
+    duplicates.add_argument('--workers', type=int, default=4, help='补算哈希的线程数')
+    duplicates.set_defaults(handler=cmd_duplicates)
+
+    vacuum = subparsers.add_parser('vacuum', help='回收空间并优化数据库')
+    vacuum.add_argument('--force', action='store_true', help='即使空闲页很少也执行回收')
+    vacuum.add_argument('--check', action='store_true', help='同时执行完整性检查')
+    vacuum.add_argument('--full', action='store_true',
+                        help='重建整个数据库并启用增量回收（旧数据库只需执行一次，期间数据库被锁定）')
+    vacuum.set_defaults(handler=cmd_vacuum)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    """命令行入口，返回退出码"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    output = sys.stdout
+
+    try:
+        # 核心模块的提示信息输出到 stderr，stdout 只输出结果，便于脚本解析
+        with contextlib.redirect_stdout(sys.stderr):
+            data_manager = open_data_manager(args)
+            result = args.handler(data_manager, args)
+    except CLIError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        return 130
+
+    if args.json:
+        json.dump(result.data, output, ensure_ascii=False, indent=2, default=str)
+        output.write('\n')
+    else:
+        output.write(result.text + '\n')
+    output.flush()
+    return result.exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量任务模块
+记录批量导入任务的状态和检查点（已完成的文件），支持暂停、继续和取消，
+程序崩溃或重启后可以从中断处继续
+"""
+
+import json
+import uuid
+import sqlite3
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Iterable, Iterator
+
+
+class BatchJob:
+    """批量导入任务"""
+
+    # 可以继续的任务状态（running 表示上次运行时程序异常退出）
+    RESUMABLE_STATUSES = ('running', 'paused', 'stopped')
+
+    def __init__(self, db_path: str, job_id: str, folder_path: str,
+                 options: Dict[str, Any] = None, status: str = 'running',
+                 scanned_count: int = 0, successful_count: int = 0, failed_count: int = 0,
+                 created_at: str = None):
+        self.db_path = db_path
+        self.job_id = job_id
+        self.folder_path = folder_path
+        self.options = options or {}
+        self.status = status
+        self.scanned_count = scanned_count
+        self.successful_count = successful_count
+        self.failed_count = failed_count
+        self.created_at = created_at
+        self.skipped_count = 0
+
+        self.pipeline = None
+        self._completed = None
+
+    # ===================== 持久化 =====================
+
+    @staticmethod
+    def init_tables(db_path: str):
+        """创建任务表和检查点表"""
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS batch_jobs (
+                    id TEXT PRIMARY KEY,
+                    folder_path TEXT NOT NULL,
+                    options TEXT,
+                    status TEXT NOT NULL,
+                    scanned_count INTEGER DEFAULT 0,
+                    successful_count INTEGER DEFAULT 0,
+                    failed_count INTEGER DEFAULT 0,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS batch_job_files (
+                    job_id TEXT NOT NULL,
+                    file_path TEXT NOT NULL,
+                    success INTEGER NOT NULL,
+                    error TEXT,
+                    PRIMARY KEY (job_id, file_path)
+                ) WITHOUT ROWID
+            """)
+
+    @classmethod
+    def create(cls, db_path: str, folder_path: str, options: Dict[str, Any] = None) -> 'BatchJob':
+        """创建新任务"""
+        cls.init_tables(db_path)
+        current_time = datetime.now().isoformat()
+        job = cls(db_path, uuid.uuid4().hex, folder_path, options, created_at=current_time)
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("""
+                INSERT INTO batch_jobs (id, folder_path, options, status, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (job.job_id, folder_path, json.dumps(job.options, ensure_ascii=False),
+                  job.status, current_time, current_time))
+        job._completed = set()
+        return job
+
+    @classmethod
+    def _from_row(cls, db_path: str, row) -> 'BatchJob':
+        return cls(db_path, row['id'], row['folder_path'],
+                   options=json.loads(row['options']) if row['options'] else {},
+                   status=row['status'],
+                   scanned_count=row['scanned_count'],
+                   successful_count=row['successful_count'],
+                   failed_count=row['failed_count'],
+                   created_at=row['created_at'])
+
+    @classmethod
+    def load(cls, db_path: str, job_id: str) -> Optional['BatchJob']:
+        """读取任务"""
+        cls.init_tables(db_path)
+        with sqlite3.connect(db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM batch_jobs WHERE id = ?", (job_id,)).fetchone()
+            return cls._from_row(db_path, row) if row else None
+
+    @classmethod
+    def list_jobs(cls, db_path: str, statuses: Iterable[str] = None) -> List['BatchJob']:
+        """列出任务（最新的在前）"""
+        cls.init_tables(db_path)
+        sql = "SELECT * FROM batch_jobs"
+        params = ()
+        if statuses:
+            statuses = tuple(statuses)
+            sql += f" WHERE status IN ({', '.join('?' * len(statuses))})"
+            params = statuses
+        with sqlite3.connect(db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(sql + " ORDER BY updated_at DESC", params).fetchall()
+            return [cls._from_row(db_path, row) for row in rows]
+
+    @classmethod
+    def find_resumable(cls, db_path: str, folder_path: str = None) -> Optional['BatchJob']:
+        """查找可以继续的最近任务"""
+        for job in cls.list_jobs(db_path, cls.RESUMABLE_STATUSES):
+            if folder_path is None or job.folder_path == folder_path:
+                return job
+        return None
+
+    def _save_status(self):
+        """保存任务状态和计数"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("""
+                UPDATE batch_jobs SET status = ?, scanned_count = ?, successful_count = ?,
+                    failed_count = ?, updated_at = ?
+                WHERE id = ?
+            """, (self.status, self.scanned_count, self.successful_count, self.failed_count,
+                  datetime.now().isoformat(), self.job_id))
+
+    # ===================== 检查点 =====================
+
+    def load_completed(self) -> set:
+        """读取已完成的文件集合（继续任务时跳过这些文件）"""
+        if self._completed is None:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.execute("SELECT file_path FROM batch_job_files WHERE job_id = ?",
+                                      (self.job_id,))
+                self._completed = {file_path for (file_path,) in cursor}
+        return self._completed
+
+    def filter_pending(self, paths: Iterable[str]) -> Iterator[str]:
+        """过滤掉本任务已完成的文件"""
+        completed = self.load_completed()
+        for file_path in paths:
+            if file_path in completed:
+                self.skipped_count += 1
+                continue
+            yield file_path
+
+    def checkpoint(self, results: List[Dict[str, Any]]):
+        """
+        记录一批已处理的文件（在记录写入数据库之后调用）
+
+        Args:
+            results: 流水线结果 {'file_path', 'success', 'error'}
+        """
+        if not results:
+            return
+        with sqlite3.connect(self.db_path) as conn:
+            conn.executemany("""
+                INSERT OR REPLACE INTO batch_job_files (job_id, file_path, success, error)
+                VALUES (?, ?, ?, ?)
+            """, [(self.job_id, r['file_path'], 1 if r['success'] or r.get('skipped') else 0, r.get('error'))
+                  for r in results])
+
+        # 按规则跳过的文件（如重复图片）视为已完成，不计为失败
+        self.successful_count += sum(1 for r in results if r['success'])
+        self.failed_count += sum(1 for r in results if not r['success'] and not r.get('skipped'))
+        if self.pipeline:
+            self.scanned_count = self.skipped_count + self.pipeline.scanned_count
+        self._save_status()
+
+    def get_failed_files(self) -> List[Dict[str, Any]]:
+        """获取处理失败的文件"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute("""
+                SELECT file_path, error FROM batch_job_files
+                WHERE job_id = ? AND success = 0 ORDER BY file_path
+            """, (self.job_id,)).fetchall()
+            return [dict(row) for row in rows]
+
+    # ===================== 控制 =====================
+
+    def attach(self, pipeline):
+        """关联正在运行的流水线"""
+        self.pipeline = pipeline
+        self.status = 'running'
+        self._save_status()
+
+    def pause(self):
+        """暂停任务"""
+        if self.pipeline:
+            self.pipeline.pause()
+        self.status = 'paused'
+        self._save_status()
+
+    def resume(self):
+        """继续任务"""
+        if self.pipeline:
+            self.pipeline.resume()
+        self.status = 'running'
+        self._save_status()
+
+    def cancel(self):
+        """停止任务（保留检查点，之后可以继续）"""
+        if self.pipeline:
+            self.pipeline.cancel()
+        self.status = 'stopped'
+        self._save_status()
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self.status == 'stopped' or bool(self.pipeline and self.pipeline.is_cancelled)
+
+    def finish(self):
+        """
+        流水线结束后更新任务状态：
+        正常结束时标记为完成并清理检查点中成功的文件，被停止时保留检查点
+        """
+        if self.pipeline and self.pipeline.is_cancelled:
+            self.status = 'stopped'
+            self._save_status()
+            return
+
+        self.status = 'completed'
+        self._save_status()
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("DELETE FROM batch_job_files WHERE job_id = ? AND success = 1", (self.job_id,))
+        self._completed = None
+
+    def delete(self):
+        """删除任务及其检查点"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("DELETE FROM batch_job_files WHERE job_id = ?", (self.job_id,))
+            conn.execute("DELETE FROM batch_jobs WHERE id = ?", (self.job_id,))
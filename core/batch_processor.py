@@ -7,28 +7,39 @@
 
 import os
 import time
-import json
-import csv
-from typing import List, Dict, Any, Optional, Callable
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from pathlib import Path
+from typing import List, Dict, Any, Optional, Callable, Iterable, Iterator
 from datetime import datetime
 
 from .image_reader import ImageInfoReader
 from .data_manager import DataManager
 from .html_exporter import HTMLExporter
+from .gallery_exporter import GalleryExporter
+from .streaming_exporter import StreamingExporter
+from .ingest_pipeline import IngestPipeline, SkipFile
+from .folder_scanner import FolderScanner
+from .image_hash import compute_dhash, DEFAULT_MAX_DISTANCE, DUPLICATE_POLICIES
+from .result_sink import ResultSink, MemorySink
 
 
 class BatchProcessor:
     """批量处理器"""
     
+    # 支持的图片格式
+    SUPPORTED_FORMATS = frozenset({'.png', '.jpg', '.jpeg', '.webp'})
+    
+    # 增量扫描比较修改时间的容差（秒）
+    MTIME_TOLERANCE = 0.001
+    
     def __init__(self, data_manager: DataManager = None):
         self.image_reader = ImageInfoReader()
         self.data_manager = data_manager or DataManager()
         self.html_exporter = HTMLExporter()
         
         # 支持的图片格式
-        self.supported_formats = {'.png', '.jpg', '.jpeg', '.webp'}
+        self.supported_formats = set(self.SUPPORTED_FORMATS)
+        
+        # 扫描时忽略的文件/目录（glob）
+        self.ignore_patterns = []
         
         # 处理状态
         self.is_processing = False
@@ -37,6 +48,14 @@ class BatchProcessor:
         self.processed_files = 0
         self.failed_files = []
         self.successful_files = []
+        self.pipeline = None
+        self.incremental_stats = {}
+        
+        # 感知哈希与重复图片处理（import: 照常导入；link: 导入并关联原图；skip: 跳过）
+        self.compute_hashes = True
+        self.duplicate_policy = 'import'
+        self.duplicate_distance = DEFAULT_MAX_DISTANCE
+        self.hash_index = None
         
     def scan_folder(self, folder_path: str, recursive: bool = True) -> List[str]:
         """
@@ -49,102 +68,198 @@ class BatchProcessor:
         Returns:
             List[str]: 图片文件路径列表
         """
-        image_files = []
-        folder_path = Path(folder_path)
+        return sorted(self.iter_folder_images(folder_path, recursive))
+    
+    def create_scanner(self) -> FolderScanner:
+        """创建使用当前图片格式和忽略规则的扫描器"""
+        return FolderScanner(self.supported_formats, ignore_patterns=self.ignore_patterns)
+    
+    def iter_folder_images(self, folder_path: str, recursive: bool = True,
+                           scanner: FolderScanner = None) -> Iterator[str]:
+        """
+        边扫描边返回文件夹中的图片文件（不排序，不等待扫描结束）
         
-        if not folder_path.exists() or not folder_path.is_dir():
-            return image_files
+        Args:
+            folder_path: 文件夹路径
+            recursive: 是否递归扫描子文件夹
+            scanner: 扫描器，传入后可读取实时计数或取消扫描
+            
+        Yields:
+            str: 图片文件路径
+        """
+        scanner = scanner or self.create_scanner()
+        yield from scanner.scan_paths(folder_path, recursive)
+    
+    def iter_changed_images(self, folder_path: str, recursive: bool = True,
+                            scanner: FolderScanner = None,
+                            detect_missing: bool = False) -> Iterator[str]:
+        """
+        增量扫描：只返回新增或大小/修改时间有变化的图片文件
         
-        try:
-            if recursive:
-                # 递归扫描所有子文件夹
-                for file_path in folder_path.rglob("*"):
-                    if file_path.is_file() and file_path.suffix.lower() in self.supported_formats:
-                        image_files.append(str(file_path))
+        先通过一次范围查询读取文件夹下已入库文件的 (大小, 修改时间)，
+        再与扫描得到的 DirEntry 状态比较，未变化的文件直接跳过。
+        统计结果保存在 self.incremental_stats 中。
+        
+        Args:
+            folder_path: 文件夹路径
+            recursive: 是否递归扫描子文件夹
+            scanner: 扫描器
+            detect_missing: 扫描完成后是否标记文件已不存在的记录
+            
+        Yields:
+            str: 需要重新提取的图片文件路径
+        """
+        scanner = scanner or self.create_scanner()
+        manifest = self.data_manager.get_file_manifest(folder_path)
+        self.incremental_stats = {'known': len(manifest), 'unchanged': 0,
+                                  'new': 0, 'changed': 0, 'missing': 0}
+        
+        for scanned in scanner.scan(folder_path, recursive):
+            known = manifest.pop(scanned.path, None)
+            if known is None:
+                self.incremental_stats['new'] += 1
+            elif (known[0] == scanned.size and known[1] is not None
+                  and abs(known[1] - scanned.mtime) < self.MTIME_TOLERANCE):
+                self.incremental_stats['unchanged'] += 1
+                continue
             else:
-                # 只扫描当前文件夹
-                for file_path in folder_path.iterdir():
-                    if file_path.is_file() and file_path.suffix.lower() in self.supported_formats:
-                        image_files.append(str(file_path))
-                        
-        except PermissionError as e:
-            print(f"无权限访问文件夹: {folder_path}, 错误: {e}")
-        except Exception as e:
-            print(f"扫描文件夹时出错: {e}")
+                self.incremental_stats['changed'] += 1
+            yield scanned.path
+        
+        # 扫描完整结束后，清单中剩下的就是已不存在的文件
+        if detect_missing and not scanner.is_cancelled:
+            folder = os.path.abspath(folder_path)
+            missing = [
+                file_path for file_path in manifest
+                if recursive or os.path.dirname(file_path) == folder
+            ]
+            missing = [file_path for file_path in missing if not os.path.exists(file_path)]
+            self.incremental_stats['missing'] = self.data_manager.mark_files_missing(missing)
+    
+    def process_stream(self,
+                       image_files: Iterable[str],
+                       progress_callback: Callable[[int, int, str], None] = None,
+                       auto_save: bool = True,
+                       max_workers: int = 4,
+                       batch_size: int = 200,
+                       job=None,
+                       tuner=None,
+                       reporter=None,
+                       duplicate_policy: str = None,
+                       result_sink: ResultSink = None) -> Iterator[Dict[str, Any]]:
+        """
+        流式批量处理图片：边扫描边提取，结果逐条返回并按批写入数据库
+        
+        Args:
+            image_files: 图片文件路径迭代器（如 iter_folder_images() 的结果）
+            progress_callback: 进度回调函数 (processed, total, current_file)，
+                扫描未结束时 total 为目前已发现的文件数
+            auto_save: 是否自动保存到数据库
+            max_workers: 最大并发数
+            batch_size: 每批写入数据库的记录数
+            job: 批量任务（BatchJob），提供时跳过已完成的文件，并在每批入库后记录检查点
+            tuner: 并发调节器（ConcurrencyTuner），提供时根据吞吐量自动调整线程数
+            reporter: 进度汇总（ProgressReporter），按固定频率汇报速度、剩余时间和阶段耗时；
+                结束时由调用方调用 reporter.finish()
+            duplicate_policy: 发现与图库中已有图片相似时的处理方式（import / link / skip），
+                默认使用 self.duplicate_policy，判断距离为 self.duplicate_distance
+            result_sink: 结果接收器（ResultSink），每条结果都交给它；结束时由调用方调用 close()
             
-        return sorted(image_files)
+        Yields:
+            Dict: {'file_path', 'success', 'skipped', 'data', 'error', 'error_type'}
+        """
+        if duplicate_policy is not None:
+            if duplicate_policy not in DUPLICATE_POLICIES:
+                raise ValueError(f"不支持的重复图片处理方式: {duplicate_policy}")
+            self.duplicate_policy = duplicate_policy
+        # 需要判断重复时载入图库已有的哈希，导入过程中新图片的哈希也加入索引
+        self.hash_index = None
+        if self.duplicate_policy != 'import' and self.compute_hashes:
+            self.hash_index = self.data_manager.build_hash_index()
+        
+        if job is not None:
+            image_files = job.filter_pending(image_files)
+        
+        self.is_processing = True
+        self.processed_files = 0
+        self.pipeline = IngestPipeline(
+            self._process_single_image,
+            data_manager=self.data_manager if auto_save else None,
+            supported_formats=self.supported_formats,
+            max_workers=max_workers,
+            batch_size=batch_size,
+            checkpoint_callback=job.checkpoint if job is not None else None,
+            tuner=tuner
+        )
+        if job is not None:
+            job.attach(self.pipeline)
+        if reporter is not None:
+            reporter.start(self.pipeline)
+        
+        try:
+            for result in self.pipeline.run(image_files):
+                if reporter is not None:
+                    reporter.update(result)
+                if result_sink is not None:
+                    result_sink.add(result)
+                self.processed_files = self.pipeline.processed_count
+                self.total_files = self.pipeline.scanned_count
+                if progress_callback:
+                    progress_callback(self.processed_files, self.total_files, result['file_path'])
+                yield result
+        finally:
+            self.total_files = self.pipeline.scanned_count
+            self.is_processing = False
+            if job is not None:
+                job.finish()
     
     def batch_process_images(self, 
-                           image_files: List[str], 
+                           image_files: Iterable[str], 
                            progress_callback: Callable[[int, int, str], None] = None,
                            auto_save: bool = True,
-                           max_workers: int = 4) -> Dict[str, Any]:
+                           max_workers: int = 4,
+                           collect_results: bool = False,
+                           result_sink: ResultSink = None) -> Dict[str, Any]:
         """
         批量处理图片
         
         Args:
-            image_files: 图片文件路径列表
+            image_files: 图片文件路径列表或迭代器
             progress_callback: 进度回调函数 (processed, total, current_file)
             auto_save: 是否自动保存到数据库
             max_workers: 最大并发数
+            collect_results: 未指定 result_sink 时是否在内存中保留每个文件的路径和提取数据
+                （只适合小批量）；默认只统计数量和保留有限的失败样本
+            result_sink: 结果接收器，如 NDJSONResultSink 把结果写入磁盘日志，
+                处理结束后可通过 result_sink.iter_results() 重新读取
             
         Returns:
             Dict: 处理结果统计
         """
-        self.is_processing = True
-        self.total_files = len(image_files)
-        self.processed_files = 0
-        self.failed_files = []
-        self.successful_files = []
+        if result_sink is None:
+            result_sink = MemorySink() if collect_results else ResultSink()
         
         start_time = time.time()
-        processed_data = []
         
         try:
-            # 使用线程池进行并发处理
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                # 提交任务
-                future_to_file = {
-                    executor.submit(self._process_single_image, file_path): file_path 
-                    for file_path in image_files
-                }
-                
-                # 处理完成的任务
-                for future in as_completed(future_to_file):
-                    file_path = future_to_file[future]
-                    
-                    try:
-                        result = future.result()
-                        if result:
-                            self.successful_files.append(file_path)
-                            processed_data.append({
-                                'file_path': file_path,
-                                'data': result
-                            })
-                            
-                            # 自动保存到数据库
-                            if auto_save:
-                                try:
-                                    self.data_manager.save_record(result)
-                                except Exception as e:
-                                    print(f"保存记录失败 {file_path}: {e}")
-                        else:
-                            self.failed_files.append(file_path)
-                            
-                    except Exception as e:
-                        print(f"处理文件失败 {file_path}: {e}")
-                        self.failed_files.append(file_path)
-                    
-                    # 更新进度
-                    self.processed_files += 1
-                    if progress_callback:
-                        progress_callback(self.processed_files, self.total_files, file_path)
-                        
+            for result in self.process_stream(image_files, progress_callback, auto_save, max_workers,
+                                              result_sink=result_sink):
+                if not result['success'] and not result['skipped'] and result['error']:
+                    print(f"处理文件失败 {result['file_path']}: {result['error']}")
         except Exception as e:
             print(f"批量处理时出错: {e}")
-        
         finally:
-            self.is_processing = False
+            result_sink.close()
+        
+        # 只有内存接收器保留了文件列表和提取数据
+        if isinstance(result_sink, MemorySink):
+            self.successful_files = result_sink.successful_files
+            self.failed_files = result_sink.failed_files
+            processed_data = result_sink.processed_data
+        else:
+            self.successful_files = []
+            self.failed_files = [sample['file_path'] for sample in result_sink.failure_samples]
+            processed_data = []
             
         # 计算处理时间
         end_time = time.time()
@@ -153,15 +268,19 @@ class BatchProcessor:
         # 返回处理结果
         return {
             'total_files': self.total_files,
-            'successful_count': len(self.successful_files),
-            'failed_count': len(self.failed_files),
+            'successful_count': result_sink.successful_count,
+            'failed_count': result_sink.failed_count,
+            'skipped_count': result_sink.skipped_count,
+            'errors': dict(result_sink.errors),
+            'failure_samples': list(result_sink.failure_samples),
             'successful_files': self.successful_files,
             'failed_files': self.failed_files,
             'processed_data': processed_data,
-            'processing_time': processing_time
+            'processing_time': processing_time,
+            'result_sink': result_sink
         }
     
-    def _process_single_image(self, file_path: str) -> Optional[Dict[str, Any]]:
+    def _process_single_image(self, file_path: str) -> Dict[str, Any]:
         """
         处理单个图片文件
         
@@ -169,137 +288,190 @@ class BatchProcessor:
             file_path: 图片文件路径
             
         Returns:
-            Dict: 提取的信息，如果失败返回None
-        """
-        try:
-            # 提取图片信息
-            image_info = self.image_reader.extract_info(file_path)
+            Dict: 提取的信息
             
-            if image_info:
-                # 添加文件信息
-                image_info['file_path'] = file_path
-                image_info['file_name'] = os.path.basename(file_path)
-                
-                # 如果没有提取到信息，创建基础记录
-                if not any(image_info.get(key) for key in ['prompt', 'model', 'sampler']):
-                    image_info = {
-                        'file_path': file_path,
-                        'file_name': os.path.basename(file_path),
-                        'prompt': '',
-                        'negative_prompt': '',
-                        'model': '',
-                        'sampler': '',
-                        'steps': '',
-                        'cfg_scale': '',
-                        'seed': '',
-                        'notes': '批量导入 - 未检测到AI生成信息',
-                        'tags': 'batch_import',
-                        'generation_source': 'Unknown'
-                    }
-                
-                return image_info
-            else:
-                # 创建基础记录（即使没有AI信息）
-                return {
-                    'file_path': file_path,
-                    'file_name': os.path.basename(file_path),
-                    'prompt': '',
-                    'negative_prompt': '',
-                    'model': '',
-                    'sampler': '',
-                    'steps': '',
-                    'cfg_scale': '',
-                    'seed': '',
-                    'notes': '批量导入 - 未检测到AI生成信息',
-                    'tags': 'batch_import',
-                    'generation_source': 'Unknown'
-                }
-                
-        except Exception as e:
-            print(f"处理单个图片失败 {file_path}: {e}")
+        Raises:
+            SkipFile: 按重复图片规则跳过该文件
+            读取或解析失败时抛出异常，由流水线按错误类型统计
+        """
+        # 先计算感知哈希（缩小解码，开销很小），重复图片可以在提取信息之前跳过
+        image_hash = compute_dhash(file_path) if self.compute_hashes else None
+        duplicate_of = self._check_duplicate(file_path, image_hash)
+        
+        # 提取图片信息
+        image_info = self.image_reader.extract_info(file_path)
+        
+        # 没有提取到信息时创建基础记录
+        if not image_info or not any(image_info.get(key) for key in ['prompt', 'model', 'sampler']):
+            image_info = {
+                'file_path': file_path,
+                'file_name': os.path.basename(file_path),
+                'prompt': '',
+                'negative_prompt': '',
+                'model': '',
+                'sampler': '',
+                'steps': '',
+                'cfg_scale': '',
+                'seed': '',
+                'notes': '批量导入 - 未检测到AI生成信息',
+                'tags': 'batch_import',
+                'generation_source': 'Unknown'
+            }
+            image_info.update(self.image_reader.get_image_size(file_path))
+        else:
+            # 添加文件信息
+            image_info['file_path'] = file_path
+            image_info['file_name'] = os.path.basename(file_path)
+        
+        image_info.update(self._get_file_stats(file_path))
+        image_info['image_hash'] = image_hash
+        if duplicate_of is not None:
+            image_info['duplicate_of'] = duplicate_of
+        return image_info
+    
+    def _check_duplicate(self, file_path: str, image_hash: Optional[int]) -> Optional[str]:
+        """
+        按重复图片规则检查：skip 时抛出 SkipFile，link 时返回原图路径
+        
+        Returns:
+            Optional[str]: 原图的文件路径，不是重复图片或不需要关联时返回None
+        """
+        if self.hash_index is None or image_hash is None:
+            return None
+        original = self.hash_index.match_or_add(file_path, image_hash, self.duplicate_distance)
+        if original is None:
             return None
+        if self.duplicate_policy == 'skip':
+            raise SkipFile(f"与已有图片重复: {original}")
+        return original
+    
+    def backfill_image_hashes(self,
+                              progress_callback: Callable[[int, int, str], None] = None,
+                              max_workers: int = 4,
+                              batch_size: int = 500) -> int:
+        """
+        为尚未计算感知哈希的记录补算哈希（文件已缺失的记录跳过）
+        
+        Args:
+            progress_callback: 进度回调函数 (processed, total, current_file)
+            max_workers: 并发数
+            batch_size: 每批写入数据库的记录数
+            
+        Returns:
+            int: 补算的记录数
+        """
+        record_ids = {
+            record['file_path']: record['id']
+            for record in self.data_manager.iter_records(
+                where="image_hash IS NULL AND missing_since IS NULL", order_by='id')
+        }
+        total = len(record_ids)
+        self.is_processing = True
+        self.pipeline = IngestPipeline(
+            lambda file_path: {'image_hash': compute_dhash(file_path)},
+            max_workers=max_workers
+        )
+        updated = 0
+        hashes = {}
+        try:
+            for result in self.pipeline.run(list(record_ids)):
+                image_hash = (result['data'] or {}).get('image_hash')
+                if image_hash is not None:
+                    hashes[record_ids[result['file_path']]] = image_hash
+                if len(hashes) >= batch_size:
+                    updated += self.data_manager.update_image_hashes(hashes)
+                    hashes.clear()
+                if progress_callback:
+                    progress_callback(self.pipeline.processed_count, total, result['file_path'])
+        finally:
+            updated += self.data_manager.update_image_hashes(hashes)
+            self.is_processing = False
+        return updated
+    
+    def _get_file_stats(self, file_path: str) -> Dict[str, Any]:
+        """获取文件大小和修改时间（供增量扫描判断文件是否变化）"""
+        try:
+            stat = os.stat(file_path)
+            return {'file_size': stat.st_size, 'file_mtime': stat.st_mtime}
+        except OSError:
+            return {}
     
     def batch_export_html(self, 
-                         records: List[Dict[str, Any]], 
+                         records: Iterable[Dict[str, Any]], 
                          output_dir: str,
                          progress_callback: Callable[[int, int, str], None] = None,
-                         include_images: bool = True) -> Dict[str, Any]:
+                         include_images: bool = True,
+                         **gallery_options) -> Dict[str, Any]:
         """
-        批量导出HTML文件
+        批量导出HTML图库（分页索引页 + 每条记录一个详情页，图片为缩略图而不是内嵌的原图）
         
         Args:
-            records: 记录列表
-            output_dir: 输出目录
+            records: 记录列表或迭代器
+            output_dir: 输出目录，入口为其中的 index.html
             progress_callback: 进度回调函数
-            include_images: 是否包含图片
+            include_images: 是否包含图片（缩略图和预览图）
+            **gallery_options: 传给 GalleryExporter 的其他参数，如 page_size、sprite_atlas
             
         Returns:
-            Dict: 导出结果统计
+            Dict: 导出结果统计，'gallery' 为 GalleryExporter.export 的完整结果
         """
-        os.makedirs(output_dir, exist_ok=True)
-        
-        successful_exports = []
-        failed_exports = []
-        
-        for i, record in enumerate(records):
-            try:
-                # 生成文件名
-                file_name = record.get('custom_name') or record.get('file_name', f'record_{record.get("id", i)}')
-                safe_file_name = self._sanitize_filename(file_name)
-                output_path = os.path.join(output_dir, f"{safe_file_name}.html")
-                
-                # 导出HTML
-                if self.html_exporter.export_to_html(record, output_path, include_images):
-                    successful_exports.append(output_path)
-                else:
-                    failed_exports.append(record.get('file_path', f'record_{i}'))
-                    
-            except Exception as e:
-                print(f"导出HTML失败 {record.get('file_path', f'record_{i}')}: {e}")
-                failed_exports.append(record.get('file_path', f'record_{i}'))
-            
-            # 更新进度
-            if progress_callback:
-                progress_callback(i + 1, len(records), record.get('file_path', f'record_{i}'))
+        if not include_images:
+            gallery_options['thumbnail_size'] = 0
+        total = len(records) if hasattr(records, '__len__') else None
+        try:
+            result = GalleryExporter(**gallery_options).export(records, output_dir, total=total,
+                                                               progress_callback=progress_callback)
+        except Exception as e:
+            print(f"导出HTML图库失败: {e}")
+            return {
+                'total_records': total or 0,
+                'successful_count': 0,
+                'failed_count': total or 0,
+                'successful_exports': [],
+                'failed_exports': [],
+                'gallery': None
+            }
         
         return {
-            'total_records': len(records),
-            'successful_count': len(successful_exports),
-            'failed_count': len(failed_exports),
-            'successful_exports': successful_exports,
-            'failed_exports': failed_exports
+            'total_records': result['records'],
+            'successful_count': result['records'],
+            'failed_count': 0,
+            'successful_exports': [result['index_path']],
+            'failed_exports': [],
+            'gallery': result
         }
     
     def batch_export_json(self, 
-                         records: List[Dict[str, Any]], 
+                         records: Iterable[Dict[str, Any]], 
                          output_file: str,
-                         pretty_format: bool = True) -> bool:
+                         pretty_format: bool = True,
+                         total_records: int = None) -> bool:
         """
-        批量导出JSON文件
+        批量导出JSON文件（流式写入）
         
         Args:
-            records: 记录列表
+            records: 记录列表或迭代器（如 DataManager.iter_records()）
             output_file: 输出文件路径
             pretty_format: 是否格式化输出
+            total_records: 记录总数，records为迭代器时需要提供
             
         Returns:
             bool: 是否成功
         """
         try:
-            os.makedirs(os.path.dirname(output_file), exist_ok=True)
+            if total_records is None:
+                total_records = len(records)
             
-            export_data = {
+            envelope = {
                 'export_time': datetime.now().isoformat(),
-                'total_records': len(records),
-                'records': records
+                'total_records': total_records
             }
             
-            with open(output_file, 'w', encoding='utf-8') as f:
-                if pretty_format:
-                    json.dump(export_data, f, ensure_ascii=False, indent=2)
-                else:
-                    json.dump(export_data, f, ensure_ascii=False)
-            
+            StreamingExporter().export(records, output_file,
+                                       export_format='json',
+                                       compress=output_file.lower().endswith('.gz'),
+                                       envelope=envelope,
+                                       indent=2 if pretty_format else None)
             return True
             
         except Exception as e:
@@ -307,24 +479,22 @@ class BatchProcessor:
             return False
     
     def batch_export_csv(self, 
-                        records: List[Dict[str, Any]], 
+                        records: Iterable[Dict[str, Any]], 
                         output_file: str) -> bool:
         """
-        批量导出CSV文件
+        批量导出CSV文件（流式写入）
         
         Args:
-            records: 记录列表
+            records: 记录列表或迭代器
             output_file: 输出文件路径
             
         Returns:
             bool: 是否成功
         """
         try:
-            if not records:
+            if isinstance(records, list) and not records:
                 return False
             
-            os.makedirs(os.path.dirname(output_file), exist_ok=True)
-            
             # 定义CSV字段
             fieldnames = [
                 'file_name', 'custom_name', 'prompt', 'negative_prompt', 
@@ -332,52 +502,20 @@ class BatchProcessor:
                 'notes', 'tags', 'generation_source', 'created_at'
             ]
             
-            with open(output_file, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-                
-                for record in records:
-                    # 过滤字段
-                    filtered_record = {
-                        key: record.get(key, '') for key in fieldnames
-                    }
-                    writer.writerow(filtered_record)
+            def filter_record(record):
+                return {key: record.get(key, '') for key in fieldnames}
             
-            return True
+            result = StreamingExporter().export(records, output_file,
+                                                export_format='csv',
+                                                compress=output_file.lower().endswith('.gz'),
+                                                fieldnames=fieldnames,
+                                                transform=filter_record)
+            return result['rows'] > 0
             
         except Exception as e:
             print(f"导出CSV失败: {e}")
             return False
     
-    def _sanitize_filename(self, filename: str) -> str:
-        """
-        清理文件名，移除不安全字符
-        
-        Args:
-            filename: 原始文件名
-            
-        Returns:
-            str: 清理后的文件名
-        """
-        # 移除文件扩展名
-        if '.' in filename:
-            filename = os.path.splitext(filename)[0]
-        
-        # 替换不安全字符
-        unsafe_chars = '<>:"/\\|?*'
-        for char in unsafe_chars:
-            filename = filename.replace(char, '_')
-        
-        # 限制长度
-        if len(filename) > 100:
-            filename = filename[:100]
-        
-        # 确保不为空
-        if not filename.strip():
-            filename = 'unnamed'
-        
-        return filename.strip()
-    
     def get_processing_status(self) -> Dict[str, Any]:
         """
         获取当前处理状态
@@ -390,10 +528,12 @@ class BatchProcessor:
             'total_files': self.total_files,
             'processed_files': self.processed_files,
             'progress_percentage': (self.processed_files / self.total_files * 100) if self.total_files > 0 else 0,
-            'successful_count': len(self.successful_files),
-            'failed_count': len(self.failed_files)
+            'successful_count': self.pipeline.successful_count if self.pipeline else 0,
+            'failed_count': self.pipeline.failed_count if self.pipeline else 0
         }
     
     def stop_processing(self):
-        """停止处理（设置标志位）"""
-        self.is_processing = False 
\ No newline at end of file
+        """停止处理（已提取的结果仍会写入数据库）"""
+        self.is_processing = False
+        if self.pipeline:
+            self.pipeline.cancel() 
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ZIP打包导出模块
+把选中的记录连同原图、可选的缩略图和ComfyUI工作流打包为一个ZIP文件，便于分享和迁移：
+    manifest.json        包信息
+    records.ndjson       每行一条记录，引用包内的图片和工作流
+    images/              原图（仅存储不压缩，PNG/JPEG 不会被重复压缩）
+    thumbnails/          可选的缩略图
+    workflows/           按内容去重的ComfyUI工作流JSON，可直接拖入ComfyUI
+ZIP逐个条目写入（支持ZIP64），图片按块复制，内存占用与图片大小和数量无关。
+import_bundle 解包图片并通过批量写入接口导入记录
+"""
+
+import io
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import zipfile
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, Optional, Callable, Iterable
+
+from .workflow_exporter import canonical_json, record_workflows
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+
+BUNDLE_FORMAT = 'baize-bundle'
+BUNDLE_VERSION = 1
+
+# 复制图片时每次读写的字节数
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# 导入时缓存的工作流数量（多条记录通常共用同一个工作流）
+WORKFLOW_CACHE_SIZE = 64
+
+# 不写入 records.ndjson 的字段（工作流单独保存，ID 和重复关联在导入时重新生成）
+_EXCLUDED_FIELDS = ('workflow_data',)
+
+
+def _safe_name(name: str) -> str:
+    """包内文件名中去掉路径分隔符等不安全字符"""
+    return ''.join('_' if char in '<>:"/\\|?*' or ord(char) < 32 else char for char in name) or 'image'
+
+
+class BundleExporter:
+    """ZIP打包导出器"""
+
+    def __init__(self,
+                 include_images: bool = True,
+                 thumbnail_size: int = 0,
+                 extract_workflows: bool = True):
+        """
+        Args:
+            include_images: 是否打包原图
+            thumbnail_size: 缩略图最长边（像素），0 表示不生成缩略图
+            extract_workflows: 是否从图片中提取ComfyUI工作流（否则只使用数据库中保存的工作流）
+        """
+        self.include_images = include_images
+        self.thumbnail_size = thumbnail_size if PIL_AVAILABLE else 0
+        self.extract_workflows = extract_workflows
+        self.is_cancelled = False
+
+    def cancel(self):
+        """取消导出（在下一条记录前生效）"""
+        self.is_cancelled = True
+
+    def export(self,
+               records: Iterable[Dict[str, Any]],
+               output_path: str,
+               total: int = None,
+               progress_callback: Callable[[int, int, int], None] = None) -> Dict[str, Any]:
+        """
+        流式打包记录
+
+        Args:
+            records: 记录迭代器（如 DataManager.iter_records()）
+            output_path: 输出的ZIP文件路径
+            total: 记录总数（仅用于进度显示）
+            progress_callback: 进度回调 (已打包记录数, 总数, 已写字节数)
+
+        Returns:
+            Dict: {'records', 'images', 'missing_images', 'thumbnails', 'workflows',
+                   'bytes', 'output_path', 'cancelled', 'elapsed'}
+        """
+        self.is_cancelled = False
+        start_time = time.time()
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        stats = {'records': 0, 'images': 0, 'missing_images': 0, 'thumbnails': 0, 'workflows': 0}
+        workflow_paths = set()
+        # 先写入临时文件，完成后再替换，避免留下不完整的包
+        temp_path = output_path + '.part'
+        completed = False
+        try:
+            # records.ndjson 先写入临时文件，ZIP 同一时间只能写一个条目
+            with zipfile.ZipFile(temp_path, 'w', allowZip64=True) as bundle, \
+                    tempfile.TemporaryFile() as records_file:
+                for index, record in enumerate(records):
+                    if self.is_cancelled:
+                        break
+                    line = self._add_record(bundle, index, record, workflow_paths, stats)
+                    records_file.write(json.dumps(line, ensure_ascii=False, default=str).encode('utf-8'))
+                    records_file.write(b'\n')
+                    stats['records'] += 1
+                    if progress_callback:
+                        progress_callback(stats['records'], total or 0, bundle.fp.tell())
+
+                if not self.is_cancelled:
+                    info = zipfile.ZipInfo('records.ndjson', date_time=time.localtime()[:6])
+                    info.compress_type = zipfile.ZIP_DEFLATED
+                    info.file_size = records_file.seek(0, os.SEEK_END)
+                    records_file.seek(0)
+                    with bundle.open(info, 'w') as entry:
+                        shutil.copyfileobj(records_file, entry, COPY_BUFFER_SIZE)
+
+                    manifest = {
+                        'format': BUNDLE_FORMAT,
+                        'version': BUNDLE_VERSION,
+                        'created_at': datetime.now().isoformat(),
+                        'records': stats['records'],
+                        'images': stats['images'],
+                        'thumbnails': stats['thumbnails'],
+                        'workflows': stats['workflows'],
+                    }
+                    bundle.writestr('manifest.json', json.dumps(manifest, ensure_ascii=False, indent=2),
+                                    compress_type=zipfile.ZIP_DEFLATED)
+            completed = True
+        finally:
+            if not completed or self.is_cancelled:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+
+        bytes_written = 0
+        if self.is_cancelled:
+            print(f"打包已取消，已处理 {stats['records']} 条记录")
+        else:
+            os.replace(temp_path, output_path)
+            bytes_written = os.path.getsize(output_path)
+
+        stats.update({
+            'bytes': bytes_written,
+            'output_path': None if self.is_cancelled else output_path,
+            'cancelled': self.is_cancelled,
+            'elapsed': time.time() - start_time,
+        })
+        return stats
+
+    def _add_record(self, bundle: zipfile.ZipFile, index: int, record: Dict[str, Any],
+                    workflow_paths: set, stats: Dict[str, int]) -> Dict[str, Any]:
+        """写入一条记录的图片、缩略图和工作流，返回 records.ndjson 中的一行"""
+        key = str(record.get('id') or index + 1)
+        file_path = record.get('file_path') or ''
+        exists = bool(file_path) and os.path.isfile(file_path)
+        line = {field: value for field, value in record.items() if field not in _EXCLUDED_FIELDS}
+        entries = {'image': None, 'thumbnail': None, 'workflow': None, 'prompt': None}
+
+        if self.include_images:
+            if exists:
+                entries['image'] = f"images/{key}_{_safe_name(os.path.basename(file_path))}"
+                self._write_file(bundle, file_path, entries['image'])
+                stats['images'] += 1
+            else:
+                stats['missing_images'] += 1
+
+        if self.thumbnail_size and exists:
+            thumbnail = self._make_thumbnail(file_path)
+            if thumbnail is not None:
+                entries['thumbnail'] = f"thumbnails/{key}.jpg"
+                bundle.writestr(entries['thumbnail'], thumbnail, compress_type=zipfile.ZIP_STORED)
+                stats['thumbnails'] += 1
+
+        # 工作流：界面格式（workflow）和执行格式（prompt）分别按内容去重保存
+        workflow = record_workflows(record, read_image=self.extract_workflows)
+        for name in ('workflow', 'prompt'):
+            data = workflow.get(name)
+            if not data:
+                continue
+            content = canonical_json(data)
+            arcname = f"workflows/{hashlib.sha1(content).hexdigest()[:16]}.json"
+            if arcname not in workflow_paths:
+                bundle.writestr(arcname, content, compress_type=zipfile.ZIP_DEFLATED)
+                workflow_paths.add(arcname)
+                stats['workflows'] += 1
+            entries[name] = arcname
+
+        line['bundle'] = entries
+        return line
+
+    def _write_file(self, bundle: zipfile.ZipFile, file_path: str, arcname: str):
+        """按块复制文件到包中（仅存储，不压缩）"""
+        info = zipfile.ZipInfo.from_file(file_path, arcname)
+        info.compress_type = zipfile.ZIP_STORED
+        # file_size 已知，超过 2GB 时自动使用 ZIP64
+        with open(file_path, 'rb') as source, bundle.open(info, 'w') as entry:
+            shutil.copyfileobj(source, entry, COPY_BUFFER_SIZE)
+
+    def _make_thumbnail(self, file_path: str) -> Optional[bytes]:
+        try:
+            with Image.open(file_path) as img:
+                img.draft('RGB', (self.thumbnail_size, self.thumbnail_size))
+                image = img.convert('RGB')
+            image.thumbnail((self.thumbnail_size, self.thumbnail_size))
+            data = io.BytesIO()
+            image.save(data, 'JPEG', quality=80)
+            return data.getvalue()
+        except Exception as e:
+            print(f"生成缩略图失败 {file_path}: {e}")
+            return None
+
+
+def _safe_extract_path(extract_dir: str, arcname: str) -> str:
+    """包内路径对应的解压路径，拒绝指向解压目录之外的路径"""
+    target = os.path.normpath(os.path.join(extract_dir, arcname))
+    root = os.path.normpath(extract_dir)
+    if os.path.commonpath([root, target]) != root:
+        raise ValueError(f"包内路径不安全: {arcname}")
+    return target
+
+
+def import_bundle(data_manager, bundle_path: str, extract_dir: str,
+                  batch_size: int = 500,
+                  progress_callback: Callable[[int, int], None] = None) -> Dict[str, Any]:
+    """
+    导入ZIP包：解压图片并按文件路径更新或插入记录
+
+    Args:
+        data_manager: 数据管理器
+        bundle_path: ZIP包路径
+        extract_dir: 图片解压目录（记录的文件路径指向解压后的图片；包中没有图片的记录保留原路径）
+        batch_size: 每批写入数据库的记录数
+        progress_callback: 进度回调 (已导入记录数, 总记录数)
+
+    Returns:
+        Dict: {'records', 'imported', 'images', 'workflows', 'elapsed'}
+    """
+    start_time = time.time()
+    stats = {'records': 0, 'imported': 0, 'images': 0}
+    workflow_cache = OrderedDict()
+    loaded_workflows = set()
+
+    with zipfile.ZipFile(bundle_path) as bundle:
+        try:
+            manifest = json.loads(bundle.read('manifest.json'))
+        except KeyError:
+            raise ValueError("不是有效的白泽AI打包文件：缺少 manifest.json")
+        if manifest.get('format') != BUNDLE_FORMAT:
+            raise ValueError("不是有效的白泽AI打包文件")
+        if manifest.get('version', 0) > BUNDLE_VERSION:
+            raise ValueError(f"打包文件版本过新: {manifest.get('version')}")
+        total = manifest.get('records', 0)
+
+        def load_workflow(arcname):
+            if not arcname:
+                return None
+            if arcname not in workflow_cache:
+                workflow_cache[arcname] = json.loads(bundle.read(arcname))
+                loaded_workflows.add(arcname)
+                if len(workflow_cache) > WORKFLOW_CACHE_SIZE:
+                    workflow_cache.popitem(last=False)
+            else:
+                workflow_cache.move_to_end(arcname)
+            return workflow_cache[arcname]
+
+        # 包中的记录ID -> 导入后的文件路径，重复图片按原图的路径重新关联
+        id_paths = {}
+        batch = []
+        with bundle.open('records.ndjson') as raw:
+            for line in io.TextIOWrapper(raw, encoding='utf-8'):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                entries = record.pop('bundle', None) or {}
+                stats['records'] += 1
+
+                image_arcname = entries.get('image')
+                if image_arcname:
+                    target = _safe_extract_path(extract_dir, image_arcname)
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    with bundle.open(image_arcname) as source, open(target, 'wb') as destination:
+                        shutil.copyfileobj(source, destination, COPY_BUFFER_SIZE)
+                    record['file_path'] = target
+                    stats['images'] += 1
+
+                record['workflow_data'] = load_workflow(entries.get('prompt'))
+                # 数据库中以JSON文本保存的字段还原为对象，由数据管理器重新序列化
+                if isinstance(record.get('lora_info'), str):
+                    try:
+                        record['lora_info'] = json.loads(record['lora_info']) if record['lora_info'] else None
+                    except json.JSONDecodeError:
+                        record['lora_info'] = None
+                original_id = record.pop('id', None)
+                if original_id is not None:
+                    id_paths[original_id] = record.get('file_path')
+                original = id_paths.get(record.pop('duplicate_of', None))
+                if original:
+                    record['duplicate_of'] = original
+                batch.append(record)
+
+                if len(batch) >= batch_size:
+                    stats['imported'] += len(data_manager.save_records_bulk(batch))
+                    batch = []
+                    if progress_callback:
+                        progress_callback(stats['records'], total)
+
+        if batch:
+            stats['imported'] += len(data_manager.save_records_bulk(batch))
+        if progress_callback:
+            progress_callback(stats['records'], total)
+
+    stats['workflows'] = len(loaded_workflows)
+    stats['elapsed'] = time.time() - start_time
+    return stats
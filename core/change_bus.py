@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据变更通知模块
+后台任务（如文件夹监视）写入记录后通过变更总线发布事件，
+界面订阅后刷新历史记录和画廊，两者互不依赖
+"""
+
+import threading
+from typing import Dict, Any, Callable
+
+
+# 事件名称
+RECORDS_ADDED = 'records_added'
+RECORDS_CHANGED = 'records_changed'
+RECORDS_REMOVED = 'records_removed'
+
+
+class ChangeBus:
+    """线程安全的发布/订阅总线"""
+
+    def __init__(self):
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback: Callable[[str, Dict[str, Any]], None]):
+        """
+        订阅变更事件
+
+        Args:
+            callback: 回调 (事件名称, 事件数据)，在发布事件的线程中调用；
+                界面需要自行切换到主线程（如通过Qt信号）
+        """
+        with self._lock:
+            if callback not in self._subscribers:
+                self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[str, Dict[str, Any]], None]):
+        """取消订阅"""
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def publish(self, event: str, payload: Dict[str, Any] = None):
+        """
+        发布事件
+
+        Args:
+            event: 事件名称，如 RECORDS_ADDED
+            payload: 事件数据，如 {'paths': [...], 'count': 10}
+        """
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(event, payload or {})
+            except Exception as e:
+                print(f"变更通知处理失败: {e}")
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+并发自动调节模块
+统计每个文件的处理耗时，区分 I/O 等待和解析（CPU）时间，
+按时间窗口测量吞吐量并逐步增减提取线程数（爬山法）：
+CPU 密集时线程数不超过 CPU 核数，I/O 密集（如网络共享目录）时允许更多线程，
+但吞吐量不再提升或下降时会回退，避免压垮慢速存储
+"""
+
+import os
+import time
+import threading
+from typing import Dict, List, Any, Optional, Callable
+
+
+class ConcurrencyTuner:
+    """提取线程数自动调节器"""
+
+    def __init__(self,
+                 min_workers: int = 1,
+                 max_workers: int = None,
+                 initial_workers: int = None,
+                 interval: float = 2.0,
+                 min_samples: int = 20,
+                 io_bound_ratio: float = 0.5,
+                 tolerance: float = 0.05,
+                 probe_after: int = 5,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            min_workers: 最少线程数
+            max_workers: 最多线程数，默认为 CPU 核数的4倍（不超过32）
+            initial_workers: 初始线程数，默认为 CPU 核数（不超过8）
+            interval: 每个测量窗口的最短时间（秒）
+            min_samples: 每个测量窗口最少处理的文件数
+            io_bound_ratio: I/O 等待占比超过该值时视为 I/O 密集
+            tolerance: 吞吐量变化小于该比例时视为没有变化
+            probe_after: 吞吐量稳定多少个窗口后重新尝试增加线程
+            clock: 时钟函数（测试时可替换）
+        """
+        cpu_count = os.cpu_count() or 4
+        self.cpu_count = cpu_count
+        self.min_workers = max(1, min_workers)
+        self.max_workers = max(self.min_workers, max_workers or min(32, cpu_count * 4))
+        if initial_workers is None:
+            initial_workers = min(8, cpu_count)
+        self.workers = self._clamp(initial_workers, self.max_workers)
+
+        self.interval = interval
+        self.min_samples = min_samples
+        self.io_bound_ratio = io_bound_ratio
+        self.tolerance = tolerance
+        self.probe_after = probe_after
+        self.clock = clock
+
+        self.decisions = []
+        self.last_window = {}
+
+        self._lock = threading.Lock()
+        self._window_start = clock()
+        self._samples = 0
+        self._wall_time = 0.0
+        self._cpu_time = 0.0
+        self._last_throughput = None
+        self._direction = 1
+        self._stable_windows = 0
+
+    def _clamp(self, workers: int, ceiling: int) -> int:
+        return max(self.min_workers, min(workers, ceiling))
+
+    def record(self, wall_time: float, cpu_time: float):
+        """
+        记录一个文件的处理耗时（由提取线程调用）
+
+        Args:
+            wall_time: 实际耗时（秒）
+            cpu_time: 线程CPU时间（秒），两者之差视为 I/O 等待
+        """
+        with self._lock:
+            self._samples += 1
+            self._wall_time += wall_time
+            self._cpu_time += min(cpu_time, wall_time)
+
+    def update(self) -> Optional[Dict[str, Any]]:
+        """
+        测量窗口结束时计算吞吐量并调整线程数
+
+        Returns:
+            Dict: 线程数发生变化时返回调整记录，否则返回None
+        """
+        now = self.clock()
+        with self._lock:
+            elapsed = now - self._window_start
+            if elapsed < self.interval or self._samples < self.min_samples:
+                return None
+            samples, wall_time, cpu_time = self._samples, self._wall_time, self._cpu_time
+            self._window_start = now
+            self._samples = 0
+            self._wall_time = 0.0
+            self._cpu_time = 0.0
+
+        throughput = samples / elapsed
+        io_ratio = (wall_time - cpu_time) / wall_time if wall_time > 0 else 0.0
+        io_bound = io_ratio >= self.io_bound_ratio
+        self.last_window = {
+            'workers': self.workers,
+            'throughput': throughput,
+            'io_ratio': io_ratio,
+            'latency': wall_time / samples,
+            'mode': 'io' if io_bound else 'cpu',
+        }
+
+        # CPU 密集时更多线程只会互相争抢
+        ceiling = self.max_workers if io_bound else min(self.max_workers, self.cpu_count)
+        old_workers = self.workers
+
+        if old_workers > ceiling:
+            new_workers = ceiling
+            reason = 'CPU密集，线程数限制为CPU核数'
+            self._direction = -1
+        elif self._last_throughput is None:
+            new_workers = old_workers + 1
+            reason = '首次测量，尝试增加线程'
+        elif throughput > self._last_throughput * (1 + self.tolerance):
+            new_workers = old_workers + self._direction
+            reason = '吞吐量提升，继续调整'
+            self._stable_windows = 0
+        elif throughput < self._last_throughput * (1 - self.tolerance):
+            # 上一次调整使吞吐量下降（如网络共享目录被压垮），反向回退
+            self._direction = -self._direction
+            new_workers = old_workers + self._direction
+            reason = '吞吐量下降，回退'
+            self._stable_windows = 0
+        else:
+            self._stable_windows += 1
+            if self._stable_windows >= self.probe_after:
+                self._stable_windows = 0
+                self._direction = 1
+                new_workers = old_workers + 1
+                reason = '吞吐量稳定，重新尝试增加线程'
+            else:
+                new_workers = old_workers
+                reason = ''
+
+        new_workers = self._clamp(new_workers, ceiling)
+        self._last_throughput = throughput
+        if new_workers == old_workers:
+            return None
+
+        self.workers = new_workers
+        decision = dict(self.last_window, old_workers=old_workers, new_workers=new_workers,
+                        reason=reason)
+        self.decisions.append(decision)
+        print(f"并发调整: {old_workers} → {new_workers} 线程（{reason}，"
+              f"{throughput:.1f} 文件/秒，I/O等待 {io_ratio:.0%}）")
+        return decision
+
+    def get_status(self) -> Dict[str, Any]:
+        """获取当前线程数和最近一个窗口的测量结果"""
+        status = dict(self.last_window)
+        status['workers'] = self.workers
+        status['adjustments'] = len(self.decisions)
+        return status
+
+    def get_decisions(self) -> List[Dict[str, Any]]:
+        """获取全部调整记录"""
+        return list(self.decisions)
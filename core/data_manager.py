@@ -8,13 +8,26 @@
 import sqlite3
 import json
 import os
+from collections import Counter
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+
+from .library_stats import LibraryStats, STATS_COLUMNS
+from .prompt_store import PromptStore
+from .streaming_exporter import StreamingExporter, detect_export_format
+from .db_maintenance import DatabaseMaintenance
+from .library_registry import LibraryRegistry, DEFAULT_LIBRARY
+from .change_bus import ChangeBus, RECORDS_CHANGED, RECORDS_REMOVED
+from .image_hash import HashIndex, DEFAULT_MAX_DISTANCE, nearest, group_similar, to_signed64
+from .library_sync import LibrarySync
 
 
 class DataManager:
     """数据管理器"""
     
+    # SQLite默认最多可附加10个数据库
+    MAX_ATTACHED_LIBRARIES = 10
+    
     def __init__(self, db_path=None, data_dir: str = None):
         # 获取用户主目录下的应用数据目录
         app_data_dir = os.path.expanduser("~/Library/Application Support/白泽AI")
@@ -31,6 +44,12 @@ class DataManager:
                 
         self.ensure_database_exists()
         self.init_database()
+        self.library_stats = LibraryStats(self.db_path)
+        self.maintenance = DatabaseMaintenance(self.db_path)
+        self.library_sync = LibrarySync(self.db_path)
+        
+        # 后台任务写入记录后通过变更总线通知界面
+        self.change_bus = ChangeBus()
         
         # 提示词数据相关
         if data_dir is None:
@@ -44,6 +63,20 @@ class DataManager:
                 
         self.prompt_data_file = os.path.join(self.data_dir, "prompt_history.json")
         self.ensure_data_dir()
+        
+        # 提示词历史保存在独立数据库中（旧版JSON文件首次运行时自动迁移）
+        self.prompt_store = PromptStore(
+            os.path.join(self.data_dir, "prompt_history.db"),
+            legacy_json_path=self.prompt_data_file
+        )
+        
+        # 多图库：默认图库为上面的主数据库，其他图库记录在注册表中
+        self.library_registry = LibraryRegistry(
+            os.path.join(self.data_dir, "libraries.json"),
+            default_db_path=self.db_path
+        )
+        if self.library_registry.active != DEFAULT_LIBRARY:
+            self._open_library(self.library_registry.get_path(self.library_registry.active))
     
     def ensure_database_exists(self):
         """确保数据库目录存在"""
@@ -56,11 +89,19 @@ class DataManager:
         if not os.path.exists(self.data_dir):
             os.makedirs(self.data_dir, exist_ok=True)
     
-    def init_database(self):
-        """初始化数据库表"""
-        with sqlite3.connect(self.db_path) as conn:
+    def init_database(self, db_path: str = None):
+        """
+        初始化数据库表
+
+        Args:
+            db_path: 数据库路径，默认为当前图库
+        """
+        with sqlite3.connect(db_path or self.db_path) as conn:
             cursor = conn.cursor()
             
+            # 新数据库在建表前启用增量自动清理，以后回收空间不必重写整个文件（已有数据库不受影响）
+            cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            
             # 创建记录表
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS image_records (
@@ -80,6 +121,14 @@ class DataManager:
                     tags TEXT,
                     generation_source TEXT,
                     workflow_data TEXT,
+                    width INTEGER,
+                    height INTEGER,
+                    file_size INTEGER,
+                    file_mtime REAL,
+                    missing_since TEXT,
+                    image_hash INTEGER,
+                    duplicate_of INTEGER,
+                    content_hash TEXT,
                     created_at TEXT NOT NULL,
                     updated_at TEXT NOT NULL
                 )
@@ -96,10 +145,31 @@ class DataManager:
                 cursor.execute("ALTER TABLE image_records ADD COLUMN generation_source TEXT")
             if 'workflow_data' not in columns:
                 cursor.execute("ALTER TABLE image_records ADD COLUMN workflow_data TEXT")
+            if 'width' not in columns:
+                cursor.execute("ALTER TABLE image_records ADD COLUMN width INTEGER")
+            if 'height' not in columns:
+                cursor.execute("ALTER TABLE image_records ADD COLUMN height INTEGER")
+            if 'file_size' not in columns:
+                cursor.execute("ALTER TABLE image_records ADD COLUMN file_size INTEGER")
+            if 'file_mtime' not in columns:
+                cursor.execute("ALTER TABLE image_records ADD COLUMN file_mtime REAL")
+            if 'missing_since' not in columns:
+                cursor.execute("ALTER TABLE image_records ADD COLUMN missing_since TEXT")
+            if 'image_hash' not in columns:
+                cursor.execute("ALTER TABLE image_records ADD COLUMN image_hash INTEGER")
+            if 'duplicate_of' not in columns:
+                cursor.execute("ALTER TABLE image_records ADD COLUMN duplicate_of INTEGER")
+            if 'content_hash' not in columns:
+                cursor.execute("ALTER TABLE image_records ADD COLUMN content_hash TEXT")
             
             # 创建索引
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_file_path ON image_records(file_path)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_created_at ON image_records(created_at)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_image_hash ON image_records(image_hash)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_content_hash ON image_records(content_hash)")
+            
+            # 增量同步的变更日志（由触发器维护）
+            LibrarySync.init_tables(cursor)
             
             conn.commit()
     
@@ -115,83 +185,211 @@ class DataManager:
         Returns:
             int: 新记录的ID
         """
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            stats_delta = Counter()
+            record_id = self._upsert_record(cursor, record_data, datetime.now().isoformat(), stats_delta)
+            self._link_duplicates(cursor, [record_id], [record_data])
+            
+            # 增量更新统计汇总表
+            LibraryStats.apply_delta(cursor, stats_delta)
+            return record_id
+    
+    def save_records_bulk(self, records: List[Dict]) -> List[int]:
+        """
+        在单个事务中批量保存记录（按文件路径更新或插入）
+        
+        Args:
+            records: 记录数据字典列表
+        
+        Returns:
+            List[int]: 记录ID列表，顺序与输入一致
+        """
+        if not records:
+            return []
+        
+        current_time = datetime.now().isoformat()
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            stats_delta = Counter()
+            # 整批一次查询已有记录，不必每条记录单独查询
+            existing_ids = self._get_ids_by_paths(cursor, [r.get('file_path', '') for r in records])
+            record_ids = [
+                self._upsert_record(cursor, record_data, current_time, stats_delta, existing_ids)
+                for record_data in records
+            ]
+            # 整批写入后再关联重复图片，原图与副本在同一批中时也能找到
+            self._link_duplicates(cursor, record_ids, records)
+            LibraryStats.apply_delta(cursor, stats_delta)
+            return record_ids
+    
+    @staticmethod
+    def _get_ids_by_paths(cursor, file_paths: List[str]) -> Dict[str, int]:
+        """在当前事务中按文件路径批量查询记录ID {文件路径: ID}"""
+        ids = {}
+        paths = list(dict.fromkeys(file_paths))
+        for start in range(0, len(paths), 500):
+            chunk = paths[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            cursor.execute(f"SELECT file_path, id FROM image_records WHERE file_path IN ({placeholders}) ORDER BY id",
+                           chunk)
+            for file_path, record_id in cursor.fetchall():
+                ids.setdefault(file_path, record_id)
+        return ids
+    
+    def _upsert_record(self, cursor, record_data: Dict, current_time: str, stats_delta: Counter,
+                       existing_ids: Dict[str, int] = None) -> int:
+        """
+        在当前事务中更新或插入一条记录，并把统计变化累加到 stats_delta
+        
+        Args:
+            existing_ids: 预先查询的 {文件路径: 记录ID}，插入新记录后同步更新；为None时单独查询
+        
+        Returns:
+            int: 记录ID
+        """
         file_path = record_data.get('file_path', '')
         file_name = os.path.basename(file_path)
-        current_time = datetime.now().isoformat()
         
         # 检查是否已存在相同文件路径的记录
-        existing_id = self.get_record_id_by_path(file_path)
+        if existing_ids is not None:
+            existing_id = existing_ids.get(file_path)
+        else:
+            cursor.execute("SELECT id FROM image_records WHERE file_path = ?", (file_path,))
+            row = cursor.fetchone()
+            existing_id = row[0] if row else None
         
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        if existing_id:
+            old_stats_row = LibraryStats.fetch_stats_row(cursor, existing_id)
+            
+            # 更新现有记录
+            cursor.execute("""
+                UPDATE image_records SET
+                    file_name = ?,
+                    custom_name = ?,
+                    prompt = ?,
+                    negative_prompt = ?,
+                    model = ?,
+                    sampler = ?,
+                    steps = ?,
+                    cfg_scale = ?,
+                    seed = ?,
+                    lora_info = ?,
+                    notes = ?,
+                    tags = ?,
+                    generation_source = ?,
+                    workflow_data = ?,
+                    width = COALESCE(?, width),
+                    height = COALESCE(?, height),
+                    file_size = COALESCE(?, file_size),
+                    file_mtime = COALESCE(?, file_mtime),
+                    image_hash = COALESCE(?, image_hash),
+                    content_hash = COALESCE(?, content_hash),
+                    missing_since = NULL,
+                    updated_at = ?
+                WHERE id = ?
+            """, (
+                file_name,
+                record_data.get('custom_name', ''),
+                record_data.get('prompt', ''),
+                record_data.get('negative_prompt', ''),
+                record_data.get('model', ''),
+                record_data.get('sampler', ''),
+                self._safe_int(record_data.get('steps')),
+                self._safe_float(record_data.get('cfg_scale')),
+                self._safe_int(record_data.get('seed')),
+                self._serialize_lora_info(record_data.get('lora_info')),
+                record_data.get('notes', ''),
+                record_data.get('tags', ''),
+                record_data.get('generation_source', ''),
+                self._serialize_workflow_data(record_data.get('workflow_data')),
+                self._safe_int(record_data.get('width')),
+                self._safe_int(record_data.get('height')),
+                self._safe_int(record_data.get('file_size')),
+                self._safe_float(record_data.get('file_mtime')),
+                self._safe_hash(record_data.get('image_hash')),
+                record_data.get('content_hash') or None,
+                current_time,
+                existing_id
+            ))
             
-            if existing_id:
-                # 更新现有记录
+            stats_delta.update(LibraryStats.extract_facets(LibraryStats.fetch_stats_row(cursor, existing_id)))
+            stats_delta.subtract(LibraryStats.extract_facets(old_stats_row))
+            return existing_id
+        else:
+            # 插入新记录
+            values = {
+                'file_path': file_path,
+                'file_name': file_name,
+                'custom_name': record_data.get('custom_name', ''),
+                'prompt': record_data.get('prompt', ''),
+                'negative_prompt': record_data.get('negative_prompt', ''),
+                'model': record_data.get('model', ''),
+                'sampler': record_data.get('sampler', ''),
+                'steps': self._safe_int(record_data.get('steps')),
+                'cfg_scale': self._safe_float(record_data.get('cfg_scale')),
+                'seed': self._safe_int(record_data.get('seed')),
+                'lora_info': self._serialize_lora_info(record_data.get('lora_info')),
+                'notes': record_data.get('notes', ''),
+                'tags': record_data.get('tags', ''),
+                'generation_source': record_data.get('generation_source', ''),
+                'workflow_data': self._serialize_workflow_data(record_data.get('workflow_data')),
+                'width': self._safe_int(record_data.get('width')),
+                'height': self._safe_int(record_data.get('height')),
+                'file_size': self._safe_int(record_data.get('file_size')),
+                'file_mtime': self._safe_float(record_data.get('file_mtime')),
+                'image_hash': self._safe_hash(record_data.get('image_hash')),
+                'content_hash': record_data.get('content_hash') or None,
+                'created_at': record_data.get('created_at') or current_time,  # 从备份恢复时保留原创建时间
+                'updated_at': current_time,
+            }
+            cursor.execute(f"INSERT INTO image_records ({', '.join(values)}) VALUES ({', '.join('?' * len(values))})",
+                           tuple(values.values()))
+            
+            record_id = cursor.lastrowid
+            if existing_ids is not None:
+                existing_ids[file_path] = record_id
+            # 插入的值即为统计所需的字段，不必再读回
+            stats_delta.update(LibraryStats.extract_facets(values))
+            return record_id
+    
+    def _link_duplicates(self, cursor, record_ids: List[int], records: List[Dict]):
+        """
+        记录重复图片与原图的关联（记录数据中的 duplicate_of 为原图的记录ID或文件路径）
+        """
+        for record_id, record_data in zip(record_ids, records):
+            original = record_data.get('duplicate_of')
+            if original is None:
+                continue
+            if isinstance(original, str):
                 cursor.execute("""
-                    UPDATE image_records SET
-                        file_name = ?,
-                        custom_name = ?,
-                        prompt = ?,
-                        negative_prompt = ?,
-                        model = ?,
-                        sampler = ?,
-                        steps = ?,
-                        cfg_scale = ?,
-                        seed = ?,
-                        lora_info = ?,
-                        notes = ?,
-                        tags = ?,
-                        generation_source = ?,
-                        workflow_data = ?,
-                        updated_at = ?
+                    UPDATE image_records SET duplicate_of =
+                        (SELECT id FROM image_records WHERE file_path = ? AND id != ?)
                     WHERE id = ?
-                """, (
-                    file_name,
-                    record_data.get('custom_name', ''),
-                    record_data.get('prompt', ''),
-                    record_data.get('negative_prompt', ''),
-                    record_data.get('model', ''),
-                    record_data.get('sampler', ''),
-                    self._safe_int(record_data.get('steps')),
-                    self._safe_float(record_data.get('cfg_scale')),
-                    self._safe_int(record_data.get('seed')),
-                    self._serialize_lora_info(record_data.get('lora_info')),
-                    record_data.get('notes', ''),
-                    record_data.get('tags', ''),
-                    record_data.get('generation_source', ''),
-                    self._serialize_workflow_data(record_data.get('workflow_data')),
-                    current_time,
-                    existing_id
-                ))
-                return existing_id
-            else:
-                # 插入新记录
-                cursor.execute("""
-                    INSERT INTO image_records (
-                        file_path, file_name, custom_name, prompt, negative_prompt, model,
-                        sampler, steps, cfg_scale, seed, lora_info, notes, tags, generation_source, workflow_data, created_at, updated_at
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    file_path,
-                    file_name,
-                    record_data.get('custom_name', ''),
-                    record_data.get('prompt', ''),
-                    record_data.get('negative_prompt', ''),
-                    record_data.get('model', ''),
-                    record_data.get('sampler', ''),
-                    self._safe_int(record_data.get('steps')),
-                    self._safe_float(record_data.get('cfg_scale')),
-                    self._safe_int(record_data.get('seed')),
-                    self._serialize_lora_info(record_data.get('lora_info')),
-                    record_data.get('notes', ''),
-                    record_data.get('tags', ''),
-                    record_data.get('generation_source', ''),
-                    self._serialize_workflow_data(record_data.get('workflow_data')),
-                    current_time,
-                    current_time
-                ))
-                
-                return cursor.lastrowid
+                """, (original, record_id, record_id))
+            elif original != record_id:
+                cursor.execute("UPDATE image_records SET duplicate_of = ? WHERE id = ?",
+                               (self._safe_int(original), record_id))
+    
+    def link_duplicate_paths(self, links: Dict[str, str]) -> int:
+        """
+        按文件路径关联重复图片与原图（导入时原图在副本之后出现的情况）
+        
+        Args:
+            links: 副本文件路径 -> 原图文件路径
+        
+        Returns:
+            int: 关联的记录数
+        """
+        if not links:
+            return 0
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.executemany("""
+                UPDATE image_records SET duplicate_of =
+                    (SELECT id FROM image_records WHERE file_path = ? ORDER BY id LIMIT 1)
+                WHERE file_path = ? AND file_path != ?
+            """, [(original, path, original) for path, original in links.items()])
+            return cursor.rowcount
     
     def get_record_by_path(self, file_path: str) -> Optional[Dict]:
         """根据文件路径获取记录"""
@@ -208,6 +406,199 @@ class DataManager:
             result = cursor.fetchone()
             return result[0] if result else None
     
+    @staticmethod
+    def _path_prefix_range(folder_path: str) -> Tuple[str, str]:
+        """文件夹下所有路径的范围 [下界, 上界)，用于在 file_path 索引上做范围扫描"""
+        prefix = os.path.join(os.path.abspath(folder_path), '')
+        return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    
+    def get_file_manifest(self, folder_path: str) -> Dict[str, Tuple[Optional[int], Optional[float]]]:
+        """
+        批量读取文件夹下已入库文件的大小和修改时间
+        
+        Args:
+            folder_path: 文件夹路径（包含所有子文件夹）
+        
+        Returns:
+            Dict: 文件路径 -> (文件大小, 修改时间)
+        """
+        lower, upper = self._path_prefix_range(folder_path)
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.execute("""
+                SELECT file_path, file_size, file_mtime FROM image_records
+                WHERE file_path >= ? AND file_path < ?
+            """, (lower, upper))
+            return {file_path: (file_size, file_mtime) for file_path, file_size, file_mtime in cursor}
+    
+    def mark_files_missing(self, file_paths: List[str]) -> int:
+        """
+        标记文件已不存在的记录
+        
+        Returns:
+            int: 新标记的记录数
+        """
+        if not file_paths:
+            return 0
+        current_time = datetime.now().isoformat()
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.executemany("""
+                UPDATE image_records SET missing_since = ?
+                WHERE file_path = ? AND missing_since IS NULL
+            """, [(current_time, file_path) for file_path in file_paths])
+            return cursor.rowcount
+    
+    def get_missing_records(self, folder_path: str = None) -> List[Dict]:
+        """获取被标记为文件缺失的记录"""
+        sql = "SELECT * FROM image_records WHERE missing_since IS NOT NULL"
+        params = ()
+        if folder_path:
+            sql += " AND file_path >= ? AND file_path < ?"
+            params = self._path_prefix_range(folder_path)
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            return [dict(row) for row in conn.execute(sql + " ORDER BY file_path", params)]
+    
+    # ===================== 重复图片 =====================
+    
+    def get_image_hashes(self, where: str = None, params: tuple = ()) -> List[Tuple[int, str, int]]:
+        """
+        读取已计算感知哈希的记录
+        
+        Returns:
+            List[Tuple[int, str, int]]: (记录ID, 文件路径, 哈希)，按ID排序
+        """
+        sql = "SELECT id, file_path, image_hash FROM image_records WHERE image_hash IS NOT NULL"
+        if where:
+            sql += f" AND ({where})"
+        with sqlite3.connect(self.db_path) as conn:
+            return conn.execute(sql + " ORDER BY id", params).fetchall()
+    
+    def update_image_hashes(self, hashes: Dict[int, int]) -> int:
+        """
+        批量写入感知哈希（补算旧记录时使用）
+        
+        Args:
+            hashes: {记录ID: 哈希}
+        
+        Returns:
+            int: 更新的记录数
+        """
+        if not hashes:
+            return 0
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.executemany(
+                "UPDATE image_records SET image_hash = ? WHERE id = ?",
+                [(self._safe_hash(image_hash), record_id) for record_id, image_hash in hashes.items()]
+            )
+            return cursor.rowcount
+    
+    def build_hash_index(self) -> HashIndex:
+        """构建以文件路径为键的内存哈希索引（导入时判断重复图片）"""
+        return HashIndex((file_path, image_hash) for _, file_path, image_hash in self.get_image_hashes())
+    
+    def find_similar_records(self, record_id: int, max_distance: int = DEFAULT_MAX_DISTANCE) -> List[Dict]:
+        """
+        查找与指定记录相似的图片
+        
+        Args:
+            record_id: 记录ID
+            max_distance: 最大汉明距离
+        
+        Returns:
+            List[Dict]: 相似记录（不含自身），按距离排序，hash_distance 为距离
+        """
+        record = self.get_record_by_id(record_id)
+        if not record or record.get('image_hash') is None:
+            return []
+        rows = [row for row in self.get_image_hashes() if row[0] != record_id]
+        matches = nearest(record['image_hash'], [row[2] for row in rows], max_distance)
+        records = self._get_records_by_ids([rows[index][0] for _, index in matches])
+        similar = []
+        for distance, index in matches:
+            similar_record = records.get(rows[index][0])
+            if similar_record:
+                similar_record['hash_distance'] = distance
+                similar.append(similar_record)
+        return similar
+    
+    def find_duplicate_groups(self, max_distance: int = DEFAULT_MAX_DISTANCE,
+                              where: str = None, params: tuple = ()) -> List[List[Dict]]:
+        """
+        把图库中相似的图片分组
+        
+        Args:
+            max_distance: 最大汉明距离（0 只查找完全相同的图片）
+            where: 可选的过滤条件
+            params: 过滤条件的参数
+        
+        Returns:
+            List[List[Dict]]: 每组至少 2 条记录，组内最早导入的记录在前，组按大小降序
+        """
+        rows = self.get_image_hashes(where, params)
+        groups = group_similar([row[2] for row in rows], max_distance)
+        records = self._get_records_by_ids([rows[index][0] for members in groups for index in members])
+        return [
+            [records[rows[index][0]] for index in members if rows[index][0] in records]
+            for members in groups
+        ]
+    
+    def _get_records_by_ids(self, record_ids: List[int]) -> Dict[int, Dict]:
+        """按ID批量读取记录 {ID: 记录}"""
+        records = {}
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            for start in range(0, len(record_ids), 500):
+                chunk = record_ids[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                for row in conn.execute(f"SELECT * FROM image_records WHERE id IN ({placeholders})", chunk):
+                    records[row['id']] = dict(row)
+        return records
+    
+    def get_records_by_paths(self, file_paths: List[str], columns: List[str] = None) -> Dict[str, Dict]:
+        """
+        按文件路径批量读取记录
+
+        Args:
+            file_paths: 文件路径列表
+            columns: 读取的列，默认为全部列
+
+        Returns:
+            Dict[str, Dict]: {文件路径: 记录}
+        """
+        select = ', '.join(['file_path'] + [c for c in columns if c != 'file_path']) if columns else '*'
+        records = {}
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            paths = list(dict.fromkeys(file_paths))
+            for start in range(0, len(paths), 500):
+                chunk = paths[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                for row in conn.execute(f"SELECT {select} FROM image_records WHERE file_path IN ({placeholders})",
+                                        chunk):
+                    records[row['file_path']] = dict(row)
+        return records
+    
+    def get_paths_by_content_hash(self, content_hashes: List[str]) -> Dict[str, str]:
+        """
+        按文件内容哈希查找记录的文件路径（同一内容有多条记录时取最早的记录）
+
+        Returns:
+            Dict[str, str]: {内容哈希: 文件路径}
+        """
+        paths = {}
+        with sqlite3.connect(self.db_path) as conn:
+            hashes = list(dict.fromkeys(content_hashes))
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                for content_hash, file_path in conn.execute(f"""
+                    SELECT content_hash, file_path FROM image_records
+                    WHERE content_hash IN ({placeholders}) ORDER BY id DESC
+                """, chunk):
+                    paths[content_hash] = file_path
+        return paths
+    
     def get_all_records(self) -> List[Dict]:
         """获取所有记录"""
         with sqlite3.connect(self.db_path) as conn:
@@ -222,6 +613,52 @@ class DataManager:
             rows = cursor.fetchall()
             return [dict(row) for row in rows]
     
+    def iter_records(self, chunk_size: int = 500, where: str = None, params: tuple = (),
+                     order_by: str = 'created_at DESC') -> Iterator[Dict]:
+        """
+        按块迭代记录，不一次性载入整个图库
+
+        Args:
+            chunk_size: 每次从游标读取的行数
+            where: 可选的WHERE条件（不含WHERE关键字）
+            params: WHERE条件的参数
+            order_by: 排序方式
+
+        Yields:
+            Dict: 记录
+        """
+        sql = "SELECT * FROM image_records"
+        if where:
+            sql += f" WHERE {where}"
+        if order_by:
+            sql += f" ORDER BY {order_by}"
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(row)
+        finally:
+            conn.close()
+
+    def count_records(self, where: str = None, params: tuple = ()) -> int:
+        """统计记录数量"""
+        sql = "SELECT COUNT(*) FROM image_records"
+        if where:
+            sql += f" WHERE {where}"
+        with sqlite3.connect(self.db_path) as conn:
+            return conn.execute(sql, params).fetchone()[0]
+
+    def get_record_columns(self) -> List[str]:
+        """获取记录表的列名"""
+        with sqlite3.connect(self.db_path) as conn:
+            return [row[1] for row in conn.execute("PRAGMA table_info(image_records)")]
+
     def get_record_by_id(self, record_id: int) -> Optional[Dict]:
         """根据ID获取记录"""
         with sqlite3.connect(self.db_path) as conn:
@@ -237,8 +674,13 @@ class DataManager:
         """删除记录"""
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
+            old_stats_row = LibraryStats.fetch_stats_row(cursor, record_id)
+            self.library_sync.hash_before_delete(cursor, [record_id])
             cursor.execute("DELETE FROM image_records WHERE id = ?", (record_id,))
-            return cursor.rowcount > 0
+            deleted = cursor.rowcount > 0
+            if deleted:
+                LibraryStats.apply_change(cursor, old_stats_row, None)
+            return deleted
     
     def update_record_file_path(self, record_id: int, new_file_path: str) -> bool:
         """更新记录的文件路径"""
@@ -251,6 +693,7 @@ class DataManager:
                     UPDATE image_records SET
                         file_path = ?,
                         file_name = ?,
+                        missing_since = NULL,
                         updated_at = ?
                     WHERE id = ?
                 """, (
@@ -265,34 +708,242 @@ class DataManager:
             print(f"更新记录文件路径时出错: {e}")
             return False
     
+    def relink_records(self, new_paths: Dict[int, str]) -> int:
+        """
+        批量更新记录的文件路径（文件被移动后重新关联）
+        
+        Args:
+            new_paths: 记录ID -> 新文件路径
+        
+        Returns:
+            int: 更新的记录数
+        """
+        if not new_paths:
+            return 0
+        current_time = datetime.now().isoformat()
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.executemany("""
+                UPDATE image_records SET
+                    file_path = ?,
+                    file_name = ?,
+                    missing_since = NULL,
+                    updated_at = ?
+                WHERE id = ?
+            """, [(new_path, os.path.basename(new_path), current_time, record_id)
+                  for record_id, new_path in new_paths.items()])
+            return cursor.rowcount
+    
+    def relink_folder(self, old_folder: str, new_folder: str, require_exists: bool = True) -> int:
+        """
+        整个文件夹移动后，把旧文件夹下的记录改为新文件夹中的对应路径
+        
+        Args:
+            old_folder: 原文件夹
+            new_folder: 新文件夹
+            require_exists: 只更新新路径下文件确实存在的记录
+        
+        Returns:
+            int: 更新的记录数
+        """
+        lower, upper = self._path_prefix_range(old_folder)
+        new_prefix = os.path.join(os.path.abspath(new_folder), '')
+        new_paths = {}
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.execute("""
+                SELECT id, file_path FROM image_records
+                WHERE file_path >= ? AND file_path < ?
+            """, (lower, upper))
+            for record_id, file_path in cursor:
+                new_path = new_prefix + file_path[len(lower):]
+                if require_exists and not os.path.exists(new_path):
+                    continue
+                new_paths[record_id] = new_path
+        return self.relink_records(new_paths)
+    
+    # 关键词搜索的字段
+    SEARCH_FIELDS = ('file_name', 'prompt', 'negative_prompt', 'model', 'notes')
+    
+    @classmethod
+    def keyword_filter(cls, keyword: str) -> Tuple[str, tuple]:
+        """
+        关键词搜索条件，可传给 iter_records / count_records 的 where 和 params
+        
+        Returns:
+            (WHERE子句, 参数)
+        """
+        where = ' OR '.join(f"{field} LIKE ?" for field in cls.SEARCH_FIELDS)
+        return f"({where})", (f'%{keyword}%',) * len(cls.SEARCH_FIELDS)
+    
     def search_records(self, keyword: str) -> List[Dict]:
         """搜索记录"""
+        where, params = self.keyword_filter(keyword)
         with sqlite3.connect(self.db_path) as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             
             # 在多个字段中搜索
-            cursor.execute("""
+            cursor.execute(f"""
                 SELECT * FROM image_records 
-                WHERE file_name LIKE ? 
-                   OR prompt LIKE ? 
-                   OR negative_prompt LIKE ?
-                   OR model LIKE ?
-                   OR notes LIKE ?
+                WHERE {where}
                 ORDER BY created_at DESC
-            """, (f'%{keyword}%',) * 5)
+            """, params)
             
             rows = cursor.fetchall()
             return [dict(row) for row in rows]
     
+    def export_records(self, file_path: str, export_format: str = None,
+                       progress_callback=None, exporter: StreamingExporter = None,
+                       **options) -> Optional[Dict[str, Any]]:
+        """
+        流式导出所有记录，格式由扩展名决定（.json/.ndjson/.jsonl/.csv，可加 .gz）
+
+        Args:
+            file_path: 输出文件路径
+            export_format: 导出格式，为None时根据扩展名判断
+            progress_callback: 进度回调 (已写行数, 总行数, 已写字节数)
+            exporter: 流式导出器，传入后可从其他线程调用其 cancel()
+            **options: 传递给 StreamingExporter.export 的其他参数
+
+        Returns:
+            Dict: 导出结果，失败时返回None
+        """
+        try:
+            exporter = exporter or StreamingExporter()
+            if export_format is None:
+                export_format = detect_export_format(file_path)[0]
+            if export_format == 'csv':
+                options.setdefault('fieldnames', self.get_record_columns())
+            return exporter.export(
+                self.iter_records(chunk_size=exporter.chunk_size),
+                file_path,
+                export_format=export_format,
+                total_rows=self.count_records(),
+                progress_callback=progress_callback,
+                **options
+            )
+        except Exception as e:
+            print(f"导出记录失败: {e}")
+            return None
+
+    def export_parquet(self, file_path: str, progress_callback=None, exporter=None,
+                       where: str = None, params: tuple = ()) -> Optional[Dict[str, Any]]:
+        """
+        导出记录为 Parquet 列式文件（需要 pyarrow）
+
+        Args:
+            file_path: 输出文件路径
+            progress_callback: 进度回调 (已写行数, 总行数, 已写行组数)
+            exporter: ParquetExporter，传入后可从其他线程调用其 cancel()
+            where: 可选的WHERE条件
+            params: WHERE条件的参数
+
+        Returns:
+            Dict: 导出结果，失败时返回None
+        """
+        try:
+            from .parquet_io import ParquetExporter
+            exporter = exporter or ParquetExporter()
+            # 按ID顺序导出，恢复时重复图片的原图总在副本之前
+            return exporter.export(
+                self.iter_records(where=where, params=params, order_by='id'),
+                file_path,
+                total_rows=self.count_records(where, params),
+                progress_callback=progress_callback
+            )
+        except Exception as e:
+            print(f"导出Parquet失败: {e}")
+            return None
+
+    def import_parquet(self, file_path: str, progress_callback=None) -> Optional[Dict[str, Any]]:
+        """
+        从 Parquet 文件批量恢复记录（按文件路径更新或插入）
+
+        Args:
+            file_path: Parquet 文件路径
+            progress_callback: 进度回调 (已导入行数, 总行数)
+
+        Returns:
+            Dict: {'rows', 'imported', 'skipped', 'elapsed'}，失败时返回None
+        """
+        try:
+            from .parquet_io import import_parquet
+            return import_parquet(self, file_path, progress_callback=progress_callback)
+        except Exception as e:
+            print(f"导入Parquet失败: {e}")
+            return None
+
+    def import_records(self, file_path: str, mode: str = 'update', progress_callback=None,
+                       importer=None) -> Optional[Dict[str, Any]]:
+        """
+        流式导入 JSON / NDJSON / CSV 导出文件（按文件路径或内容哈希更新或插入记录）
+
+        Args:
+            file_path: 导出文件路径（可gzip压缩）
+            mode: 已有记录的处理方式 update / merge / skip
+            progress_callback: 进度回调 (已读记录数, 已读字节数, 文件字节数)
+            importer: RecordImporter，传入后可从其他线程调用其 cancel()
+
+        Returns:
+            Dict: {'rows', 'imported', 'added', 'updated', 'skipped', ...}，失败时返回None
+        """
+        try:
+            from .record_importer import RecordImporter
+            importer = importer or RecordImporter(mode=mode)
+            return importer.import_file(self, file_path, progress_callback=progress_callback)
+        except Exception as e:
+            print(f"导入记录失败: {e}")
+            return None
+
+    def export_changeset(self, file_path: str, peer: str = None, since: int = None) -> Optional[Dict[str, Any]]:
+        """
+        导出增量同步变更集（某个版本之后的记录修改与删除）
+
+        Args:
+            file_path: 输出文件路径（.gz 结尾时压缩）
+            peer: 对端图库ID，默认从上次导出给它的版本开始
+            since: 起始版本（不含），优先于 peer 的记录
+
+        Returns:
+            Dict: 导出结果，失败时返回None
+        """
+        try:
+            return self.library_sync.export_changeset(file_path, since=since, peer=peer)
+        except Exception as e:
+            print(f"导出变更集失败: {e}")
+            return None
+
+    def import_changeset(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """
+        合并另一台机器导出的变更集（按内容哈希匹配图片，逐字段以较新的修改为准）
+
+        Args:
+            file_path: 变更集文件路径
+
+        Returns:
+            Dict: 合并结果（含冲突列表），失败时返回None
+        """
+        try:
+            result = self.library_sync.import_changeset(file_path)
+        except Exception as e:
+            print(f"导入变更集失败: {e}")
+            return None
+        if result['record_ids']:
+            self.change_bus.publish(RECORDS_CHANGED, {'ids': result['record_ids'],
+                                                      'count': len(result['record_ids']), 'source': 'sync'})
+        if result['deleted']:
+            self.change_bus.publish(RECORDS_REMOVED, {'count': result['deleted'], 'source': 'sync'})
+        return result
+
+    def get_sync_status(self) -> Dict[str, Any]:
+        """获取增量同步状态（本图库ID、当前版本和各对端的同步进度）"""
+        return self.library_sync.get_status()
+
     def export_to_json(self, file_path: str) -> bool:
         """导出数据为JSON格式"""
         try:
-            records = self.get_all_records()
-            
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(records, f, ensure_ascii=False, indent=2)
-            
+            StreamingExporter().export(self.iter_records(), file_path,
+                                       export_format='json', compress=False, indent=2)
             return True
         except Exception as e:
             print(f"导出JSON失败: {e}")
@@ -301,17 +952,12 @@ class DataManager:
     def export_to_csv(self, file_path: str) -> bool:
         """导出数据为CSV格式"""
         try:
-            import csv
-            
-            records = self.get_all_records()
-            if not records:
+            if self.count_records() == 0:
                 return False
             
-            with open(file_path, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=records[0].keys())
-                writer.writeheader()
-                writer.writerows(records)
-            
+            StreamingExporter().export(self.iter_records(), file_path,
+                                       export_format='csv', compress=False,
+                                       fieldnames=self.get_record_columns())
             return True
         except Exception as e:
             print(f"导出CSV失败: {e}")
@@ -326,6 +972,11 @@ class DataManager:
         except (ValueError, TypeError):
             return None
              
+    def _safe_hash(self, value) -> Optional[int]:
+        """感知哈希转换为有符号 64 位整数（SQLite INTEGER 的范围）"""
+        value = self._safe_int(value)
+        return to_signed64(value) if value is not None else None
+    
     def _safe_float(self, value) -> Optional[float]:
         """安全转换为浮点数"""
         if value is None or value == '':
@@ -375,7 +1026,7 @@ class DataManager:
     
     def save_prompt_data(self, prompt_data: Dict[str, Any]) -> bool:
         """
-        保存提示词数据
+        保存提示词数据（只写入发生变化的场景和提示词）
         
         Args:
             prompt_data: 提示词数据字典，格式如下：
@@ -394,11 +1045,9 @@ class DataManager:
             # 添加时间戳
             prompt_data["last_updated"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             
-            # 保存到文件
-            with open(self.prompt_data_file, 'w', encoding='utf-8') as f:
-                json.dump(prompt_data, f, ensure_ascii=False, indent=2)
-            
-            print(f"提示词数据已保存到: {self.prompt_data_file}")
+            change_count = self.prompt_store.save(prompt_data)
+            if change_count:
+                print(f"提示词数据已保存: {change_count} 处变更")
             return True
             
         except Exception as e:
@@ -410,16 +1059,14 @@ class DataManager:
         加载提示词数据
         
         Returns:
-            提示词数据字典，如果文件不存在或加载失败则返回None
+            提示词数据字典，如果没有记录或加载失败则返回None
         """
         try:
-            if not os.path.exists(self.prompt_data_file):
-                print("提示词历史文件不存在，将创建新的记录")
+            data = self.prompt_store.load()
+            if data is None:
+                print("提示词历史为空，将创建新的记录")
                 return None
             
-            with open(self.prompt_data_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
             print(f"成功加载提示词数据，最后更新时间: {data.get('last_updated', '未知')}")
             return data
             
@@ -454,29 +1101,45 @@ class DataManager:
             "last_updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }
     
-    def backup_prompt_data(self) -> bool:
+    def backup_prompt_data(self, label: str = '') -> bool:
         """
-        备份提示词数据
+        备份提示词数据（在变更日志中记录检查点，可通过 restore_prompt_data 恢复）
         """
         try:
-            if not os.path.exists(self.prompt_data_file):
-                return True
-            
-            # 创建备份文件名
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_file = os.path.join(self.data_dir, f"prompt_history_backup_{timestamp}.json")
-            
-            # 复制文件
-            import shutil
-            shutil.copy2(self.prompt_data_file, backup_file)
-            
-            print(f"数据已备份到: {backup_file}")
+            checkpoint_time = self.prompt_store.mark_checkpoint(label)
+            print(f"已记录提示词检查点: {checkpoint_time}")
             return True
             
         except Exception as e:
             print(f"备份数据失败: {e}")
             return False
     
+    def restore_prompt_data(self, point_in_time: str) -> Optional[Dict[str, Any]]:
+        """
+        将提示词数据恢复到指定时间点
+        
+        Args:
+            point_in_time: ISO格式时间（如检查点时间）
+        """
+        try:
+            return self.prompt_store.restore(point_in_time)
+        except Exception as e:
+            print(f"恢复提示词数据失败: {e}")
+            return None
+    
+    def compact_prompt_history(self, before: str) -> int:
+        """
+        压缩提示词变更日志，指定时间点之前的历史合并为一个快照
+        
+        Returns:
+            int: 删除的日志条数
+        """
+        try:
+            return self.prompt_store.compact(before)
+        except Exception as e:
+            print(f"压缩提示词历史失败: {e}")
+            return 0
+    
     def export_prompt_data(self, export_path: str) -> bool:
         """
         导出提示词数据到指定路径
@@ -525,7 +1188,9 @@ class DataManager:
         try:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
+                self.library_sync.hash_before_delete(cursor)
                 cursor.execute("DELETE FROM image_records")
+                LibraryStats.clear(cursor)
                 return cursor.rowcount >= 0  # 即使没有记录也返回True
         except Exception as e:
             print(f"清空所有记录时出错: {e}")
@@ -558,4 +1223,293 @@ class DataManager:
             return all_tags
         except Exception as e:
             print(f"获取标签失败: {e}")
-            return set()
\ No newline at end of file
+            return set()
+    
+    # ===================== 多图库功能 =====================
+    
+    @property
+    def active_library(self) -> str:
+        """当前图库名称"""
+        return self.library_registry.active
+    
+    def list_libraries(self) -> List[Dict[str, Any]]:
+        """
+        列出所有图库
+        
+        Returns:
+            List[Dict]: {'name', 'path', 'active', 'exists'}
+        """
+        return [
+            {
+                'name': name,
+                'path': self.library_registry.get_path(name),
+                'active': name == self.active_library,
+                'exists': os.path.exists(self.library_registry.get_path(name))
+            }
+            for name in self.library_registry.names()
+        ]
+    
+    def create_library(self, name: str) -> bool:
+        """创建新图库"""
+        try:
+            db_path = self.library_registry.add(name)
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            self._prepare_library(db_path)
+            return True
+        except Exception as e:
+            print(f"创建图库失败: {e}")
+            return False
+    
+    def remove_library(self, name: str, delete_file: bool = False) -> bool:
+        """
+        删除图库
+        
+        Args:
+            name: 图库名称（不能是默认图库或当前图库）
+            delete_file: 是否同时删除数据库文件
+        """
+        try:
+            db_path = self.library_registry.remove(name)
+            if delete_file and db_path and os.path.exists(db_path):
+                os.remove(db_path)
+            return True
+        except Exception as e:
+            print(f"删除图库失败: {e}")
+            return False
+    
+    def switch_library(self, name: str, persist: bool = True) -> bool:
+        """
+        切换当前图库，无需重启
+        
+        Args:
+            name: 图库名称
+            persist: 是否记住为下次启动时的图库
+        
+        Returns:
+            bool: 是否成功
+        """
+        try:
+            db_path = self.library_registry.get_path(name)
+            if db_path is None:
+                raise KeyError(f"图库不存在: {name}")
+            self._open_library(db_path)
+            self.library_registry.set_active(name, persist=persist)
+            return True
+        except Exception as e:
+            print(f"切换图库失败: {e}")
+            return False
+    
+    def _open_library(self, db_path: str):
+        """将当前数据库切换为指定图库，并重新绑定统计与维护组件"""
+        self._prepare_library(db_path)
+        self.db_path = db_path
+        self.library_stats = LibraryStats(self.db_path)
+        self.maintenance = DatabaseMaintenance(self.db_path)
+        self.library_sync = LibrarySync(self.db_path)
+    
+    def _prepare_library(self, db_path: str):
+        """确保图库数据库存在且表结构为最新"""
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.init_database(db_path)
+        with sqlite3.connect(db_path) as conn:
+            LibraryStats.init_tables(conn.cursor())
+    
+    def _attach_libraries(self, conn, libraries: List[str] = None) -> List[Tuple[str, str]]:
+        """
+        将其他图库附加到当前连接
+        
+        Args:
+            conn: 当前图库的连接
+            libraries: 要包含的图库名称，默认为全部
+        
+        Returns:
+            List[Tuple[str, str]]: (schema名, 图库名称)，当前图库为 main
+        """
+        names = libraries or self.library_registry.names()
+        schemas = []
+        for name in names:
+            if name == self.active_library:
+                schemas.insert(0, ('main', name))
+                continue
+            db_path = self.library_registry.get_path(name)
+            if not db_path or not os.path.exists(db_path):
+                continue
+            if len(schemas) >= self.MAX_ATTACHED_LIBRARIES:
+                print(f"附加的图库数量超过上限 {self.MAX_ATTACHED_LIBRARIES}，已跳过: {name}")
+                continue
+            self._prepare_library(db_path)
+            schema = f"lib_{len(schemas)}"
+            conn.execute(f"ATTACH DATABASE ? AS {schema}", (db_path,))
+            schemas.append((schema, name))
+        if libraries and self.active_library not in libraries:
+            schemas = [item for item in schemas if item[0] != 'main']
+        return schemas
+    
+    def _create_union_view(self, conn, schemas: List[Tuple[str, str]], table: str, columns: List[str]) -> str:
+        """在临时库中创建合并多个图库同名表的视图，返回视图名"""
+        column_sql = ', '.join(columns)
+        selects = [
+            f"SELECT {index} AS library_index, {column_sql} FROM {schema}.{table}"
+            for index, (schema, _) in enumerate(schemas)
+        ]
+        view_name = f"all_{table}"
+        conn.execute(f"DROP VIEW IF EXISTS temp.{view_name}")
+        conn.execute(f"CREATE TEMP VIEW {view_name} AS {' UNION ALL '.join(selects)}")
+        return view_name
+    
+    def search_all_libraries(self, keyword: str, libraries: List[str] = None) -> List[Dict]:
+        """
+        跨图库搜索记录
+        
+        Args:
+            keyword: 关键词
+            libraries: 要搜索的图库名称，默认为全部
+        
+        Returns:
+            List[Dict]: 记录列表，每条记录的 'library' 字段为所属图库
+        """
+        try:
+            columns = self.get_record_columns()
+            with sqlite3.connect(self.db_path) as conn:
+                schemas = self._attach_libraries(conn, libraries)
+                if not schemas:
+                    return []
+                view_name = self._create_union_view(conn, schemas, 'image_records', columns)
+                
+                conn.row_factory = sqlite3.Row
+                cursor = conn.execute(f"""
+                    SELECT * FROM {view_name}
+                    WHERE file_name LIKE ? 
+                       OR prompt LIKE ? 
+                       OR negative_prompt LIKE ?
+                       OR model LIKE ?
+                       OR notes LIKE ?
+                    ORDER BY created_at DESC
+                """, (f'%{keyword}%',) * 5)
+                
+                records = []
+                for row in cursor.fetchall():
+                    record = dict(row)
+                    record['library'] = schemas[record.pop('library_index')][1]
+                    records.append(record)
+                return records
+        except Exception as e:
+            print(f"跨图库搜索失败: {e}")
+            return []
+    
+    def get_facet_counts_all_libraries(self, dimension: str, limit: int = None,
+                                       libraries: List[str] = None) -> List[Tuple[str, int]]:
+        """
+        跨图库统计计数（合并各图库的统计汇总表）
+        
+        Args:
+            dimension: 统计维度（model / lora / sampler / source / tag / day 等）
+            limit: 返回数量上限
+            libraries: 要统计的图库名称，默认为全部
+        
+        Returns:
+            List[Tuple[str, int]]: (值, 数量) 列表
+        """
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                schemas = self._attach_libraries(conn, libraries)
+                if not schemas:
+                    return []
+                view_name = self._create_union_view(conn, schemas, 'library_stats',
+                                                    ['dimension', 'value', 'count'])
+                sql = f"""
+                    SELECT value, SUM(count) AS total FROM {view_name}
+                    WHERE dimension = ?
+                    GROUP BY value
+                    ORDER BY total DESC, value
+                """
+                params = [dimension]
+                if limit:
+                    sql += " LIMIT ?"
+                    params.append(limit)
+                return [tuple(row) for row in conn.execute(sql, params).fetchall()]
+        except Exception as e:
+            print(f"跨图库统计失败: {e}")
+            return []
+    
+    def move_records(self, record_ids: List[int], target_library: str) -> int:
+        """
+        将记录批量移动到另一个图库（单个事务内完成，同路径记录会被覆盖）
+        
+        Args:
+            record_ids: 当前图库中的记录ID
+            target_library: 目标图库名称
+        
+        Returns:
+            int: 移动的记录数量
+        """
+        if not record_ids or target_library == self.active_library:
+            return 0
+        
+        try:
+            target_path = self.library_registry.get_path(target_library)
+            if target_path is None:
+                raise KeyError(f"图库不存在: {target_library}")
+            self._prepare_library(target_path)
+            
+            source_columns = self.get_record_columns()
+            with sqlite3.connect(target_path) as conn:
+                target_columns = {row[1] for row in conn.execute("PRAGMA table_info(image_records)")}
+            # 重复关联引用的是本图库的记录ID，移动后不再有效
+            columns = [c for c in source_columns if c not in ('id', 'duplicate_of') and c in target_columns]
+            column_sql = ', '.join(columns)
+            stats_sql = ', '.join(STATS_COLUMNS)
+            
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute("ATTACH DATABASE ? AS target", (target_path,))
+                cursor = conn.cursor()
+                cursor.execute("CREATE TEMP TABLE move_ids (id INTEGER PRIMARY KEY)")
+                cursor.executemany("INSERT OR IGNORE INTO move_ids (id) VALUES (?)",
+                                   [(record_id,) for record_id in record_ids])
+                
+                # 统计增量：源图库减去移出的记录，目标图库加上移入的记录并减去被覆盖的记录
+                cursor.execute(f"""
+                    SELECT {stats_sql} FROM main.image_records
+                    WHERE id IN (SELECT id FROM move_ids)
+                """)
+                moved = Counter()
+                for row in cursor.fetchall():
+                    moved.update(LibraryStats.extract_facets(dict(zip(STATS_COLUMNS, row))))
+                cursor.execute(f"""
+                    SELECT {stats_sql} FROM target.image_records
+                    WHERE file_path IN (
+                        SELECT file_path FROM main.image_records WHERE id IN (SELECT id FROM move_ids)
+                    )
+                """)
+                replaced = Counter()
+                for row in cursor.fetchall():
+                    replaced.update(LibraryStats.extract_facets(dict(zip(STATS_COLUMNS, row))))
+                
+                # 源图库中的删除要能同步出去，复制前补算内容哈希
+                self.library_sync.hash_before_delete(cursor, record_ids)
+                cursor.execute("""
+                    DELETE FROM target.image_records WHERE file_path IN (
+                        SELECT file_path FROM main.image_records WHERE id IN (SELECT id FROM move_ids)
+                    )
+                """)
+                cursor.execute(f"""
+                    INSERT INTO target.image_records ({column_sql})
+                    SELECT {column_sql} FROM main.image_records
+                    WHERE id IN (SELECT id FROM move_ids)
+                """)
+                moved_count = cursor.rowcount
+                cursor.execute("DELETE FROM main.image_records WHERE id IN (SELECT id FROM move_ids)")
+                
+                target_delta = Counter(moved)
+                target_delta.subtract(replaced)
+                source_delta = Counter()
+                source_delta.subtract(moved)
+                LibraryStats.apply_delta(cursor, target_delta, schema='target')
+                LibraryStats.apply_delta(cursor, source_delta)
+                
+                conn.commit()
+                cursor.execute("DROP TABLE temp.move_ids")
+                return moved_count
+        except Exception as e:
+            print(f"移动记录失败: {e}")
+            return 0
@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+训练数据集导出模块
+把选中的记录导出为 LoRA 训练常用的 图片 + 同名 .txt 标注 格式：
+标注由提示词和/或标签生成，可去掉权重语法、LoRA 标记和指定的词；
+图片需要缩放、裁剪或转换格式时在进程池中处理，不需要处理时优先使用
+reflink/硬链接，不占用额外空间。
+输出目录中的 dataset_manifest.json 记录每张图片的来源和处理参数，
+再次运行时只处理新增或修改的记录，中断后可继续
+"""
+
+import os
+import re
+import json
+import time
+import fnmatch
+import hashlib
+import shutil
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, Callable, Iterable
+
+try:
+    from PIL import Image, ImageOps
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+
+MANIFEST_NAME = 'dataset_manifest.json'
+
+# 标注来源
+CAPTION_SOURCES = ('prompt', 'tags', 'both')
+
+# 图片处理方式
+LINK_MODES = ('auto', 'reflink', 'hardlink', 'copy')
+
+# 输出图片格式 -> (扩展名, PIL格式)
+IMAGE_FORMATS = {
+    'png': ('.png', 'PNG'),
+    'jpg': ('.jpg', 'JPEG'),
+    'webp': ('.webp', 'WEBP'),
+}
+
+# 每处理多少张图片保存一次清单（中断后从这里继续）
+MANIFEST_SAVE_INTERVAL = 200
+
+# Linux 上的 FICLONE ioctl（btrfs、XFS 等支持写时复制的文件系统）
+_FICLONE = 0x40049409
+
+_LORA_TAG = re.compile(r'<[^<>]*>')
+_WEIGHT_SUFFIX = re.compile(r':\s*-?\d+(?:\.\d+)?\s*$')
+_ESCAPED_BRACKET = re.compile(r'\\([()\[\]])')
+
+
+def _strip_weights(token: str) -> str:
+    """去掉 (word:1.2)、((word))、[word] 等权重语法，保留转义的括号"""
+    placeholders = {'(': '\x01', ')': '\x02', '[': '\x03', ']': '\x04'}
+    token = _ESCAPED_BRACKET.sub(lambda match: placeholders[match.group(1)], token)
+    token = re.sub(r'[()\[\]]', '', token)
+    token = _WEIGHT_SUFFIX.sub('', token)
+    for bracket, placeholder in placeholders.items():
+        token = token.replace(placeholder, bracket)
+    return token
+
+
+def clean_caption(text: str,
+                  strip_weights: bool = True,
+                  exclude_tokens: Iterable[str] = (),
+                  max_tokens: int = 0) -> List[str]:
+    """
+    提示词拆分为逗号分隔的词并清理
+
+    Args:
+        text: 提示词或标签文本
+        strip_weights: 是否去掉权重语法和 <lora:...> 等标记
+        exclude_tokens: 要去掉的词，不区分大小写，支持通配符（如 "score_*"）
+        max_tokens: 最多保留的词数，0 表示不限制
+
+    Returns:
+        List[str]: 去重后的词
+    """
+    if not text:
+        return []
+    if strip_weights:
+        text = _LORA_TAG.sub(',', text)
+    patterns = [pattern.strip().lower() for pattern in exclude_tokens if pattern and pattern.strip()]
+
+    tokens = []
+    seen = set()
+    for token in re.split(r'[,\n]', text):
+        if strip_weights:
+            token = _strip_weights(token)
+        token = ' '.join(token.split())
+        key = token.lower()
+        if not token or key in seen:
+            continue
+        if any(fnmatch.fnmatchcase(key, pattern) for pattern in patterns):
+            continue
+        seen.add(key)
+        tokens.append(token)
+        if max_tokens and len(tokens) >= max_tokens:
+            break
+    return tokens
+
+
+def _clone_file(source: str, target: str, link_mode: str) -> str:
+    """
+    不经过转换地放置图片
+
+    Returns:
+        str: 实际使用的方式 reflink / hardlink / copy
+    """
+    if link_mode in ('auto', 'reflink'):
+        try:
+            import fcntl
+            with open(source, 'rb') as src, open(target, 'wb') as dst:
+                fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+            return 'reflink'
+        except (ImportError, OSError):
+            if os.path.exists(target):
+                os.remove(target)
+    if link_mode in ('auto', 'hardlink'):
+        try:
+            os.link(source, target)
+            return 'hardlink'
+        except OSError:
+            pass
+    shutil.copy2(source, target)
+    return 'copy'
+
+
+def _transform_image(source: str, target: str, resolution: int, square_crop: bool,
+                     pil_format: Optional[str], quality: int) -> Optional[str]:
+    """
+    缩放、裁剪并转换图片（在子进程中执行）
+
+    Returns:
+        错误信息，成功时返回None
+    """
+    try:
+        with Image.open(source) as img:
+            if resolution:
+                img.draft('RGB', (resolution, resolution))
+            image = ImageOps.exif_transpose(img)
+            pil_format = pil_format or img.format or 'PNG'
+            if square_crop:
+                side = min(image.size)
+                image = ImageOps.fit(image, (side, side), Image.Resampling.LANCZOS)
+            if resolution and max(image.size) > resolution:
+                image.thumbnail((resolution, resolution), Image.Resampling.LANCZOS)
+            if pil_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            elif image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+                image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+
+            temp_path = target + '.part'
+            options = {'quality': quality} if pil_format in ('JPEG', 'WEBP') else {}
+            image.save(temp_path, pil_format, **options)
+            os.replace(temp_path, target)
+        return None
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+
+
+class DatasetExporter:
+    """训练数据集导出器"""
+
+    def __init__(self,
+                 caption_source: str = 'prompt',
+                 strip_weights: bool = True,
+                 exclude_tokens: Iterable[str] = (),
+                 max_tokens: int = 0,
+                 trigger_word: str = '',
+                 resolution: int = 0,
+                 square_crop: bool = False,
+                 image_format: str = None,
+                 quality: int = 95,
+                 link_mode: str = 'auto',
+                 max_workers: int = None):
+        """
+        Args:
+            caption_source: 标注来源 prompt / tags / both
+            strip_weights: 是否去掉权重语法和 <lora:...> 等标记
+            exclude_tokens: 要从标注中去掉的词（支持通配符）
+            max_tokens: 标注最多保留的词数，0 表示不限制
+            trigger_word: 加在每条标注开头的触发词
+            resolution: 图片最长边上限（像素），0 表示不缩放
+            square_crop: 是否居中裁剪为正方形
+            image_format: 输出格式 png / jpg / webp，None 表示保持原格式
+            quality: JPEG/WebP 质量
+            link_mode: 不需要转换时的处理方式 auto（reflink → 硬链接 → 复制）/ reflink / hardlink / copy
+            max_workers: 处理图片的进程数，默认为CPU核心数
+        """
+        if caption_source not in CAPTION_SOURCES:
+            raise ValueError(f"不支持的标注来源: {caption_source}")
+        if link_mode not in LINK_MODES:
+            raise ValueError(f"不支持的图片处理方式: {link_mode}")
+        if image_format and image_format.lower() not in IMAGE_FORMATS:
+            raise ValueError(f"不支持的图片格式: {image_format}")
+        self.caption_source = caption_source
+        self.strip_weights = strip_weights
+        self.exclude_tokens = list(exclude_tokens)
+        self.max_tokens = max_tokens
+        self.trigger_word = trigger_word.strip()
+        self.resolution = resolution
+        self.square_crop = square_crop
+        self.image_format = image_format.lower() if image_format else None
+        self.quality = quality
+        self.link_mode = link_mode
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.is_cancelled = False
+
+    @property
+    def needs_transform(self) -> bool:
+        """是否需要重新编码图片"""
+        return bool(self.resolution or self.square_crop or self.image_format)
+
+    def cancel(self):
+        """取消导出（已提交的图片处理完后停止）"""
+        self.is_cancelled = True
+
+    def build_caption(self, record: Dict[str, Any]) -> str:
+        """
+        生成一条记录的标注
+
+        Args:
+            record: 记录数据
+
+        Returns:
+            str: 逗号分隔的标注文本
+        """
+        text = ''
+        if self.caption_source in ('prompt', 'both'):
+            text = record.get('prompt') or ''
+        if self.caption_source in ('tags', 'both'):
+            text = ', '.join(filter(None, [record.get('tags') or '', text]))
+        tokens = clean_caption(text, self.strip_weights, self.exclude_tokens, self.max_tokens)
+        if self.trigger_word:
+            tokens = [self.trigger_word] + [token for token in tokens
+                                            if token.lower() != self.trigger_word.lower()]
+        return ', '.join(tokens)
+
+    def _image_options(self) -> str:
+        """影响输出图片的参数，变化时需要重新生成图片"""
+        options = [self.resolution, self.square_crop, self.image_format,
+                   self.quality if self.needs_transform else None]
+        return hashlib.sha1(json.dumps(options).encode('utf-8')).hexdigest()[:12]
+
+    def _output_name(self, record: Dict[str, Any], index: int) -> str:
+        file_path = record.get('file_path') or ''
+        stem = os.path.splitext(os.path.basename(file_path))[0]
+        stem = re.sub(r'[^\w\-.]+', '_', stem).strip('._') or 'image'
+        key = record.get('id') or index + 1
+        return f"{key}_{stem}"
+
+    def export(self,
+               records: Iterable[Dict[str, Any]],
+               output_dir: str,
+               total: int = None,
+               progress_callback: Callable[[int, int, str], None] = None) -> Dict[str, Any]:
+        """
+        导出数据集（再次运行时只处理新增或修改的记录）
+
+        Args:
+            records: 记录迭代器（如 DataManager.iter_records(where=...)）
+            output_dir: 输出目录
+            total: 记录总数（仅用于进度显示）
+            progress_callback: 进度回调 (已处理数, 总数, 当前文件)
+
+        Returns:
+            Dict: {'records', 'images', 'unchanged', 'linked', 'copied', 'converted',
+                   'captions', 'missing', 'failed', 'errors', 'cancelled', 'elapsed', 'output_dir'}
+        """
+        if self.needs_transform and not PIL_AVAILABLE:
+            raise ImportError("缩放或转换图片需要安装 Pillow")
+
+        self.is_cancelled = False
+        start_time = time.time()
+        os.makedirs(output_dir, exist_ok=True)
+        manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+        manifest = self._load_manifest(manifest_path)
+        entries = manifest['entries']
+        options = self._image_options()
+
+        stats = {'records': 0, 'images': 0, 'unchanged': 0, 'linked': 0, 'copied': 0, 'converted': 0,
+                 'captions': 0, 'missing': 0, 'failed': 0}
+        errors = []
+        pending = deque()
+        max_pending = self.max_workers * 4
+        changes = [0]
+
+        def record_done(name, entry, file_path):
+            entries[name] = entry
+            changes[0] += 1
+            if changes[0] % MANIFEST_SAVE_INTERVAL == 0:
+                self._save_manifest(manifest_path, manifest)
+            stats['records'] += 1
+            if progress_callback:
+                progress_callback(stats['records'], total or 0, file_path)
+
+        def finish_oldest():
+            name, entry, file_path, future = pending.popleft()
+            error = future.result()
+            if error:
+                stats['failed'] += 1
+                errors.append({'file_path': file_path, 'error': error})
+                entries.pop(name, None)
+                stats['records'] += 1
+                if progress_callback:
+                    progress_callback(stats['records'], total or 0, file_path)
+                return
+            stats['converted'] += 1
+            stats['images'] += 1
+            record_done(name, entry, file_path)
+
+        pool = ProcessPoolExecutor(max_workers=self.max_workers) if self.needs_transform else None
+        try:
+            for index, record in enumerate(records):
+                if self.is_cancelled:
+                    break
+                file_path = record.get('file_path') or ''
+                if not file_path or not os.path.isfile(file_path):
+                    stats['missing'] += 1
+                    stats['records'] += 1
+                    continue
+
+                name = self._output_name(record, index)
+                extension = (IMAGE_FORMATS[self.image_format][0] if self.image_format
+                             else os.path.splitext(file_path)[1].lower())
+                image_name = name + extension
+
+                # 标注很小，每次都重新生成，只在内容变化时写入
+                caption = self.build_caption(record)
+                if self._write_caption(os.path.join(output_dir, name + '.txt'), caption):
+                    stats['captions'] += 1
+
+                source_stat = os.stat(file_path)
+                entry = {
+                    'source': file_path,
+                    'image': image_name,
+                    'size': source_stat.st_size,
+                    'mtime': source_stat.st_mtime,
+                    'options': options,
+                }
+                previous = entries.get(name)
+                target = os.path.join(output_dir, image_name)
+                if (previous and all(previous.get(key) == value for key, value in entry.items())
+                        and os.path.exists(target)):
+                    stats['unchanged'] += 1
+                    stats['records'] += 1
+                    continue
+                if previous and previous.get('image') != image_name:
+                    self._remove(os.path.join(output_dir, previous['image']))
+                self._remove(target)
+
+                if pool is None:
+                    method = _clone_file(file_path, target, self.link_mode)
+                    stats['copied' if method == 'copy' else 'linked'] += 1
+                    stats['images'] += 1
+                    entry['method'] = method
+                    record_done(name, entry, file_path)
+                else:
+                    pil_format = IMAGE_FORMATS[self.image_format][1] if self.image_format else None
+                    future = pool.submit(_transform_image, file_path, target, self.resolution,
+                                         self.square_crop, pil_format, self.quality)
+                    entry['method'] = 'convert'
+                    pending.append((name, entry, file_path, future))
+                    # 限制排队的任务数，内存占用与记录总数无关
+                    if len(pending) >= max_pending:
+                        finish_oldest()
+
+            while pending:
+                finish_oldest()
+        finally:
+            if pool:
+                pool.shutdown(cancel_futures=True)
+            self._save_manifest(manifest_path, manifest)
+
+        stats.update({
+            'errors': errors[:100],
+            'cancelled': self.is_cancelled,
+            'elapsed': time.time() - start_time,
+            'output_dir': output_dir,
+        })
+        return stats
+
+    @staticmethod
+    def _write_caption(caption_path: str, caption: str) -> bool:
+        """写入标注文件，内容未变化时不写入，返回是否写入"""
+        try:
+            with open(caption_path, 'r', encoding='utf-8') as f:
+                if f.read() == caption:
+                    return False
+        except OSError:
+            pass
+        with open(caption_path, 'w', encoding='utf-8') as f:
+            f.write(caption)
+        return True
+
+    @staticmethod
+    def _remove(path: str):
+        if os.path.lexists(path):
+            os.remove(path)
+
+    @staticmethod
+    def _load_manifest(manifest_path: str) -> Dict[str, Any]:
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if isinstance(manifest.get('entries'), dict):
+                return manifest
+        except (OSError, json.JSONDecodeError):
+            pass
+        return {'version': 1, 'entries': {}}
+
+    @staticmethod
+    def _save_manifest(manifest_path: str, manifest: Dict[str, Any]):
+        """原子地保存清单（先写临时文件再替换）"""
+        temp_path = manifest_path + '.part'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(temp_path, manifest_path)
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库维护模块
+提供在线增量备份、ANALYZE / PRAGMA optimize、增量VACUUM、完整性检查及页面统计，
+并按间隔自动执行到期的维护任务
+"""
+
+import os
+import time
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional, Callable
+
+
+class BackupCancelled(Exception):
+    """备份被取消"""
+    pass
+
+
+class DatabaseMaintenance:
+    """数据库维护器"""
+
+    # 各任务的默认执行间隔
+    DEFAULT_INTERVALS = {
+        'optimize': timedelta(hours=6),
+        'analyze': timedelta(days=7),
+        'vacuum': timedelta(days=1),
+        'integrity_check': timedelta(days=7),
+        'backup': timedelta(days=1),
+    }
+
+    def __init__(self, db_path: str, backup_dir: str = None, keep_backups: int = 5,
+                 free_page_ratio: float = 0.1, min_free_pages: int = 256):
+        """
+        Args:
+            db_path: 数据库路径
+            backup_dir: 备份目录，默认为数据库所在目录下的 backups
+            keep_backups: 保留的自动备份数量
+            free_page_ratio: 空闲页占比超过该值时执行增量VACUUM
+            min_free_pages: 空闲页数量超过该值时才执行增量VACUUM
+        """
+        self.db_path = db_path
+        self.backup_dir = backup_dir or os.path.join(os.path.dirname(db_path), "backups")
+        self.keep_backups = keep_backups
+        self.free_page_ratio = free_page_ratio
+        self.min_free_pages = min_free_pages
+        self.intervals = dict(self.DEFAULT_INTERVALS)
+        self.is_cancelled = False
+        self.init_tables()
+
+    def init_tables(self):
+        """初始化维护记录表"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS maintenance_log (
+                    task TEXT PRIMARY KEY,
+                    last_run TEXT NOT NULL,
+                    result TEXT
+                )
+            """)
+
+    def cancel(self):
+        """取消正在进行的备份"""
+        self.is_cancelled = True
+
+    # ===================== 统计 =====================
+
+    def get_db_stats(self) -> Dict[str, Any]:
+        """
+        获取数据库大小与页面统计
+
+        Returns:
+            Dict: 文件大小、页大小、页数、空闲页数、空闲占比、自动清理模式及上次维护时间
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+            freelist_count = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+            journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+            last_runs = dict(conn.execute("SELECT task, last_run FROM maintenance_log").fetchall())
+
+        wal_path = self.db_path + "-wal"
+        return {
+            'file_size': os.path.getsize(self.db_path),
+            'wal_size': os.path.getsize(wal_path) if os.path.exists(wal_path) else 0,
+            'page_size': page_size,
+            'page_count': page_count,
+            'freelist_count': freelist_count,
+            'free_ratio': freelist_count / page_count if page_count else 0.0,
+            'auto_vacuum': {0: 'none', 1: 'full', 2: 'incremental'}.get(auto_vacuum, str(auto_vacuum)),
+            'journal_mode': journal_mode,
+            'last_runs': last_runs,
+            'backups': self.list_backups(),
+        }
+
+    def needs_vacuum(self, stats: Dict[str, Any] = None) -> bool:
+        """空闲页是否超过阈值"""
+        stats = stats or self.get_db_stats()
+        return (stats['freelist_count'] >= self.min_free_pages
+                and stats['free_ratio'] >= self.free_page_ratio)
+
+    # ===================== 维护任务 =====================
+
+    def optimize(self) -> str:
+        """执行 PRAGMA optimize，仅重新分析统计信息已过期的表"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("PRAGMA optimize")
+        return "ok"
+
+    def analyze(self) -> str:
+        """执行完整 ANALYZE，刷新查询规划器的统计信息"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("ANALYZE")
+        return "ok"
+
+    def needs_conversion(self) -> bool:
+        """数据库是否尚未启用增量自动清理（需要先执行一次 convert_to_incremental）"""
+        with sqlite3.connect(self.db_path) as conn:
+            return conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2
+
+    def incremental_vacuum(self, max_pages: int = None) -> int:
+        """
+        回收空闲页，只截断文件末尾，不重写整个数据库
+
+        数据库尚未启用增量自动清理时不做任何操作（返回0），
+        需要由用户确认后调用 convert_to_incremental 转换一次。
+
+        Args:
+            max_pages: 本次最多回收的页数，为None时回收全部空闲页
+
+        Returns:
+            int: 回收的页数
+        """
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        try:
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                return 0
+            before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            # execute() 只执行一步（回收一页），executescript 才会执行到结束
+            if max_pages:
+                conn.executescript(f"PRAGMA incremental_vacuum({int(max_pages)})")
+            else:
+                conn.executescript("PRAGMA incremental_vacuum")
+            after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        finally:
+            conn.close()
+        return before - after
+
+    def convert_to_incremental(self) -> int:
+        """
+        切换为 INCREMENTAL 自动清理模式并执行一次完整VACUUM
+
+        完整VACUUM会重写整个数据库文件，期间数据库被锁定，
+        因此不会自动执行，只在用户确认后调用；之后的回收都是增量的。
+
+        Returns:
+            int: 回收的页数
+        """
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        try:
+            before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+            after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        finally:
+            conn.close()
+        return before - after
+
+    def integrity_check(self, quick: bool = True) -> List[str]:
+        """
+        完整性检查
+
+        Args:
+            quick: 是否使用 quick_check（跳过索引内容校验，速度更快）
+
+        Returns:
+            List[str]: 检查结果，仅包含 "ok" 表示数据库完好
+        """
+        pragma = "quick_check" if quick else "integrity_check"
+        with sqlite3.connect(self.db_path) as conn:
+            return [row[0] for row in conn.execute(f"PRAGMA {pragma}")]
+
+    def backup(self, dest_path: str = None, pages_per_step: int = 256, pause: float = 0.01,
+               progress_callback: Callable[[int, int], None] = None) -> Optional[str]:
+        """
+        在线增量备份
+
+        使用sqlite备份API每次复制有限页数，步骤之间释放数据库锁，
+        备份期间应用仍可正常读写。
+
+        Args:
+            dest_path: 备份文件路径，默认在备份目录下按时间命名
+            pages_per_step: 每步复制的页数
+            pause: 每步之间的暂停秒数
+            progress_callback: 进度回调 (已复制页数, 总页数)
+
+        Returns:
+            str: 备份文件路径，取消时返回None
+        """
+        if dest_path is None:
+            os.makedirs(self.backup_dir, exist_ok=True)
+            name = os.path.splitext(os.path.basename(self.db_path))[0]
+            dest_path = os.path.join(
+                self.backup_dir, f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
+            )
+
+        self.is_cancelled = False
+        temp_path = dest_path + '.part'
+
+        def on_progress(status, remaining, total):
+            if self.is_cancelled:
+                raise BackupCancelled()
+            if progress_callback:
+                progress_callback(total - remaining, total)
+
+        source = sqlite3.connect(self.db_path)
+        target = sqlite3.connect(temp_path)
+        completed = False
+        try:
+            source.backup(target, pages=pages_per_step, progress=on_progress, sleep=pause)
+            completed = not self.is_cancelled
+        except BackupCancelled:
+            pass
+        finally:
+            target.close()
+            source.close()
+            # 取消或失败时不留下不完整的备份文件
+            if not completed and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        if not completed:
+            print("数据库备份已取消")
+            return None
+
+        os.replace(temp_path, dest_path)
+        return dest_path
+
+    def list_backups(self) -> List[str]:
+        """列出自动备份文件（按时间从新到旧）"""
+        if not os.path.isdir(self.backup_dir):
+            return []
+        prefix = os.path.splitext(os.path.basename(self.db_path))[0] + "_"
+        backups = [
+            os.path.join(self.backup_dir, name)
+            for name in os.listdir(self.backup_dir)
+            if name.startswith(prefix) and name.endswith('.db')
+        ]
+        return sorted(backups, reverse=True)
+
+    def prune_backups(self) -> int:
+        """删除超出保留数量的旧备份"""
+        removed = 0
+        for path in self.list_backups()[self.keep_backups:]:
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError as e:
+                print(f"删除旧备份失败: {e}")
+        return removed
+
+    # ===================== 调度 =====================
+
+    def get_due_tasks(self, now: datetime = None) -> List[str]:
+        """获取已到期的维护任务"""
+        now = now or datetime.now()
+        with sqlite3.connect(self.db_path) as conn:
+            last_runs = dict(conn.execute("SELECT task, last_run FROM maintenance_log").fetchall())
+
+        due = []
+        for task, interval in self.intervals.items():
+            last_run = last_runs.get(task)
+            if last_run is None or now - datetime.fromisoformat(last_run) >= interval:
+                due.append(task)
+        return due
+
+    def run_task(self, task: str, progress_callback: Callable[[int, int], None] = None) -> Any:
+        """
+        执行单个维护任务并记录执行时间
+
+        Args:
+            task: optimize / analyze / vacuum / integrity_check / backup，
+                或 convert_vacuum（转换为增量清理模式，不参与定时调度）
+            progress_callback: 备份进度回调
+
+        Returns:
+            任务结果
+        """
+        # 上一次取消只对当时的任务有效
+        self.is_cancelled = False
+        start_time = time.time()
+        if task == 'optimize':
+            result = self.optimize()
+        elif task == 'analyze':
+            result = self.analyze()
+        elif task == 'vacuum':
+            result = self.incremental_vacuum() if self.needs_vacuum() else 0
+        elif task == 'convert_vacuum':
+            result = self.convert_to_incremental()
+        elif task == 'integrity_check':
+            result = self.integrity_check()
+        elif task == 'backup':
+            result = self.backup(progress_callback=progress_callback)
+            if result is None:
+                return None
+            self.prune_backups()
+        else:
+            raise ValueError(f"未知的维护任务: {task}")
+
+        summary = result if isinstance(result, str) else repr(result)
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO maintenance_log (task, last_run, result) VALUES (?, ?, ?)",
+                (task, datetime.now().isoformat(), summary)
+            )
+        print(f"数据库维护任务 {task} 完成，用时 {time.time() - start_time:.2f} 秒")
+        return result
+
+    def run_due_tasks(self, now: datetime = None,
+                      progress_callback: Callable[[int, int], None] = None) -> Dict[str, Any]:
+        """
+        执行所有到期的维护任务
+
+        Returns:
+            Dict: 任务名 -> 结果（失败时为错误信息）
+        """
+        self.is_cancelled = False
+        results = {}
+        for task in self.get_due_tasks(now):
+            if self.is_cancelled:
+                break
+            try:
+                results[task] = self.run_task(task, progress_callback)
+            except Exception as e:
+                print(f"数据库维护任务 {task} 失败: {e}")
+                results[task] = f"error: {e}"
+        return results
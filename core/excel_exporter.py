@@ -2,324 +2,453 @@
 # -*- coding: utf-8 -*-
 """
 Excel导出模块
-用于将AI图片信息导出为Excel表格，支持图片嵌入
+用于将AI图片信息导出为Excel表格，支持图片嵌入。
+使用只写模式的工作簿逐行写入；缩略图在线程池中预先生成到内存（BytesIO），
+不在原图旁边写临时文件；超过行数上限时自动拆分到新的工作表或文件
 """
 
+import io
 import os
-import json
-from datetime import datetime
-from typing import List, Dict, Any
+import time
+from copy import copy
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Callable, Iterable, Tuple
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.drawing.image import Image
 from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
 from openpyxl.utils import get_column_letter
 from PIL import Image as PILImage
 
+from .streaming_exporter import parse_json_field
+
+
+# Excel 单个工作表的最大行数（含表头）
+EXCEL_MAX_ROWS = 1048576
+
+# 包含图片时每个文件的默认最大行数：图片数据要保留到保存文件时才写出，按文件拆分可限制内存占用
+IMAGE_ROWS_PER_FILE = 10000
+
+# 数据列：(表头, 列宽)
+DATA_COLUMNS = [
+    ("文件名", 15),
+    ("自定义名称", 15),
+    ("正向提示词", 40),
+    ("负向提示词", 30),
+    ("模型", 20),
+    ("采样器", 15),
+    ("采样步数", 10),
+    ("CFG缩放", 10),
+    ("种子", 18),
+    ("LoRA信息", 25),
+    ("标签", 20),
+    ("备注", 25),
+    ("创建时间", 18),
+]
+
+# 图片列宽
+IMAGE_COLUMN_WIDTH = 25
+
+# 种子列在数据列中的位置（以文本格式写入，避免科学计数法）
+SEED_COLUMN_INDEX = 8
+
+SHEET_TITLE = "AI图片信息"
+
+
+def format_lora_info(lora_info_str: str) -> str:
+    """格式化LoRA信息为 "名称 (权重); ..." """
+    if not lora_info_str:
+        return ""
+
+    lora_info = parse_json_field(lora_info_str)
+    if not lora_info:
+        return ""
+
+    if isinstance(lora_info, dict) and 'loras' in lora_info:
+        lora_list = []
+        for lora in lora_info['loras']:
+            if isinstance(lora, dict):
+                name = lora.get('name', '未知')
+                weight = lora.get('weight', 1.0)
+                lora_list.append(f"{name} ({weight})")
+        return "; ".join(lora_list)
+    elif isinstance(lora_info, dict):
+        # 字典格式
+        return "; ".join(f"{name} ({weight})" for name, weight in lora_info.items())
+    else:
+        return str(lora_info)
+
+
+def record_to_row(record: Dict[str, Any]) -> List[Any]:
+    """把记录转换为数据列的值"""
+    seed_value = record.get('seed', '')
+    if seed_value is not None and str(seed_value).isdigit():
+        seed_value = str(seed_value)  # 强制转为字符串避免科学计数法
+
+    return [
+        os.path.basename(record.get('file_path') or ''),
+        record.get('custom_name', ''),
+        record.get('prompt', ''),
+        record.get('negative_prompt', ''),
+        record.get('model', ''),
+        record.get('sampler', ''),
+        record.get('steps', ''),
+        record.get('cfg_scale', ''),
+        seed_value,
+        format_lora_info(record.get('lora_info', '')),
+        record.get('tags', ''),
+        record.get('notes', ''),
+        record.get('created_at', '')[:19] if record.get('created_at') else ''
+    ]
+
+
+def make_thumbnail(image_path: str, max_size: Tuple[int, int]) -> Optional[Tuple[io.BytesIO, int, int]]:
+    """
+    生成缩略图到内存
+
+    Args:
+        image_path: 图片路径
+        max_size: 最大尺寸 (width, height)
+
+    Returns:
+        (图片数据, 宽, 高)，失败时返回None
+    """
+    try:
+        with PILImage.open(image_path) as img:
+            # JPEG 在解码时直接缩小
+            img.draft('RGB', max_size)
+            has_alpha = img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info)
+            image = img.convert('RGBA' if has_alpha else 'RGB')
+        image.thumbnail(max_size)
+
+        data = io.BytesIO()
+        if has_alpha:
+            image.save(data, 'PNG', optimize=True)
+        else:
+            image.save(data, 'JPEG', quality=85)
+        data.seek(0)
+        return data, image.width, image.height
+    except Exception as e:
+        print(f"生成缩略图失败 {image_path}: {e}")
+        return None
+
+
+class StreamingExcelExporter:
+    """流式Excel导出器"""
+
+    def __init__(self,
+                 include_images: bool = True,
+                 max_image_size: Tuple[int, int] = (150, 150),
+                 max_rows_per_sheet: int = EXCEL_MAX_ROWS - 1,
+                 max_rows_per_file: int = None,
+                 max_workers: int = 4,
+                 chunk_size: int = 200):
+        """
+        Args:
+            include_images: 是否嵌入缩略图（False 时只写数据，速度最快）
+            max_image_size: 缩略图最大尺寸 (width, height)
+            max_rows_per_sheet: 每个工作表的最大数据行数（不超过Excel上限）
+            max_rows_per_file: 每个文件的最大数据行数，超过时拆分为 name_2.xlsx 等；
+                               为None时包含图片默认 IMAGE_ROWS_PER_FILE 行，不含图片不拆分
+            max_workers: 生成缩略图的线程数
+            chunk_size: 每批预先生成缩略图的记录数
+        """
+        self.include_images = include_images
+        self.max_image_size = tuple(max_image_size)
+        self.max_rows_per_sheet = max(1, min(max_rows_per_sheet, EXCEL_MAX_ROWS - 1))
+        if max_rows_per_file is None and include_images:
+            max_rows_per_file = IMAGE_ROWS_PER_FILE
+        self.max_rows_per_file = max_rows_per_file
+        self.max_workers = max(1, max_workers)
+        self.chunk_size = max(1, chunk_size)
+        self.is_cancelled = False
+
+    def cancel(self):
+        """取消导出（在下一批记录前生效）"""
+        self.is_cancelled = True
+
+    def export(self,
+               records: Iterable[Dict[str, Any]],
+               output_path: str,
+               total_rows: int = None,
+               progress_callback: Callable[[int, int, str], None] = None) -> Dict[str, Any]:
+        """
+        流式导出记录到Excel
+
+        Args:
+            records: 记录迭代器（如 DataManager.iter_records()）
+            output_path: 输出文件路径，拆分时其余文件为 name_2.xlsx、name_3.xlsx ...
+            total_rows: 总行数（仅用于进度显示）
+            progress_callback: 进度回调 (已写行数, 总行数, 当前文件)
+
+        Returns:
+            Dict: {'rows', 'output_paths', 'sheets', 'images', 'failed_images', 'cancelled', 'elapsed'}
+        """
+        self.is_cancelled = False
+        start_time = time.time()
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        self._output_path = output_path
+        self._output_paths = []
+        self._workbook = None
+        self._worksheet = None
+        self._sheet_count = 0
+        self._sheet_rows = 0
+        self._file_rows = 0
+        rows = 0
+        stats = {'images': 0, 'failed_images': 0}
+
+        try:
+            pool = ThreadPoolExecutor(max_workers=self.max_workers) if self.include_images else None
+            try:
+                chunks = self._chunks(records)
+                # 写入当前批时，下一批的缩略图已在线程池中生成
+                pending = self._submit_chunk(pool, next(chunks, None))
+                while pending is not None and not self.is_cancelled:
+                    chunk, futures = pending
+                    pending = self._submit_chunk(pool, next(chunks, None))
+
+                    for record, future in zip(chunk, futures):
+                        self._write_record(record, future.result() if future else None, stats)
+                        rows += 1
+
+                    if progress_callback:
+                        progress_callback(rows, total_rows, self._current_path())
+                if pending is not None:
+                    for future in pending[1]:
+                        if future:
+                            future.cancel()
+            finally:
+                if pool:
+                    pool.shutdown()
+
+            if self._workbook is not None and not self.is_cancelled:
+                self._save_workbook()
+            elif self._workbook is None and not self.is_cancelled:
+                # 没有记录时也输出只有表头的文件
+                self._new_workbook()
+                self._save_workbook()
+        except Exception:
+            self._discard_outputs()
+            raise
+
+        if self.is_cancelled:
+            self._discard_outputs()
+            print(f"导出已取消，已处理 {rows} 行")
+
+        return {
+            'rows': rows,
+            'output_paths': list(self._output_paths),
+            'sheets': self._sheet_count,
+            'images': stats['images'],
+            'failed_images': stats['failed_images'],
+            'cancelled': self.is_cancelled,
+            'elapsed': time.time() - start_time,
+        }
+
+    def _chunks(self, records: Iterable[Dict[str, Any]]):
+        chunk = []
+        for record in records:
+            chunk.append(record)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _submit_chunk(self, pool, chunk):
+        """提交一批记录的缩略图任务，返回 (记录, futures)"""
+        if chunk is None:
+            return None
+        if pool is None:
+            return chunk, [None] * len(chunk)
+        return chunk, [pool.submit(self._thumbnail_for, record) for record in chunk]
+
+    def _thumbnail_for(self, record: Dict[str, Any]):
+        image_path = record.get('file_path') or ''
+        if not image_path or not os.path.exists(image_path):
+            return None
+        return make_thumbnail(image_path, self.max_image_size)
+
+    # ===================== 工作簿 =====================
+
+    def _current_path(self) -> str:
+        index = len(self._output_paths) + 1
+        if index == 1:
+            return self._output_path
+        base, ext = os.path.splitext(self._output_path)
+        return f"{base}_{index}{ext or '.xlsx'}"
+
+    def _new_workbook(self):
+        self._workbook = Workbook(write_only=True)
+        self._file_rows = 0
+        self._new_sheet()
+
+    def _new_sheet(self):
+        sheet_number = len(self._workbook.worksheets) + 1
+        title = SHEET_TITLE if sheet_number == 1 else f"{SHEET_TITLE} {sheet_number}"
+        worksheet = self._workbook.create_sheet(title)
+        self._sheet_count += 1
+        self._sheet_rows = 0
+
+        # 只写模式下列宽、行高和冻结窗格必须在写入行之前设置
+        widths = ([IMAGE_COLUMN_WIDTH] if self.include_images else []) + [width for _, width in DATA_COLUMNS]
+        for col, width in enumerate(widths, 1):
+            worksheet.column_dimensions[get_column_letter(col)].width = width
+        worksheet.freeze_panes = "A2"
+        if self.include_images:
+            worksheet.sheet_format.defaultRowHeight = self.max_image_size[1] * 0.8
+            worksheet.sheet_format.customHeight = True
+            worksheet.row_dimensions[1].height = 20
+
+        headers = (["图片"] if self.include_images else []) + [header for header, _ in DATA_COLUMNS]
+        header_cells = []
+        for header in headers:
+            cell = WriteOnlyCell(worksheet, value=header)
+            cell.font = _HEADER_FONT
+            cell.fill = _HEADER_FILL
+            cell.alignment = _HEADER_ALIGNMENT
+            cell.border = _THIN_BORDER
+            header_cells.append(cell)
+        worksheet.append(header_cells)
+        self._cell_styles = {False: self._cell_style(worksheet, False), True: self._cell_style(worksheet, True)}
+        self._worksheet = worksheet
+
+    def _save_workbook(self):
+        path = self._current_path()
+        # 先写入临时文件，完成后再替换，避免留下不完整的导出文件
+        temp_path = path + '.part'
+        try:
+            self._workbook.save(temp_path)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        self._output_paths.append(path)
+        self._workbook = None
+        self._worksheet = None
+
+    def _discard_outputs(self):
+        """删除本次导出已写出的文件"""
+        if self._workbook is not None:
+            # 结束未保存工作表的临时写入
+            for worksheet in self._workbook.worksheets:
+                if not worksheet.closed:
+                    worksheet.close()
+        for path in self._output_paths:
+            if os.path.exists(path):
+                os.remove(path)
+        self._output_paths = []
+        self._workbook = None
+
+    def _write_record(self, record: Dict[str, Any], thumbnail, stats: Dict[str, int]):
+        if self._workbook is None:
+            self._new_workbook()
+        elif self.max_rows_per_file and self._file_rows >= self.max_rows_per_file:
+            self._save_workbook()
+            self._new_workbook()
+        elif self._sheet_rows >= self.max_rows_per_sheet:
+            self._new_sheet()
+
+        worksheet = self._worksheet
+        values = record_to_row(record)
+        row_index = self._sheet_rows + 2
+
+        if not self.include_images:
+            # 不含图片：直接写入值，不设置单元格样式
+            worksheet.append(values)
+        else:
+            image_value = None
+            image_path = record.get('file_path') or ''
+            if thumbnail is not None:
+                data, width, height = thumbnail
+                img = Image(data)
+                img.width, img.height = width, height
+                img.anchor = f"A{row_index}"
+                worksheet.add_image(img)
+                stats['images'] += 1
+            elif image_path and os.path.exists(image_path):
+                # 缩略图生成失败时显示文件名
+                image_value = os.path.basename(image_path)
+                stats['failed_images'] += 1
+            else:
+                image_value = "图片不存在"
+
+            cells = [self._styled_cell(worksheet, image_value, False)]
+            for i, value in enumerate(values):
+                cells.append(self._styled_cell(worksheet, value, i == SEED_COLUMN_INDEX))
+            worksheet.append(cells)
+
+        self._sheet_rows += 1
+        self._file_rows += 1
+
+    def _styled_cell(self, worksheet, value, text_format: bool):
+        cell = WriteOnlyCell(worksheet, value=value)
+        # 复制本工作表预先设置好的样式，比逐个设置对齐、边框快得多
+        cell._style = copy(self._cell_styles[text_format])
+        return cell
+
+    @staticmethod
+    def _cell_style(worksheet, text_format: bool):
+        """数据单元格的样式（自动换行、顶端对齐、细边框，种子列为文本格式）；样式编号属于所在工作簿"""
+        cell = WriteOnlyCell(worksheet)
+        cell.alignment = _DATA_ALIGNMENT
+        cell.border = _THIN_BORDER
+        if text_format:
+            cell.number_format = '@'  # 文本格式
+        return cell._style
+
+
+_HEADER_FONT = Font(bold=True, color="FFFFFF")
+_HEADER_FILL = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+_HEADER_ALIGNMENT = Alignment(horizontal="center", vertical="center")
+_DATA_ALIGNMENT = Alignment(vertical="top", wrap_text=True)
+_THIN_BORDER = Border(
+    left=Side(style='thin'),
+    right=Side(style='thin'),
+    top=Side(style='thin'),
+    bottom=Side(style='thin')
+)
+
 
 class ExcelExporter:
-    """Excel导出器"""
-    
+    """Excel导出器（一次导出一组记录，内部使用流式导出器）"""
+
     def __init__(self):
-        self.workbook = None
-        self.worksheet = None
-        
-    def export_records(self, records: List[Dict[str, Any]], output_path: str, 
-                      include_images: bool = True, max_image_size: tuple = (150, 150)) -> bool:
+        self.last_result = None
+
+    def export_records(self, records: Iterable[Dict[str, Any]], output_path: str,
+                      include_images: bool = True, max_image_size: tuple = (150, 150),
+                      progress_callback: Callable[[int, int, str], None] = None) -> bool:
         """
         导出记录到Excel文件
-        
+
         Args:
-            records: 记录列表
+            records: 记录列表或迭代器
             output_path: 输出文件路径
             include_images: 是否包含图片
             max_image_size: 图片最大尺寸 (width, height)
-            
+            progress_callback: 进度回调 (已写行数, 总行数, 当前文件)
+
         Returns:
-            bool: 是否成功导出
+            bool: 是否成功导出（拆分出的文件列表见 last_result['output_paths']）
         """
-        temp_files_to_cleanup = []
         try:
-            self.workbook = Workbook()
-            self.worksheet = self.workbook.active
-            self.worksheet.title = "AI图片信息"
-            
-            # 设置表头
-            self._setup_headers(include_images)
-            
-            # 填充数据，并收集临时文件列表
-            temp_files_to_cleanup = self._fill_data(records, include_images, max_image_size)
-            
-            # 设置样式
-            self._apply_styles(include_images)
-            
-            # 保存文件（这时openpyxl才真正读取图片文件）
-            self.workbook.save(output_path)
-            
-            # 保存成功后清理临时文件
-            self._cleanup_temp_files(temp_files_to_cleanup)
-            
-            return True
-            
+            exporter = StreamingExcelExporter(include_images=bool(include_images),
+                                              max_image_size=max_image_size)
+            total = len(records) if hasattr(records, '__len__') else None
+            self.last_result = exporter.export(records, output_path, total_rows=total,
+                                               progress_callback=progress_callback)
+            return not self.last_result['cancelled']
+
         except Exception as e:
             print(f"导出Excel失败: {e}")
             import traceback
             traceback.print_exc()
-            # 即使出错也要清理临时文件
-            self._cleanup_temp_files(temp_files_to_cleanup)
             return False
-    
-    def _setup_headers(self, include_images: bool):
-        """设置表头"""
-        headers = []
-        
-        if include_images:
-            headers.append("图片")
-            
-        headers.extend([
-            "文件名", "自定义名称", "正向提示词", "负向提示词", 
-            "模型", "采样器", "采样步数", "CFG缩放", "种子", 
-            "LoRA信息", "标签", "备注", "创建时间"
-        ])
-        
-        # 写入表头
-        for col, header in enumerate(headers, 1):
-            cell = self.worksheet.cell(row=1, column=col, value=header)
-            cell.font = Font(bold=True, color="FFFFFF")
-            cell.fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-            cell.alignment = Alignment(horizontal="center", vertical="center")
-    
-    def _fill_data(self, records: List[Dict[str, Any]], include_images: bool, max_image_size: tuple) -> List[str]:
-        """填充数据"""
-        current_row = 2
-        temp_files_to_cleanup = []  # 记录需要清理的临时文件
-        
-        for record in records:
-            col = 1
-            
-            # 处理图片
-            if include_images:
-                image_path = record.get('file_path', '')
-                # 先在图片列写入占位符
-                img_cell = self.worksheet.cell(row=current_row, column=col, value="")
-                
-                if image_path and os.path.exists(image_path):
-                    try:
-                        # 调整图片大小并插入
-                        resized_image_path = self._resize_image(image_path, max_image_size)
-                        if resized_image_path and os.path.exists(resized_image_path):
-                            # 使用更安全的方式处理图片
-                            try:
-                                img = Image(resized_image_path)
-                                img.anchor = f"{get_column_letter(col)}{current_row}"
-                                self.worksheet.add_image(img)
-                                
-                                # 设置行高以适应图片
-                                self.worksheet.row_dimensions[current_row].height = max_image_size[1] * 0.8
-                                
-                                print(f"成功添加图片: {resized_image_path}")
-                                
-                                # 记录临时文件，稍后批量清理
-                                if resized_image_path != image_path:
-                                    temp_files_to_cleanup.append(resized_image_path)
-                            except Exception as img_error:
-                                print(f"openpyxl添加图片失败 {resized_image_path}: {img_error}")
-                                # 清理失败的临时文件
-                                if resized_image_path != image_path and os.path.exists(resized_image_path):
-                                    try:
-                                        os.remove(resized_image_path)
-                                    except:
-                                        pass
-                                # 显示文件名
-                                img_cell.value = os.path.basename(image_path)
-                        else:
-                            # 调整大小失败，显示文件名
-                            img_cell.value = os.path.basename(image_path)
-                    except Exception as e:
-                        print(f"处理图片失败 {image_path}: {e}")
-                        import traceback
-                        traceback.print_exc()
-                        # 图片处理失败时显示文件名
-                        img_cell.value = os.path.basename(image_path)
-                else:
-                    # 图片不存在时显示提示
-                    img_cell.value = "图片不存在"
-                
-                col += 1
-            
-            # 填充其他数据
-            seed_value = record.get('seed', '')
-            if seed_value and str(seed_value).isdigit():
-                seed_value = str(seed_value)  # 强制转为字符串避免科学计数法
-            
-            data_values = [
-                os.path.basename(record.get('file_path', '')),
-                record.get('custom_name', ''),
-                record.get('prompt', ''),
-                record.get('negative_prompt', ''),
-                record.get('model', ''),
-                record.get('sampler', ''),
-                record.get('steps', ''),
-                record.get('cfg_scale', ''),
-                seed_value,
-                self._format_lora_info(record.get('lora_info', '')),
-                record.get('tags', ''),
-                record.get('notes', ''),
-                record.get('created_at', '')[:19] if record.get('created_at') else ''
-            ]
-            
-            for i, value in enumerate(data_values):
-                cell = self.worksheet.cell(row=current_row, column=col, value=value)
-                cell.alignment = Alignment(vertical="top", wrap_text=True)
-                
-                # 种子列设置为文本格式（第9个数据列）
-                if i == 8:  # 种子是data_values的第9个元素（索引8）
-                    cell.number_format = '@'  # 文本格式
-                    
-                col += 1
-            
-            current_row += 1
-        
-        # 返回需要清理的临时文件列表
-        return temp_files_to_cleanup
-    
-    def _resize_image(self, image_path: str, max_size: tuple) -> str:
-        """调整图片大小"""
-        try:
-            # 检查原始文件是否存在
-            if not os.path.exists(image_path):
-                print(f"原始图片文件不存在: {image_path}")
-                return None
-                
-            with PILImage.open(image_path) as img:
-                # 计算缩放比例
-                width_ratio = max_size[0] / img.width
-                height_ratio = max_size[1] / img.height
-                ratio = min(width_ratio, height_ratio)
-                
-                if ratio >= 1:
-                    # 图片已经足够小，直接返回原路径
-                    return image_path
-                
-                # 计算新尺寸
-                new_width = int(img.width * ratio)
-                new_height = int(img.height * ratio)
-                
-                # 调整大小
-                resized_img = img.resize((new_width, new_height), PILImage.Resampling.LANCZOS)
-                
-                # 生成临时文件路径，确保目录存在
-                temp_path = f"{image_path}_temp_resized.png"
-                temp_dir = os.path.dirname(temp_path)
-                
-                # 如果目录不存在，尝试创建（但通常应该存在，因为原文件在这里）
-                if not os.path.exists(temp_dir):
-                    try:
-                        os.makedirs(temp_dir, exist_ok=True)
-                    except Exception as e:
-                        print(f"无法创建临时文件目录 {temp_dir}: {e}")
-                        return image_path  # 返回原路径作为备选
-                
-                # 保存临时文件
-                resized_img.save(temp_path, "PNG")
-                
-                # 验证临时文件是否成功创建
-                if os.path.exists(temp_path):
-                    return temp_path
-                else:
-                    print(f"临时文件创建失败: {temp_path}")
-                    return image_path
-                
-        except Exception as e:
-            print(f"调整图片大小失败 {image_path}: {e}")
-            import traceback
-            traceback.print_exc()
-            return image_path
-    
+
     def _format_lora_info(self, lora_info_str: str) -> str:
         """格式化LoRA信息"""
-        if not lora_info_str:
-            return ""
-        
-        try:
-            from .data_manager import DataManager
-            dm = DataManager()
-            lora_info = dm._deserialize_lora_info(lora_info_str)
-            
-            if not lora_info:
-                return ""
-            
-            if isinstance(lora_info, dict) and 'loras' in lora_info:
-                lora_list = []
-                for lora in lora_info['loras']:
-                    if isinstance(lora, dict):
-                        name = lora.get('name', '未知')
-                        weight = lora.get('weight', 1.0)
-                        lora_list.append(f"{name} ({weight})")
-                return "; ".join(lora_list)
-            elif isinstance(lora_info, dict):
-                # 字典格式
-                lora_list = [f"{name} ({weight})" for name, weight in lora_info.items()]
-                return "; ".join(lora_list)
-            else:
-                return str(lora_info)
-                
-        except Exception as e:
-            print(f"格式化LoRA信息失败: {e}")
-            return "解析错误"
-    
-    def _apply_styles(self, include_images: bool):
-        """应用样式"""
-        # 设置列宽
-        column_widths = []
-        
-        if include_images:
-            column_widths.append(25)  # 图片列，增加宽度
-            
-        column_widths.extend([
-            15,  # 文件名
-            15,  # 自定义名称
-            40,  # 正向提示词
-            30,  # 负向提示词
-            20,  # 模型
-            15,  # 采样器
-            10,  # 采样步数
-            10,  # CFG缩放
-            18,  # 种子，增加宽度
-            25,  # LoRA信息
-            20,  # 标签
-            25,  # 备注
-            18   # 创建时间
-        ])
-        
-        # 应用列宽
-        for col, width in enumerate(column_widths, 1):
-            self.worksheet.column_dimensions[get_column_letter(col)].width = width
-        
-        # 设置边框
-        thin_border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
-        
-        # 应用边框到所有使用的单元格
-        max_row = self.worksheet.max_row
-        max_col = self.worksheet.max_column
-        
-        for row in range(1, max_row + 1):
-            for col in range(1, max_col + 1):
-                self.worksheet.cell(row=row, column=col).border = thin_border
-        
-        # 冻结首行
-        self.worksheet.freeze_panes = "A2"
-    
-    def _cleanup_temp_files(self, temp_files: List[str]):
-        """清理临时文件"""
-        for temp_file in temp_files:
-            try:
-                if os.path.exists(temp_file):
-                    os.remove(temp_file)
-                    print(f"已清理临时文件: {temp_file}")
-            except Exception as e:
-                print(f"清理临时文件失败 {temp_file}: {e}")
\ No newline at end of file
+        return format_lora_info(lora_info_str)
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文件夹扫描模块
+基于 os.scandir 的并行目录扫描：利用 DirEntry 缓存的类型和状态信息，
+多线程同时遍历子目录（网络共享目录上效果明显），跳过隐藏/系统目录和忽略规则，
+安全跟随符号链接（检测循环），边扫描边返回结果
+"""
+
+import os
+import sys
+import queue
+import fnmatch
+import threading
+from collections import namedtuple
+from typing import List, Iterable, Iterator, Callable
+
+
+# 扫描结果：路径、文件大小、修改时间
+ScannedFile = namedtuple('ScannedFile', ['path', 'size', 'mtime'])
+
+# 默认跳过的系统目录
+SYSTEM_DIRECTORIES = {
+    '$RECYCLE.BIN', 'System Volume Information', '$Recycle.Bin',
+    '__pycache__', 'node_modules', '.git', '.svn', '.Trash', '.Trashes',
+    '.Spotlight-V100', '.fseventsd', '@eaDir',
+}
+
+# Windows 隐藏/系统文件属性
+_FILE_ATTRIBUTE_HIDDEN = 0x2
+_FILE_ATTRIBUTE_SYSTEM = 0x4
+
+# 队列结束标记
+_DONE = object()
+
+
+class FolderScanner:
+    """并行文件夹扫描器"""
+
+    def __init__(self,
+                 supported_formats: Iterable[str] = None,
+                 ignore_patterns: List[str] = None,
+                 skip_hidden: bool = True,
+                 follow_symlinks: bool = True,
+                 max_workers: int = 8,
+                 queue_size: int = 1024):
+        """
+        Args:
+            supported_formats: 支持的扩展名（小写，含点），为None时返回所有文件
+            ignore_patterns: 忽略规则（glob），同时匹配名称和相对路径，如 ["*_thumb*", "temp/*"]
+            skip_hidden: 是否跳过隐藏目录和文件
+            follow_symlinks: 是否跟随指向目录的符号链接
+            max_workers: 并行扫描的线程数
+            queue_size: 结果队列容量（消费方跟不上时扫描线程自动等待）
+        """
+        self.supported_formats = {ext.lower() for ext in supported_formats} if supported_formats else None
+        self.ignore_patterns = list(ignore_patterns or [])
+        self.skip_hidden = skip_hidden
+        self.follow_symlinks = follow_symlinks
+        self.max_workers = max(1, max_workers)
+        self.queue_size = queue_size
+
+        self.is_cancelled = False
+        self.files_found = 0
+        self.dirs_scanned = 0
+        self.errors = []
+
+    def cancel(self):
+        """取消扫描"""
+        self.is_cancelled = True
+
+    def scan(self, root: str, recursive: bool = True,
+             progress_callback: Callable[[int, int], None] = None) -> Iterator[ScannedFile]:
+        """
+        扫描文件夹
+
+        Args:
+            root: 根目录
+            recursive: 是否递归扫描子目录
+            progress_callback: 进度回调 (已发现文件数, 已扫描目录数)，在调用方线程中调用
+
+        Yields:
+            ScannedFile: 扫描到的文件（顺序不固定）
+        """
+        self.is_cancelled = False
+        self.files_found = 0
+        self.dirs_scanned = 0
+        self.errors = []
+
+        root = os.path.abspath(root)
+        if not os.path.isdir(root):
+            return
+
+        dir_queue = queue.Queue()
+        result_queue = queue.Queue(maxsize=self.queue_size)
+        visited = set()
+        visited_lock = threading.Lock()
+        pending = [1]  # 尚未扫描完成的目录数
+        pending_lock = threading.Lock()
+
+        self._mark_visited(root, visited, visited_lock)
+        dir_queue.put(root)
+
+        def put_result(item):
+            while not self.is_cancelled:
+                try:
+                    result_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def worker():
+            while True:
+                directory = dir_queue.get()
+                if directory is _DONE:
+                    break
+                try:
+                    if not self.is_cancelled:
+                        subdirs = self._scan_directory(root, directory, recursive,
+                                                       visited, visited_lock, put_result)
+                        with pending_lock:
+                            pending[0] += len(subdirs)
+                        for subdir in subdirs:
+                            dir_queue.put(subdir)
+                finally:
+                    with pending_lock:
+                        self.dirs_scanned += 1
+                        pending[0] -= 1
+                        finished = pending[0] == 0
+                    if finished:
+                        # 所有目录扫描完成，通知其他线程和调用方结束
+                        for _ in range(self.max_workers):
+                            dir_queue.put(_DONE)
+                        put_result(_DONE)
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(self.max_workers)]
+        for thread in threads:
+            thread.start()
+
+        finished = False
+        try:
+            while True:
+                try:
+                    item = result_queue.get(timeout=0.1)
+                except queue.Empty:
+                    if self.is_cancelled:
+                        break
+                    continue
+                if item is _DONE:
+                    finished = True
+                    break
+                self.files_found += 1
+                if progress_callback:
+                    progress_callback(self.files_found, self.dirs_scanned)
+                yield item
+        finally:
+            if not finished:
+                # 调用方提前结束时，目录可能已全部扫描完，但工作线程仍阻塞在放入结果上
+                self.is_cancelled = True
+                for _ in range(self.max_workers):
+                    dir_queue.put(_DONE)
+            for thread in threads:
+                thread.join(timeout=1.0)
+
+    def scan_paths(self, root: str, recursive: bool = True) -> Iterator[str]:
+        """扫描文件夹，只返回路径"""
+        for scanned in self.scan(root, recursive):
+            yield scanned.path
+
+    def _scan_directory(self, root: str, directory: str, recursive: bool,
+                        visited: set, visited_lock, put_result) -> List[str]:
+        """扫描单个目录，文件放入结果队列，返回需要继续扫描的子目录"""
+        subdirs = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if self.is_cancelled:
+                        break
+                    try:
+                        if self._is_ignored(root, entry):
+                            continue
+
+                        if entry.is_dir(follow_symlinks=self.follow_symlinks):
+                            if recursive and self._mark_visited(entry.path, visited, visited_lock):
+                                subdirs.append(entry.path)
+                            continue
+
+                        if not entry.is_file(follow_symlinks=self.follow_symlinks):
+                            continue
+                        if self.supported_formats is not None:
+                            if os.path.splitext(entry.name)[1].lower() not in self.supported_formats:
+                                continue
+
+                        # Windows上 DirEntry.stat() 直接使用目录枚举时缓存的信息
+                        stat = entry.stat(follow_symlinks=self.follow_symlinks)
+                        if not put_result(ScannedFile(entry.path, stat.st_size, stat.st_mtime)):
+                            break
+                    except OSError as e:
+                        self.errors.append((entry.path, str(e)))
+        except OSError as e:
+            print(f"无法访问目录: {directory}, 错误: {e}")
+            self.errors.append((directory, str(e)))
+        return subdirs
+
+    def _is_ignored(self, root: str, entry) -> bool:
+        """是否跳过该条目"""
+        name = entry.name
+        if self.skip_hidden:
+            if name.startswith('.') or name in SYSTEM_DIRECTORIES:
+                return True
+            if sys.platform == 'win32':
+                try:
+                    attributes = entry.stat(follow_symlinks=False).st_file_attributes
+                    if attributes & (_FILE_ATTRIBUTE_HIDDEN | _FILE_ATTRIBUTE_SYSTEM):
+                        return True
+                except (OSError, AttributeError):
+                    pass
+
+        if self.ignore_patterns:
+            relative_path = os.path.relpath(entry.path, root).replace(os.sep, '/')
+            for pattern in self.ignore_patterns:
+                if fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(relative_path, pattern):
+                    return True
+        return False
+
+    @staticmethod
+    def _mark_visited(path: str, visited: set, visited_lock) -> bool:
+        """记录已访问的目录（按设备号和inode识别），已访问过时返回False以避免符号链接循环"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        if stat.st_ino:
+            key = (stat.st_dev, stat.st_ino)
+        else:
+            key = os.path.normcase(os.path.realpath(path))
+        with visited_lock:
+            if key in visited:
+                return False
+            visited.add(key)
+            return True
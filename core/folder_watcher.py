@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文件夹监视模块
+持续监视生成工具（ComfyUI、A1111等）的输出文件夹，新图片写入完成后自动入库：
+有 watchdog 时使用系统文件事件（inotify / FSEvents / ReadDirectoryChangesW），
+否则按增量扫描清单定时轮询；文件大小稳定后才处理，按小批次写入数据库，
+入库后通过变更总线通知界面
+"""
+
+import os
+import json
+import time
+import threading
+from typing import Dict, List, Any, Callable, Iterable
+
+from .change_bus import RECORDS_ADDED
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    WATCHDOG_AVAILABLE = False
+    Observer = None
+    FileSystemEventHandler = object
+
+
+DEFAULT_WATCH_CONFIG = {'enabled': False, 'recursive': True, 'folders': []}
+
+
+def load_watch_config(config_path: str) -> Dict[str, Any]:
+    """读取监视文件夹设置"""
+    config = dict(DEFAULT_WATCH_CONFIG, folders=[])
+    try:
+        if os.path.exists(config_path):
+            with open(config_path, 'r', encoding='utf-8') as f:
+                config.update(json.load(f))
+    except Exception as e:
+        print(f"读取监视文件夹设置失败: {e}")
+    return config
+
+
+def save_watch_config(config_path: str, config: Dict[str, Any]) -> bool:
+    """保存监视文件夹设置"""
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(config_path)), exist_ok=True)
+        with open(config_path, 'w', encoding='utf-8') as f:
+            json.dump(config, f, ensure_ascii=False, indent=2)
+        return True
+    except Exception as e:
+        print(f"保存监视文件夹设置失败: {e}")
+        return False
+
+
+class _WatchEventHandler(FileSystemEventHandler):
+    """把文件系统事件转交给监视器"""
+
+    def __init__(self, watcher: 'FolderWatcher'):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.watcher.notify(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.watcher.notify(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.watcher.notify(event.dest_path)
+
+
+class FolderWatcher:
+    """文件夹监视器"""
+
+    def __init__(self,
+                 batch_processor,
+                 folders: Iterable[str],
+                 recursive: bool = True,
+                 settle_time: float = 1.0,
+                 poll_interval: float = 3.0,
+                 batch_size: int = 50,
+                 max_workers: int = 2,
+                 change_bus=None,
+                 use_native: bool = True,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            batch_processor: 批量处理器（BatchProcessor），用于增量扫描和提取入库
+            folders: 监视的文件夹
+            recursive: 是否包含子文件夹
+            settle_time: 文件大小和修改时间保持不变多久后视为写入完成（秒）
+            poll_interval: 轮询模式下的扫描间隔（秒）
+            batch_size: 每批入库的文件数
+            max_workers: 提取线程数
+            change_bus: 变更总线（ChangeBus），入库后发布 RECORDS_ADDED 事件
+            use_native: 是否优先使用系统文件事件
+            clock: 时钟函数（测试时可替换）
+        """
+        self.batch_processor = batch_processor
+        self.folders = [os.path.abspath(folder) for folder in folders]
+        self.recursive = recursive
+        self.settle_time = settle_time
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.change_bus = change_bus
+        self.use_native = use_native
+        self.clock = clock
+
+        self.mode = None
+        self.ingested_count = 0
+        self.is_running = False
+
+        # 等待写入完成的文件：路径 -> ((大小, 修改时间), 首次观察到该状态的时间)，None表示尚未检查
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        # 处理过但没有入库的文件（图片损坏、重复跳过等）：路径 -> (大小, 修改时间)，文件变化前轮询不再处理
+        self._failed = {}
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._observer = None
+        self._thread = None
+
+    # ===================== 启动与停止 =====================
+
+    def start(self):
+        """开始监视（先补扫一次未运行期间新增的文件）"""
+        if self.is_running:
+            return
+        self._stop_event.clear()
+        self.mode = 'polling'
+
+        if self.use_native and WATCHDOG_AVAILABLE:
+            try:
+                self._observer = Observer()
+                handler = _WatchEventHandler(self)
+                for folder in self.folders:
+                    if os.path.isdir(folder):
+                        self._observer.schedule(handler, folder, recursive=self.recursive)
+                self._observer.start()
+                self.mode = 'native'
+            except Exception as e:
+                print(f"启动文件系统监视失败，改为定时扫描: {e}")
+                self._observer = None
+
+        self.is_running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        print(f"开始监视 {len(self.folders)} 个文件夹（{'系统事件' if self.mode == 'native' else '定时扫描'}）")
+
+    def stop(self, timeout: float = 5.0):
+        """停止监视"""
+        if not self.is_running:
+            return
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._observer:
+            try:
+                self._observer.stop()
+                self._observer.join(timeout)
+            except Exception as e:
+                print(f"停止文件系统监视失败: {e}")
+            self._observer = None
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        self.is_running = False
+
+    # ===================== 检测 =====================
+
+    def notify(self, file_path: str):
+        """登记可能新增或修改的文件（由文件事件或轮询调用）"""
+        if os.path.splitext(file_path)[1].lower() not in self.batch_processor.supported_formats:
+            return
+        if os.path.basename(file_path).startswith('.'):
+            return
+        with self._pending_lock:
+            self._pending.setdefault(os.path.abspath(file_path), None)
+        self._wake_event.set()
+
+    def poll_once(self):
+        """按增量扫描清单扫描一遍，登记新增或修改的文件"""
+        for folder in self.folders:
+            if self._stop_event.is_set():
+                break
+            if not os.path.isdir(folder):
+                continue
+            try:
+                for file_path in self.batch_processor.iter_changed_images(folder, self.recursive):
+                    if self._failed and self._failed.get(os.path.abspath(file_path)) == self._signature(file_path):
+                        continue
+                    self.notify(file_path)
+            except Exception as e:
+                print(f"扫描监视文件夹失败 {folder}: {e}")
+
+    @staticmethod
+    def _signature(file_path: str):
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime
+
+    @property
+    def pending_count(self) -> int:
+        with self._pending_lock:
+            return len(self._pending)
+
+    def collect_ready(self) -> List[str]:
+        """
+        检查等待中的文件，返回已写入完成（状态在 settle_time 内未变化）的文件
+
+        Returns:
+            List[str]: 可以入库的文件路径
+        """
+        now = self.clock()
+        ready = []
+        with self._pending_lock:
+            pending = list(self._pending.items())
+
+        updates = {}
+        removed = []
+        for file_path, observed in pending:
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                # 临时文件被改名或删除
+                removed.append(file_path)
+                continue
+            signature = (stat.st_size, stat.st_mtime)
+            if observed is None or observed[0] != signature or stat.st_size == 0:
+                updates[file_path] = (signature, now)
+            elif now - observed[1] >= self.settle_time:
+                ready.append(file_path)
+                removed.append(file_path)
+
+        with self._pending_lock:
+            for file_path, observed in updates.items():
+                if file_path in self._pending:
+                    self._pending[file_path] = observed
+            for file_path in removed:
+                self._pending.pop(file_path, None)
+        return sorted(ready)
+
+    # ===================== 入库 =====================
+
+    def ingest(self, file_paths: List[str]) -> int:
+        """
+        按小批次提取并入库，完成后发布变更事件
+
+        Returns:
+            int: 成功入库的文件数
+        """
+        saved = 0
+        for start in range(0, len(file_paths), self.batch_size):
+            if self._stop_event.is_set():
+                break
+            batch = file_paths[start:start + self.batch_size]
+            saved_paths = []
+            try:
+                for result in self.batch_processor.process_stream(
+                    batch,
+                    auto_save=True,
+                    max_workers=self.max_workers,
+                    batch_size=self.batch_size
+                ):
+                    file_path = os.path.abspath(result['file_path'])
+                    if result['success']:
+                        saved_paths.append(result['file_path'])
+                        self._failed.pop(file_path, None)
+                    else:
+                        signature = self._signature(file_path)
+                        if signature:
+                            self._failed[file_path] = signature
+            except Exception as e:
+                print(f"监视文件夹入库失败: {e}")
+
+            if saved_paths:
+                saved += len(saved_paths)
+                self.ingested_count += len(saved_paths)
+                if self.change_bus:
+                    self.change_bus.publish(RECORDS_ADDED, {
+                        'paths': saved_paths,
+                        'count': len(saved_paths),
+                        'source': 'folder_watcher',
+                    })
+        return saved
+
+    def _run(self):
+        """监视线程：空闲时阻塞等待事件，有待处理文件时定期检查是否写入完成"""
+        self.poll_once()
+        next_poll = self.clock() + self.poll_interval
+
+        while not self._stop_event.is_set():
+            ready = self.collect_ready()
+            if ready:
+                self.ingest(ready)
+
+            if self.pending_count:
+                timeout = max(0.05, self.settle_time / 2)
+            elif self.mode == 'polling':
+                timeout = max(0.05, next_poll - self.clock())
+            else:
+                # 系统事件模式下没有待处理文件时一直等待，不占用CPU
+                timeout = None
+
+            self._wake_event.wait(timeout)
+            self._wake_event.clear()
+
+            if self.mode == 'polling' and self.clock() >= next_poll and not self._stop_event.is_set():
+                self.poll_once()
+                next_poll = self.clock() + self.poll_interval
+
+    def get_status(self) -> Dict[str, Any]:
+        """获取监视状态"""
+        return {
+            'running': self.is_running,
+            'mode': self.mode,
+            'folders': list(self.folders),
+            'pending': self.pending_count,
+            'ingested': self.ingested_count,
+            'failed': len(self._failed),
+        }
@@ -0,0 +1,539 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTML图库导出模块
+把多条记录导出为一个可离线浏览的图库文件夹：
+分页的索引页 + 每条记录一个详情页，缩略图和预览图缩小后保存在 assets/ 中
+（可选复制原图），页面通过 loading="lazy" 按需加载；
+记录的精简索引写入 assets/search-index.js，供页面在浏览器中搜索；
+可选把每页的缩略图拼成一张图集（assets/sprites-N），索引页每页只加载一张图片。
+缩略图在线程池中并行生成，导出的大小和时间取决于缩略图尺寸而不是原图大小
+"""
+
+import os
+import json
+import math
+import time
+import shutil
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Any, Callable, Iterable
+
+from .html_exporter import HTMLExporter
+from .html_template import HTMLTemplate, Markup
+from .contact_sheet import SpriteAtlasWriter
+
+try:
+    from PIL import Image, features
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+
+# 搜索索引中每条记录保留的提示词长度
+SEARCH_TEXT_LENGTH = 300
+
+# 浏览器端搜索最多显示的结果数
+MAX_SEARCH_RESULTS = 500
+
+
+class GalleryExporter:
+    """HTML图库导出器"""
+
+    def __init__(self,
+                 page_size: int = 120,
+                 thumbnail_size: int = 320,
+                 preview_size: int = 1280,
+                 image_format: str = 'webp',
+                 quality: int = 80,
+                 include_originals: bool = False,
+                 max_workers: int = 4,
+                 sprite_atlas: bool = False,
+                 title: str = '白泽AI 图库'):
+        """
+        Args:
+            page_size: 每个索引页的记录数
+            thumbnail_size: 缩略图最长边（像素），0 表示不生成图片
+            preview_size: 详情页预览图最长边，0 表示详情页使用缩略图；复制原图时不生成预览图
+            image_format: 缩略图格式 webp / jpeg（不支持 WebP 时自动使用 JPEG）
+            quality: 缩略图压缩质量
+            include_originals: 是否把原图复制到 assets/originals
+            max_workers: 生成缩略图的线程数
+            sprite_atlas: 是否把每页的缩略图拼成一张图集，索引页用 CSS 定位显示
+            title: 图库标题
+        """
+        self.page_size = max(1, page_size)
+        self.thumbnail_size = thumbnail_size
+        self.preview_size = preview_size
+        self.image_format = image_format.lower()
+        self.quality = quality
+        self.include_originals = include_originals
+        self.max_workers = max(1, max_workers)
+        self.sprite_atlas = sprite_atlas
+        self.title = title
+        self.html_exporter = HTMLExporter()
+        self.is_cancelled = False
+
+        if self.image_format == 'webp' and PIL_AVAILABLE and not features.check('webp'):
+            self.image_format = 'jpeg'
+
+    def cancel(self):
+        """取消导出（已提交的缩略图完成后停止）"""
+        self.is_cancelled = True
+
+    def export(self,
+               records: Iterable[Dict[str, Any]],
+               output_dir: str,
+               total: int = None,
+               progress_callback: Callable[[int, int, str], None] = None) -> Dict[str, Any]:
+        """
+        导出图库
+
+        Args:
+            records: 记录迭代器（如 DataManager.iter_records()）
+            output_dir: 输出文件夹，图库入口为其中的 index.html
+            total: 记录总数（仅用于进度显示）
+            progress_callback: 进度回调 (已完成, 总数, 当前文件)
+
+        Returns:
+            Dict: {'output_dir', 'index_path', 'records', 'pages', 'thumbnails', 'sprite_sheets',
+                   'failed_images', 'bytes', 'elapsed', 'cancelled'}
+        """
+        self.is_cancelled = False
+        start_time = time.time()
+        for folder in ('records', os.path.join('assets', 'thumbs'),
+                       os.path.join('assets', 'previews'), os.path.join('assets', 'originals')):
+            os.makedirs(os.path.join(output_dir, folder), exist_ok=True)
+
+        entries = []
+        stats = {'thumbnails': 0, 'failed_images': 0}
+        pending = deque()
+        max_pending = self.max_workers * 4
+        atlas = None
+        if self.sprite_atlas and self.thumbnail_size and PIL_AVAILABLE:
+            # 每页一张接近正方形的图集，格子与缩略图同样大小（超过尺寸上限时每页分为多张）
+            atlas = SpriteAtlasWriter(os.path.join(output_dir, 'assets'), 'sprites', self.thumbnail_size,
+                                      columns=math.ceil(math.sqrt(self.page_size)), per_sheet=self.page_size,
+                                      image_format=self.image_format, quality=self.quality)
+        atlas_page = [1]
+
+        def finish_oldest():
+            index, record, key, future = pending.popleft()
+            try:
+                assets = future.result()
+            except Exception as e:
+                print(f"生成缩略图失败 {record.get('file_path', '')}: {e}")
+                assets = {}
+            if assets.get('thumb'):
+                stats['thumbnails'] += 1
+            elif self.thumbnail_size and record.get('file_path'):
+                stats['failed_images'] += 1
+            entries.append(self._write_record_page(output_dir, index, record, key, assets))
+            if atlas is not None and assets.get('thumb'):
+                self._add_sprite(atlas, atlas_page, entries[-1], os.path.join(output_dir, assets['thumb']))
+            if progress_callback:
+                progress_callback(len(entries), total or 0, record.get('file_path', ''))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for index, record in enumerate(records):
+                if self.is_cancelled:
+                    break
+                key = str(record.get('id') or index + 1)
+                future = pool.submit(self._make_assets, output_dir, record.get('file_path') or '', key)
+                pending.append((index, record, key, future))
+                # 限制排队的任务数，内存占用与记录总数无关
+                if len(pending) >= max_pending:
+                    finish_oldest()
+            while pending:
+                finish_oldest()
+
+        sprite_sheets = self._attach_sprites(atlas, entries) if atlas is not None else 0
+        page_count = self._write_index_pages(output_dir, entries)
+        self._write_search_index(output_dir, entries)
+
+        total_bytes = 0
+        for root, _, files in os.walk(output_dir):
+            for name in files:
+                total_bytes += os.path.getsize(os.path.join(root, name))
+
+        return {
+            'output_dir': output_dir,
+            'index_path': os.path.join(output_dir, 'index.html'),
+            'records': len(entries),
+            'pages': page_count,
+            'thumbnails': stats['thumbnails'],
+            'sprite_sheets': sprite_sheets,
+            'failed_images': stats['failed_images'],
+            'bytes': total_bytes,
+            'elapsed': time.time() - start_time,
+            'cancelled': self.is_cancelled,
+        }
+
+    # ===================== 图片 =====================
+
+    def _make_assets(self, output_dir: str, file_path: str, key: str) -> Dict[str, str]:
+        """
+        生成一条记录的缩略图、预览图并按需复制原图（在线程池中执行）
+
+        Returns:
+            Dict[str, str]: {'thumb', 'preview', 'original'} 相对于图库根目录的路径
+        """
+        assets = {}
+        if not file_path or not os.path.exists(file_path):
+            return assets
+
+        if self.include_originals:
+            original = f"assets/originals/{key}{os.path.splitext(file_path)[1].lower()}"
+            shutil.copy2(file_path, os.path.join(output_dir, original))
+            assets['original'] = original
+
+        if not PIL_AVAILABLE or not self.thumbnail_size:
+            return assets
+
+        try:
+            extension = '.webp' if self.image_format == 'webp' else '.jpg'
+            largest = max(self.thumbnail_size, 0 if self.include_originals else self.preview_size)
+            with Image.open(file_path) as img:
+                # JPEG 在解码时直接缩小，只解码需要的尺寸
+                img.draft('RGB', (largest, largest))
+                image = img.convert('RGBA' if self._has_alpha(img) else 'RGB')
+
+            if self.preview_size and not self.include_originals:
+                image.thumbnail((self.preview_size, self.preview_size))
+                preview = f"assets/previews/{key}{extension}"
+                self._save_image(image, os.path.join(output_dir, preview))
+                assets['preview'] = preview
+
+            image.thumbnail((self.thumbnail_size, self.thumbnail_size))
+            thumb = f"assets/thumbs/{key}{extension}"
+            self._save_image(image, os.path.join(output_dir, thumb))
+            assets['thumb'] = thumb
+            assets['thumb_size'] = image.size
+        except Exception as e:
+            # 无法解码的图片只缺少缩略图，已复制的原图仍然可用
+            print(f"生成缩略图失败 {file_path}: {e}")
+        return assets
+
+    @staticmethod
+    def _add_sprite(atlas: SpriteAtlasWriter, atlas_page: List[int], entry: Dict[str, Any], thumb_path: str):
+        """把刚生成的缩略图加入所在页的图集"""
+        if entry['p'] != atlas_page[0]:
+            atlas.new_sheet()
+            atlas_page[0] = entry['p']
+        try:
+            with Image.open(thumb_path) as img:
+                atlas.add(entry['k'], img.convert('RGB'))
+        except Exception as e:
+            print(f"加入图集失败 {thumb_path}: {e}")
+
+    @staticmethod
+    def _attach_sprites(atlas: SpriteAtlasWriter, entries: List[Dict[str, Any]]) -> int:
+        """写出图集，把每条记录在图集中的位置保存到索引项，返回图集数"""
+        atlas_map = atlas.close()
+        for entry in entries:
+            sprite = atlas_map['sprites'].get(entry['k'])
+            if sprite:
+                sheet = atlas_map['sheets'][sprite['sheet']]
+                entry['sprite'] = dict(sprite, file=sheet['file'], columns=sheet['columns'], rows=sheet['rows'])
+        return len(atlas_map['sheets'])
+
+    @staticmethod
+    def _has_alpha(img) -> bool:
+        return img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info)
+
+    def _save_image(self, image, output_path: str):
+        if self.image_format == 'webp':
+            image.save(output_path, 'WEBP', quality=self.quality, method=4)
+        else:
+            if image.mode == 'RGBA':
+                background = Image.new('RGB', image.size, (255, 255, 255))
+                background.paste(image, mask=image.split()[3])
+                image = background
+            image.save(output_path, 'JPEG', quality=self.quality, optimize=True, progressive=True)
+
+    # ===================== 页面 =====================
+
+    def _page_file(self, page: int) -> str:
+        return 'index.html' if page == 1 else f"page-{page}.html"
+
+    def _write_record_page(self, output_dir: str, index: int, record: Dict[str, Any],
+                           key: str, assets: Dict[str, Any]) -> Dict[str, Any]:
+        """写出详情页，返回该记录的索引项"""
+        page = index // self.page_size + 1
+        image = assets.get('original') or assets.get('preview') or assets.get('thumb')
+        nav_html = (f'<p class="subtitle"><a href="../{self._page_file(page)}" '
+                    f'style="color: inherit;">← 返回图库</a></p>')
+        self.html_exporter.export_to_html(
+            record,
+            os.path.join(output_dir, 'records', f"{key}.html"),
+            include_image=False,
+            image_src=f"../{image}" if image else None,
+            nav_html=nav_html
+        )
+
+        prompt = record.get('prompt') or ''
+        return {
+            'k': key,
+            't': record.get('custom_name') or record.get('file_name') or os.path.basename(record.get('file_path') or ''),
+            'm': record.get('model') or '',
+            'i': assets.get('thumb', ''),
+            'w': (assets.get('thumb_size') or (0, 0))[0],
+            'h': (assets.get('thumb_size') or (0, 0))[1],
+            'p': page,
+            's': ' '.join(filter(None, [prompt[:SEARCH_TEXT_LENGTH], record.get('tags') or '',
+                                        record.get('sampler') or ''])),
+        }
+
+    def _write_index_pages(self, output_dir: str, entries: List[Dict[str, Any]]) -> int:
+        """写出分页的索引页，返回页数"""
+        page_count = max(1, math.ceil(len(entries) / self.page_size))
+        export_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        for page in range(1, page_count + 1):
+            page_entries = entries[(page - 1) * self.page_size:page * self.page_size]
+            context = {
+                'title': self.title,
+                'page': page,
+                'page_count': page_count,
+                'record_count': len(entries),
+                'export_time': export_time,
+                'cards_html': (self._render_card(entry) for entry in page_entries) if page_entries else _EMPTY_HTML,
+                'pagination_html': self._render_pagination(page, page_count),
+                'max_results': MAX_SEARCH_RESULTS,
+            }
+            with open(os.path.join(output_dir, self._page_file(page)), 'w', encoding='utf-8') as f:
+                _INDEX_TEMPLATE.render_to(f, context)
+        return page_count
+
+    def _render_card(self, entry: Dict[str, Any]) -> Markup:
+        sprite = entry.get('sprite')
+        if sprite:
+            # 背景放大为图集的列数/行数倍，按格子所在的行列用百分比定位
+            columns, rows = sprite['columns'], sprite['rows']
+            image_html = _CARD_SPRITE_TEMPLATE.render_markup({
+                'src': f"assets/{sprite['file']}",
+                'size_x': columns * 100,
+                'size_y': rows * 100,
+                'position_x': round(sprite['column'] * 100 / (columns - 1), 4) if columns > 1 else 0,
+                'position_y': round(sprite['row'] * 100 / (rows - 1), 4) if rows > 1 else 0,
+            })
+        elif entry['i']:
+            image_html = (_CARD_IMAGE_TEMPLATE if entry['w'] else _CARD_IMAGE_NO_SIZE_TEMPLATE).render_markup(
+                {'src': entry['i'], 'width': entry['w'], 'height': entry['h']})
+        else:
+            image_html = _NO_IMAGE_HTML
+        return _CARD_TEMPLATE.render_markup({'key': entry['k'], 'image_html': image_html,
+                                             'caption': entry['t'], 'meta': entry['m']})
+
+    def _render_pagination(self, page: int, page_count: int) -> Markup:
+        """页码导航：首页、末页和当前页附近的页码"""
+        if page_count <= 1:
+            return Markup('')
+        shown = sorted({1, page_count, *range(max(1, page - 3), min(page_count, page + 3) + 1)})
+        links = []
+        if page > 1:
+            links.append(f'<a href="{self._page_file(page - 1)}">上一页</a>')
+        previous = 0
+        for number in shown:
+            if number - previous > 1:
+                links.append('<span>…</span>')
+            if number == page:
+                links.append(f'<span class="current">{number}</span>')
+            else:
+                links.append(f'<a href="{self._page_file(number)}">{number}</a>')
+            previous = number
+        if page < page_count:
+            links.append(f'<a href="{self._page_file(page + 1)}">下一页</a>')
+        return Markup('<nav class="pagination">' + ''.join(links) + '</nav>')
+
+    def _write_search_index(self, output_dir: str, entries: List[Dict[str, Any]]):
+        """写出供浏览器端搜索的精简索引（以脚本形式加载，直接打开本地文件也可用）"""
+        index = {
+            'title': self.title,
+            'page_size': self.page_size,
+            'records': [{key: entry[key] for key in ('k', 't', 'm', 'i', 'p', 's')} for entry in entries],
+        }
+        with open(os.path.join(output_dir, 'assets', 'search-index.js'), 'w', encoding='utf-8') as f:
+            f.write('window.BAIZE_GALLERY = ')
+            json.dump(index, f, ensure_ascii=False, separators=(',', ':'))
+            f.write(';\n')
+
+
+_CARD_TEMPLATE = HTMLTemplate(
+    '<a class="card" href="records/{key}.html">{image_html}'
+    '<div class="caption">{caption}</div><div class="meta">{meta}</div></a>\n'
+)
+
+_CARD_IMAGE_TEMPLATE = HTMLTemplate(
+    '<img src="{src}" alt="" loading="lazy" decoding="async" width="{width}" height="{height}">'
+)
+
+_CARD_SPRITE_TEMPLATE = HTMLTemplate(
+    '<span class="sprite" style="background-image: url(\'{src}\'); '
+    'background-size: {size_x}% {size_y}%; background-position: {position_x}% {position_y}%;"></span>'
+)
+
+_CARD_IMAGE_NO_SIZE_TEMPLATE = HTMLTemplate('<img src="{src}" alt="" loading="lazy" decoding="async">')
+
+_NO_IMAGE_HTML = Markup('<div class="no-image">📷</div>')
+
+_EMPTY_HTML = Markup('<p class="empty">没有记录</p>')
+
+_INDEX_TEMPLATE = HTMLTemplate("""<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{title} - 第 {page} 页</title>
+    <style>
+        * {{ margin: 0; padding: 0; box-sizing: border-box; }}
+        body {{
+            font-family: 'Segoe UI', 'Microsoft YaHei', -apple-system, BlinkMacSystemFont, sans-serif;
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            min-height: 100vh;
+            padding: 24px;
+            color: #333;
+        }}
+        .container {{
+            max-width: 1400px;
+            margin: 0 auto;
+            background: rgba(255, 255, 255, 0.98);
+            border-radius: 24px;
+            padding: 32px;
+            box-shadow: 0 25px 50px rgba(0, 0, 0, 0.15);
+        }}
+        .header {{ display: flex; flex-wrap: wrap; gap: 16px; align-items: center; justify-content: space-between; margin-bottom: 24px; }}
+        .title {{ font-size: 1.8rem; color: #4f46e5; }}
+        .subtitle {{ color: #64748b; font-size: 0.9rem; margin-top: 4px; }}
+        .search {{
+            flex: 0 1 360px;
+            padding: 10px 16px;
+            border: 1px solid #cbd5e1;
+            border-radius: 12px;
+            font-size: 1rem;
+        }}
+        .status {{ color: #64748b; margin-bottom: 12px; min-height: 1.2em; }}
+        .grid {{ display: grid; grid-template-columns: repeat(auto-fill, minmax(180px, 1fr)); gap: 16px; }}
+        .card {{
+            display: block;
+            background: #f8fafc;
+            border: 1px solid #e2e8f0;
+            border-radius: 14px;
+            overflow: hidden;
+            text-decoration: none;
+            color: inherit;
+            transition: transform 0.2s ease, box-shadow 0.2s ease;
+        }}
+        .card:hover {{ transform: translateY(-2px); box-shadow: 0 10px 25px rgba(0, 0, 0, 0.1); }}
+        .card img, .no-image {{
+            display: block;
+            width: 100%;
+            height: 200px;
+            object-fit: cover;
+            background: #e2e8f0;
+        }}
+        .card .sprite {{
+            display: block;
+            width: 100%;
+            aspect-ratio: 1 / 1;
+            background-color: #e2e8f0;
+            background-repeat: no-repeat;
+        }}
+        .no-image {{ display: flex; align-items: center; justify-content: center; font-size: 2rem; }}
+        .caption {{ padding: 8px 10px 0; font-size: 0.85rem; font-weight: 600; white-space: nowrap; overflow: hidden; text-overflow: ellipsis; }}
+        .meta {{ padding: 2px 10px 10px; font-size: 0.75rem; color: #64748b; white-space: nowrap; overflow: hidden; text-overflow: ellipsis; }}
+        .pagination {{ display: flex; flex-wrap: wrap; gap: 6px; justify-content: center; margin-top: 24px; }}
+        .pagination a, .pagination span {{ padding: 6px 12px; border-radius: 8px; text-decoration: none; color: #4f46e5; }}
+        .pagination a:hover {{ background: #eef2ff; }}
+        .pagination .current {{ background: #4f46e5; color: white; }}
+        .empty {{ color: #64748b; }}
+        .footer {{ text-align: center; color: #94a3b8; font-size: 0.8rem; margin-top: 24px; }}
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <div>
+                <h1 class="title">{title}</h1>
+                <p class="subtitle">共 {record_count} 条记录 · 第 {page}/{page_count} 页</p>
+            </div>
+            <input id="search" class="search" type="search" placeholder="搜索全部记录：文件名、提示词、模型、标签">
+        </div>
+        <div id="status" class="status"></div>
+        <div id="page-grid" class="grid">
+{cards_html}
+        </div>
+        <div id="search-grid" class="grid" hidden></div>
+        {pagination_html}
+        <div class="footer">导出时间: {export_time} · 由 白泽AI 生成</div>
+    </div>
+
+    <script src="assets/search-index.js" defer></script>
+    <script>
+        (function () {{
+            const input = document.getElementById('search');
+            const status = document.getElementById('status');
+            const pageGrid = document.getElementById('page-grid');
+            const searchGrid = document.getElementById('search-grid');
+            const pagination = document.querySelector('.pagination');
+            let timer = null;
+
+            function card(entry) {{
+                const link = document.createElement('a');
+                link.className = 'card';
+                link.href = 'records/' + entry.k + '.html';
+                if (entry.i) {{
+                    const img = document.createElement('img');
+                    img.src = entry.i;
+                    img.loading = 'lazy';
+                    img.alt = '';
+                    link.appendChild(img);
+                }} else {{
+                    const placeholder = document.createElement('div');
+                    placeholder.className = 'no-image';
+                    placeholder.textContent = '📷';
+                    link.appendChild(placeholder);
+                }}
+                const caption = document.createElement('div');
+                caption.className = 'caption';
+                caption.textContent = entry.t;
+                const meta = document.createElement('div');
+                meta.className = 'meta';
+                meta.textContent = entry.m + ' · 第 ' + entry.p + ' 页';
+                link.appendChild(caption);
+                link.appendChild(meta);
+                return link;
+            }}
+
+            function search() {{
+                const terms = input.value.trim().toLowerCase().split(/\\s+/).filter(Boolean);
+                const showPage = terms.length === 0 || !window.BAIZE_GALLERY;
+                pageGrid.hidden = !showPage;
+                searchGrid.hidden = showPage;
+                if (pagination) pagination.hidden = !showPage;
+                if (showPage) {{
+                    status.textContent = '';
+                    return;
+                }}
+                const results = [];
+                let count = 0;
+                for (const entry of window.BAIZE_GALLERY.records) {{
+                    const text = (entry.t + ' ' + entry.m + ' ' + entry.s).toLowerCase();
+                    if (terms.every(term => text.includes(term))) {{
+                        count += 1;
+                        if (results.length < {max_results}) results.push(entry);
+                    }}
+                }}
+                searchGrid.replaceChildren(...results.map(card));
+                status.textContent = '找到 ' + count + ' 条记录' + (count > results.length ? '，显示前 ' + results.length + ' 条' : '');
+            }}
+
+            input.addEventListener('input', function () {{
+                clearTimeout(timer);
+                timer = setTimeout(search, 150);
+            }});
+        }})();
+    </script>
+</body>
+</html>
+""")
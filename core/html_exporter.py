@@ -9,14 +9,49 @@ import os
 import json
 import base64
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Iterator
+
+from .html_template import HTMLTemplate, Markup
+
+
+# LoRA 信息气泡
+_LORA_TEMPLATE = HTMLTemplate("""
+                        <div class="info-bubble lora-bubble">
+                            <div class="bubble-label">LoRA</div>
+                            <div class="bubble-content">
+                                <div class="lora-name">{name}</div>
+                                <div class="lora-weight">权重: {weight}</div>{hash_html}
+                            </div>
+                        </div>
+""")
+
+_LORA_HASH_TEMPLATE = HTMLTemplate("""
+                                <div class="lora-hash">Hash: {hash}...</div>""")
+
+_LORA_RAW_TEMPLATE = HTMLTemplate("""
+                <div class="info-bubble lora-bubble">
+                    <div class="bubble-label">LoRA</div>
+                    <div class="bubble-content">
+                        <div class="lora-raw">{raw}</div>
+                    </div>
+                </div>
+""")
+
+_IMAGE_TEMPLATE = HTMLTemplate('<img src="{src}" alt="AI Generated Image" class="preview-image" loading="lazy">')
+
+_NO_IMAGE_HTML = Markup('<div class="no-image-placeholder">📷<br>未包含图片</div>')
 
 
 class HTMLExporter:
     """HTML导出器"""
     
+    # 页面模板只解析一次，所有导出器实例共用
+    _compiled_template = None
+    
     def __init__(self):
-        self.template = self._get_html_template()
+        if HTMLExporter._compiled_template is None:
+            HTMLExporter._compiled_template = HTMLTemplate(self._get_html_template())
+        self.template = HTMLExporter._compiled_template
     
     def export_single_record(self, record_data: Dict[str, Any], include_image: bool = True) -> str:
         """
@@ -34,53 +69,15 @@ class HTMLExporter:
             html_data = self._prepare_html_data(record_data, include_image)
             
             # 渲染HTML
-            html_content = self._render_html(html_data)
-            
-            return html_content
+            return self.template.render(self._build_context(html_data))
             
         except Exception as e:
             print(f"生成HTML内容失败: {e}")
             return f"<html><body><h1>生成失败</h1><p>错误: {str(e)}</p></body></html>"
     
-    def export_multiple_records(self, records: list, config: dict = None) -> str:
-        """
-        导出多个记录为HTML内容字符串
-        
-        Args:
-            records: 记录列表
-            config: 导出配置
-            
-        Returns:
-            str: HTML内容字符串
-        """
-        try:
-            if not records:
-                return "<html><body><h1>无数据</h1><p>没有可导出的记录</p></body></html>"
-            
-            # 使用第一个记录的格式作为模板，后续可以扩展为多记录模板
-            first_record = records[0]
-            include_image = config.get('include_images', True) if config else True
-            
-            # 目前使用单记录模板，后续可以扩展
-            html_data = self._prepare_html_data(first_record, include_image)
-            html_content = self._render_html(html_data)
-            
-            # 如果有多个记录，可以在这里扩展生成多记录页面
-            if len(records) > 1:
-                # 简单处理：在标题中显示记录数量
-                html_content = html_content.replace(
-                    f'<title>{html_data["title"]}</title>',
-                    f'<title>批量导出 - {len(records)} 个记录</title>'
-                )
-            
-            return html_content
-            
-        except Exception as e:
-            print(f"生成批量HTML内容失败: {e}")
-            return f"<html><body><h1>生成失败</h1><p>错误: {str(e)}</p></body></html>"
-    
     def export_to_html(self, record_data: Dict[str, Any], output_path: str, 
-                      include_image: bool = True) -> bool:
+                      include_image: bool = True, image_src: str = None,
+                      nav_html: str = '') -> bool:
         """
         导出记录为HTML分享页面
         
@@ -88,20 +85,22 @@ class HTMLExporter:
             record_data: 图片记录数据
             output_path: 输出文件路径
             include_image: 是否在HTML中包含图片
+            image_src: 图片地址（如图库中的相对路径），提供时引用该地址而不嵌入base64
+            nav_html: 标题下方的导航链接HTML
             
         Returns:
             bool: 是否成功导出
         """
         try:
             # 准备数据
-            html_data = self._prepare_html_data(record_data, include_image)
+            html_data = self._prepare_html_data(record_data, include_image and not image_src)
+            if image_src:
+                html_data['image_data'] = image_src
+            html_data['nav_html'] = Markup(nav_html)
             
-            # 渲染HTML
-            html_content = self._render_html(html_data)
-            
-            # 写入文件
+            # 渲染HTML，片段直接写入文件
             with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(html_content)
+                self.template.render_to(f, self._build_context(html_data))
             
             return True
             
@@ -182,60 +181,37 @@ class HTMLExporter:
             print(f"图片编码失败: {e}")
             return ""
     
-    def _render_html(self, data: Dict[str, Any]) -> str:
-        """渲染HTML内容"""
-        
-        # 渲染LoRA信息
-        lora_html = ""
-        if data['lora_data']:
-            # 处理不同格式的LoRA数据
-            if isinstance(data['lora_data'], list):
-                # 列表格式：[{'name': '...', 'weight': 0.8, 'hash': '...'}, ...]
-                for lora_item in data['lora_data']:
-                    if isinstance(lora_item, dict):
-                        lora_name = lora_item.get('name', '未知LoRA')
-                        lora_weight = lora_item.get('weight', 'N/A')
-                        lora_hash = lora_item.get('hash', '')
-                        
-                        lora_html += f"""
-                        <div class="info-bubble lora-bubble">
-                            <div class="bubble-label">LoRA</div>
-                            <div class="bubble-content">
-                                <div class="lora-name">{lora_name}</div>
-                                <div class="lora-weight">权重: {lora_weight}</div>
-                                {f'<div class="lora-hash">Hash: {lora_hash[:8]}...</div>' if lora_hash else ''}
-                            </div>
-                        </div>
-                        """
-            elif isinstance(data['lora_data'], dict):
-                # 字典格式：{'lora_name': weight, ...}
-                for lora_name, lora_weight in data['lora_data'].items():
-                    lora_html += f"""
-                    <div class="info-bubble lora-bubble">
-                        <div class="bubble-label">LoRA</div>
-                        <div class="bubble-content">
-                            <div class="lora-name">{lora_name}</div>
-                            <div class="lora-weight">权重: {lora_weight}</div>
-                        </div>
-                    </div>
-                    """
-            else:
-                # 其他格式，显示原始数据
-                lora_html += f"""
-                <div class="info-bubble lora-bubble">
-                    <div class="bubble-label">LoRA</div>
-                    <div class="bubble-content">
-                        <div class="lora-raw">{str(data['lora_data'])}</div>
-                    </div>
-                </div>
-                """
+    def _render_lora_html(self, lora_data: Any) -> Iterator[Markup]:
+        """逐个渲染LoRA信息气泡"""
+        if not lora_data:
+            return
+        # 处理不同格式的LoRA数据
+        if isinstance(lora_data, list):
+            # 列表格式：[{'name': '...', 'weight': 0.8, 'hash': '...'}, ...]
+            for lora_item in lora_data:
+                if isinstance(lora_item, dict):
+                    lora_hash = str(lora_item.get('hash', '') or '')
+                    yield _LORA_TEMPLATE.render_markup({
+                        'name': lora_item.get('name', '未知LoRA'),
+                        'weight': lora_item.get('weight', 'N/A'),
+                        'hash_html': _LORA_HASH_TEMPLATE.render_markup({'hash': lora_hash[:8]}) if lora_hash else '',
+                    })
+        elif isinstance(lora_data, dict):
+            # 字典格式：{'lora_name': weight, ...}
+            for lora_name, lora_weight in lora_data.items():
+                yield _LORA_TEMPLATE.render_markup({'name': lora_name, 'weight': lora_weight, 'hash_html': ''})
+        else:
+            # 其他格式，显示原始数据
+            yield _LORA_RAW_TEMPLATE.render_markup({'raw': lora_data})
+    
+    def _build_context(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """把渲染数据整理为模板插槽的值（普通值由模板转义，Markup 原样写入）"""
         
         # 渲染图片
-        image_html = ""
         if data['image_data']:
-            image_html = f'<img src="{data["image_data"]}" alt="AI Generated Image" class="preview-image">'
+            image_html = _IMAGE_TEMPLATE.render_markup({'src': data['image_data']})
         else:
-            image_html = '<div class="no-image-placeholder">📷<br>未包含图片</div>'
+            image_html = _NO_IMAGE_HTML
         
         # 准备复制的文本数据
         # 处理LoRA数据格式转换
@@ -260,21 +236,26 @@ class HTMLExporter:
             'lora': lora_copy_data
         }
         
-        # 填充模板
-        return self.template.format(
-            title=data['title'],
-            image_html=image_html,
-            prompt=data['prompt'],
-            negative_prompt=data['negative_prompt'],
-            model=data['model'],
-            sampler=data['sampler'],
-            steps=data['steps'],
-            cfg_scale=data['cfg_scale'],
-            seed=data['seed'],
-            lora_html=lora_html,
-            export_time=data['export_time'],
-            copy_data_json=json.dumps(copy_data, ensure_ascii=False)
-        )
+        return {
+            'title': data['title'],
+            'nav_html': Markup(data.get('nav_html', '')),
+            'image_html': image_html,
+            'prompt': data['prompt'],
+            'negative_prompt': data['negative_prompt'],
+            'model': data['model'],
+            'sampler': data['sampler'],
+            'steps': data['steps'],
+            'cfg_scale': data['cfg_scale'],
+            'seed': data['seed'],
+            'lora_html': self._render_lora_html(data['lora_data']),
+            'export_time': data['export_time'],
+            # 写在 <script> 中，避免 </script> 提前结束脚本
+            'copy_data_json': Markup(json.dumps(copy_data, ensure_ascii=False).replace('</', '<\\/'))
+        }
+    
+    def _render_html(self, data: Dict[str, Any]) -> str:
+        """渲染HTML内容"""
+        return self.template.render(self._build_context(data))
     
     def _get_html_template(self) -> str:
         """获取HTML模板"""
@@ -670,6 +651,7 @@ class HTMLExporter:
         <div class="header">
             <h1 class="title">{title}</h1>
             <p class="subtitle">AI图片生成信息分享</p>
+            {nav_html}
         </div>
 
         <div class="main-content">
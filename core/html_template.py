@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTML模板模块
+模板只解析一次，拆成静态片段和插槽；渲染时按顺序把片段和（已转义的）值直接写入文件流，
+不在内存中拼接整页字符串，导出大量记录时内存占用保持平稳。
+模板语法与 str.format 相同：{name} 为插槽，{{ 和 }} 为字面的花括号
+"""
+
+import io
+import html
+from string import Formatter
+from typing import Dict, Any, List, Tuple, TextIO, Iterable
+
+
+class Markup(str):
+    """已经是安全HTML的字符串，渲染时不再转义"""
+
+
+def escape(value: Any) -> str:
+    """
+    转义插入到HTML中的值
+
+    Args:
+        value: 任意值，None 视为空字符串；Markup 原样返回
+
+    Returns:
+        str: 转义后的字符串
+    """
+    if isinstance(value, Markup):
+        return value
+    if value is None:
+        return ''
+    return html.escape(str(value))
+
+
+class HTMLTemplate:
+    """预编译的HTML模板"""
+
+    def __init__(self, source: str):
+        """
+        Args:
+            source: 模板文本
+        """
+        self.segments: List[Tuple[str, str]] = []
+        for literal, field_name, format_spec, conversion in Formatter().parse(source):
+            if format_spec or conversion:
+                raise ValueError(f"模板插槽不支持格式说明: {{{field_name}}}")
+            self.segments.append((literal, field_name))
+        self.fields = {field_name for _, field_name in self.segments if field_name is not None}
+
+    def render_to(self, stream: TextIO, context: Dict[str, Any]):
+        """
+        渲染模板并写入文本流
+
+        插槽的值：Markup 原样写入，其他值转义后写入；
+        列表、元组或生成器逐项写入（每项按同样规则处理），可用于流式输出大量片段
+
+        Args:
+            stream: 可写的文本流（如以 'w' 模式打开的文件）
+            context: 插槽名到值的映射，缺少插槽时抛出 KeyError
+        """
+        write = stream.write
+        for literal, field_name in self.segments:
+            if literal:
+                write(literal)
+            if field_name is None:
+                continue
+            value = context[field_name]
+            if isinstance(value, str) or not isinstance(value, Iterable):
+                write(escape(value))
+            else:
+                for item in value:
+                    write(escape(item))
+
+    def render(self, context: Dict[str, Any]) -> str:
+        """
+        渲染模板为字符串
+
+        Args:
+            context: 插槽名到值的映射
+
+        Returns:
+            str: HTML内容
+        """
+        buffer = io.StringIO()
+        self.render_to(buffer, context)
+        return buffer.getvalue()
+
+    def render_markup(self, context: Dict[str, Any]) -> Markup:
+        """渲染为 Markup，用于嵌入其他模板的插槽"""
+        return Markup(self.render(context))
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片感知哈希模块
+导入时从缩小解码的灰度图计算 64 位差值哈希（dHash），保存到数据库；
+按汉明距离查找重复或相似的图片：
+多索引哈希表把 64 位分成 4 段各 16 位，两个哈希距离不超过 r 时，
+至少有一段的距离不超过 r // 4，只需在这些段的桶里查找候选
+"""
+
+import threading
+from itertools import combinations
+from typing import List, Any, Optional, Iterable, Tuple
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+HASH_BITS = 64
+HASH_MASK = (1 << HASH_BITS) - 1
+
+# dHash 比较 9x8 灰度图中相邻像素的亮度
+HASH_WIDTH = 9
+HASH_HEIGHT = 8
+
+# 解码时的目标尺寸：JPEG 可在解码阶段按 1/2~1/8 缩小，其他格式先按整数倍缩小
+DECODE_SIZE = 64
+
+# 默认认为重复的最大汉明距离（64 位中不同的位数）
+DEFAULT_MAX_DISTANCE = 6
+
+# 多索引分段：4 段 x 16 位
+BLOCK_COUNT = 4
+BLOCK_BITS = HASH_BITS // BLOCK_COUNT
+BLOCK_MASK = (1 << BLOCK_BITS) - 1
+
+# 导入时发现重复图片的处理方式
+DUPLICATE_POLICIES = ('import', 'link', 'skip')
+
+
+def to_signed64(value: int) -> int:
+    """转换为有符号 64 位整数（SQLite INTEGER 的范围）"""
+    value &= HASH_MASK
+    return value - (1 << HASH_BITS) if value >= (1 << (HASH_BITS - 1)) else value
+
+
+def to_unsigned64(value: int) -> int:
+    """转换为无符号 64 位整数"""
+    return value & HASH_MASK
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """两个哈希的汉明距离"""
+    return ((a ^ b) & HASH_MASK).bit_count()
+
+
+def dhash_from_pixels(pixels) -> int:
+    """
+    从 9x8 灰度像素计算 dHash
+
+    Args:
+        pixels: 8 行 9 列的亮度值（二维列表或数组）
+
+    Returns:
+        int: 有符号 64 位哈希
+    """
+    if NUMPY_AVAILABLE:
+        array = np.asarray(pixels, dtype=np.int16).reshape(HASH_HEIGHT, HASH_WIDTH)
+        bits = (array[:, 1:] > array[:, :-1]).ravel()
+        value = int(np.packbits(bits).view('>u8')[0])
+    else:
+        value = 0
+        for row in pixels:
+            for left, right in zip(row[:-1], row[1:]):
+                value = (value << 1) | (1 if right > left else 0)
+    return to_signed64(value)
+
+
+def compute_dhash(file_path: str) -> Optional[int]:
+    """
+    计算图片文件的 dHash（缩小解码，不解码完整尺寸的像素）
+
+    Returns:
+        Optional[int]: 有符号 64 位哈希，无法读取时返回None
+    """
+    if not PIL_AVAILABLE:
+        return None
+    try:
+        with Image.open(file_path) as img:
+            # JPEG 在解码时直接缩小（DCT 缩放），大幅减少解码量
+            img.draft('L', (DECODE_SIZE, DECODE_SIZE))
+            # reduce 只支持部分模式：调色板、1 位、16 位等先转换
+            if img.mode in ('LA', 'P', 'PA'):
+                img = img.convert('RGBA')
+            elif img.mode.startswith('I;16') or img.mode in ('I', 'F'):
+                # 16 位灰度按比例缩放到 8 位，直接转换会截断为全白
+                img = img.convert('F').point(lambda value: value / 256).convert('L')
+            elif img.mode not in ('L', 'RGB', 'RGBA'):
+                img = img.convert('L')
+            factor = min(img.size) // DECODE_SIZE
+            if factor > 1 and hasattr(img, 'reduce'):
+                img = img.reduce(factor)
+            if img.mode == 'RGBA':
+                background = Image.new('RGBA', img.size, (255, 255, 255, 255))
+                img = Image.alpha_composite(background, img)
+            small = img.convert('L').resize((HASH_WIDTH, HASH_HEIGHT), Image.BOX)
+            pixels = list(small.getdata())
+        return dhash_from_pixels([pixels[row * HASH_WIDTH:(row + 1) * HASH_WIDTH]
+                                  for row in range(HASH_HEIGHT)])
+    except Exception as e:
+        print(f"计算图片哈希失败 {file_path}: {e}")
+        return None
+
+
+def _block_keys(value: int) -> List[int]:
+    """把无符号哈希拆成各段的值"""
+    return [(value >> (block * BLOCK_BITS)) & BLOCK_MASK for block in range(BLOCK_COUNT)]
+
+
+def _flip_masks(max_distance: int) -> List[int]:
+    """段内需要枚举的翻转位组合（距离不超过 max_distance // 段数）"""
+    radius = max(0, max_distance) // BLOCK_COUNT
+    masks = [0]
+    for bits in range(1, radius + 1):
+        for positions in combinations(range(BLOCK_BITS), bits):
+            mask = 0
+            for position in positions:
+                mask |= 1 << position
+            masks.append(mask)
+    return masks
+
+
+class HashIndex:
+    """多索引哈希表：增量添加哈希，按汉明距离查询（线程安全）"""
+
+    def __init__(self, items: Iterable[Tuple[Any, int]] = ()):
+        """
+        Args:
+            items: 初始内容 (键, 哈希)，键通常是文件路径或记录ID
+        """
+        self._buckets = [dict() for _ in range(BLOCK_COUNT)]
+        self._count = 0
+        self._lock = threading.Lock()
+        for key, hash_value in items:
+            self.add(key, hash_value)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, key: Any, hash_value: int):
+        """添加一个哈希"""
+        if hash_value is None:
+            return
+        with self._lock:
+            self._add(key, to_unsigned64(hash_value))
+
+    def query(self, hash_value: int, max_distance: int = DEFAULT_MAX_DISTANCE) -> List[Tuple[int, Any]]:
+        """
+        查找距离不超过 max_distance 的哈希
+
+        Returns:
+            List[Tuple[int, Any]]: (距离, 键)，按距离排序
+        """
+        with self._lock:
+            return self._query(to_unsigned64(hash_value), max_distance)
+
+    def find(self, hash_value: int, max_distance: int = DEFAULT_MAX_DISTANCE) -> Optional[Any]:
+        """返回距离最近的一个键，没有时返回None"""
+        matches = self.query(hash_value, max_distance)
+        return matches[0][1] if matches else None
+
+    def match_or_add(self, key: Any, hash_value: int,
+                     max_distance: int = DEFAULT_MAX_DISTANCE) -> Optional[Any]:
+        """
+        查找与给定哈希相近的其他键；没有时把它加入索引（查找和添加是原子的，
+        并发导入的两张相似图片只有后一张会被判为重复）
+
+        Returns:
+            Optional[Any]: 距离最近的其他键，没有时返回None
+        """
+        value = to_unsigned64(hash_value)
+        with self._lock:
+            for _, other_key in self._query(value, max_distance):
+                if other_key != key:
+                    return other_key
+            self._add(key, value)
+            return None
+
+    def _add(self, key: Any, value: int):
+        entry = (value, key)
+        for buckets, block_key in zip(self._buckets, _block_keys(value)):
+            buckets.setdefault(block_key, []).append(entry)
+        self._count += 1
+
+    def _query(self, value: int, max_distance: int) -> List[Tuple[int, Any]]:
+        masks = _flip_masks(max_distance)
+        found = {}
+        for buckets, block_key in zip(self._buckets, _block_keys(value)):
+            for mask in masks:
+                for other, key in buckets.get(block_key ^ mask, ()):
+                    if key in found:
+                        continue
+                    distance = (value ^ other).bit_count()
+                    if distance <= max_distance:
+                        found[key] = distance
+        return sorted(((distance, key) for key, distance in found.items()), key=lambda item: item[0])
+
+
+def nearest(hash_value: int, hashes: List[int], max_distance: int = DEFAULT_MAX_DISTANCE) -> List[Tuple[int, int]]:
+    """
+    在哈希列表中查找与给定哈希相近的项（单次查询，线性扫描）
+
+    Returns:
+        List[Tuple[int, int]]: (距离, 下标)，按距离排序
+    """
+    if not hashes:
+        return []
+    value = to_unsigned64(hash_value)
+    if NUMPY_AVAILABLE:
+        array = _to_uint64_array(hashes)
+        distances = _popcount64(array ^ np.uint64(value))
+        indices = np.flatnonzero(distances <= max_distance)
+        order = np.argsort(distances[indices], kind='stable')
+        return [(int(distances[i]), int(i)) for i in indices[order]]
+    matches = [(hamming_distance(value, other), index) for index, other in enumerate(hashes)]
+    return sorted(item for item in matches if item[0] <= max_distance)
+
+
+def group_similar(hashes: List[int], max_distance: int = DEFAULT_MAX_DISTANCE) -> List[List[int]]:
+    """
+    把相近的哈希分组（距离不超过 max_distance 的两项连通即为同一组）
+
+    Args:
+        hashes: 哈希列表
+        max_distance: 最大汉明距离
+
+    Returns:
+        List[List[int]]: 每组的下标（至少 2 项），组内按下标排序，组按大小降序
+    """
+    if len(hashes) < 2:
+        return []
+
+    # 完全相同的哈希先合并，只在不同的哈希之间查找相近的对
+    if NUMPY_AVAILABLE:
+        unique, inverse = np.unique(_to_uint64_array(hashes), return_inverse=True)
+        inverse = inverse.ravel()
+        pairs = _similar_pairs_numpy(unique, max_distance)
+        unique_count = len(unique)
+    else:
+        unique_index = {}
+        inverse = [unique_index.setdefault(to_unsigned64(value), len(unique_index)) for value in hashes]
+        pairs = _similar_pairs_python(list(unique_index), max_distance)
+        unique_count = len(unique_index)
+
+    parent = list(range(unique_count))
+
+    def find_root(index):
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    for a, b in pairs:
+        root_a, root_b = find_root(a), find_root(b)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    groups = {}
+    for index, unique_position in enumerate(inverse):
+        groups.setdefault(find_root(int(unique_position)), []).append(index)
+    result = [members for members in groups.values() if len(members) > 1]
+    result.sort(key=lambda members: (-len(members), members[0]))
+    return result
+
+
+def _to_uint64_array(hashes: List[int]):
+    return np.fromiter((to_unsigned64(value) for value in hashes), dtype=np.uint64, count=len(hashes))
+
+
+def _popcount64(array):
+    """逐项统计 uint64 数组中置位的个数"""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(array).astype(np.int64)
+    table = np.array([bin(i).count('1') for i in range(256)], dtype=np.int64)
+    return table[np.ascontiguousarray(array).view(np.uint8).reshape(-1, 8)].sum(axis=1)
+
+
+def _similar_pairs_numpy(unique, max_distance: int) -> List[Tuple[int, int]]:
+    """向量化的多索引查找：返回距离不超过 max_distance 的下标对 (a, b)，a < b"""
+    count = len(unique)
+    masks = _flip_masks(max_distance)
+    found = []
+    for block in range(BLOCK_COUNT):
+        keys = ((unique >> np.uint64(block * BLOCK_BITS)) & np.uint64(BLOCK_MASK)).astype(np.int64)
+        order = np.argsort(keys, kind='stable')
+        # 每个段值在排序结果中的起始位置，查找桶只需两次下标访问
+        starts = np.searchsorted(keys[order], np.arange(BLOCK_MASK + 2))
+        for mask in masks:
+            # 翻转位不为0时，两个段值互为翻转，只从该位为0的一侧查找一次
+            query = np.flatnonzero((keys & (mask & -mask)) == 0) if mask else np.arange(count)
+            targets = keys[query] ^ mask
+            low = starts[targets]
+            counts = starts[targets + 1] - low
+            total = int(counts.sum())
+            if total == 0:
+                continue
+            # 展开每一项与其候选桶中所有项的组合
+            a = np.repeat(query, counts)
+            offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            b = order[np.repeat(low, counts) + offsets]
+            if mask:
+                a, b = np.minimum(a, b), np.maximum(a, b)
+            else:
+                keep = a < b
+                a, b = a[keep], b[keep]
+            keep = _popcount64(unique[a] ^ unique[b]) <= max_distance
+            if keep.any():
+                found.append(a[keep] * count + b[keep])
+    if not found:
+        return []
+    pair_keys = np.unique(np.concatenate(found))
+    return list(zip((pair_keys // count).tolist(), (pair_keys % count).tolist()))
+
+
+def _similar_pairs_python(unique: List[int], max_distance: int) -> List[Tuple[int, int]]:
+    """纯Python的多索引查找（未安装 numpy 时使用）"""
+    masks = _flip_masks(max_distance)
+    block_keys = [_block_keys(value) for value in unique]
+    found = set()
+    for block in range(BLOCK_COUNT):
+        buckets = {}
+        for index, keys in enumerate(block_keys):
+            buckets.setdefault(keys[block], []).append(index)
+        for a, keys in enumerate(block_keys):
+            for mask in masks:
+                for b in buckets.get(keys[block] ^ mask, ()):
+                    if a < b and (a, b) not in found and \
+                            (unique[a] ^ unique[b]).bit_count() <= max_distance:
+                        found.add((a, b))
+    return sorted(found)
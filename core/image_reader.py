@@ -41,14 +41,19 @@ class ImageInfoReader:
             print(f"文件格式: {file_ext}")
             
             if file_ext == 'png':
-                return self._extract_from_png(file_path)
+                info = self._extract_from_png(file_path)
             elif file_ext in ['jpg', 'jpeg']:
-                return self._extract_from_jpg(file_path)
+                info = self._extract_from_jpg(file_path)
             elif file_ext == 'webp':
-                return self._extract_from_webp(file_path)
+                info = self._extract_from_webp(file_path)
             else:
                 print(f"不支持的文件格式: {file_ext}")
                 return None
+            
+            # 补充图片尺寸（用于统计尺寸分布）
+            if info and 'width' not in info:
+                info.update(self.get_image_size(file_path))
+            return info
                 
         except Exception as e:
             print(f"提取图片信息时出错: {e}")
@@ -56,6 +61,21 @@ class ImageInfoReader:
             traceback.print_exc()
             return None
     
+    def get_image_size(self, file_path):
+        """
+        读取图片尺寸（只解析文件头，不解码像素）
+        
+        Returns:
+            dict: {'width': int, 'height': int}，读取失败时返回空字典
+        """
+        try:
+            with Image.open(file_path) as img:
+                width, height = img.size
+                return {'width': width, 'height': height}
+        except Exception as e:
+            print(f"读取图片尺寸失败: {e}")
+            return {}
+    
     def _extract_from_png(self, file_path):
         """从PNG文件中提取信息"""
         try:
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式导入流水线
+扫描 → 识别 → 提取 → 入库 四个阶段通过有界队列连接：
+扫描结果边产生边提取，队列满时上游自动等待（背压），
+提取结果按批写入数据库，提交后逐条返回给调用方，内存占用与文件总数无关
+"""
+
+import os
+import time
+import queue
+import threading
+from typing import Dict, List, Any, Optional, Callable, Iterable, Iterator
+
+
+# 队列结束标记
+_DONE = object()
+
+
+class SkipFile(Exception):
+    """提取函数抛出此异常表示按规则跳过该文件（如重复图片），不计为失败"""
+
+
+class IngestPipeline:
+    """流式导入流水线"""
+
+    def __init__(self,
+                 extract_func: Callable[[str], Optional[Dict[str, Any]]],
+                 data_manager=None,
+                 supported_formats: Iterable[str] = None,
+                 max_workers: int = 4,
+                 queue_size: int = 256,
+                 batch_size: int = 200,
+                 checkpoint_callback: Callable[[List[Dict[str, Any]]], None] = None,
+                 tuner=None):
+        """
+        Args:
+            extract_func: 提取单个文件信息的函数，失败时返回None或抛出异常，跳过时抛出 SkipFile
+            data_manager: 数据管理器，为None时不入库
+            supported_formats: 支持的扩展名（小写，含点），为None时不过滤
+            max_workers: 提取线程数
+            queue_size: 阶段之间队列的容量
+            batch_size: 每批写入数据库的记录数
+            checkpoint_callback: 每批写入数据库后调用，参数为该批次的全部结果（含失败的文件）
+            tuner: 并发调节器（ConcurrencyTuner），提供时由它决定提取线程数，忽略 max_workers
+        """
+        self.extract_func = extract_func
+        self.data_manager = data_manager
+        self.supported_formats = set(supported_formats) if supported_formats else None
+        self.tuner = tuner
+        self.max_workers = tuner.max_workers if tuner else max(1, max_workers)
+        self.active_workers = tuner.workers if tuner else self.max_workers
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.checkpoint_callback = checkpoint_callback
+
+        self.is_cancelled = False
+        self._resume_event = threading.Event()
+        self._resume_event.set()
+        self.scan_finished = False
+        self.scanned_count = 0
+        self.processed_count = 0
+        self.successful_count = 0
+        self.failed_count = 0
+        self.skipped_count = 0
+        self.saved_count = 0
+
+        # 各阶段累计耗时：阶段名 -> [秒, 次数]
+        # scan: 等待扫描结果；read: 提取时的 I/O 等待；parse: 提取时的CPU时间；db: 批量写入数据库
+        self._stage_timings = {stage: [0.0, 0] for stage in ('scan', 'read', 'parse', 'db')}
+        self._timing_lock = threading.Lock()
+
+    def cancel(self):
+        """取消导入（已提取的结果仍会写入数据库）"""
+        self.is_cancelled = True
+        self._resume_event.set()
+
+    def pause(self):
+        """暂停导入（正在处理的文件完成后暂停）"""
+        self._resume_event.clear()
+
+    def resume(self):
+        """继续导入"""
+        self._resume_event.set()
+
+    @property
+    def is_paused(self) -> bool:
+        return not self._resume_event.is_set()
+
+    def _wait_if_paused(self):
+        """暂停时等待，直到继续或取消"""
+        while not self._resume_event.wait(0.1):
+            pass
+
+    def _add_stage_time(self, stage: str, seconds: float, count: int = 1):
+        with self._timing_lock:
+            timing = self._stage_timings[stage]
+            timing[0] += seconds
+            timing[1] += count
+
+    def get_stage_timings(self) -> Dict[str, tuple]:
+        """获取各阶段累计耗时 {阶段: (秒, 次数)}"""
+        with self._timing_lock:
+            return {stage: tuple(timing) for stage, timing in self._stage_timings.items()}
+
+    def get_status(self) -> Dict[str, Any]:
+        """获取当前计数"""
+        return {
+            'scanned': self.scanned_count,
+            'scan_finished': self.scan_finished,
+            'processed': self.processed_count,
+            'successful': self.successful_count,
+            'failed': self.failed_count,
+            'skipped': self.skipped_count,
+            'saved': self.saved_count,
+            'paused': self.is_paused,
+            'workers': self.active_workers,
+        }
+
+    def run(self, paths: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        """
+        运行流水线
+
+        Args:
+            paths: 文件路径迭代器（可以是边扫描边产生的生成器）
+
+        Yields:
+            Dict: {'file_path', 'success', 'skipped', 'data', 'error', 'error_type'}
+        """
+        path_queue = queue.Queue(maxsize=self.queue_size)
+        result_queue = queue.Queue(maxsize=self.queue_size)
+
+        def put(target_queue, item):
+            """放入队列；取消后放弃等待，避免阻塞线程"""
+            while not self.is_cancelled:
+                try:
+                    target_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def scan_and_identify():
+            """扫描与识别阶段：过滤不支持的文件，放入提取队列"""
+            try:
+                paths_iter = iter(paths)
+                while True:
+                    start_time = time.perf_counter()
+                    file_path = next(paths_iter, _DONE)
+                    self._add_stage_time('scan', time.perf_counter() - start_time)
+                    if file_path is _DONE:
+                        break
+                    self._wait_if_paused()
+                    if self.is_cancelled:
+                        break
+                    if self.supported_formats is not None:
+                        if os.path.splitext(file_path)[1].lower() not in self.supported_formats:
+                            continue
+                    self.scanned_count += 1
+                    if not put(path_queue, file_path):
+                        break
+            except Exception as e:
+                print(f"扫描文件时出错: {e}")
+            finally:
+                self.scan_finished = True
+                put(path_queue, _DONE)
+
+        def extract(index):
+            """提取阶段：从队列取文件并提取信息"""
+            while True:
+                # 每个文件之间检查暂停和取消
+                self._wait_if_paused()
+                if self.is_cancelled:
+                    break
+                if index >= self.active_workers:
+                    # 超出当前线程数的线程暂时空闲；扫描结束后不再需要
+                    if self.scan_finished:
+                        break
+                    time.sleep(0.05)
+                    continue
+                try:
+                    file_path = path_queue.get(timeout=0.1)
+                except queue.Empty:
+                    if self.is_cancelled:
+                        break
+                    continue
+                if file_path is _DONE:
+                    # 放回结束标记，通知其他线程
+                    path_queue.put(_DONE)
+                    break
+                start_time = time.perf_counter()
+                start_cpu = time.thread_time()
+                try:
+                    data = self.extract_func(file_path)
+                    result = {'file_path': file_path, 'success': data is not None, 'skipped': False,
+                              'data': data, 'error': None, 'error_type': None}
+                except SkipFile as e:
+                    result = {'file_path': file_path, 'success': False, 'skipped': True,
+                              'data': None, 'error': str(e), 'error_type': None}
+                except Exception as e:
+                    result = {'file_path': file_path, 'success': False, 'skipped': False,
+                              'data': None, 'error': str(e), 'error_type': type(e).__name__}
+                wall_time = time.perf_counter() - start_time
+                cpu_time = min(time.thread_time() - start_cpu, wall_time)
+                self._add_stage_time('read', wall_time - cpu_time)
+                self._add_stage_time('parse', cpu_time)
+                if self.tuner:
+                    self.tuner.record(wall_time, cpu_time)
+                if not put(result_queue, result):
+                    break
+            put(result_queue, _DONE)
+
+        threads = [threading.Thread(target=scan_and_identify, daemon=True)]
+        threads += [threading.Thread(target=extract, args=(i,), daemon=True)
+                    for i in range(self.max_workers)]
+        for thread in threads:
+            thread.start()
+
+        # 入库阶段在调用方线程中执行：按批写入并逐条返回结果
+        pending = []
+        finished_workers = 0
+        try:
+            while finished_workers < self.max_workers:
+                try:
+                    result = result_queue.get(timeout=0.1)
+                except queue.Empty:
+                    if self.is_cancelled and not any(t.is_alive() for t in threads[1:]):
+                        break
+                    # 提取跟不上时先提交已有的结果，调用方不必等满一批
+                    yield from self._flush(pending)
+                    continue
+                if result is _DONE:
+                    finished_workers += 1
+                    continue
+                if self.tuner and self.tuner.update():
+                    self.active_workers = self.tuner.workers
+
+                self.processed_count += 1
+                pending.append(result)
+                if self.data_manager is None:
+                    # 不入库时结果在提取后即确定
+                    self._count(result)
+                    yield result
+                if len(pending) >= self.batch_size:
+                    yield from self._flush(pending)
+            yield from self._flush(pending)
+        finally:
+            # 调用方提前停止迭代时也要收尾
+            self.is_cancelled = self.is_cancelled or finished_workers < self.max_workers
+            self._flush(pending)
+            for thread in threads:
+                thread.join(timeout=1.0)
+
+    def _count(self, result: Dict[str, Any]):
+        if result['success']:
+            self.successful_count += 1
+        elif result['skipped']:
+            self.skipped_count += 1
+        else:
+            self.failed_count += 1
+
+    def _flush(self, pending: list) -> List[Dict[str, Any]]:
+        """
+        把待写入的结果批量写入数据库，并记录检查点
+
+        入库时结果在该批提交之后才计数和返回；写入失败时该批成功提取的结果改为失败
+
+        Returns:
+            List[Dict]: 需要返回给调用方的结果（不入库时已逐条返回，为空）
+        """
+        if not pending:
+            return []
+        batch = list(pending)
+        pending.clear()
+        if self.data_manager is not None:
+            records = [result['data'] for result in batch if result['success']]
+            if records:
+                start_time = time.perf_counter()
+                try:
+                    self.data_manager.save_records_bulk(records)
+                except Exception as e:
+                    print(f"批量保存记录失败: {e}")
+                    for result in batch:
+                        if result['success']:
+                            result.update(success=False, error=f"保存到数据库失败: {e}",
+                                          error_type=type(e).__name__)
+                else:
+                    self._add_stage_time('db', time.perf_counter() - start_time, len(records))
+                    self.saved_count += len(records)
+            for result in batch:
+                self._count(result)
+        if self.checkpoint_callback:
+            try:
+                self.checkpoint_callback(batch)
+            except Exception as e:
+                print(f"记录检查点失败: {e}")
+        return batch if self.data_manager is not None else []
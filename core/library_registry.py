@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图库注册表模块
+记录所有图库数据库的名称和路径，以及当前使用的图库
+"""
+
+import os
+import re
+import json
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+# 默认图库名称
+DEFAULT_LIBRARY = "默认图库"
+
+
+class LibraryRegistry:
+    """图库注册表（保存在数据目录下的 libraries.json）"""
+
+    def __init__(self, registry_path: str, default_db_path: str):
+        """
+        Args:
+            registry_path: 注册表文件路径
+            default_db_path: 默认图库的数据库路径
+        """
+        self.registry_path = registry_path
+        self.default_db_path = default_db_path
+        self.libraries_dir = os.path.join(os.path.dirname(default_db_path), "libraries")
+        self.data = self._load()
+
+    def _load(self) -> Dict:
+        """读取注册表，文件不存在或损坏时只包含默认图库"""
+        data = {'active': DEFAULT_LIBRARY, 'libraries': {}}
+        if os.path.exists(self.registry_path):
+            try:
+                with open(self.registry_path, 'r', encoding='utf-8') as f:
+                    data.update(json.load(f))
+            except Exception as e:
+                print(f"读取图库注册表失败: {e}")
+
+        # 默认图库始终指向当前的主数据库
+        data['libraries'][DEFAULT_LIBRARY] = {
+            'path': self.default_db_path,
+            'created_at': data['libraries'].get(DEFAULT_LIBRARY, {}).get('created_at', '')
+        }
+        if data['active'] not in data['libraries']:
+            data['active'] = DEFAULT_LIBRARY
+        return data
+
+    def _save(self):
+        """保存注册表"""
+        try:
+            os.makedirs(os.path.dirname(self.registry_path), exist_ok=True)
+            temp_path = self.registry_path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.registry_path)
+        except Exception as e:
+            print(f"保存图库注册表失败: {e}")
+
+    @property
+    def active(self) -> str:
+        """当前图库名称"""
+        return self.data['active']
+
+    def set_active(self, name: str, persist: bool = True):
+        """
+        设置当前图库
+
+        Args:
+            name: 图库名称
+            persist: 是否写入注册表文件（为False时只对当前进程生效，如命令行临时指定图库）
+        """
+        if name not in self.data['libraries']:
+            raise KeyError(f"图库不存在: {name}")
+        self.data['active'] = name
+        if persist:
+            self._save()
+
+    def names(self) -> List[str]:
+        """所有图库名称（默认图库在前）"""
+        others = sorted(name for name in self.data['libraries'] if name != DEFAULT_LIBRARY)
+        return [DEFAULT_LIBRARY] + others
+
+    def get_path(self, name: str) -> Optional[str]:
+        """获取图库的数据库路径"""
+        library = self.data['libraries'].get(name)
+        return library['path'] if library else None
+
+    def add(self, name: str, path: str = None) -> str:
+        """
+        注册新图库
+
+        Args:
+            name: 图库名称
+            path: 数据库路径，默认在 libraries 目录下按名称生成
+
+        Returns:
+            str: 数据库路径
+        """
+        name = name.strip()
+        if not name:
+            raise ValueError("图库名称不能为空")
+        if name in self.data['libraries']:
+            raise ValueError(f"图库已存在: {name}")
+
+        if path is None:
+            file_name = re.sub(r'[<>:"/\\|?*\s]+', '_', name).strip('._') or 'library'
+            path = os.path.join(self.libraries_dir, f"{file_name}.db")
+            index = 1
+            while os.path.exists(path) or path in (lib['path'] for lib in self.data['libraries'].values()):
+                path = os.path.join(self.libraries_dir, f"{file_name}_{index}.db")
+                index += 1
+
+        self.data['libraries'][name] = {'path': path, 'created_at': datetime.now().isoformat()}
+        self._save()
+        return path
+
+    def remove(self, name: str) -> Optional[str]:
+        """
+        注销图库（不删除数据库文件）
+
+        Returns:
+            str: 被注销图库的数据库路径
+        """
+        if name == DEFAULT_LIBRARY:
+            raise ValueError("不能删除默认图库")
+        if name == self.active:
+            raise ValueError("不能删除当前使用的图库")
+        library = self.data['libraries'].pop(name, None)
+        self._save()
+        return library['path'] if library else None
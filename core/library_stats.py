@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图库统计模块
+基于汇总表的增量统计：按模型、LoRA、采样器、来源、标签、日期计数，
+以及步数、CFG、尺寸的分布直方图
+"""
+
+import re
+import json
+import sqlite3
+from collections import Counter
+from typing import Dict, List, Any, Optional, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    print("警告: numpy 未安装，统计直方图将使用纯Python分箱")
+
+
+# 汇总表中保存记录总数的维度名
+TOTAL_DIMENSION = 'total'
+
+# 支持的计数维度
+COUNT_DIMENSIONS = ('model', 'lora', 'sampler', 'source', 'tag', 'day')
+
+# 支持的数值分布维度（size 以 "宽x高" 形式保存，直方图按百万像素分箱）
+HISTOGRAM_DIMENSIONS = ('steps', 'cfg', 'size')
+
+# 计算统计所需的记录字段
+STATS_COLUMNS = ('model', 'sampler', 'generation_source', 'lora_info', 'tags',
+                 'created_at', 'steps', 'cfg_scale', 'width', 'height')
+
+_TAG_SPLIT_PATTERN = re.compile(r'[,，;；\s]+')
+
+
+class LibraryStats:
+    """图库统计（汇总表随记录的增删改增量维护）"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            self.init_tables(cursor)
+            if self._needs_rebuild(cursor):
+                self._rebuild(cursor)
+            conn.commit()
+
+    # ===================== 汇总表维护 =====================
+
+    @staticmethod
+    def init_tables(cursor):
+        """创建汇总表"""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS library_stats (
+                dimension TEXT NOT NULL,
+                value TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (dimension, value)
+            ) WITHOUT ROWID
+        """)
+
+    @staticmethod
+    def fetch_stats_row(cursor, record_id: int) -> Optional[Dict[str, Any]]:
+        """读取计算统计所需的记录字段"""
+        cursor.execute(
+            f"SELECT {', '.join(STATS_COLUMNS)} FROM image_records WHERE id = ?",
+            (record_id,)
+        )
+        row = cursor.fetchone()
+        return dict(zip(STATS_COLUMNS, row)) if row else None
+
+    @staticmethod
+    def extract_facets(record: Optional[Dict[str, Any]]) -> List[Tuple[str, str]]:
+        """
+        提取单条记录对各统计维度的贡献
+
+        Args:
+            record: 记录字段字典（数据库中保存的形式）
+
+        Returns:
+            List[Tuple[str, str]]: (维度, 值) 列表
+        """
+        if not record:
+            return []
+
+        facets = [(TOTAL_DIMENSION, '')]
+
+        for dimension, key in (('model', 'model'), ('sampler', 'sampler'),
+                               ('source', 'generation_source')):
+            value = (record.get(key) or '').strip()
+            if value:
+                facets.append((dimension, value))
+
+        created_at = record.get('created_at') or ''
+        if len(created_at) >= 10:
+            facets.append(('day', created_at[:10]))
+
+        for lora_name in sorted(LibraryStats._lora_names(record.get('lora_info'))):
+            facets.append(('lora', lora_name))
+
+        tags = record.get('tags') or ''
+        for tag in sorted({t.strip() for t in _TAG_SPLIT_PATTERN.split(tags) if t.strip()}):
+            facets.append(('tag', tag))
+
+        steps = record.get('steps')
+        if steps is not None and steps != '':
+            facets.append(('steps', str(int(steps))))
+
+        cfg_scale = record.get('cfg_scale')
+        if cfg_scale is not None and cfg_scale != '':
+            facets.append(('cfg', f"{float(cfg_scale):g}"))
+
+        width, height = record.get('width'), record.get('height')
+        if width and height:
+            facets.append(('size', f"{int(width)}x{int(height)}"))
+
+        return facets
+
+    @staticmethod
+    def apply_change(cursor, old_record: Optional[Dict[str, Any]],
+                     new_record: Optional[Dict[str, Any]]):
+        """
+        按记录变更增量更新汇总表
+
+        Args:
+            cursor: 与记录写入处于同一事务的游标
+            old_record: 变更前的记录（插入时为None）
+            new_record: 变更后的记录（删除时为None）
+        """
+        delta = Counter(LibraryStats.extract_facets(new_record))
+        delta.subtract(Counter(LibraryStats.extract_facets(old_record)))
+        LibraryStats.apply_delta(cursor, delta)
+
+    @staticmethod
+    def apply_delta(cursor, delta: Counter, schema: str = 'main'):
+        """
+        将 (维度, 值) -> 增量 写入汇总表
+
+        Args:
+            cursor: 游标
+            delta: 增量
+            schema: 汇总表所在的数据库（附加的图库使用其schema名）
+        """
+        changes = [(dimension, value, count) for (dimension, value), count in delta.items() if count]
+        if not changes:
+            return
+
+        cursor.executemany(f"""
+            INSERT INTO {schema}.library_stats (dimension, value, count) VALUES (?, ?, ?)
+            ON CONFLICT(dimension, value) DO UPDATE SET count = count + excluded.count
+        """, changes)
+        cursor.executemany(
+            f"DELETE FROM {schema}.library_stats WHERE dimension = ? AND value = ? AND count <= 0",
+            [(dimension, value) for dimension, value, count in changes if count < 0]
+        )
+
+    @staticmethod
+    def clear(cursor):
+        """清空汇总表"""
+        cursor.execute("DELETE FROM library_stats")
+
+    def rebuild(self):
+        """根据全部记录重建汇总表"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            self._rebuild(cursor)
+            conn.commit()
+
+    def _needs_rebuild(self, cursor) -> bool:
+        """汇总表缺失总数记录而记录表非空时需要重建（首次升级）"""
+        cursor.execute("SELECT count FROM library_stats WHERE dimension = ? AND value = ''",
+                       (TOTAL_DIMENSION,))
+        row = cursor.fetchone()
+        cursor.execute("SELECT COUNT(*) FROM image_records")
+        record_count = cursor.fetchone()[0]
+        return (row[0] if row else 0) != record_count
+
+    def _rebuild(self, cursor):
+        """重建汇总表（分批读取，避免一次载入全部记录）"""
+        print("正在重建图库统计汇总表...")
+        self.clear(cursor)
+
+        read_cursor = cursor.connection.cursor()
+        read_cursor.execute(f"SELECT {', '.join(STATS_COLUMNS)} FROM image_records")
+        total = Counter()
+        while True:
+            rows = read_cursor.fetchmany(1000)
+            if not rows:
+                break
+            for row in rows:
+                total.update(self.extract_facets(dict(zip(STATS_COLUMNS, row))))
+        self.apply_delta(cursor, total)
+
+    @staticmethod
+    def _lora_names(lora_info) -> set:
+        """从lora_info中提取LoRA名称"""
+        if not lora_info:
+            return set()
+        if isinstance(lora_info, str):
+            try:
+                lora_info = json.loads(lora_info)
+            except (json.JSONDecodeError, TypeError):
+                return set()
+
+        items = lora_info.get('loras', []) if isinstance(lora_info, dict) else lora_info
+        names = set()
+        if isinstance(items, list):
+            for item in items:
+                if isinstance(item, dict) and item.get('name'):
+                    names.add(str(item['name']).strip())
+        elif isinstance(lora_info, dict) and 'raw_lora_text' not in lora_info:
+            names.update(str(key).strip() for key in lora_info.keys())
+        return {name for name in names if name}
+
+    # ===================== 查询接口 =====================
+
+    def get_total_records(self) -> int:
+        """获取记录总数"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT count FROM library_stats WHERE dimension = ? AND value = ''",
+                           (TOTAL_DIMENSION,))
+            row = cursor.fetchone()
+            return row[0] if row else 0
+
+    def get_counts(self, dimension: str, limit: int = None) -> List[Tuple[str, int]]:
+        """
+        获取某个维度的计数（按数量降序）
+
+        Args:
+            dimension: model / lora / sampler / source / tag / day / steps / cfg / size
+            limit: 最多返回的条数
+
+        Returns:
+            List[Tuple[str, int]]: (值, 数量) 列表
+        """
+        sql = "SELECT value, count FROM library_stats WHERE dimension = ? ORDER BY count DESC, value"
+        params = [dimension]
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def get_daily_counts(self, days: int = None) -> List[Tuple[str, int]]:
+        """获取每日新增图片数量（按日期升序）"""
+        sql = "SELECT value, count FROM library_stats WHERE dimension = 'day' ORDER BY value DESC"
+        params = []
+        if days:
+            sql += " LIMIT ?"
+            params.append(days)
+
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            return list(reversed(cursor.fetchall()))
+
+    def get_histogram(self, dimension: str, bins: int = 10) -> Dict[str, Any]:
+        """
+        计算数值分布直方图（基于汇总表的取值计数即时分箱）
+
+        Args:
+            dimension: steps / cfg / size（size按百万像素分箱）
+            bins: 分箱数量
+
+        Returns:
+            Dict: {'edges': [...], 'counts': [...], 'total': int}
+        """
+        if dimension not in HISTOGRAM_DIMENSIONS:
+            raise ValueError(f"不支持的直方图维度: {dimension}")
+
+        values, weights = [], []
+        for value, count in self.get_counts(dimension):
+            try:
+                if dimension == 'size':
+                    width, height = value.split('x')
+                    values.append(int(width) * int(height) / 1_000_000)
+                else:
+                    values.append(float(value))
+                weights.append(count)
+            except ValueError:
+                continue
+
+        if not values:
+            return {'edges': [], 'counts': [], 'total': 0}
+
+        if NUMPY_AVAILABLE:
+            counts, edges = np.histogram(np.asarray(values, dtype=np.float64), bins=bins,
+                                         weights=np.asarray(weights, dtype=np.int64))
+            return {
+                'edges': [float(edge) for edge in edges],
+                'counts': [int(count) for count in counts],
+                'total': int(sum(weights))
+            }
+
+        return self._histogram_fallback(values, weights, bins)
+
+    def _histogram_fallback(self, values: List[float], weights: List[int], bins: int) -> Dict[str, Any]:
+        """未安装numpy时的分箱实现（与numpy.histogram的区间规则一致）"""
+        low, high = min(values), max(values)
+        if low == high:
+            low, high = low - 0.5, high + 0.5
+        width = (high - low) / bins
+        edges = [low + i * width for i in range(bins)] + [high]
+        counts = [0] * bins
+        for value, weight in zip(values, weights):
+            index = min(int((value - low) / width), bins - 1)
+            counts[index] += weight
+        return {'edges': edges, 'counts': counts, 'total': sum(weights)}
+
+    def get_summary(self, top_n: int = 10, days: int = 30, bins: int = 10) -> Dict[str, Any]:
+        """
+        获取仪表盘所需的全部统计
+
+        Returns:
+            Dict: 包含总数、各维度Top N、每日数量和直方图
+        """
+        summary = {
+            'total_records': self.get_total_records(),
+            'daily': self.get_daily_counts(days),
+            'histograms': {dimension: self.get_histogram(dimension, bins)
+                           for dimension in HISTOGRAM_DIMENSIONS},
+            'top_sizes': self.get_counts('size', top_n)
+        }
+        for dimension in COUNT_DIMENSIONS:
+            if dimension != 'day':
+                summary[f'top_{dimension}s'] = self.get_counts(dimension, top_n)
+        return summary
@@ -0,0 +1,685 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图库增量同步模块
+数据库触发器把每条记录的字段修改写入变更日志（按字段记录版本号、修改时间和来源图库），
+删除记录时留下墓碑。导出时只写出某个版本之后的变更（变更集，通常只有几KB），
+另一台机器导入时按图片内容哈希（而不是文件路径）找到对应记录，逐字段以最后修改者为准合并，
+两边在上次同步之后都修改过的字段报告为冲突
+"""
+
+import os
+import json
+import gzip
+import time
+import uuid
+import heapq
+import sqlite3
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+
+from .library_stats import LibraryStats
+
+
+# 参与同步的字段（文件路径、大小等与所在机器有关的字段不同步）
+SYNC_FIELDS = ('custom_name', 'prompt', 'negative_prompt', 'model', 'sampler', 'steps', 'cfg_scale',
+               'seed', 'lora_info', 'notes', 'tags', 'generation_source', 'workflow_data', 'width', 'height')
+
+# 变更日志中表示"整条记录创建"的字段名
+RECORD_FIELD = '*'
+
+# 变更集文件格式
+CHANGESET_FORMAT = 'baize-changeset'
+CHANGESET_VERSION = 1
+
+# 启用同步前已有记录的修改时间：任何之后的修改都比它新
+BASELINE_TIME = '1970-01-01T00:00:00.000Z'
+
+# 每批处理的记录数
+CHUNK_SIZE = 500
+
+# 触发器中的当前UTC时间（毫秒精度，可直接按字符串比较）
+_NOW_SQL = "strftime('%Y-%m-%dT%H:%M:%fZ', 'now')"
+
+# 触发器中的新版本号与本图库ID
+_STAMP_SQL = "FROM sync_state v, sync_state o WHERE v.key = 'version' AND o.key = 'library_id'"
+
+
+def utc_now() -> str:
+    """与触发器格式一致的当前UTC时间"""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+def file_content_hash(file_path: str) -> Optional[str]:
+    """
+    计算文件内容哈希（BLAKE2b-128），用于在不同机器之间识别同一张图片
+
+    Returns:
+        32位十六进制字符串，文件不存在或无法读取时返回None
+    """
+    try:
+        digest = hashlib.blake2b(digest_size=16)
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    except OSError:
+        return None
+
+
+def _open_changeset(file_path: str, mode: str):
+    """按 gzip 魔数或 .gz 扩展名选择压缩方式"""
+    if 'w' in mode:
+        if file_path.endswith('.gz') or file_path.endswith('.gz.part'):
+            return gzip.open(file_path, 'wt', encoding='utf-8')
+        return open(file_path, 'w', encoding='utf-8')
+    with open(file_path, 'rb') as f:
+        compressed = f.read(2) == b'\x1f\x8b'
+    if compressed:
+        return gzip.open(file_path, 'rt', encoding='utf-8')
+    return open(file_path, 'r', encoding='utf-8')
+
+
+def _chunks(items: List, size: int = CHUNK_SIZE) -> Iterator[List]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class LibrarySync:
+    """图库变更日志、变更集导出与合并"""
+
+    def __init__(self, db_path: str, max_workers: int = 4):
+        """
+        Args:
+            db_path: 图库数据库路径（表和触发器由 init_tables 在初始化数据库时创建）
+            max_workers: 计算内容哈希的线程数
+        """
+        self.db_path = db_path
+        self.max_workers = max_workers
+
+    # ===================== 表结构 =====================
+
+    @staticmethod
+    def init_tables(cursor):
+        """
+        创建同步状态表、变更日志、墓碑表、对端表和触发器
+
+        Args:
+            cursor: 已创建 image_records（含 content_hash 列）的数据库游标
+        """
+        cursor.execute("CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value)")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS sync_journal (
+                record_id INTEGER NOT NULL,
+                field TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                modified_at TEXT NOT NULL,
+                origin TEXT NOT NULL,
+                PRIMARY KEY (record_id, field)
+            ) WITHOUT ROWID
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_sync_journal_version ON sync_journal(version)")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS sync_tombstones (
+                version INTEGER PRIMARY KEY,
+                content_hash TEXT,
+                file_path TEXT,
+                deleted_at TEXT NOT NULL,
+                origin TEXT NOT NULL
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS sync_peers (
+                peer_id TEXT PRIMARY KEY,
+                exported_version INTEGER NOT NULL DEFAULT 0,
+                imported_version INTEGER NOT NULL DEFAULT 0,
+                local_version INTEGER NOT NULL DEFAULT 0,
+                synced_at TEXT
+            )
+        """)
+
+        cursor.execute("SELECT value FROM sync_state WHERE key = 'library_id'")
+        if cursor.fetchone() is None:
+            library_id = uuid.uuid4().hex
+            # 启用同步前已有的记录作为版本1，修改时间为基准时间
+            cursor.execute("""
+                INSERT OR IGNORE INTO sync_journal (record_id, field, version, modified_at, origin)
+                SELECT id, ?, 1, ?, ? FROM image_records
+            """, (RECORD_FIELD, BASELINE_TIME, library_id))
+            cursor.executemany("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)",
+                               [('library_id', library_id), ('version', 1)])
+
+        # 插入：整条记录一行日志
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS sync_record_insert AFTER INSERT ON image_records
+            BEGIN
+                UPDATE sync_state SET value = value + 1 WHERE key = 'version';
+                INSERT OR REPLACE INTO sync_journal (record_id, field, version, modified_at, origin)
+                SELECT NEW.id, '{RECORD_FIELD}', v.value, {_NOW_SQL}, o.value {_STAMP_SQL};
+            END
+        """)
+
+        # 更新：只记录值确实变化的同步字段
+        changed = ' OR '.join(f"OLD.{field} IS NOT NEW.{field}" for field in SYNC_FIELDS)
+        field_statements = '\n'.join(f"""
+                INSERT OR REPLACE INTO sync_journal (record_id, field, version, modified_at, origin)
+                SELECT NEW.id, '{field}', v.value, {_NOW_SQL}, o.value {_STAMP_SQL}
+                    AND OLD.{field} IS NOT NEW.{field};""" for field in SYNC_FIELDS)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS sync_record_update AFTER UPDATE ON image_records
+            WHEN {changed}
+            BEGIN
+                UPDATE sync_state SET value = value + 1 WHERE key = 'version';{field_statements}
+            END
+        """)
+
+        # 删除：留下墓碑（内容哈希 + 路径），删除该记录的日志
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS sync_record_delete AFTER DELETE ON image_records
+            BEGIN
+                UPDATE sync_state SET value = value + 1 WHERE key = 'version';
+                INSERT INTO sync_tombstones (version, content_hash, file_path, deleted_at, origin)
+                SELECT v.value, OLD.content_hash, OLD.file_path, {_NOW_SQL}, o.value {_STAMP_SQL};
+                DELETE FROM sync_journal WHERE record_id = OLD.id;
+            END
+        """)
+
+        # 文件被修改后内容哈希失效，下次同步时重新计算
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS sync_content_changed AFTER UPDATE OF file_size, file_mtime
+            ON image_records
+            WHEN NEW.content_hash IS NOT NULL AND NEW.content_hash IS OLD.content_hash
+                AND (OLD.file_size IS NOT NEW.file_size OR OLD.file_mtime IS NOT NEW.file_mtime)
+            BEGIN
+                UPDATE image_records SET content_hash = NULL WHERE id = NEW.id;
+            END
+        """)
+
+    # ===================== 状态 =====================
+
+    @staticmethod
+    def _state(cursor) -> Tuple[str, int]:
+        """(本图库ID, 当前版本号)"""
+        cursor.execute("SELECT key, value FROM sync_state WHERE key IN ('library_id', 'version')")
+        state = dict(cursor.fetchall())
+        return state['library_id'], int(state['version'])
+
+    def get_status(self) -> Dict[str, Any]:
+        """
+        获取同步状态
+
+        Returns:
+            Dict: {'library_id', 'version', 'tombstones', 'peers': [{'peer_id', 'exported_version',
+                  'imported_version', 'local_version', 'synced_at'}]}
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            library_id, version = self._state(cursor)
+            tombstones = cursor.execute("SELECT COUNT(*) FROM sync_tombstones").fetchone()[0]
+            cursor.execute("""
+                SELECT peer_id, exported_version, imported_version, local_version, synced_at
+                FROM sync_peers ORDER BY peer_id
+            """)
+            peers = [dict(zip(('peer_id', 'exported_version', 'imported_version', 'local_version',
+                               'synced_at'), row)) for row in cursor.fetchall()]
+        return {'library_id': library_id, 'version': version, 'tombstones': tombstones, 'peers': peers}
+
+    def compact_tombstones(self, before_version: int) -> int:
+        """
+        删除指定版本之前的墓碑（所有对端都已导入这些版本之后调用）
+
+        Returns:
+            int: 删除的墓碑数量
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.execute("DELETE FROM sync_tombstones WHERE version < ?", (before_version,))
+            return cursor.rowcount
+
+    # ===================== 内容哈希 =====================
+
+    def _hash_records(self, cursor, rows: List[Tuple[int, str]]) -> Dict[int, str]:
+        """计算并保存记录文件的内容哈希（不修改同步字段，不产生变更日志）"""
+        rows = [(record_id, file_path) for record_id, file_path in rows if file_path]
+        if not rows:
+            return {}
+        if len(rows) == 1 or self.max_workers <= 1:
+            digests = [file_content_hash(file_path) for _, file_path in rows]
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                digests = list(executor.map(file_content_hash, [file_path for _, file_path in rows]))
+        hashes = {record_id: digest for (record_id, _), digest in zip(rows, digests) if digest}
+        cursor.executemany("UPDATE image_records SET content_hash = ? WHERE id = ?",
+                           [(digest, record_id) for record_id, digest in hashes.items()])
+        return hashes
+
+    def backfill_content_hashes(self, progress_callback=None) -> int:
+        """
+        为所有文件存在、还没有内容哈希的记录补算哈希
+
+        Args:
+            progress_callback: 进度回调 (已处理数, 总数)
+
+        Returns:
+            int: 补算的记录数
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT id, file_path FROM image_records
+                WHERE content_hash IS NULL AND missing_since IS NULL
+            """)
+            rows = cursor.fetchall()
+            hashed = 0
+            for done, chunk in enumerate(_chunks(rows), 1):
+                hashed += len(self._hash_records(cursor, chunk))
+                conn.commit()
+                if progress_callback:
+                    progress_callback(min(done * CHUNK_SIZE, len(rows)), len(rows))
+            return hashed
+
+    def hash_before_delete(self, cursor, record_ids: List[int] = None) -> int:
+        """
+        删除记录前为还没有内容哈希、文件仍然存在的记录补算哈希
+
+        墓碑在对端只按内容哈希匹配，没有哈希的墓碑不会导出。
+
+        Args:
+            cursor: 执行删除的同一连接上的游标
+            record_ids: 将要删除的记录ID，为None时表示全部记录
+
+        Returns:
+            int: 补算的记录数
+        """
+        if record_ids is None:
+            cursor.execute("SELECT id, file_path FROM image_records WHERE content_hash IS NULL")
+            rows = cursor.fetchall()
+        else:
+            rows = []
+            for chunk in _chunks(list(record_ids)):
+                placeholders = ','.join('?' * len(chunk))
+                cursor.execute(f"""
+                    SELECT id, file_path FROM image_records
+                    WHERE content_hash IS NULL AND id IN ({placeholders})
+                """, chunk)
+                rows.extend(cursor.fetchall())
+        return sum(len(self._hash_records(cursor, chunk)) for chunk in _chunks(rows))
+
+    # ===================== 导出 =====================
+
+    def export_changeset(self, output_path: str, since: int = None, peer: str = None) -> Dict[str, Any]:
+        """
+        导出某个版本之后的变更
+
+        Args:
+            output_path: 变更集文件（.gz 结尾时压缩）
+            since: 起始版本（不含），为None时使用上次导出给 peer 的版本，没有 peer 时导出全部
+            peer: 对端图库ID；不导出来自该图库的变更，并记录导出到的版本
+
+        Returns:
+            Dict: {'library_id', 'since', 'until', 'records', 'fields', 'tombstones',
+                  'skipped_tombstones', 'output_path', 'bytes', 'elapsed'}
+        """
+        start_time = time.time()
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            library_id, until = self._state(cursor)
+            if peer == library_id:
+                raise ValueError("对端图库不能是本图库")
+            if since is None:
+                since = 0
+                if peer:
+                    row = cursor.execute("SELECT exported_version FROM sync_peers WHERE peer_id = ?",
+                                         (peer,)).fetchone()
+                    since = row[0] if row else 0
+
+            # 按每条记录最新的变更版本排序，与墓碑合并后按版本顺序写出
+            cursor.execute("""
+                SELECT record_id, MAX(version) AS latest FROM sync_journal
+                WHERE version > ? AND origin IS NOT ?
+                GROUP BY record_id ORDER BY latest
+            """, (since, peer))
+            changed = cursor.fetchall()
+            cursor.execute("""
+                SELECT version, content_hash, file_path, deleted_at, origin FROM sync_tombstones
+                WHERE version > ? AND origin IS NOT ? AND content_hash IS NOT NULL ORDER BY version
+            """, (since, peer))
+            tombstones = cursor.fetchall()
+            # 删除时文件已不存在、没有内容哈希的记录无法在对端可靠识别，其墓碑不导出
+            skipped_tombstones = cursor.execute("""
+                SELECT COUNT(*) FROM sync_tombstones
+                WHERE version > ? AND origin IS NOT ? AND content_hash IS NULL
+            """, (since, peer)).fetchone()[0]
+
+            # 变更集需要内容哈希，先为涉及的记录补算
+            for chunk in _chunks([record_id for record_id, _ in changed]):
+                placeholders = ','.join('?' * len(chunk))
+                cursor.execute(f"""
+                    SELECT id, file_path FROM image_records
+                    WHERE content_hash IS NULL AND id IN ({placeholders})
+                """, chunk)
+                self._hash_records(cursor, cursor.fetchall())
+            conn.commit()
+
+            temp_path = output_path + '.part'
+            stats = {'records': 0, 'fields': 0, 'tombstones': 0, 'skipped_tombstones': skipped_tombstones}
+            try:
+                with _open_changeset(temp_path, 'w') as f:
+                    header = {'format': CHANGESET_FORMAT, 'version': CHANGESET_VERSION,
+                              'library_id': library_id, 'since': since, 'until': until,
+                              'created_at': utc_now()}
+                    f.write(json.dumps(header, ensure_ascii=False) + '\n')
+                    entries = heapq.merge(self._record_entries(cursor, changed, since, peer),
+                                          self._tombstone_entries(tombstones),
+                                          key=lambda entry: entry['v'])
+                    for entry in entries:
+                        if 'deleted' in entry:
+                            stats['tombstones'] += 1
+                        else:
+                            stats['records'] += 1
+                            stats['fields'] += len(entry['f'])
+                        f.write(json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n')
+                os.replace(temp_path, output_path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+
+            if peer:
+                cursor.execute("""
+                    INSERT INTO sync_peers (peer_id, exported_version) VALUES (?, ?)
+                    ON CONFLICT(peer_id) DO UPDATE SET exported_version = excluded.exported_version
+                """, (peer, until))
+            conn.commit()
+
+        stats.update({'library_id': library_id, 'since': since, 'until': until,
+                      'output_path': output_path, 'bytes': os.path.getsize(output_path),
+                      'elapsed': time.time() - start_time})
+        return stats
+
+    def _record_entries(self, cursor, changed: List[Tuple[int, int]], since: int,
+                        peer: Optional[str]) -> Iterator[Dict[str, Any]]:
+        """生成记录变更条目：新记录包含全部字段，已有记录只包含变化的字段"""
+        columns = ('id', 'file_path', 'content_hash', 'file_size', 'created_at') + SYNC_FIELDS
+        for chunk in _chunks(changed):
+            ids = [record_id for record_id, _ in chunk]
+            placeholders = ','.join('?' * len(ids))
+            cursor.execute(f"SELECT {', '.join(columns)} FROM image_records WHERE id IN ({placeholders})", ids)
+            records = {row[0]: dict(zip(columns, row)) for row in cursor.fetchall()}
+            cursor.execute(f"""
+                SELECT record_id, field, version, modified_at, origin FROM sync_journal
+                WHERE record_id IN ({placeholders})
+            """, ids)
+            journal = {}
+            for record_id, field, version, modified_at, origin in cursor.fetchall():
+                journal.setdefault(record_id, {})[field] = (version, modified_at, origin)
+
+            for record_id, latest in chunk:
+                record = records.get(record_id)
+                meta = journal.get(record_id, {})
+                if record is None or RECORD_FIELD not in meta:
+                    continue
+                created = meta[RECORD_FIELD]
+                is_new = created[0] > since and created[2] != peer
+                fields = {}
+                for field in SYNC_FIELDS:
+                    version, modified_at, origin = meta.get(field, created)
+                    if is_new or (field in meta and version > since and origin != peer):
+                        fields[field] = [record[field], modified_at, origin]
+                if not fields:
+                    continue
+                entry = {'v': latest, 'h': record['content_hash'], 'p': record['file_path'],
+                         's': record['file_size'], 'f': fields}
+                if is_new:
+                    entry['new'] = [record['created_at'], created[1], created[2]]
+                yield entry
+
+    @staticmethod
+    def _tombstone_entries(tombstones: List[Tuple]) -> Iterator[Dict[str, Any]]:
+        for version, content_hash, file_path, deleted_at, origin in tombstones:
+            yield {'v': version, 'h': content_hash, 'p': file_path, 'deleted': [deleted_at, origin]}
+
+    # ===================== 导入 =====================
+
+    def import_changeset(self, input_path: str) -> Dict[str, Any]:
+        """
+        合并另一台机器导出的变更集
+
+        每个字段以修改时间较新的一方为准（时间相同时比较图库ID）；
+        本机在上次从该图库导入之后也修改过、且值不同的字段记为冲突
+
+        Args:
+            input_path: 变更集文件
+
+        Returns:
+            Dict: {'library_id', 'since', 'until', 'gap', 'records', 'added', 'updated', 'fields',
+                  'deleted', 'unmatched', 'conflicts': [...], 'record_ids', 'elapsed'}
+        """
+        start_time = time.time()
+        with _open_changeset(input_path, 'r') as f:
+            header = json.loads(f.readline() or '{}')
+            if header.get('format') != CHANGESET_FORMAT:
+                raise ValueError(f"不是白泽变更集文件: {input_path}")
+            if header.get('version', 0) > CHANGESET_VERSION:
+                raise ValueError(f"不支持的变更集版本: {header.get('version')}")
+
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                library_id, _ = self._state(cursor)
+                source = header['library_id']
+                if source == library_id:
+                    raise ValueError("变更集来自本图库")
+                row = cursor.execute("""
+                    SELECT imported_version, local_version FROM sync_peers WHERE peer_id = ?
+                """, (source,)).fetchone()
+                imported_version, local_version = row if row else (0, 0)
+
+                result = {'library_id': source, 'since': header['since'], 'until': header['until'],
+                          # 中间有变更集没有导入
+                          'gap': header['since'] > imported_version,
+                          'records': 0, 'added': 0, 'updated': 0, 'fields': 0, 'deleted': 0,
+                          'unmatched': 0, 'conflicts': [], 'record_ids': []}
+                batch = []
+                for line in f:
+                    if line.strip():
+                        batch.append(json.loads(line))
+                    if len(batch) >= CHUNK_SIZE:
+                        self._merge_batch(cursor, batch, source, local_version, result)
+                        batch = []
+                if batch:
+                    self._merge_batch(cursor, batch, source, local_version, result)
+
+                _, version = self._state(cursor)
+                cursor.execute("""
+                    INSERT INTO sync_peers (peer_id, imported_version, local_version, synced_at)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(peer_id) DO UPDATE SET
+                        imported_version = MAX(imported_version, excluded.imported_version),
+                        local_version = excluded.local_version,
+                        synced_at = excluded.synced_at
+                """, (source, header['until'], version, utc_now()))
+                conn.commit()
+
+        result['elapsed'] = time.time() - start_time
+        return result
+
+    def _match_records(self, cursor, entries: List[Dict[str, Any]]) -> List[Optional[Tuple]]:
+        """
+        按内容哈希查找本机记录；本机没有哈希时先为大小相同的文件补算，
+        两边都无法计算哈希（文件不存在）时才按路径匹配。
+        墓碑只按内容哈希匹配：同一路径上可能是另一张图片（如 ComfyUI 默认文件名）
+
+        Returns:
+            与 entries 对应的 (记录ID, 文件路径, 内容哈希) 或 None
+        """
+        def by_hash(hashes):
+            if not hashes:
+                return {}
+            placeholders = ','.join('?' * len(hashes))
+            cursor.execute(f"""
+                SELECT content_hash, id, file_path FROM image_records
+                WHERE content_hash IN ({placeholders}) ORDER BY id DESC
+            """, list(hashes))
+            # 同一内容有多条记录时使用最早的记录
+            return {content_hash: (record_id, file_path, content_hash)
+                    for content_hash, record_id, file_path in cursor.fetchall()}
+
+        hashes = {entry['h'] for entry in entries if entry.get('h')}
+        matches = by_hash(hashes)
+
+        sizes = {entry['s'] for entry in entries
+                 if entry.get('h') and entry['h'] not in matches and entry.get('s') is not None}
+        if sizes:
+            placeholders = ','.join('?' * len(sizes))
+            cursor.execute(f"""
+                SELECT id, file_path FROM image_records
+                WHERE content_hash IS NULL AND file_size IN ({placeholders})
+            """, list(sizes))
+            if self._hash_records(cursor, cursor.fetchall()):
+                matches.update(by_hash(hashes - set(matches)))
+
+        results = []
+        for entry in entries:
+            match = matches.get(entry.get('h'))
+            if match is None and entry.get('p'):
+                cursor.execute("SELECT id, file_path, content_hash FROM image_records WHERE file_path = ?",
+                               (entry['p'],))
+                row = cursor.fetchone()
+                if row and 'deleted' in entry:
+                    if entry.get('h') and row[2] is None:
+                        content_hash = self._hash_records(cursor, [row[:2]]).get(row[0])
+                        if content_hash == entry['h']:
+                            match = (row[0], row[1], content_hash)
+                elif row and (row[2] is None or not entry.get('h')):
+                    match = row
+            results.append(match)
+        return results
+
+    def _merge_batch(self, cursor, entries: List[Dict[str, Any]], source: str, local_version: int,
+                     result: Dict[str, Any]):
+        """在当前事务中合并一批变更条目"""
+        matches = self._match_records(cursor, entries)
+        for entry, match in zip(entries, matches):
+            if 'deleted' in entry:
+                if match and entry.get('h'):
+                    self._apply_tombstone(cursor, entry, match, result)
+                continue
+            result['records'] += 1
+            if match:
+                self._apply_fields(cursor, entry, match, source, local_version, result)
+            elif 'new' in entry:
+                self._insert_record(cursor, entry, result)
+            else:
+                # 对端修改了本机没有的记录（创建记录的变更不在本变更集中）
+                result['unmatched'] += 1
+
+    @staticmethod
+    def _fix_journal(cursor, record_id: int, fields: Dict[str, Tuple[str, str]]):
+        """把触发器写入的本机修改时间和来源改为变更集中的原始值"""
+        cursor.executemany("""
+            UPDATE sync_journal SET modified_at = ?, origin = ? WHERE record_id = ? AND field = ?
+        """, [(modified_at, origin, record_id, field) for field, (modified_at, origin) in fields.items()])
+
+    def _apply_fields(self, cursor, entry: Dict[str, Any], match: Tuple, source: str,
+                      local_version: int, result: Dict[str, Any]):
+        record_id = match[0]
+        cursor.execute(f"SELECT {', '.join(SYNC_FIELDS)} FROM image_records WHERE id = ?", (record_id,))
+        local = dict(zip(SYNC_FIELDS, cursor.fetchone()))
+        cursor.execute("SELECT field, version, modified_at, origin FROM sync_journal WHERE record_id = ?",
+                       (record_id,))
+        journal = {field: (version, modified_at, origin) for field, version, modified_at, origin in cursor.fetchall()}
+        created = journal.get(RECORD_FIELD, (0, BASELINE_TIME, ''))
+
+        updates = {}
+        for field, (value, modified_at, origin) in entry['f'].items():
+            if field not in local or local[field] == value:
+                continue
+            local_meta = journal.get(field, created)
+            remote_wins = (modified_at, origin) > (local_meta[1], local_meta[2])
+            # 两边在上次同步之后都单独修改过该字段才算冲突（新记录中未修改的字段沿用创建时间）
+            remote_changed = 'new' not in entry or [modified_at, origin] != entry['new'][1:]
+            locally_changed = (field in journal and local_meta[0] > local_version
+                               and local_meta[2] != source)
+            if remote_changed and locally_changed:
+                result['conflicts'].append({
+                    'record_id': record_id, 'file_path': match[1], 'content_hash': entry.get('h'),
+                    'field': field, 'local': local[field], 'remote': value,
+                    'local_modified_at': local_meta[1], 'remote_modified_at': modified_at,
+                    'winner': 'remote' if remote_wins else 'local'
+                })
+            if remote_wins:
+                updates[field] = (value, modified_at, origin)
+        if not updates:
+            return
+
+        old_stats_row = LibraryStats.fetch_stats_row(cursor, record_id)
+        assignments = ', '.join(f"{field} = ?" for field in updates)
+        cursor.execute(f"UPDATE image_records SET {assignments}, updated_at = ? WHERE id = ?",
+                       [value for value, _, _ in updates.values()] + [datetime.now().isoformat(), record_id])
+        self._fix_journal(cursor, record_id, {field: (modified_at, origin)
+                                              for field, (_, modified_at, origin) in updates.items()})
+        LibraryStats.apply_change(cursor, old_stats_row, LibraryStats.fetch_stats_row(cursor, record_id))
+        result['updated'] += 1
+        result['fields'] += len(updates)
+        result['record_ids'].append(record_id)
+
+    def _insert_record(self, cursor, entry: Dict[str, Any], result: Dict[str, Any]):
+        file_path = entry.get('p') or ''
+        cursor.execute("SELECT id FROM image_records WHERE file_path = ?", (file_path,))
+        if cursor.fetchone():
+            # 本机同一路径是内容不同的另一张图片
+            result['conflicts'].append({'record_id': None, 'file_path': file_path,
+                                        'content_hash': entry.get('h'), 'field': 'file_path',
+                                        'local': None, 'remote': None, 'winner': 'local'})
+            return
+
+        created_at, modified_at, origin = entry['new']
+        current_time = datetime.now().isoformat()
+        fields = {field: value for field, (value, _, _) in entry['f'].items() if field in SYNC_FIELDS}
+        columns = ['file_path', 'file_name', 'content_hash', 'file_size', 'missing_since',
+                   'created_at', 'updated_at'] + list(fields)
+        values = [file_path, os.path.basename(file_path), entry.get('h'), entry.get('s'),
+                  # 图片还没有复制到本机时标记为缺失，可用 relink 重新关联
+                  None if os.path.exists(file_path) else current_time,
+                  created_at or current_time, current_time] + list(fields.values())
+        cursor.execute(f"INSERT INTO image_records ({', '.join(columns)}) VALUES ({','.join('?' * len(values))})",
+                       values)
+        record_id = cursor.lastrowid
+
+        # 新记录的日志保留原始创建时间，字段修改时间不同于创建时间的单独记录
+        cursor.execute("SELECT version FROM sync_journal WHERE record_id = ? AND field = ?",
+                       (record_id, RECORD_FIELD))
+        version = cursor.fetchone()[0]
+        self._fix_journal(cursor, record_id, {RECORD_FIELD: (modified_at, origin)})
+        cursor.executemany("""
+            INSERT OR REPLACE INTO sync_journal (record_id, field, version, modified_at, origin)
+            VALUES (?, ?, ?, ?, ?)
+        """, [(record_id, field, version, field_modified_at, field_origin)
+              for field, (_, field_modified_at, field_origin) in entry['f'].items()
+              if field in SYNC_FIELDS and (field_modified_at, field_origin) != (modified_at, origin)])
+        LibraryStats.apply_change(cursor, None, LibraryStats.fetch_stats_row(cursor, record_id))
+        result['added'] += 1
+        result['record_ids'].append(record_id)
+
+    def _apply_tombstone(self, cursor, entry: Dict[str, Any], match: Tuple, result: Dict[str, Any]):
+        record_id = match[0]
+        deleted_at, origin = entry['deleted']
+        cursor.execute("SELECT MAX(modified_at) FROM sync_journal WHERE record_id = ?", (record_id,))
+        last_modified = cursor.fetchone()[0] or BASELINE_TIME
+        if last_modified > deleted_at:
+            # 对端删除之后本机又修改过，保留记录
+            result['conflicts'].append({'record_id': record_id, 'file_path': match[1],
+                                        'content_hash': entry.get('h'), 'field': RECORD_FIELD,
+                                        'local': 'modified', 'remote': 'deleted',
+                                        'local_modified_at': last_modified,
+                                        'remote_modified_at': deleted_at, 'winner': 'local'})
+            return
+
+        old_stats_row = LibraryStats.fetch_stats_row(cursor, record_id)
+        cursor.execute("DELETE FROM image_records WHERE id = ?", (record_id,))
+        cursor.execute("""
+            UPDATE sync_tombstones SET deleted_at = ?, origin = ?
+            WHERE version = (SELECT value FROM sync_state WHERE key = 'version')
+        """, (deleted_at, origin))
+        LibraryStats.apply_change(cursor, old_stats_row, None)
+        result['deleted'] += 1
@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Parquet导入导出模块
+把 image_records 导出为带类型的列式文件，供 pandas / DuckDB 等分析工具直接读取：
+数值列保持整数/浮点类型，时间为时间戳，LoRA 和标签为嵌套列表，模型、采样器使用字典编码。
+从数据库游标逐块读取并按行组写入，不一次性载入整个图库；
+读取时按批转换回记录，通过批量写入接口恢复到数据库
+"""
+
+import os
+import re
+import time
+import json
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Callable, Iterable, Iterator
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+from .image_hash import to_signed64
+
+
+# 每个行组的记录数
+DEFAULT_ROW_GROUP_SIZE = 50000
+
+# 恢复时每批写入数据库的记录数
+DEFAULT_IMPORT_BATCH_SIZE = 1000
+
+# 标签分隔符（与图库标签统计一致，但不按空格拆分，标签本身可以包含空格）
+_TAG_SEPARATORS = re.compile(r'[,，;；]')
+
+
+def _record_schema():
+    """image_records 的 Arrow 表结构"""
+    category = pa.dictionary(pa.int32(), pa.string())
+    lora = pa.struct([
+        ('name', pa.string()),
+        ('weight', pa.float64()),
+        ('hash', pa.string()),
+    ])
+    return pa.schema([
+        ('id', pa.int64()),
+        ('file_path', pa.string()),
+        ('file_name', pa.string()),
+        ('custom_name', pa.string()),
+        ('prompt', pa.string()),
+        ('negative_prompt', pa.string()),
+        ('model', category),
+        ('sampler', category),
+        ('steps', pa.int32()),
+        ('cfg_scale', pa.float64()),
+        ('seed', pa.int64()),
+        ('loras', pa.list_(lora)),
+        # 无法解析为 LoRA 列表的原文（lora_info 中的 raw_lora_text）
+        ('raw_lora_text', pa.string()),
+        ('notes', pa.string()),
+        # 嵌套的字典类型跨行组时 pyarrow 无法整体读取，标签列表使用普通字符串（Parquet 写入时仍按字典页编码）
+        ('tags', pa.list_(pa.string())),
+        ('generation_source', category),
+        ('workflow_data', pa.string()),
+        ('width', pa.int32()),
+        ('height', pa.int32()),
+        ('file_size', pa.int64()),
+        ('file_mtime', pa.float64()),
+        ('missing_since', pa.timestamp('us')),
+        ('image_hash', pa.int64()),
+        ('duplicate_of', pa.int64()),
+        ('created_at', pa.timestamp('us')),
+        ('updated_at', pa.timestamp('us')),
+    ])
+
+
+def _to_int(value, bits: int = 64) -> Optional[int]:
+    if value is None or value == '':
+        return None
+    try:
+        value = int(value)
+    except (ValueError, TypeError):
+        return None
+    limit = 1 << (bits - 1)
+    return value if -limit <= value < limit else None
+
+
+def _to_float(value) -> Optional[float]:
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def _to_timestamp(value) -> Optional[datetime]:
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def _load_lora_info(lora_info) -> Any:
+    """lora_info 的JSON文本还原为对象；不是JSON的文本作为原文保留"""
+    if isinstance(lora_info, str):
+        if not lora_info.strip():
+            return None
+        try:
+            return json.loads(lora_info)
+        except (json.JSONDecodeError, TypeError):
+            return {'raw_lora_text': lora_info}
+    return lora_info
+
+
+def _parse_raw_lora_text(lora_info) -> Optional[str]:
+    """lora_info 中无法解析为列表的原文（raw_lora_text）"""
+    lora_info = _load_lora_info(lora_info)
+    if isinstance(lora_info, dict) and lora_info.get('raw_lora_text'):
+        return str(lora_info['raw_lora_text'])
+    return None
+
+
+def _parse_loras(lora_info) -> Optional[List[Dict[str, Any]]]:
+    """lora_info（JSON文本，{"loras": [...]} 或 {名称: 权重}）转换为嵌套列表；原文由 raw_lora_text 列保存"""
+    lora_info = _load_lora_info(lora_info)
+    if not lora_info:
+        return None
+
+    if isinstance(lora_info, dict) and 'loras' in lora_info:
+        items = lora_info['loras']
+    elif isinstance(lora_info, dict):
+        items = [{'name': name, 'weight': weight} for name, weight in lora_info.items()
+                 if name != 'raw_lora_text']
+    else:
+        items = lora_info
+    if not isinstance(items, list) or not items:
+        return None
+
+    loras = []
+    for item in items:
+        if isinstance(item, dict):
+            loras.append({
+                'name': str(item.get('name', '')),
+                'weight': _to_float(item.get('weight')),
+                'hash': str(item['hash']) if item.get('hash') else None,
+            })
+    return loras
+
+
+def split_tags(tags: str) -> List[str]:
+    """标签文本拆分为列表"""
+    if not tags:
+        return []
+    return [tag.strip() for tag in _TAG_SEPARATORS.split(tags) if tag.strip()]
+
+
+def record_to_row(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    数据库记录转换为 Parquet 行
+
+    Args:
+        record: image_records 中的一行（字典）
+
+    Returns:
+        Dict: 与表结构对应的带类型的值
+    """
+    image_hash = _to_int(record.get('image_hash'), 65)
+    return {
+        'id': _to_int(record.get('id')),
+        'file_path': record.get('file_path'),
+        'file_name': record.get('file_name'),
+        'custom_name': record.get('custom_name') or None,
+        'prompt': record.get('prompt') or None,
+        'negative_prompt': record.get('negative_prompt') or None,
+        'model': record.get('model') or None,
+        'sampler': record.get('sampler') or None,
+        'steps': _to_int(record.get('steps'), 32),
+        'cfg_scale': _to_float(record.get('cfg_scale')),
+        'seed': _to_int(record.get('seed')),
+        'loras': _parse_loras(record.get('lora_info')),
+        'raw_lora_text': _parse_raw_lora_text(record.get('lora_info')),
+        'notes': record.get('notes') or None,
+        'tags': split_tags(record.get('tags')),
+        'generation_source': record.get('generation_source') or None,
+        'workflow_data': record.get('workflow_data') or None,
+        'width': _to_int(record.get('width'), 32),
+        'height': _to_int(record.get('height'), 32),
+        'file_size': _to_int(record.get('file_size')),
+        'file_mtime': _to_float(record.get('file_mtime')),
+        'missing_since': _to_timestamp(record.get('missing_since')),
+        'image_hash': to_signed64(image_hash) if image_hash is not None else None,
+        'duplicate_of': _to_int(record.get('duplicate_of')),
+        'created_at': _to_timestamp(record.get('created_at')),
+        'updated_at': _to_timestamp(record.get('updated_at')),
+    }
+
+
+def row_to_record(row: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Parquet 行转换为可传给 DataManager.save_records_bulk 的记录数据
+
+    Args:
+        row: Parquet 中的一行
+
+    Returns:
+        Dict: 记录数据（lora_info、workflow_data 为对象，由数据管理器序列化）
+    """
+    workflow_data = row.get('workflow_data')
+    if workflow_data:
+        try:
+            workflow_data = json.loads(workflow_data)
+        except (json.JSONDecodeError, TypeError):
+            workflow_data = None
+
+    loras = row.get('loras')
+    lora_info = {}
+    if loras:
+        lora_info['loras'] = [{key: value for key, value in lora.items() if value is not None}
+                              for lora in loras]
+    if row.get('raw_lora_text'):
+        lora_info['raw_lora_text'] = row['raw_lora_text']
+
+    created_at = row.get('created_at')
+    return {
+        'file_path': row.get('file_path') or '',
+        'custom_name': row.get('custom_name') or '',
+        'prompt': row.get('prompt') or '',
+        'negative_prompt': row.get('negative_prompt') or '',
+        'model': row.get('model') or '',
+        'sampler': row.get('sampler') or '',
+        'steps': row.get('steps'),
+        'cfg_scale': row.get('cfg_scale'),
+        'seed': row.get('seed'),
+        'lora_info': lora_info or None,
+        'notes': row.get('notes') or '',
+        'tags': ', '.join(row.get('tags') or []),
+        'generation_source': row.get('generation_source') or '',
+        'workflow_data': workflow_data,
+        'width': row.get('width'),
+        'height': row.get('height'),
+        'file_size': row.get('file_size'),
+        'file_mtime': row.get('file_mtime'),
+        'image_hash': row.get('image_hash'),
+        'created_at': created_at.isoformat() if created_at else None,
+    }
+
+
+class ParquetExporter:
+    """Parquet流式导出器"""
+
+    def __init__(self, row_group_size: int = DEFAULT_ROW_GROUP_SIZE, compression: str = 'zstd'):
+        """
+        Args:
+            row_group_size: 每个行组的记录数（写入时内存中最多保留一个行组）
+            compression: 压缩算法 zstd / snappy / gzip / none
+        """
+        if not PYARROW_AVAILABLE:
+            raise ImportError("导出Parquet需要安装 pyarrow")
+        self.row_group_size = max(1, row_group_size)
+        self.compression = compression
+        self.schema = _record_schema()
+        self.is_cancelled = False
+
+    def cancel(self):
+        """取消导出（在下一个行组前生效）"""
+        self.is_cancelled = True
+
+    def export(self,
+               records: Iterable[Dict[str, Any]],
+               output_path: str,
+               total_rows: int = None,
+               progress_callback: Callable[[int, int, int], None] = None) -> Dict[str, Any]:
+        """
+        流式导出记录
+
+        Args:
+            records: 记录迭代器（如 DataManager.iter_records()）
+            output_path: 输出文件路径
+            total_rows: 总行数（仅用于进度显示）
+            progress_callback: 进度回调 (已写行数, 总行数, 已写行组数)
+
+        Returns:
+            Dict: {'rows', 'row_groups', 'bytes', 'cancelled', 'output_path', 'elapsed'}
+        """
+        self.is_cancelled = False
+        start_time = time.time()
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        # 先写入临时文件，完成后再替换，避免留下不完整的导出文件
+        temp_path = output_path + '.part'
+        rows = 0
+        row_groups = 0
+        completed = False
+        writer = pq.ParquetWriter(temp_path, self.schema, compression=self.compression)
+        try:
+            batch = []
+            for record in records:
+                batch.append(record_to_row(record))
+                if len(batch) >= self.row_group_size:
+                    if self.is_cancelled:
+                        break
+                    self._write_row_group(writer, batch)
+                    rows += len(batch)
+                    row_groups += 1
+                    batch = []
+                    if progress_callback:
+                        progress_callback(rows, total_rows, row_groups)
+
+            if batch and not self.is_cancelled:
+                self._write_row_group(writer, batch)
+                rows += len(batch)
+                row_groups += 1
+            completed = True
+        finally:
+            writer.close()
+            if not completed or self.is_cancelled:
+                os.remove(temp_path)
+
+        if self.is_cancelled:
+            print(f"导出已取消，已写入 {rows} 行")
+            bytes_written = 0
+        else:
+            os.replace(temp_path, output_path)
+            bytes_written = os.path.getsize(output_path)
+            if progress_callback:
+                progress_callback(rows, total_rows, row_groups)
+
+        return {
+            'rows': rows,
+            'row_groups': row_groups,
+            'bytes': bytes_written,
+            'cancelled': self.is_cancelled,
+            'output_path': None if self.is_cancelled else output_path,
+            'elapsed': time.time() - start_time,
+        }
+
+    def _write_row_group(self, writer, rows: List[Dict[str, Any]]):
+        table = pa.Table.from_pylist(rows, schema=self.schema)
+        writer.write_table(table, row_group_size=len(rows))
+
+
+def iter_parquet_records(input_path: str, batch_size: int = DEFAULT_IMPORT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """
+    按批读取 Parquet 文件中的记录
+
+    Args:
+        input_path: Parquet 文件路径
+        batch_size: 每批的记录数
+
+    Yields:
+        List[Dict]: 一批记录数据（已转换为 save_records_bulk 的格式）
+    """
+    if not PYARROW_AVAILABLE:
+        raise ImportError("读取Parquet需要安装 pyarrow")
+    parquet_file = pq.ParquetFile(input_path)
+    for batch in parquet_file.iter_batches(batch_size=batch_size):
+        yield batch.to_pylist()
+
+
+def import_parquet(data_manager, input_path: str,
+                   batch_size: int = DEFAULT_IMPORT_BATCH_SIZE,
+                   progress_callback: Callable[[int, int], None] = None) -> Dict[str, Any]:
+    """
+    从 Parquet 文件恢复记录（按文件路径更新或插入，保留创建时间、感知哈希和重复图片关联）
+
+    Args:
+        data_manager: 数据管理器
+        input_path: Parquet 文件路径
+        batch_size: 每批写入数据库的记录数
+        progress_callback: 进度回调 (已导入行数, 总行数)
+
+    Returns:
+        Dict: {'rows', 'imported', 'skipped', 'elapsed'}
+    """
+    start_time = time.time()
+    total_rows = pq.ParquetFile(input_path).metadata.num_rows if PYARROW_AVAILABLE else 0
+    # 导出文件中的记录ID -> 文件路径，重复图片按原图的路径重新关联
+    id_paths = {}
+    rows = imported = skipped = 0
+
+    for batch in iter_parquet_records(input_path, batch_size):
+        records = []
+        for row in batch:
+            rows += 1
+            if row.get('id') is not None:
+                id_paths[row['id']] = row.get('file_path')
+            if not row.get('file_path'):
+                skipped += 1
+                continue
+            record = row_to_record(row)
+            original = id_paths.get(row.get('duplicate_of'))
+            if original:
+                record['duplicate_of'] = original
+            records.append(record)
+
+        imported += len(data_manager.save_records_bulk(records))
+        if progress_callback:
+            progress_callback(rows, total_rows)
+
+    return {
+        'rows': rows,
+        'imported': imported,
+        'skipped': skipped,
+        'elapsed': time.time() - start_time,
+    }
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量处理进度汇总模块
+逐个文件累计计数，但只按固定的刷新频率回调界面（避免每个文件都发送Qt信号），
+提供处理速度（文件/秒、MB/秒）、剩余时间、按错误类型统计的失败数和各阶段耗时，
+任务结束时可写出 JSON 格式的任务报告
+"""
+
+import os
+import json
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Any, Optional, Callable
+
+
+# 提取函数返回空结果（没有异常）时的错误类型
+NO_RESULT_ERROR = 'NoResult'
+
+
+class ProgressReporter:
+    """批量处理进度汇总"""
+
+    def __init__(self,
+                 callback: Callable[[Dict[str, Any]], None] = None,
+                 refresh_interval: float = 0.25,
+                 rate_smoothing: float = 0.3,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            callback: 进度回调，参数为 snapshot() 的结果，最多每 refresh_interval 秒调用一次
+            refresh_interval: 界面刷新间隔（秒）
+            rate_smoothing: 速度的指数平滑系数（越大越灵敏）
+            clock: 时钟函数（测试时可替换）
+        """
+        self.callback = callback
+        self.refresh_interval = refresh_interval
+        self.rate_smoothing = rate_smoothing
+        self.clock = clock
+
+        self.pipeline = None
+        self.processed = 0
+        self.successful = 0
+        self.failed = 0
+        self.skipped = 0
+        self.bytes_processed = 0
+        self.errors = Counter()
+        self.current_file = ''
+        self.started_at = None
+        self.finished_at = None
+        self.status = 'running'
+
+        self._start_time = None
+        self._last_emit = None
+        self._last_processed = 0
+        self._last_bytes = 0
+        self._files_per_sec = 0.0
+        self._bytes_per_sec = 0.0
+
+    def start(self, pipeline=None):
+        """
+        开始计时
+
+        Args:
+            pipeline: 导入流水线（IngestPipeline），用于读取扫描总数和各阶段耗时
+        """
+        self.pipeline = pipeline
+        self.started_at = datetime.now().isoformat()
+        self._start_time = self._last_emit = self.clock()
+
+    def update(self, result: Dict[str, Any]):
+        """
+        记录一个文件的处理结果（开销很小，每个文件调用一次）
+
+        Args:
+            result: 流水线结果 {'file_path', 'success', 'data', 'error', 'error_type'}
+        """
+        if self._start_time is None:
+            self.start(self.pipeline)
+
+        self.processed += 1
+        self.current_file = result['file_path']
+        if result['success']:
+            self.successful += 1
+            self.bytes_processed += (result.get('data') or {}).get('file_size') or 0
+        elif result.get('skipped'):
+            self.skipped += 1
+        else:
+            self.failed += 1
+            self.errors[result.get('error_type') or NO_RESULT_ERROR] += 1
+
+        now = self.clock()
+        if now - self._last_emit >= self.refresh_interval:
+            self._emit(now)
+
+    def finish(self, status: str = 'completed') -> Dict[str, Any]:
+        """
+        结束任务并发送最后一次进度
+
+        Args:
+            status: 任务结果，如 completed / stopped / failed
+
+        Returns:
+            Dict: 任务报告（见 get_report()）
+        """
+        self.status = status
+        self.finished_at = datetime.now().isoformat()
+        self._emit(self.clock())
+        return self.get_report()
+
+    def _emit(self, now: float):
+        """更新速度并回调界面"""
+        elapsed = now - self._last_emit
+        if elapsed > 0:
+            files_rate = (self.processed - self._last_processed) / elapsed
+            bytes_rate = (self.bytes_processed - self._last_bytes) / elapsed
+            if self._last_processed == 0:
+                self._files_per_sec, self._bytes_per_sec = files_rate, bytes_rate
+            else:
+                alpha = self.rate_smoothing
+                self._files_per_sec = alpha * files_rate + (1 - alpha) * self._files_per_sec
+                self._bytes_per_sec = alpha * bytes_rate + (1 - alpha) * self._bytes_per_sec
+        self._last_emit = now
+        self._last_processed = self.processed
+        self._last_bytes = self.bytes_processed
+
+        if self.callback:
+            try:
+                self.callback(self.snapshot(now))
+            except Exception as e:
+                print(f"进度回调失败: {e}")
+
+    @property
+    def total(self) -> int:
+        """目前已知的文件总数（扫描未结束时会继续增长）"""
+        return self.pipeline.scanned_count if self.pipeline else self.processed
+
+    @property
+    def scan_finished(self) -> bool:
+        return self.pipeline.scan_finished if self.pipeline else True
+
+    def snapshot(self, now: float = None) -> Dict[str, Any]:
+        """
+        当前进度
+
+        Returns:
+            Dict: 计数、速度、剩余时间（扫描未结束时为按目前已知总数的估计）、错误类型和阶段耗时
+        """
+        now = self.clock() if now is None else now
+        total = max(self.total, self.processed)
+        remaining = total - self.processed
+        eta = remaining / self._files_per_sec if self._files_per_sec > 0 else None
+        return {
+            'processed': self.processed,
+            'total': total,
+            'successful': self.successful,
+            'failed': self.failed,
+            'skipped': self.skipped,
+            'percent': self.processed * 100 // total if total else 0,
+            'scan_finished': self.scan_finished,
+            'current_file': self.current_file,
+            'elapsed': now - self._start_time if self._start_time is not None else 0.0,
+            'files_per_sec': self._files_per_sec,
+            'mb_per_sec': self._bytes_per_sec / (1024 * 1024),
+            'eta_seconds': eta,
+            'errors': dict(self.errors),
+            'stages': self.get_stage_timings(),
+        }
+
+    def get_stage_timings(self) -> Dict[str, Dict[str, float]]:
+        """各阶段累计耗时（秒）和平均耗时（毫秒），来自流水线"""
+        if not self.pipeline:
+            return {}
+        timings = {}
+        for stage, (seconds, count) in self.pipeline.get_stage_timings().items():
+            timings[stage] = {
+                'seconds': round(seconds, 4),
+                'count': count,
+                'avg_ms': round(seconds * 1000 / count, 3) if count else 0.0,
+            }
+        return timings
+
+    def get_report(self) -> Dict[str, Any]:
+        """任务报告（可序列化为JSON）"""
+        snapshot = self.snapshot()
+        elapsed = snapshot['elapsed']
+        return {
+            'status': self.status,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'elapsed_seconds': round(elapsed, 3),
+            'scanned': snapshot['total'],
+            'processed': self.processed,
+            'successful': self.successful,
+            'failed': self.failed,
+            'skipped': self.skipped,
+            'bytes_processed': self.bytes_processed,
+            'files_per_sec': round(self.processed / elapsed, 3) if elapsed > 0 else None,
+            'mb_per_sec': round(self.bytes_processed / (1024 * 1024) / elapsed, 3) if elapsed > 0 else None,
+            'errors': snapshot['errors'],
+            'stages': snapshot['stages'],
+        }
+
+    def write_report(self, report_path: str, extra: Dict[str, Any] = None) -> Optional[str]:
+        """
+        写出 JSON 任务报告
+
+        Args:
+            report_path: 报告文件路径
+            extra: 附加到报告中的字段（如任务ID、文件夹、并发调整记录）
+
+        Returns:
+            str: 报告文件路径，失败时返回None
+        """
+        report = self.get_report()
+        if extra:
+            report.update(extra)
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(report_path)), exist_ok=True)
+            with open(report_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            return report_path
+        except Exception as e:
+            print(f"写入任务报告失败: {e}")
+            return None
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    """把秒数格式化为 “1小时2分” / “3分5秒” / “8秒”"""
+    if seconds is None:
+        return "--"
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}小时{seconds % 3600 // 60}分"
+    if seconds >= 60:
+        return f"{seconds // 60}分{seconds % 60}秒"
+    return f"{seconds}秒"
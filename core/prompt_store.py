@@ -0,0 +1,544 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+提示词历史存储模块
+使用SQLite按场景、按提示词增量保存提示词编辑器数据，
+版本历史为只追加的变更日志，支持压缩和按时间点恢复
+"""
+
+import os
+import json
+import sqlite3
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+
+# 场景中单独建表保存的字段，其余字段作为附加信息整体保存
+_SCENE_CORE_KEYS = ('title', 'english_prompts', 'translation_map')
+
+
+class PromptStore:
+    """提示词历史存储"""
+
+    def __init__(self, db_path: str, legacy_json_path: str = None):
+        """
+        初始化存储
+
+        Args:
+            db_path: 数据库文件路径
+            legacy_json_path: 旧版 prompt_history.json 路径，存储为空时自动迁移
+        """
+        self.db_path = db_path
+        self._state = None      # scene_id -> 场景状态，首次读写时加载
+        self._last_seq = None   # 缓存对应的变更日志序号，用于发现其他实例的写入
+
+        with sqlite3.connect(self.db_path) as conn:
+            self._init_tables(conn.cursor())
+            conn.commit()
+
+        if legacy_json_path:
+            self._migrate_legacy_json(legacy_json_path)
+
+    def _init_tables(self, cursor):
+        """创建数据表"""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS prompt_scenes (
+                scene_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                position INTEGER NOT NULL,
+                title TEXT NOT NULL,
+                extra TEXT,
+                updated_at TEXT NOT NULL
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS prompt_items (
+                scene_id INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                PRIMARY KEY (scene_id, position)
+            ) WITHOUT ROWID
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS prompt_translations (
+                scene_id INTEGER NOT NULL,
+                source TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                PRIMARY KEY (scene_id, source)
+            ) WITHOUT ROWID
+        """)
+        # 变更日志：op 为 snapshot / scene_put / scene_delete / item_put /
+        # items_truncate / translation_put / translation_delete / checkpoint
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS prompt_changelog (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                changed_at TEXT NOT NULL,
+                op TEXT NOT NULL,
+                scene_id INTEGER,
+                key TEXT,
+                value TEXT
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_prompt_changelog_time ON prompt_changelog(changed_at)")
+
+    def _migrate_legacy_json(self, legacy_json_path: str):
+        """从旧版JSON文件迁移（仅在存储为空时执行一次）"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM prompt_changelog")
+            if cursor.fetchone()[0] > 0:
+                return
+
+        if not os.path.exists(legacy_json_path):
+            return
+
+        try:
+            with open(legacy_json_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data.get('scenes'), list):
+                self.replace_all(data)
+                print(f"已将提示词历史从 {legacy_json_path} 迁移到数据库")
+        except Exception as e:
+            print(f"迁移提示词历史失败: {e}")
+
+    # ===================== 读取 =====================
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """
+        加载全部场景
+
+        Returns:
+            与旧版JSON格式一致的数据字典，存储为空时返回None
+        """
+        self._ensure_state()
+        if not self._state:
+            return None
+
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT MAX(changed_at) FROM prompt_changelog")
+            last_updated = cursor.fetchone()[0]
+
+        return {
+            'scenes': self._state_to_scenes(self._state),
+            'last_updated': self._format_time(last_updated)
+        }
+
+    def _ensure_state(self):
+        """确保内存中的场景状态与数据库一致"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM prompt_changelog")
+            last_seq = cursor.fetchone()[0]
+            if self._state is not None and last_seq == self._last_seq:
+                return
+
+            state = {}
+            cursor.execute("SELECT scene_id, position, title, extra FROM prompt_scenes")
+            for scene_id, position, title, extra in cursor.fetchall():
+                state[scene_id] = {
+                    'position': position,
+                    'title': title,
+                    'extra': json.loads(extra) if extra else {},
+                    'prompts': [],
+                    'translations': {}
+                }
+            cursor.execute("SELECT scene_id, text FROM prompt_items ORDER BY scene_id, position")
+            for scene_id, text in cursor.fetchall():
+                if scene_id in state:
+                    state[scene_id]['prompts'].append(text)
+            cursor.execute("SELECT scene_id, source, translation FROM prompt_translations")
+            for scene_id, source, translation in cursor.fetchall():
+                if scene_id in state:
+                    state[scene_id]['translations'][source] = translation
+
+            self._state = state
+            self._last_seq = last_seq
+
+    # ===================== 增量保存 =====================
+
+    def save(self, prompt_data: Dict[str, Any]) -> int:
+        """
+        保存提示词数据，只写入发生变化的场景和提示词
+
+        Args:
+            prompt_data: 与旧版JSON格式一致的数据字典
+
+        Returns:
+            int: 写入的变更条数
+        """
+        self._ensure_state()
+        operations = self._diff(self._state, prompt_data.get('scenes', []))
+        if not operations:
+            return 0
+
+        changed_at = datetime.now().isoformat()
+        new_scene_ids = {}
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                for op, scene_id, key, value in operations:
+                    scene_id = self._write_operation(cursor, op, scene_id, key, value, changed_at, new_scene_ids)
+                    cursor.execute(
+                        "INSERT INTO prompt_changelog (changed_at, op, scene_id, key, value) VALUES (?, ?, ?, ?, ?)",
+                        (changed_at, op, scene_id, key, value)
+                    )
+                    self._apply_operation(self._state, op, scene_id, key, value)
+                conn.commit()
+                self._last_seq = cursor.lastrowid
+        except Exception:
+            # 事务已回滚，丢弃部分更新的内存状态
+            self._state = None
+            raise
+
+        return len(operations)
+
+    def _diff(self, state: Dict[int, Dict[str, Any]], scenes: List[Dict[str, Any]]) -> List[Tuple]:
+        """
+        计算新数据相对当前状态的变更
+
+        场景按标题匹配（同名优先匹配相同位置），未匹配的再按位置匹配，
+        其余视为新增或删除。新增场景的scene_id在写入时分配，这里用负数占位。
+        """
+        existing_by_position = {scene['position']: scene_id for scene_id, scene in state.items()}
+        matched = {}
+        used = set()
+
+        # 第一轮：按标题匹配
+        for position, scene in enumerate(scenes):
+            title = scene.get('title', '')
+            candidates = [scene_id for scene_id, current in state.items()
+                          if current['title'] == title and scene_id not in used]
+            if candidates:
+                candidates.sort(key=lambda scene_id: abs(state[scene_id]['position'] - position))
+                matched[position] = candidates[0]
+                used.add(candidates[0])
+
+        # 第二轮：按位置匹配（如场景被重命名）
+        for position in range(len(scenes)):
+            if position not in matched:
+                scene_id = existing_by_position.get(position)
+                if scene_id is not None and scene_id not in used:
+                    matched[position] = scene_id
+                    used.add(scene_id)
+
+        operations = []
+        for scene_id in state:
+            if scene_id not in used:
+                operations.append(('scene_delete', scene_id, None, None))
+
+        new_scene_count = 0
+        for position, scene in enumerate(scenes):
+            scene_id = matched.get(position)
+            if scene_id is None:
+                new_scene_count += 1
+                scene_id = -new_scene_count
+                current = {'position': None, 'title': None, 'extra': {}, 'prompts': [], 'translations': {}}
+            else:
+                current = state[scene_id]
+
+            title = scene.get('title', '')
+            extra = {key: value for key, value in scene.items() if key not in _SCENE_CORE_KEYS}
+            if current['position'] != position or current['title'] != title or current['extra'] != extra:
+                operations.append(('scene_put', scene_id, None, json.dumps(
+                    {'position': position, 'title': title, 'extra': extra}, ensure_ascii=False)))
+
+            prompts = list(scene.get('english_prompts', []))
+            old_prompts = current['prompts']
+            for index, text in enumerate(prompts):
+                if index >= len(old_prompts) or old_prompts[index] != text:
+                    operations.append(('item_put', scene_id, str(index), text))
+            if len(prompts) < len(old_prompts):
+                operations.append(('items_truncate', scene_id, str(len(prompts)), None))
+
+            translations = scene.get('translation_map', {}) or {}
+            old_translations = current['translations']
+            for source, translation in translations.items():
+                if old_translations.get(source) != translation:
+                    operations.append(('translation_put', scene_id, source, translation))
+            for source in old_translations:
+                if source not in translations:
+                    operations.append(('translation_delete', scene_id, source, None))
+
+        return operations
+
+    def _write_operation(self, cursor, op: str, scene_id: int, key: Optional[str],
+                         value: Optional[str], changed_at: str, new_scene_ids: Dict[int, int]) -> int:
+        """
+        将单条变更写入数据表
+
+        Args:
+            new_scene_ids: 新增场景的占位ID -> 数据库分配的ID
+
+        Returns:
+            int: 实际的scene_id（新增场景时为新分配的ID）
+        """
+        if scene_id is not None and scene_id < 0:
+            if op == 'scene_put' and scene_id not in new_scene_ids:
+                scene = json.loads(value)
+                cursor.execute(
+                    "INSERT INTO prompt_scenes (position, title, extra, updated_at) VALUES (?, ?, ?, ?)",
+                    (scene['position'], scene['title'],
+                     json.dumps(scene['extra'], ensure_ascii=False), changed_at)
+                )
+                new_scene_ids[scene_id] = cursor.lastrowid
+                return cursor.lastrowid
+            scene_id = new_scene_ids[scene_id]
+
+        if op == 'scene_put':
+            scene = json.loads(value)
+            cursor.execute(
+                "UPDATE prompt_scenes SET position = ?, title = ?, extra = ?, updated_at = ? WHERE scene_id = ?",
+                (scene['position'], scene['title'],
+                 json.dumps(scene['extra'], ensure_ascii=False), changed_at, scene_id)
+            )
+        elif op == 'scene_delete':
+            cursor.execute("DELETE FROM prompt_scenes WHERE scene_id = ?", (scene_id,))
+            cursor.execute("DELETE FROM prompt_items WHERE scene_id = ?", (scene_id,))
+            cursor.execute("DELETE FROM prompt_translations WHERE scene_id = ?", (scene_id,))
+        elif op == 'item_put':
+            cursor.execute(
+                "INSERT OR REPLACE INTO prompt_items (scene_id, position, text) VALUES (?, ?, ?)",
+                (scene_id, int(key), value)
+            )
+        elif op == 'items_truncate':
+            cursor.execute("DELETE FROM prompt_items WHERE scene_id = ? AND position >= ?",
+                           (scene_id, int(key)))
+        elif op == 'translation_put':
+            cursor.execute(
+                "INSERT OR REPLACE INTO prompt_translations (scene_id, source, translation) VALUES (?, ?, ?)",
+                (scene_id, key, value)
+            )
+        elif op == 'translation_delete':
+            cursor.execute("DELETE FROM prompt_translations WHERE scene_id = ? AND source = ?",
+                           (scene_id, key))
+        return scene_id
+
+    @staticmethod
+    def _apply_operation(state: Dict[int, Dict[str, Any]], op: str, scene_id: Optional[int],
+                         key: Optional[str], value: Optional[str]):
+        """将单条变更应用到内存状态（保存、恢复和压缩共用）"""
+        if op == 'snapshot':
+            state.clear()
+            for scene in json.loads(value):
+                state[scene['scene_id']] = {
+                    'position': scene['position'],
+                    'title': scene['title'],
+                    'extra': scene.get('extra', {}),
+                    'prompts': list(scene.get('prompts', [])),
+                    'translations': dict(scene.get('translations', {}))
+                }
+        elif op == 'scene_put':
+            scene = json.loads(value)
+            current = state.setdefault(scene_id, {'prompts': [], 'translations': {}})
+            current.update(position=scene['position'], title=scene['title'], extra=scene['extra'])
+        elif op == 'scene_delete':
+            state.pop(scene_id, None)
+        elif op == 'item_put' and scene_id in state:
+            prompts = state[scene_id]['prompts']
+            index = int(key)
+            if index < len(prompts):
+                prompts[index] = value
+            else:
+                prompts.extend([''] * (index - len(prompts)))
+                prompts.append(value)
+        elif op == 'items_truncate' and scene_id in state:
+            del state[scene_id]['prompts'][int(key):]
+        elif op == 'translation_put' and scene_id in state:
+            state[scene_id]['translations'][key] = value
+        elif op == 'translation_delete' and scene_id in state:
+            state[scene_id]['translations'].pop(key, None)
+
+    # ===================== 整体替换、恢复与压缩 =====================
+
+    def replace_all(self, prompt_data: Dict[str, Any], changed_at: str = None):
+        """整体替换全部场景并记录快照（用于迁移和恢复）"""
+        state = {}
+        for position, scene in enumerate(prompt_data.get('scenes', [])):
+            state[position + 1] = {
+                'position': position,
+                'title': scene.get('title', ''),
+                'extra': {key: value for key, value in scene.items() if key not in _SCENE_CORE_KEYS},
+                'prompts': list(scene.get('english_prompts', [])),
+                'translations': dict(scene.get('translation_map', {}) or {})
+            }
+        self._write_state(state, changed_at or datetime.now().isoformat())
+
+    def _write_state(self, state: Dict[int, Dict[str, Any]], changed_at: str):
+        """将完整状态写入数据表，并追加一条快照日志"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM prompt_scenes")
+            cursor.execute("DELETE FROM prompt_items")
+            cursor.execute("DELETE FROM prompt_translations")
+
+            for scene_id, scene in state.items():
+                cursor.execute(
+                    "INSERT INTO prompt_scenes (scene_id, position, title, extra, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    (scene_id, scene['position'], scene['title'],
+                     json.dumps(scene['extra'], ensure_ascii=False), changed_at)
+                )
+                cursor.executemany(
+                    "INSERT INTO prompt_items (scene_id, position, text) VALUES (?, ?, ?)",
+                    [(scene_id, index, text) for index, text in enumerate(scene['prompts'])]
+                )
+                cursor.executemany(
+                    "INSERT INTO prompt_translations (scene_id, source, translation) VALUES (?, ?, ?)",
+                    [(scene_id, source, translation) for source, translation in scene['translations'].items()]
+                )
+
+            cursor.execute(
+                "INSERT INTO prompt_changelog (changed_at, op, value) VALUES (?, 'snapshot', ?)",
+                (changed_at, self._serialize_state(state))
+            )
+            conn.commit()
+
+        self._state = None  # 下次访问时重新加载
+
+    def state_at(self, point_in_time: str) -> Optional[Dict[int, Dict[str, Any]]]:
+        """
+        通过回放变更日志计算某个时间点的状态
+
+        Args:
+            point_in_time: ISO格式时间
+
+        Returns:
+            场景状态，日志已被压缩到该时间点之后时返回None
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT MIN(changed_at) FROM prompt_changelog")
+            earliest = cursor.fetchone()[0]
+            if earliest is None or earliest > point_in_time:
+                return None
+
+            cursor.execute("""
+                SELECT COALESCE(MAX(seq), 0) FROM prompt_changelog
+                WHERE op = 'snapshot' AND changed_at <= ?
+            """, (point_in_time,))
+            start_seq = cursor.fetchone()[0]
+
+            state = {}
+            cursor.execute("""
+                SELECT op, scene_id, key, value FROM prompt_changelog
+                WHERE seq >= ? AND changed_at <= ? ORDER BY seq
+            """, (start_seq, point_in_time))
+            for op, scene_id, key, value in cursor:
+                self._apply_operation(state, op, scene_id, key, value)
+            return state
+
+    def restore(self, point_in_time: str) -> Optional[Dict[str, Any]]:
+        """
+        恢复到某个时间点的状态（恢复本身也作为快照记入日志，可再次撤销）
+
+        Returns:
+            恢复后的数据字典，无法恢复时返回None
+        """
+        state = self.state_at(point_in_time)
+        if state is None:
+            print(f"无法恢复到 {point_in_time}：该时间点早于最早的历史记录")
+            return None
+
+        self._write_state(state, datetime.now().isoformat())
+        print(f"提示词数据已恢复到 {point_in_time}")
+        return self.load()
+
+    def compact(self, before: str) -> int:
+        """
+        压缩变更日志：把某个时间点之前的日志合并为一条快照
+
+        Args:
+            before: ISO格式时间，此前的日志被合并
+
+        Returns:
+            int: 删除的日志条数
+        """
+        before = min(before, datetime.now().isoformat())
+        state = self.state_at(before)
+        if state is None:
+            return 0
+
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT MAX(seq), COUNT(*) FROM prompt_changelog WHERE changed_at <= ?", (before,))
+            last_seq, count = cursor.fetchone()
+            if count <= 1:
+                return 0
+
+            cursor.execute("DELETE FROM prompt_changelog WHERE seq <= ?", (last_seq,))
+            # 复用被合并的最后一个序号，保证快照排在后续变更之前
+            cursor.execute(
+                "INSERT INTO prompt_changelog (seq, changed_at, op, value) VALUES (?, ?, 'snapshot', ?)",
+                (last_seq, before, self._serialize_state(state))
+            )
+            conn.commit()
+
+        print(f"已压缩提示词历史：合并 {count} 条变更记录")
+        return count - 1
+
+    def mark_checkpoint(self, label: str = '') -> str:
+        """
+        记录一个检查点（代替整文件复制的备份）
+
+        Returns:
+            str: 检查点时间，可传给 restore()
+        """
+        changed_at = datetime.now().isoformat()
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO prompt_changelog (changed_at, op, key) VALUES (?, 'checkpoint', ?)",
+                (changed_at, label)
+            )
+            conn.commit()
+        return changed_at
+
+    def list_checkpoints(self) -> List[Dict[str, str]]:
+        """列出所有检查点"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT changed_at, key FROM prompt_changelog
+                WHERE op = 'checkpoint' ORDER BY seq DESC
+            """)
+            return [{'time': changed_at, 'label': label or ''} for changed_at, label in cursor.fetchall()]
+
+    # ===================== 辅助方法 =====================
+
+    @staticmethod
+    def _state_to_scenes(state: Dict[int, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """内存状态转换为旧版JSON格式的场景列表"""
+        scenes = []
+        for scene in sorted(state.values(), key=lambda item: item['position']):
+            scene_data = dict(scene['extra'])
+            scene_data.update({
+                'title': scene['title'],
+                'english_prompts': list(scene['prompts']),
+                'translation_map': dict(scene['translations'])
+            })
+            scenes.append(scene_data)
+        return scenes
+
+    @staticmethod
+    def _serialize_state(state: Dict[int, Dict[str, Any]]) -> str:
+        """序列化快照"""
+        return json.dumps([
+            {
+                'scene_id': scene_id,
+                'position': scene['position'],
+                'title': scene['title'],
+                'extra': scene['extra'],
+                'prompts': scene['prompts'],
+                'translations': scene['translations']
+            }
+            for scene_id, scene in state.items()
+        ], ensure_ascii=False)
+
+    @staticmethod
+    def _format_time(iso_time: Optional[str]) -> str:
+        """ISO时间转换为旧版JSON中使用的显示格式"""
+        if not iso_time:
+            return ''
+        try:
+            return datetime.fromisoformat(iso_time).strftime("%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            return iso_time
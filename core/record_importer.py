@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+记录导入模块
+把 export_to_json / batch_export_json / 批量导出对话框写出的 JSON、NDJSON、CSV（可gzip压缩）
+重新导入图库。JSON数组逐条增量解析（不把整个文件读入内存），字段按别名映射
+（如批量导出的 positive_prompt、中文CSV表头），分批交给 save_records_bulk 写入；
+按文件路径或文件内容哈希识别已有记录，可以覆盖、合并或跳过
+"""
+
+import io
+import os
+import re
+import csv
+import json
+import gzip
+import time
+from typing import Dict, List, Any, Optional, Iterator, Callable
+
+from .streaming_exporter import detect_export_format
+
+
+# 支持的导入格式
+IMPORT_FORMATS = ('json', 'ndjson', 'csv')
+
+# 已有记录的处理方式：导入的值覆盖 / 只补充本地为空的字段 / 跳过
+IMPORT_MODES = ('update', 'merge', 'skip')
+
+# 每批写入数据库的记录数
+DEFAULT_BATCH_SIZE = 1000
+
+# 每次从文件读取的字符数
+READ_SIZE = 1024 * 1024
+
+# 导出文件中的字段名 -> 记录字段
+FIELD_ALIASES = {
+    'positive_prompt': 'prompt',
+    # 批量导出对话框的中文CSV表头
+    'ID': 'id',
+    '文件路径': 'file_path',
+    '自定义名称': 'custom_name',
+    '正向提示词': 'prompt',
+    '负向提示词': 'negative_prompt',
+    '模型': 'model',
+    '采样器': 'sampler',
+    '采样步数': 'steps',
+    'CFG缩放': 'cfg_scale',
+    '种子': 'seed',
+    'Lora信息': 'lora_info',
+    '生成来源': 'generation_source',
+    '标签': 'tags',
+    '备注': 'notes',
+    '工作流数据': 'workflow_data',
+    '创建时间': 'created_at',
+}
+
+# 可导入的字段（其余字段如 file_name、updated_at 由数据管理器生成）
+IMPORT_FIELDS = ('id', 'file_path', 'custom_name', 'prompt', 'negative_prompt', 'model', 'sampler', 'steps',
+                 'cfg_scale', 'seed', 'lora_info', 'notes', 'tags', 'generation_source', 'workflow_data',
+                 'width', 'height', 'file_size', 'file_mtime', 'image_hash', 'content_hash', 'duplicate_of',
+                 'created_at')
+
+# 文本字段（缺失时为空字符串）
+TEXT_FIELDS = ('custom_name', 'prompt', 'negative_prompt', 'model', 'sampler', 'notes', 'tags',
+               'generation_source')
+
+# 合并时本地不为空就保留的字段
+MERGE_FIELDS = TEXT_FIELDS + ('steps', 'cfg_scale', 'seed', 'lora_info', 'workflow_data',
+                              'width', 'height', 'image_hash', 'content_hash')
+
+# 字段名或别名 -> 记录字段
+_FIELD_MAP = dict({field: field for field in IMPORT_FIELDS}, **FIELD_ALIASES)
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+# ===================== 解析 =====================
+
+class _JSONStream:
+    """在滑动缓冲区上用 raw_decode 逐个解析JSON值"""
+
+    def __init__(self, stream, read_size: int = READ_SIZE):
+        self.stream = stream
+        self.read_size = read_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size: int = None):
+        chunk = self.stream.read(size or self.read_size)
+        if not chunk:
+            self.eof = True
+            return
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+
+    def peek(self) -> Optional[str]:
+        """跳过空白，返回下一个字符（文件结束时返回None）"""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if self.eof:
+                return None
+            self._fill()
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"JSON格式错误：位置 {self.pos} 处应为 '{char}'")
+        self.pos += 1
+
+    def decode(self):
+        """解析一个完整的值；值跨越缓冲区末尾时读入更多内容后重试"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # 数字等标量在缓冲区末尾时可能被截断
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # 每次至少读入与未解析部分等量的内容，超大的值也只需重试几次
+            self._fill(max(self.read_size, len(self.buffer) - self.pos))
+
+    def iter_array(self) -> Iterator[Any]:
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.decode()
+            char = self.peek()
+            self.pos += 1
+            if char == ']':
+                return
+            if char != ',':
+                raise ValueError(f"JSON格式错误：位置 {self.pos - 1} 处应为 ',' 或 ']'")
+
+
+def iter_json_records(stream, read_size: int = READ_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    逐条解析JSON记录：顶层为记录数组，或带 "records" 数组的外层对象（batch_export_json 的格式）
+
+    Args:
+        stream: 文本流
+        read_size: 每次读取的字符数
+    """
+    reader = _JSONStream(stream, read_size)
+    char = reader.peek()
+    if char == '[':
+        yield from reader.iter_array()
+        return
+    if char != '{':
+        raise ValueError("JSON文件中没有记录数组")
+
+    reader.expect('{')
+    while reader.peek() == '"':
+        key = reader.decode()
+        reader.expect(':')
+        if key == 'records' and reader.peek() == '[':
+            yield from reader.iter_array()
+            return
+        reader.decode()
+        if reader.peek() != ',':
+            break
+        reader.pos += 1
+    raise ValueError("JSON文件中没有 records 数组")
+
+
+def iter_ndjson_records(stream) -> Iterator[Dict[str, Any]]:
+    """逐行解析NDJSON记录（跳过空行）"""
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def iter_csv_records(stream) -> Iterator[Dict[str, Any]]:
+    """逐行解析CSV记录（表头为字段名）"""
+    # 工作流数据等字段可能超过默认的 128KB 限制
+    csv.field_size_limit(2 ** 31 - 1)
+    yield from csv.DictReader(stream)
+
+
+_PARSERS = {
+    'json': iter_json_records,
+    'ndjson': iter_ndjson_records,
+    'csv': iter_csv_records,
+}
+
+
+def _open_binary(input_path: str):
+    """打开文件，按 gzip 魔数自动解压；返回 (原始文件, 读取用的二进制流)"""
+    raw = open(input_path, 'rb')
+    compressed = raw.read(2) == b'\x1f\x8b'
+    raw.seek(0)
+    return raw, gzip.GzipFile(fileobj=raw, mode='rb') if compressed else raw
+
+
+def detect_import_format(input_path: str) -> str:
+    """
+    判断导入文件的格式：先看扩展名，无法判断时根据内容开头判断
+
+    Returns:
+        json / ndjson / csv
+    """
+    try:
+        return detect_export_format(input_path)[0]
+    except ValueError:
+        pass
+
+    raw, binary = _open_binary(input_path)
+    try:
+        text = io.TextIOWrapper(binary, encoding='utf-8-sig', errors='replace')
+        first_line = text.readline()
+    finally:
+        raw.close()
+    stripped = first_line.strip()
+    if stripped.startswith('['):
+        return 'json'
+    if stripped.startswith('{'):
+        try:
+            first = json.loads(stripped)
+        except json.JSONDecodeError:
+            return 'json'
+        return 'json' if 'records' in first else 'ndjson'
+    return 'csv'
+
+
+# ===================== 字段映射 =====================
+
+def _parse_json_text(value) -> Optional[Any]:
+    """数据库中以JSON文本保存的字段还原为对象（由数据管理器重新序列化）"""
+    if value is None or value == '':
+        return None
+    if not isinstance(value, str):
+        return value
+    try:
+        return json.loads(value)
+    except (json.JSONDecodeError, TypeError):
+        return None
+
+
+def _parse_lora_info(value) -> Optional[Any]:
+    """lora_info：JSON文本或对象；批量导出中无法解析的原文和CSV中的显示文本保留为 raw_lora_text"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, dict) and set(value) == {'raw'}:
+        value = value['raw']
+    parsed = _parse_json_text(value)
+    if parsed is None and isinstance(value, str):
+        return {'raw_lora_text': value}
+    return parsed
+
+
+def normalize_record(raw: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    导出文件中的一条记录转换为可传给 DataManager.save_records_bulk 的记录数据
+
+    Args:
+        raw: 解析出的原始记录（字段名可以是别名）
+
+    Returns:
+        Dict: 记录数据，没有文件路径时返回None
+    """
+    if not isinstance(raw, dict):
+        return None
+    record = {}
+    for key, value in raw.items():
+        field = _FIELD_MAP.get(key)
+        if field is None:
+            continue
+        # prompt 和 positive_prompt 同时存在时取不为空的一个
+        if field in record and (value is None or value == ''):
+            continue
+        record[field] = value
+
+    if not record.get('file_path'):
+        return None
+    for field in TEXT_FIELDS:
+        value = record.get(field)
+        if value is None:
+            record[field] = ''
+        elif not isinstance(value, str):
+            record[field] = str(value)
+    record['lora_info'] = _parse_lora_info(record.get('lora_info'))
+    record['workflow_data'] = _parse_json_text(record.get('workflow_data'))
+    for field in ('id', 'duplicate_of', 'content_hash', 'created_at'):
+        if record.get(field) == '':
+            record[field] = None
+    return record
+
+
+def _is_empty(value) -> bool:
+    return value is None or value == ''
+
+
+# ===================== 导入 =====================
+
+class RecordImporter:
+    """流式记录导入器"""
+
+    def __init__(self, mode: str = 'update', batch_size: int = DEFAULT_BATCH_SIZE,
+                 match_content: bool = True):
+        """
+        Args:
+            mode: 已有记录的处理方式 update（导入的值覆盖）/ merge（只补充本地为空的字段）/ skip（跳过）
+            batch_size: 每批写入数据库的记录数
+            match_content: 路径不同但文件内容哈希相同的记录视为同一张图片
+        """
+        if mode not in IMPORT_MODES:
+            raise ValueError(f"不支持的导入方式: {mode}")
+        self.mode = mode
+        self.batch_size = batch_size
+        self.match_content = match_content
+        self.is_cancelled = False
+
+    def cancel(self):
+        """取消导入（已写入的批次保留）"""
+        self.is_cancelled = True
+
+    def import_file(self, data_manager, input_path: str, import_format: str = None,
+                    progress_callback: Callable[[int, int, int], None] = None) -> Dict[str, Any]:
+        """
+        流式导入记录文件
+
+        Args:
+            data_manager: 数据管理器
+            input_path: JSON / NDJSON / CSV 文件（可gzip压缩）
+            import_format: 文件格式，为None时自动判断
+            progress_callback: 进度回调 (已读记录数, 已读字节数, 文件字节数)
+
+        Returns:
+            Dict: {'format', 'rows', 'imported', 'added', 'updated', 'matched_by_content',
+                  'skipped', 'invalid', 'linked_duplicates', 'cancelled', 'elapsed'}
+        """
+        import_format = import_format or detect_import_format(input_path)
+        if import_format not in IMPORT_FORMATS:
+            raise ValueError(f"不支持的导入格式: {import_format}")
+
+        self.is_cancelled = False
+        start_time = time.time()
+        stats = {'format': import_format, 'rows': 0, 'imported': 0, 'added': 0, 'updated': 0,
+                 'matched_by_content': 0, 'skipped': 0, 'invalid': 0}
+        # 导出文件中的记录ID -> 导入后的文件路径，重复图片按原图的路径重新关联
+        id_paths = {}
+        # 原图在副本之后出现时，导入结束后再关联 {副本路径: 原图记录ID}
+        self._pending_duplicates = {}
+
+        raw, binary = _open_binary(input_path)
+        try:
+            total_bytes = os.fstat(raw.fileno()).st_size
+            text = io.TextIOWrapper(binary, encoding='utf-8-sig', newline='')
+            batch = []
+            for item in _PARSERS[import_format](text):
+                if self.is_cancelled:
+                    break
+                stats['rows'] += 1
+                record = normalize_record(item)
+                if record is None:
+                    stats['invalid'] += 1
+                    continue
+                batch.append(record)
+                if len(batch) >= self.batch_size:
+                    self._write_batch(data_manager, batch, id_paths, stats)
+                    batch = []
+                    if progress_callback:
+                        progress_callback(stats['rows'], raw.tell(), total_bytes)
+            if batch and not self.is_cancelled:
+                self._write_batch(data_manager, batch, id_paths, stats)
+            if progress_callback:
+                progress_callback(stats['rows'], raw.tell(), total_bytes)
+        finally:
+            raw.close()
+
+        links = {path: id_paths[original_id] for path, original_id in self._pending_duplicates.items()
+                 if original_id in id_paths}
+        stats['linked_duplicates'] = data_manager.link_duplicate_paths(links)
+        stats['cancelled'] = self.is_cancelled
+        stats['elapsed'] = time.time() - start_time
+        return stats
+
+    def _write_batch(self, data_manager, batch: List[Dict[str, Any]], id_paths: Dict[Any, str],
+                     stats: Dict[str, Any]):
+        """识别已有记录，按导入方式合并后批量写入"""
+        columns = None if self.mode == 'merge' else ['file_path']
+        existing = data_manager.get_records_by_paths([record['file_path'] for record in batch], columns)
+
+        if self.match_content:
+            unmatched = [record for record in batch
+                         if record['file_path'] not in existing and record.get('content_hash')]
+            if unmatched:
+                local_paths = data_manager.get_paths_by_content_hash([r['content_hash'] for r in unmatched])
+                for record in unmatched:
+                    local_path = local_paths.get(record['content_hash'])
+                    if local_path:
+                        record['file_path'] = local_path
+                        stats['matched_by_content'] += 1
+                if local_paths:
+                    existing.update(data_manager.get_records_by_paths(list(local_paths.values()), columns))
+
+        records = []
+        for record in batch:
+            record_id = record.pop('id', None)
+            if record_id is not None:
+                id_paths[record_id] = record['file_path']
+            original_id = record.pop('duplicate_of', None)
+            if original_id is not None:
+                if original_id in id_paths:
+                    if id_paths[original_id] != record['file_path']:
+                        record['duplicate_of'] = id_paths[original_id]
+                else:
+                    self._pending_duplicates[record['file_path']] = original_id
+
+            local = existing.get(record['file_path'])
+            if local is not None:
+                if self.mode == 'skip':
+                    stats['skipped'] += 1
+                    continue
+                if self.mode == 'merge':
+                    record = self._merge(local, record)
+                stats['updated'] += 1
+            else:
+                stats['added'] += 1
+                # 同一文件中同一路径的后续记录按更新处理
+                existing[record['file_path']] = record
+            records.append(record)
+
+        stats['imported'] += len(data_manager.save_records_bulk(records))
+
+    @staticmethod
+    def _merge(local: Dict[str, Any], record: Dict[str, Any]) -> Dict[str, Any]:
+        """本地不为空的字段保留本地值，其余使用导入的值"""
+        merged = dict(record)
+        for field in MERGE_FIELDS:
+            value = local.get(field)
+            if _is_empty(value):
+                continue
+            if field == 'lora_info':
+                value = _parse_lora_info(value)
+            elif field == 'workflow_data':
+                value = _parse_json_text(value)
+            merged[field] = value
+        if local.get('created_at'):
+            merged['created_at'] = local['created_at']
+        return merged
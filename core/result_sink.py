@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量处理结果接收模块
+流水线逐条产生的结果交给接收器处理，而不是全部保存在内存中：
+ResultSink 只统计数量并保留有限的失败样本（记录本身已写入数据库），
+DiscardSink 只统计数量，NDJSONResultSink 把每条结果写入磁盘日志（可gzip压缩）并可重新迭代，
+MemorySink 保留全部结果（仅适合小批量）
+"""
+
+import os
+import json
+import gzip
+from collections import Counter
+from typing import Dict, List, Any, Iterator
+
+from .progress_reporter import NO_RESULT_ERROR
+
+
+# 默认保留的失败样本数
+DEFAULT_FAILURE_SAMPLES = 100
+
+
+class ResultSink:
+    """结果汇总：只保留计数、错误类型统计和有限的失败样本"""
+
+    def __init__(self, max_failure_samples: int = DEFAULT_FAILURE_SAMPLES):
+        """
+        Args:
+            max_failure_samples: 最多保留的失败样本数
+        """
+        self.max_failure_samples = max_failure_samples
+        self.successful_count = 0
+        self.failed_count = 0
+        self.skipped_count = 0
+        self.errors = Counter()
+        self.failure_samples = []
+        self.closed = False
+
+    @property
+    def processed_count(self) -> int:
+        return self.successful_count + self.failed_count + self.skipped_count
+
+    def add(self, result: Dict[str, Any]):
+        """
+        接收一条结果
+
+        Args:
+            result: 流水线结果 {'file_path', 'success', 'skipped', 'data', 'error', 'error_type'}
+        """
+        if result['success']:
+            self.successful_count += 1
+        elif result.get('skipped'):
+            self.skipped_count += 1
+        else:
+            self.failed_count += 1
+            self.errors[result.get('error_type') or NO_RESULT_ERROR] += 1
+            if len(self.failure_samples) < self.max_failure_samples:
+                self.failure_samples.append({
+                    'file_path': result['file_path'],
+                    'error': result.get('error'),
+                    'error_type': result.get('error_type'),
+                })
+        self._write(result)
+
+    def _write(self, result: Dict[str, Any]):
+        """保存单条结果（子类实现）"""
+
+    def close(self):
+        """结束接收（写入磁盘的接收器在此关闭文件）"""
+        self.closed = True
+
+    def iter_results(self) -> Iterator[Dict[str, Any]]:
+        """重新迭代接收到的结果（只统计数量的接收器没有可迭代的结果）"""
+        return iter(())
+
+    def summary(self) -> Dict[str, Any]:
+        """汇总信息"""
+        return {
+            'processed': self.processed_count,
+            'successful': self.successful_count,
+            'failed': self.failed_count,
+            'skipped': self.skipped_count,
+            'errors': dict(self.errors),
+            'failure_samples': list(self.failure_samples),
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class DiscardSink(ResultSink):
+    """只统计数量，不保留任何结果"""
+
+    def __init__(self):
+        super().__init__(max_failure_samples=0)
+
+
+class MemorySink(ResultSink):
+    """在内存中保留全部结果（兼容旧接口，只适合小批量）"""
+
+    def __init__(self, max_failure_samples: int = DEFAULT_FAILURE_SAMPLES):
+        super().__init__(max_failure_samples)
+        self.results = []
+
+    def _write(self, result: Dict[str, Any]):
+        self.results.append(result)
+
+    def iter_results(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.results)
+
+    @property
+    def successful_files(self) -> List[str]:
+        return [result['file_path'] for result in self.results if result['success']]
+
+    @property
+    def failed_files(self) -> List[str]:
+        return [result['file_path'] for result in self.results
+                if not result['success'] and not result.get('skipped')]
+
+    @property
+    def processed_data(self) -> List[Dict[str, Any]]:
+        return [{'file_path': result['file_path'], 'data': result['data']}
+                for result in self.results if result['success']]
+
+
+class NDJSONResultSink(ResultSink):
+    """把每条结果写成一行JSON保存到磁盘（扩展名为 .gz 时gzip压缩）"""
+
+    def __init__(self, log_path: str, include_data: bool = True,
+                 max_failure_samples: int = DEFAULT_FAILURE_SAMPLES):
+        """
+        Args:
+            log_path: 日志文件路径，如 results.ndjson 或 results.ndjson.gz
+            include_data: 是否写入提取到的完整数据（否则只写文件路径和状态）
+            max_failure_samples: 内存中保留的失败样本数
+        """
+        super().__init__(max_failure_samples)
+        self.log_path = log_path
+        self.include_data = include_data
+        self.compress = log_path.lower().endswith('.gz')
+
+        log_dir = os.path.dirname(log_path)
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+        if self.compress:
+            self._file = gzip.open(log_path, 'wt', encoding='utf-8')
+        else:
+            self._file = open(log_path, 'w', encoding='utf-8')
+
+    def _write(self, result: Dict[str, Any]):
+        line = {
+            'file_path': result['file_path'],
+            'success': result['success'],
+            'skipped': result.get('skipped', False),
+            'error': result.get('error'),
+            'error_type': result.get('error_type'),
+        }
+        if self.include_data:
+            line['data'] = result.get('data')
+        self._file.write(json.dumps(line, ensure_ascii=False, default=str))
+        self._file.write('\n')
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+        super().close()
+
+    def iter_results(self) -> Iterator[Dict[str, Any]]:
+        """逐行读取日志中的结果（先关闭写入）"""
+        self.close()
+        opener = gzip.open if self.compress else open
+        with opener(self.log_path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def summary(self) -> Dict[str, Any]:
+        summary = super().summary()
+        summary['log_path'] = self.log_path
+        return summary
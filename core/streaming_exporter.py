@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式导出模块
+逐块迭代记录并增量写入文件，支持JSON数组、NDJSON、CSV及gzip压缩，
+按行数和字节数报告进度，支持取消
+"""
+
+import os
+import io
+import csv
+import json
+import gzip
+import time
+import textwrap
+from typing import Dict, List, Any, Optional, Callable, Iterable, Tuple
+
+
+# 支持的导出格式
+EXPORT_FORMATS = ('json', 'ndjson', 'csv')
+
+# 扩展名 -> 导出格式
+_EXTENSION_FORMATS = {
+    '.json': 'json',
+    '.ndjson': 'ndjson',
+    '.jsonl': 'ndjson',
+    '.csv': 'csv',
+}
+
+
+def detect_export_format(output_path: str) -> Tuple[str, bool]:
+    """
+    根据文件扩展名判断导出格式
+
+    Returns:
+        (格式, 是否gzip压缩)
+    """
+    path = output_path.lower()
+    compress = path.endswith('.gz')
+    if compress:
+        path = path[:-3]
+    export_format = _EXTENSION_FORMATS.get(os.path.splitext(path)[1])
+    if export_format is None:
+        raise ValueError(f"无法根据文件名判断导出格式: {output_path}")
+    return export_format, compress
+
+
+def parse_json_field(value) -> Optional[Any]:
+    """解析以JSON文本保存的字段（如lora_info），解析失败时返回None"""
+    if not value:
+        return None
+    if not isinstance(value, str):
+        return value
+    try:
+        return json.loads(value)
+    except (json.JSONDecodeError, TypeError):
+        return None
+
+
+class StreamingExporter:
+    """流式导出器"""
+
+    def __init__(self, chunk_size: int = 500):
+        """
+        Args:
+            chunk_size: 每写入多少行刷新一次并报告进度
+        """
+        self.chunk_size = chunk_size
+        self.is_cancelled = False
+
+    def cancel(self):
+        """取消导出（在下一行写入前生效）"""
+        self.is_cancelled = True
+
+    def export(self,
+               records: Iterable[Dict[str, Any]],
+               output_path: str,
+               export_format: str = None,
+               compress: bool = None,
+               fieldnames: List[str] = None,
+               transform: Callable[[Dict[str, Any]], Dict[str, Any]] = None,
+               total_rows: int = None,
+               progress_callback: Callable[[int, int, int], None] = None,
+               envelope: Dict[str, Any] = None,
+               indent: int = None,
+               encoding: str = 'utf-8') -> Dict[str, Any]:
+        """
+        流式导出记录
+
+        Args:
+            records: 记录迭代器（如 DataManager.iter_records()）
+            output_path: 输出文件路径
+            export_format: json / ndjson / csv，为None时根据扩展名判断
+            compress: 是否gzip压缩，为None时根据 .gz 扩展名判断
+            fieldnames: CSV列名，为None时使用第一条记录的键
+            transform: 写入前对每条记录的转换函数
+            total_rows: 总行数（仅用于进度显示）
+            progress_callback: 进度回调 (已写行数, 总行数, 已写字节数)
+            envelope: JSON格式时包裹记录数组的外层字段，记录写入其 "records" 键
+            indent: JSON格式时的缩进
+            encoding: 文本编码
+
+        Returns:
+            Dict: {'rows', 'bytes', 'cancelled', 'output_path', 'elapsed'}
+        """
+        if export_format is None or compress is None:
+            detected_format, detected_compress = detect_export_format(output_path)
+            export_format = export_format or detected_format
+            compress = detected_compress if compress is None else compress
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"不支持的导出格式: {export_format}")
+
+        self.is_cancelled = False
+        start_time = time.time()
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        # 先写入临时文件，完成后再替换，避免留下不完整的导出文件
+        temp_path = output_path + '.part'
+        rows = 0
+        raw_file = open(temp_path, 'wb')
+        completed = False
+        try:
+            binary = gzip.GzipFile(fileobj=raw_file, mode='wb') if compress else raw_file
+            text = io.TextIOWrapper(binary, encoding=encoding,
+                                    newline='' if export_format == 'csv' else None)
+
+            writer = _RecordWriter.create(export_format, text, fieldnames, envelope, indent)
+            for record in records:
+                if self.is_cancelled:
+                    break
+                if transform:
+                    record = transform(record)
+                writer.write(record)
+                rows += 1
+
+                if rows % self.chunk_size == 0:
+                    text.flush()
+                    if progress_callback:
+                        progress_callback(rows, total_rows, raw_file.tell())
+
+            if not self.is_cancelled:
+                writer.close()
+            text.flush()
+            text.detach()
+            if compress:
+                binary.close()
+            bytes_written = raw_file.tell()
+            completed = True
+        finally:
+            raw_file.close()
+            if not completed:
+                os.remove(temp_path)
+
+        if self.is_cancelled:
+            os.remove(temp_path)
+            print(f"导出已取消，已写入 {rows} 行")
+        else:
+            os.replace(temp_path, output_path)
+            if progress_callback:
+                progress_callback(rows, total_rows, bytes_written)
+
+        return {
+            'rows': rows,
+            'bytes': bytes_written,
+            'cancelled': self.is_cancelled,
+            'output_path': None if self.is_cancelled else output_path,
+            'elapsed': time.time() - start_time
+        }
+
+
+class _RecordWriter:
+    """按格式逐条写入记录"""
+
+    @staticmethod
+    def create(export_format: str, stream, fieldnames, envelope, indent):
+        if export_format == 'csv':
+            return _CSVWriter(stream, fieldnames)
+        if export_format == 'ndjson':
+            return _NDJSONWriter(stream)
+        return _JSONArrayWriter(stream, envelope, indent)
+
+    def write(self, record: Dict[str, Any]):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class _NDJSONWriter(_RecordWriter):
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, record):
+        self.stream.write(json.dumps(record, ensure_ascii=False, default=str))
+        self.stream.write('\n')
+
+
+class _JSONArrayWriter(_RecordWriter):
+    def __init__(self, stream, envelope, indent):
+        self.stream = stream
+        self.indent = indent
+        self.first = True
+
+        if envelope:
+            # 外层字段先写出，记录数组作为最后一个字段
+            header = json.dumps(dict(envelope, records=[]), ensure_ascii=False, indent=indent, default=str)
+            self.prefix, self.suffix = header.rsplit('[]', 1)
+            self.item_indent = ' ' * (indent * 2) if indent else ''
+        else:
+            self.prefix, self.suffix = '', ''
+            self.item_indent = ' ' * indent if indent else ''
+        self.stream.write(self.prefix + '[')
+
+    def write(self, record):
+        text = json.dumps(record, ensure_ascii=False, indent=self.indent, default=str)
+        if self.indent:
+            text = textwrap.indent(text, self.item_indent)
+            self.stream.write('\n' if self.first else ',\n')
+        elif not self.first:
+            self.stream.write(', ')
+        self.stream.write(text)
+        self.first = False
+
+    def close(self):
+        if self.indent and not self.first:
+            self.stream.write('\n' + self.item_indent[:-self.indent])
+        self.stream.write(']' + self.suffix + '\n')
+
+
+class _CSVWriter(_RecordWriter):
+    def __init__(self, stream, fieldnames):
+        self.stream = stream
+        self.fieldnames = fieldnames
+        self.writer = None
+        if fieldnames:
+            self._start(fieldnames)
+
+    def _start(self, fieldnames):
+        self.writer = csv.DictWriter(self.stream, fieldnames=fieldnames, extrasaction='ignore')
+        self.writer.writeheader()
+
+    def write(self, record):
+        if self.writer is None:
+            self._start(list(record.keys()))
+        self.writer.writerow(record)
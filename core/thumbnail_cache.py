@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+缩略图缓存
+把原图缩小后的结果按 路径 + 修改时间 + 文件大小 保存在数据目录中，
+联系表、图集等需要大量小图的导出只在第一次解码原图，之后读取几KB的缓存文件。
+原图修改后缓存键变化，旧缓存不再使用
+"""
+
+import os
+import hashlib
+import threading
+from typing import Optional
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+
+class ThumbnailCache:
+    """磁盘缩略图缓存（可在多个线程中同时使用）"""
+
+    def __init__(self, cache_dir: str, size: int = 256, quality: int = 85):
+        """
+        Args:
+            cache_dir: 缓存目录（如 数据目录/thumbnail_cache）
+            size: 缩略图最长边（像素），不同尺寸分别缓存
+            quality: 缓存文件的 JPEG 质量
+        """
+        self.size = size
+        self.quality = quality
+        self.cache_dir = os.path.join(cache_dir, str(size))
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def cache_path(self, file_path: str) -> Optional[str]:
+        """
+        原图对应的缓存文件路径
+
+        Returns:
+            缓存文件路径，原图不存在时返回None
+        """
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        key = f"{os.path.abspath(file_path)}|{stat.st_mtime_ns}|{stat.st_size}"
+        digest = hashlib.sha1(key.encode('utf-8', 'surrogateescape')).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], digest + '.jpg')
+
+    def get(self, file_path: str):
+        """
+        获取缩略图（RGB），缓存不存在时解码原图并写入缓存
+
+        Args:
+            file_path: 原图路径
+
+        Returns:
+            PIL.Image 或 None（原图不存在或无法解码）
+        """
+        if not PIL_AVAILABLE:
+            return None
+        cache_path = self.cache_path(file_path)
+        if cache_path is None:
+            return None
+
+        try:
+            with Image.open(cache_path) as img:
+                img.load()
+                return img
+        except (OSError, ValueError):
+            pass
+
+        try:
+            with Image.open(file_path) as img:
+                # JPEG 在解码时直接缩小，只解码需要的尺寸
+                img.draft('RGB', (self.size, self.size))
+                if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+                    rgba = img.convert('RGBA')
+                    image = Image.new('RGB', rgba.size, (255, 255, 255))
+                    image.paste(rgba, mask=rgba.getchannel('A'))
+                else:
+                    image = img.convert('RGB')
+            image.thumbnail((self.size, self.size))
+        except Exception as e:
+            print(f"生成缩略图失败 {file_path}: {e}")
+            return None
+
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            temp_path = f"{cache_path}.{os.getpid()}-{threading.get_ident()}.part"
+            image.save(temp_path, 'JPEG', quality=self.quality)
+            os.replace(temp_path, cache_path)
+        except OSError as e:
+            print(f"写入缩略图缓存失败 {cache_path}: {e}")
+        return image
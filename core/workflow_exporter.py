@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ComfyUI工作流批量导出模块
+从选中的记录中提取工作流，按内容去重后每个工作流只写出一次：
+    workflows/<hash>.json   界面格式（workflow），可直接拖入ComfyUI
+    prompts/<hash>.json     可选的执行格式（prompt），可提交到 /prompt 接口
+    images.ndjson           每行一张图片：记录ID、路径、工作流和执行格式的哈希、种子
+    manifest.json           汇总：每个工作流被多少张图片使用
+工作流只读取PNG文件头部的文本块（遇到图像数据即停止），不解码像素。
+同一工作流批量生成的图片只有种子不同，去重时种子单独记录在 images.ndjson 中，
+用 apply_seeds 可以还原每张图片的原始工作流
+"""
+
+import os
+import copy
+import json
+import time
+import zlib
+import struct
+import hashlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, Optional, Callable, Iterable, Tuple
+
+
+MANIFEST_FORMAT = 'baize-workflows'
+MANIFEST_VERSION = 1
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# 单个文本块的大小上限（超过时跳过，防止损坏的文件占用大量内存）
+MAX_TEXT_CHUNK_SIZE = 64 * 1024 * 1024
+
+# ComfyUI 保存工作流的文本块
+WORKFLOW_TEXT_KEYS = ('prompt', 'workflow')
+
+# 执行格式中表示种子的输入
+SEED_INPUTS = ('seed', 'noise_seed')
+
+
+def canonical_json(data: Any) -> bytes:
+    """序列化为紧凑、键有序的JSON，相同内容得到相同的字节"""
+    return json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def content_hash(data: Any) -> str:
+    """工作流内容哈希（canonical_json 的 SHA-1 前16位）"""
+    return hashlib.sha1(canonical_json(data)).hexdigest()[:16]
+
+
+def read_png_text(file_path: str, keys: Iterable[str] = None) -> Dict[str, str]:
+    """
+    只读取PNG文件头部的文本块（tEXt/zTXt/iTXt），遇到图像数据（IDAT）即停止，
+    其余数据块直接跳过，读取量与图片大小无关
+
+    Args:
+        file_path: PNG文件路径
+        keys: 只返回这些键的文本，None 表示全部
+
+    Returns:
+        Dict[str, str]: 文本块的键和内容，不是PNG或读取失败时为空字典
+    """
+    wanted = set(keys) if keys is not None else None
+    texts = {}
+    try:
+        with open(file_path, 'rb') as f:
+            if f.read(8) != PNG_SIGNATURE:
+                return texts
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    break
+                length, chunk_type = struct.unpack('>I4s', header)
+                if chunk_type in (b'IDAT', b'IEND'):
+                    break
+                if chunk_type not in (b'tEXt', b'zTXt', b'iTXt') or length > MAX_TEXT_CHUNK_SIZE:
+                    f.seek(length + 4, os.SEEK_CUR)
+                    continue
+                data = f.read(length)
+                f.seek(4, os.SEEK_CUR)
+                key, _, body = data.partition(b'\0')
+                key = key.decode('latin-1')
+                if wanted is not None and key not in wanted:
+                    continue
+                text = _decode_text_chunk(chunk_type, body)
+                if text is not None:
+                    texts[key] = text
+    except (OSError, struct.error) as e:
+        print(f"读取PNG文本块失败 {file_path}: {e}")
+    return texts
+
+
+def _decode_text_chunk(chunk_type: bytes, body: bytes) -> Optional[str]:
+    try:
+        if chunk_type == b'tEXt':
+            return body.decode('latin-1')
+        if chunk_type == b'zTXt':
+            return zlib.decompress(body[1:]).decode('latin-1')
+        # iTXt：压缩标志、压缩方法、语言标签\0、翻译后的键\0、UTF-8文本
+        compressed = body[0] == 1
+        _, _, rest = body[2:].partition(b'\0')
+        _, _, text = rest.partition(b'\0')
+        return (zlib.decompress(text) if compressed else text).decode('utf-8')
+    except (zlib.error, UnicodeDecodeError, IndexError):
+        return None
+
+
+def read_comfyui_workflow(file_path: str) -> Dict[str, Any]:
+    """
+    从PNG文件头部读取ComfyUI工作流
+
+    Returns:
+        Dict: {'workflow': 界面格式, 'prompt': 执行格式}，没有时为空字典
+    """
+    result = {}
+    for key, text in read_png_text(file_path, WORKFLOW_TEXT_KEYS).items():
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(data, dict) and data:
+            result[key] = data
+    return result
+
+
+def record_workflows(record: Dict[str, Any], read_image: bool = True) -> Dict[str, Any]:
+    """
+    记录的ComfyUI工作流：优先读取PNG中的工作流，没有执行格式时使用数据库中保存的工作流
+
+    Args:
+        record: 记录数据
+        read_image: 是否读取图片文件（否则只使用数据库中保存的工作流）
+
+    Returns:
+        Dict: {'workflow': 界面格式, 'prompt': 执行格式}，没有时为空字典
+    """
+    stored = record.get('workflow_data')
+    if isinstance(stored, str):
+        try:
+            stored = json.loads(stored) if stored.strip() else None
+        except json.JSONDecodeError:
+            stored = None
+
+    file_path = record.get('file_path') or ''
+    workflow = {}
+    # 界面格式的工作流只保存在图片中
+    if read_image and file_path.lower().endswith('.png') and os.path.isfile(file_path):
+        workflow = read_comfyui_workflow(file_path)
+    if isinstance(stored, dict) and stored and not workflow.get('prompt'):
+        workflow['prompt'] = stored
+    return workflow
+
+
+def split_seeds(prompt: Optional[Dict[str, Any]],
+                workflow: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    """
+    把种子从工作流中分离出来，得到用于去重的规范形式
+
+    执行格式中 seed/noise_seed 输入的值；界面格式中同一节点 widgets_values 里
+    等于这些值的位置。两者都替换为 0，界面格式还去掉画布位置（extra.ds）
+
+    Args:
+        prompt: 执行格式
+        workflow: 界面格式
+
+    Returns:
+        Tuple: (规范的执行格式, 规范的界面格式, 种子 {'prompt': {节点: {输入: 值}}, 'workflow': {节点: {位置: 值}}})
+    """
+    seeds = {'prompt': {}, 'workflow': {}}
+    normalized_prompt = copy.deepcopy(prompt) if prompt else None
+    normalized_workflow = copy.deepcopy(workflow) if workflow else None
+
+    if normalized_prompt:
+        for node_id, node in normalized_prompt.items():
+            inputs = node.get('inputs') if isinstance(node, dict) else None
+            if not isinstance(inputs, dict):
+                continue
+            for name in SEED_INPUTS:
+                value = inputs.get(name)
+                # 连接到其他节点的输入是 [节点, 输出] 列表，不是种子值
+                if isinstance(value, int) and not isinstance(value, bool):
+                    seeds['prompt'].setdefault(str(node_id), {})[name] = value
+                    inputs[name] = 0
+
+    if normalized_workflow:
+        extra = normalized_workflow.get('extra')
+        if isinstance(extra, dict):
+            extra.pop('ds', None)
+        for node in normalized_workflow.get('nodes') or []:
+            if not isinstance(node, dict):
+                continue
+            node_seeds = set(seeds['prompt'].get(str(node.get('id')), {}).values())
+            values = node.get('widgets_values')
+            if not node_seeds or not isinstance(values, list):
+                continue
+            for index, value in enumerate(values):
+                if isinstance(value, int) and not isinstance(value, bool) and value in node_seeds:
+                    seeds['workflow'].setdefault(str(node['id']), {})[str(index)] = value
+                    values[index] = 0
+
+    return normalized_prompt, normalized_workflow, seeds
+
+
+def apply_seeds(prompt: Optional[Dict[str, Any]], workflow: Optional[Dict[str, Any]],
+                seeds: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    把 images.ndjson 中记录的种子写回导出的工作流，还原某张图片的原始工作流
+
+    Args:
+        prompt: 导出的执行格式
+        workflow: 导出的界面格式
+        seeds: 该图片的种子
+
+    Returns:
+        Tuple: (执行格式, 界面格式) 的副本
+    """
+    prompt = copy.deepcopy(prompt) if prompt else prompt
+    workflow = copy.deepcopy(workflow) if workflow else workflow
+    for node_id, values in (seeds.get('prompt') or {}).items():
+        if prompt and node_id in prompt:
+            prompt[node_id]['inputs'].update(values)
+    if workflow:
+        nodes = {str(node.get('id')): node for node in workflow.get('nodes') or [] if isinstance(node, dict)}
+        for node_id, values in (seeds.get('workflow') or {}).items():
+            node = nodes.get(node_id)
+            if node is not None:
+                for index, value in values.items():
+                    node['widgets_values'][int(index)] = value
+    return prompt, workflow
+
+
+class WorkflowExporter:
+    """ComfyUI工作流批量导出器"""
+
+    def __init__(self,
+                 include_prompt: bool = True,
+                 dedupe_seeds: bool = True,
+                 read_images: bool = True,
+                 max_workers: int = 8,
+                 indent: Optional[int] = 2):
+        """
+        Args:
+            include_prompt: 是否同时导出执行格式（prompt）
+            dedupe_seeds: 去重时忽略种子（种子记录在 images.ndjson 中）
+            read_images: 是否从PNG中读取工作流（否则只使用数据库中保存的执行格式）
+            max_workers: 读取PNG文本块的线程数
+            indent: 写出的JSON缩进，None 表示紧凑格式
+        """
+        self.include_prompt = include_prompt
+        self.dedupe_seeds = dedupe_seeds
+        self.read_images = read_images
+        self.max_workers = max(1, max_workers)
+        self.indent = indent
+        self.is_cancelled = False
+
+    def cancel(self):
+        """取消导出（已提交的读取完成后停止）"""
+        self.is_cancelled = True
+
+    def export(self,
+               records: Iterable[Dict[str, Any]],
+               output_dir: str,
+               total: int = None,
+               progress_callback: Callable[[int, int, str], None] = None) -> Dict[str, Any]:
+        """
+        导出工作流（输出目录中已有的同一工作流不会重复写出）
+
+        Args:
+            records: 记录迭代器（如 DataManager.iter_records(where=...)）
+            output_dir: 输出目录
+            total: 记录总数（仅用于进度显示）
+            progress_callback: 进度回调 (已处理数, 总数, 当前文件)
+
+        Returns:
+            Dict: {'records', 'images', 'no_workflow', 'workflows', 'prompts', 'written',
+                   'output_dir', 'manifest_path', 'elapsed', 'cancelled'}
+        """
+        self.is_cancelled = False
+        start_time = time.time()
+        for folder in ('workflows', 'prompts'):
+            os.makedirs(os.path.join(output_dir, folder), exist_ok=True)
+
+        stats = {'records': 0, 'images': 0, 'no_workflow': 0, 'written': 0}
+        usage = {'workflows': {}, 'prompts': {}}
+        pending = deque()
+        max_pending = self.max_workers * 16
+        images_path = os.path.join(output_dir, 'images.ndjson')
+
+        with open(images_path + '.part', 'w', encoding='utf-8') as images_file, \
+                ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+
+            def finish_oldest():
+                record, future = pending.popleft()
+                line = self._add_record(output_dir, record, future.result(), usage, stats)
+                stats['records'] += 1
+                if line is None:
+                    stats['no_workflow'] += 1
+                else:
+                    stats['images'] += 1
+                    images_file.write(json.dumps(line, ensure_ascii=False, separators=(',', ':')) + '\n')
+                if progress_callback:
+                    progress_callback(stats['records'], total or 0, record.get('file_path', ''))
+
+            for record in records:
+                if self.is_cancelled:
+                    break
+                pending.append((record, pool.submit(record_workflows, record, self.read_images)))
+                # 限制排队的任务数，内存占用与记录总数无关
+                if len(pending) >= max_pending:
+                    finish_oldest()
+            while pending:
+                finish_oldest()
+        os.replace(images_path + '.part', images_path)
+
+        manifest_path = os.path.join(output_dir, 'manifest.json')
+        manifest = {
+            'format': MANIFEST_FORMAT,
+            'version': MANIFEST_VERSION,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'images': stats['images'],
+            'seeds_separated': self.dedupe_seeds,
+            'workflows': usage['workflows'],
+            'prompts': usage['prompts'],
+        }
+        with open(manifest_path + '.part', 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(manifest_path + '.part', manifest_path)
+
+        stats.update({
+            'workflows': len(usage['workflows']),
+            'prompts': len(usage['prompts']),
+            'output_dir': output_dir,
+            'manifest_path': manifest_path,
+            'elapsed': time.time() - start_time,
+            'cancelled': self.is_cancelled,
+        })
+        return stats
+
+    def _add_record(self, output_dir: str, record: Dict[str, Any], workflow: Dict[str, Any],
+                    usage: Dict[str, Dict[str, Any]], stats: Dict[str, int]) -> Optional[Dict[str, Any]]:
+        """按内容哈希写出一条记录的工作流，返回 images.ndjson 中的一行（没有工作流时返回None）"""
+        prompt = workflow.get('prompt') if self.include_prompt else None
+        ui_workflow = workflow.get('workflow')
+        if not prompt and not ui_workflow:
+            return None
+
+        if self.dedupe_seeds:
+            normalized_prompt, normalized_workflow, seeds = split_seeds(workflow.get('prompt'), ui_workflow)
+        else:
+            normalized_prompt, seeds = workflow.get('prompt'), None
+            normalized_workflow = self._without_view_state(ui_workflow) if ui_workflow else None
+
+        line = {'record_id': record.get('id'), 'file_path': record.get('file_path'),
+                'workflow': None, 'prompt': None}
+        for kind, folder, data, normalized in (('workflow', 'workflows', ui_workflow, normalized_workflow),
+                                               ('prompt', 'prompts', prompt, normalized_prompt)):
+            if not data:
+                continue
+            digest = content_hash(normalized)
+            entry = usage[folder].get(digest)
+            if entry is None:
+                relative_path = f"{folder}/{digest}.json"
+                target = os.path.join(output_dir, relative_path)
+                if not os.path.exists(target):
+                    # 写出第一张图片的原始工作流（带种子，可以直接使用）
+                    with open(target + '.part', 'w', encoding='utf-8') as f:
+                        json.dump(self._without_view_state(data) if kind == 'workflow' else data, f,
+                                  ensure_ascii=False, indent=self.indent)
+                    os.replace(target + '.part', target)
+                    stats['written'] += 1
+                entry = usage[folder][digest] = {'file': relative_path, 'images': 0}
+            entry['images'] += 1
+            line[kind] = digest
+
+        if seeds is not None and (seeds['prompt'] or seeds['workflow']):
+            line['seeds'] = {kind: values for kind, values in seeds.items() if values}
+        return line
+
+    @staticmethod
+    def _without_view_state(workflow: Dict[str, Any]) -> Dict[str, Any]:
+        """去掉画布位置（extra.ds），其余内容不变"""
+        extra = workflow.get('extra')
+        if not isinstance(extra, dict) or 'ds' not in extra:
+            return workflow
+        workflow = dict(workflow)
+        workflow['extra'] = {key: value for key, value in extra.items() if key != 'ds'}
+        return workflow
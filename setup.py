@@ -13,6 +13,7 @@ setup(
     description="白泽AI - 智能图片信息提取工具",
     author="Your Name",
     packages=find_packages(),
+    py_modules=["main", "baize_cli", "single_instance"],
     python_requires=">=3.10",
     install_requires=[
         "PyQt5>=5.15.0",
@@ -22,7 +23,8 @@ setup(
     ],
     entry_points={
         "console_scripts": [
-            "ai-image-reader=main:main"
+            "ai-image-reader=main:main",
+            "baize=baize_cli:main"
         ]
     },
     classifiers=[
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+命令行工具测试
+"""
+
+import io
+import os
+import sys
+import json
+import tempfile
+import contextlib
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.data_manager import DataManager
+import baize_cli
+
+
+def run_cli(temp_dir, *argv):
+    """运行命令行并返回 (退出码, stdout)"""
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        exit_code = baize_cli.main(['--db', os.path.join(temp_dir, 'test.db'),
+                                    '--data-dir', temp_dir, *argv])
+    return exit_code, output.getvalue()
+
+
+def test_baize_cli():
+    """测试搜索、导出、统计、重新关联和维护子命令"""
+    print("🧪 开始测试命令行工具...")
+
+    # 命令行只依赖 core 模块
+    assert not any(name == 'ui' or name.startswith('ui.') for name in sys.modules)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        data_manager = DataManager(os.path.join(temp_dir, 'test.db'), data_dir=temp_dir)
+        old_folder = os.path.join(temp_dir, 'old')
+        new_folder = os.path.join(temp_dir, 'new')
+        os.makedirs(new_folder)
+        for name in ['a.png', 'b.png']:
+            with open(os.path.join(new_folder, name), 'wb') as f:
+                f.write(b'x' * 10)
+        data_manager.save_records_bulk([
+            {'file_path': os.path.join(old_folder, 'a.png'), 'prompt': 'a girl in red', 'model': 'sdxl',
+             'file_size': 10},
+            {'file_path': os.path.join(old_folder, 'b.png'), 'prompt': 'a cat', 'model': 'flux',
+             'file_size': 10},
+            {'file_path': os.path.join(old_folder, 'c.png'), 'prompt': 'a girl in blue', 'model': 'sdxl'},
+        ])
+
+        # 搜索：stdout 只包含结果，可直接解析
+        exit_code, output = run_cli(temp_dir, '--json', 'search', 'girl')
+        assert exit_code == 0
+        records = json.loads(output)
+        assert sorted(os.path.basename(r['file_path']) for r in records) == ['a.png', 'c.png']
+        exit_code, output = run_cli(temp_dir, 'search', 'girl', '--limit', '1')
+        assert '共 1 条记录' in output
+
+        # 导出
+        ndjson_path = os.path.join(temp_dir, 'out.ndjson')
+        exit_code, output = run_cli(temp_dir, '--json', 'export', ndjson_path, '--query', 'cat')
+        assert exit_code == 0 and json.loads(output)['rows'] == 1
+        with open(ndjson_path, encoding='utf-8') as f:
+            assert json.loads(f.readline())['model'] == 'flux'
+        csv_path = os.path.join(temp_dir, 'out.csv.gz')
+        exit_code, output = run_cli(temp_dir, '--json', 'export', csv_path)
+        assert json.loads(output)['rows'] == 3 and os.path.exists(csv_path)
+        exit_code, _ = run_cli(temp_dir, 'export', os.path.join(temp_dir, 'out.bin'))
+        assert exit_code == 1
+
+        # 统计
+        exit_code, output = run_cli(temp_dir, '--json', 'stats')
+        stats = json.loads(output)
+        assert stats['total_records'] == 3
+        assert stats['top_models'][0] == ['sdxl', 2]
+
+        # 重复图片
+        data_manager.update_image_hashes({1: 0x0F0F, 3: 0x0F0E})
+        exit_code, output = run_cli(temp_dir, '--json', 'duplicates', '--distance', '2')
+        groups = json.loads(output)['groups']
+        assert exit_code == 0 and [[r['id'] for r in group] for group in groups] == [[1, 3]]
+
+        # 重新关联：整个文件夹移动，只更新新位置存在的文件
+        exit_code, output = run_cli(temp_dir, '--json', 'relink', '--from', old_folder, '--to', new_folder)
+        assert json.loads(output)['updated'] == 2
+        assert data_manager.get_record_by_path(os.path.join(new_folder, 'a.png'))['prompt'] == 'a girl in red'
+
+        # 按文件名查找缺失的文件
+        moved = os.path.join(temp_dir, 'moved')
+        os.makedirs(moved)
+        with open(os.path.join(moved, 'c.png'), 'wb') as f:
+            f.write(b'y')
+        exit_code, output = run_cli(temp_dir, '--json', 'relink', '--search', moved, '--dry-run')
+        result = json.loads(output)
+        assert result['missing'] == 1 and result['matched'] == 1 and result['updated'] == 0
+        exit_code, output = run_cli(temp_dir, '--json', 'relink', '--search', moved)
+        assert json.loads(output)['updated'] == 1
+        assert data_manager.get_record_by_path(os.path.join(moved, 'c.png')) is not None
+
+        # 维护
+        exit_code, output = run_cli(temp_dir, '--json', 'vacuum', '--check')
+        assert exit_code == 0 and json.loads(output)['integrity'] == ['ok']
+
+        # 不存在的图库
+        exit_code, _ = run_cli(temp_dir, '--library', '不存在', 'stats')
+        assert exit_code == 1
+
+    print("✅ 命令行工具测试通过")
+
+
+if __name__ == "__main__":
+    test_baize_cli()
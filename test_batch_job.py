@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量任务检查点测试
+"""
+
+import os
+import sys
+import time
+import tempfile
+import threading
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.data_manager import DataManager
+from core.batch_job import BatchJob
+from core.ingest_pipeline import IngestPipeline
+
+
+def run_job(job, data_manager, paths, extract, stop_after=None):
+    """模拟 BatchProcessor.process_stream 运行任务"""
+    pipeline = IngestPipeline(extract, data_manager=data_manager, max_workers=2,
+                              queue_size=4, batch_size=10, checkpoint_callback=job.checkpoint)
+    job.attach(pipeline)
+    processed = []
+    try:
+        for result in pipeline.run(job.filter_pending(paths)):
+            processed.append(result['file_path'])
+            if stop_after and len(processed) == stop_after:
+                job.cancel()
+    finally:
+        job.finish()
+    return processed
+
+
+def test_batch_job():
+    """测试检查点、断点继续、暂停和失败文件记录"""
+    print("🧪 开始测试批量任务检查点...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, 'test.db')
+        data_manager = DataManager(db_path, data_dir=temp_dir)
+        folder = os.path.join(temp_dir, 'outputs')
+        paths = [os.path.join(folder, f'{i}.png') for i in range(200)]
+
+        def extract(file_path):
+            if file_path.endswith('7.png'):
+                raise ValueError('bad file')
+            return {'file_path': file_path, 'prompt': 'girl'}
+
+        # 第一次运行中途停止：检查点只包含已入库的文件
+        job = BatchJob.create(db_path, folder, {'incremental': False})
+        first = run_job(job, data_manager, paths, extract, stop_after=35)
+        assert job.status == 'stopped'
+        completed = BatchJob.load(db_path, job.job_id).load_completed()
+        assert completed and completed <= set(first)
+        assert data_manager.count_records() == sum(1 for p in completed if not p.endswith('7.png'))
+
+        # 模拟重启：找到可继续的任务，只处理剩余的文件
+        resumed = BatchJob.find_resumable(db_path, folder)
+        assert resumed.job_id == job.job_id and resumed.options == {'incremental': False}
+        assert BatchJob.find_resumable(db_path, os.path.join(temp_dir, 'other')) is None
+        second = run_job(resumed, data_manager, paths, extract)
+        assert resumed.skipped_count == len(completed)
+        assert set(second) == set(paths) - completed
+        assert resumed.status == 'completed'
+        assert data_manager.count_records() == 180
+        assert len(resumed.get_failed_files()) == 20
+        assert BatchJob.find_resumable(db_path, folder) is None
+
+        # 暂停后不再处理新文件，继续后正常完成
+        job = BatchJob.create(db_path, folder)
+        pipeline = IngestPipeline(lambda p: {'file_path': p}, max_workers=2, queue_size=2,
+                                  batch_size=5, checkpoint_callback=job.checkpoint)
+        job.attach(pipeline)
+        job.pause()
+        assert BatchJob.load(db_path, job.job_id).status == 'paused'
+        results = []
+        consumer = threading.Thread(target=lambda: results.extend(pipeline.run(iter(paths[:50]))))
+        consumer.start()
+        time.sleep(0.3)
+        assert len(results) <= 4
+        job.resume()
+        consumer.join(timeout=10)
+        job.finish()
+        assert len(results) == 50 and job.successful_count == 50
+        assert BatchJob.load(db_path, job.job_id).status == 'completed'
+
+    print("✅ 批量任务检查点测试通过")
+
+
+if __name__ == "__main__":
+    test_batch_job()
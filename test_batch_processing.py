@@ -76,7 +76,7 @@ def test_batch_processor():
                     html_dir,
                     include_images=False  # 不包含图片以避免大文件
                 )
-                print(f"HTML导出: 成功 {html_result['successful_count']} 个文件")
+                print(f"HTML图库导出: 成功 {html_result['successful_count']} 条记录")
         
         print("\n✅ 批量处理功能测试完成！")
 
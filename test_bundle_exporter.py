@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ZIP打包导出与导入测试
+"""
+
+import os
+import sys
+import json
+import zipfile
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
+
+from core.data_manager import DataManager
+from core.bundle_exporter import BundleExporter, import_bundle
+
+
+PROMPT = {"3": {"class_type": "KSampler", "inputs": {"seed": 1, "steps": 20}},
+          "4": {"class_type": "CheckpointLoaderSimple", "inputs": {"ckpt_name": "sdxl.safetensors"}}}
+WORKFLOW = {"last_node_id": 4, "nodes": [{"id": 3, "type": "KSampler"}, {"id": 4, "type": "CheckpointLoaderSimple"}]}
+
+
+def make_comfyui_png(path, color):
+    """生成带ComfyUI工作流文本块的PNG"""
+    info = PngInfo()
+    info.add_text('prompt', json.dumps(PROMPT))
+    info.add_text('workflow', json.dumps(WORKFLOW))
+    Image.new('RGB', (64, 48), color).save(path, pnginfo=info)
+
+
+def test_bundle_exporter():
+    """测试仅存储的原图、工作流去重、缩略图、导入和路径安全检查"""
+    print("🧪 开始测试ZIP打包...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        image_dir = os.path.join(temp_dir, 'images')
+        os.makedirs(image_dir)
+        paths = []
+        for i in range(3):
+            path = os.path.join(image_dir, f"comfy_{i}.png")
+            make_comfyui_png(path, (i * 40, 80, 120))
+            paths.append(path)
+
+        source = DataManager(os.path.join(temp_dir, 'source.db'), data_dir=temp_dir)
+        records = [{'file_path': path, 'prompt': f"prompt {i}", 'model': 'sdxl', 'seed': 1000 + i,
+                    'generation_source': 'ComfyUI', 'workflow_data': PROMPT,
+                    'lora_info': {'loras': [{'name': 'detail', 'weight': 0.5}]}}
+                   for i, path in enumerate(paths)]
+        records.append({'file_path': os.path.join(image_dir, 'missing.png'), 'prompt': 'missing'})
+        records.append({'file_path': os.path.join(image_dir, 'comfy_0_copy.png'), 'prompt': 'copy',
+                        'duplicate_of': paths[0]})
+        source.save_records_bulk(records)
+
+        bundle_path = os.path.join(temp_dir, 'share.zip')
+        progress = []
+        result = BundleExporter(thumbnail_size=32).export(
+            source.iter_records(order_by='id'), bundle_path, total=5,
+            progress_callback=lambda done, total, size: progress.append(done))
+        assert result['records'] == 5 and result['images'] == 3 and result['missing_images'] == 2
+        assert result['thumbnails'] == 3
+        # 三张图片共用同一个工作流：界面格式和执行格式各保存一份
+        assert result['workflows'] == 2
+        assert progress == [1, 2, 3, 4, 5]
+        assert not os.path.exists(bundle_path + '.part')
+
+        with zipfile.ZipFile(bundle_path) as bundle:
+            names = bundle.namelist()
+            assert 'manifest.json' in names and 'records.ndjson' in names
+            image_infos = [info for info in bundle.infolist() if info.filename.startswith('images/')]
+            assert len(image_infos) == 3
+            assert all(info.compress_type == zipfile.ZIP_STORED for info in image_infos)
+            workflow_names = sorted(name for name in names if name.startswith('workflows/'))
+            contents = [json.loads(bundle.read(name)) for name in workflow_names]
+            assert PROMPT in contents and WORKFLOW in contents
+            lines = [json.loads(line) for line in bundle.read('records.ndjson').decode('utf-8').splitlines()]
+            assert 'workflow_data' not in lines[0]
+            assert lines[0]['bundle']['workflow'] in workflow_names
+            assert lines[3]['bundle']['image'] is None
+
+        # 导入到新的图库
+        target = DataManager(os.path.join(temp_dir, 'target.db'), data_dir=temp_dir)
+        extract_dir = os.path.join(temp_dir, 'extracted')
+        result = import_bundle(target, bundle_path, extract_dir, batch_size=2)
+        assert result['records'] == 5 and result['imported'] == 5 and result['images'] == 3
+        assert result['workflows'] == 1
+
+        restored = target.search_records('prompt 1')[0]
+        assert restored['file_path'].startswith(extract_dir) and os.path.exists(restored['file_path'])
+        assert restored['seed'] == 1001
+        assert json.loads(restored['workflow_data']) == PROMPT
+        assert json.loads(restored['lora_info']) == {'loras': [{'name': 'detail', 'weight': 0.5}]}
+        with open(restored['file_path'], 'rb') as f, open(paths[1], 'rb') as original:
+            assert f.read() == original.read()
+        copy = target.search_records('copy')[0]
+        original_id = target.get_record_id_by_path(
+            next(record['file_path'] for record in target.search_records('prompt 0')))
+        assert copy['duplicate_of'] == original_id
+
+        # 包内路径不能指向解压目录之外
+        evil_path = os.path.join(temp_dir, 'evil.zip')
+        with zipfile.ZipFile(evil_path, 'w') as bundle:
+            bundle.writestr('manifest.json', json.dumps({'format': 'baize-bundle', 'version': 1, 'records': 1}))
+            bundle.writestr('records.ndjson', json.dumps({'file_path': 'x.png', 'bundle': {'image': '../../evil.png'}}))
+            bundle.writestr('../../evil.png', b'data')
+        try:
+            import_bundle(target, evil_path, extract_dir)
+            assert False, "应拒绝不安全的路径"
+        except ValueError:
+            pass
+
+    print("✅ ZIP打包测试通过")
+
+
+if __name__ == "__main__":
+    test_bundle_exporter()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+并发自动调节测试
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.concurrency_tuner import ConcurrencyTuner
+from core.ingest_pipeline import IngestPipeline
+from core.data_manager import DataManager
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def simulate(tuner, clock, throughput_for, io_ratio, windows):
+    """按线程数给出模拟吞吐量，运行若干个测量窗口"""
+    history = []
+    for _ in range(windows):
+        throughput = throughput_for(tuner.workers)
+        for _ in range(int(throughput * tuner.interval)):
+            tuner.record(0.1, 0.1 * (1 - io_ratio))
+        clock.now += tuner.interval
+        tuner.update()
+        history.append(tuner.workers)
+    return history
+
+
+def test_concurrency_tuner():
+    """测试 CPU 密集、I/O 密集和慢速存储下的线程数调节"""
+    print("🧪 开始测试并发自动调节...")
+
+    # CPU 密集：线程数不超过 CPU 核数
+    clock = FakeClock()
+    tuner = ConcurrencyTuner(max_workers=32, initial_workers=2, clock=clock)
+    tuner.cpu_count = 4
+    simulate(tuner, clock, lambda w: 50 * w, io_ratio=0.1, windows=20)
+    assert tuner.workers == 4
+    assert tuner.get_status()['mode'] == 'cpu'
+
+    # I/O 密集且吞吐量随线程数增加（快速SSD）：逐步增加到上限
+    clock = FakeClock()
+    tuner = ConcurrencyTuner(max_workers=12, initial_workers=2, clock=clock)
+    tuner.cpu_count = 4
+    simulate(tuner, clock, lambda w: 50 * w, io_ratio=0.8, windows=20)
+    assert tuner.workers == 12
+
+    # 慢速网络共享目录：超过3个线程后吞吐量下降，线程数维持在最优值附近
+    clock = FakeClock()
+    tuner = ConcurrencyTuner(max_workers=16, initial_workers=6, clock=clock)
+    history = simulate(tuner, clock, lambda w: 30 - 5 * abs(w - 3), io_ratio=0.9, windows=30)
+    assert all(abs(w - 3) <= 1 for w in history[-10:])
+    assert tuner.get_decisions() and tuner.get_decisions()[0]['old_workers'] == 6
+
+    # 样本不足或窗口未结束时不调整
+    clock = FakeClock()
+    tuner = ConcurrencyTuner(initial_workers=2, clock=clock)
+    tuner.record(0.1, 0.05)
+    clock.now += 10
+    assert tuner.update() is None and tuner.workers == 2
+
+    # 流水线使用调节器决定的线程数
+    with tempfile.TemporaryDirectory() as temp_dir:
+        data_manager = DataManager(os.path.join(temp_dir, 'test.db'), data_dir=temp_dir)
+
+        def extract(file_path):
+            time.sleep(0.001)
+            return {'file_path': file_path}
+
+        tuner = ConcurrencyTuner(max_workers=6, initial_workers=2, interval=0.05, min_samples=5)
+        pipeline = IngestPipeline(extract, data_manager=data_manager, queue_size=4,
+                                  batch_size=50, tuner=tuner)
+        results = list(pipeline.run(os.path.join(temp_dir, f'{i}.png') for i in range(300)))
+        assert len(results) == 300 and pipeline.saved_count == 300
+        assert pipeline.get_status()['workers'] == tuner.workers
+        assert data_manager.count_records() == 300
+
+    print("✅ 并发自动调节测试通过")
+
+
+if __name__ == "__main__":
+    test_concurrency_tuner()
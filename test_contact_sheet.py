@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+联系表与图集导出测试
+"""
+
+import os
+import re
+import sys
+import json
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image
+
+from core.data_manager import DataManager
+from core.thumbnail_cache import ThumbnailCache
+from core.contact_sheet import ContactSheetExporter, SpriteAtlasWriter, MAX_SHEET_SIZE, format_parameters
+from core.gallery_exporter import GalleryExporter
+
+
+def test_contact_sheet():
+    """测试缩略图缓存、多页PNG/PDF联系表、图集位置表和HTML图库的图集模式"""
+    print("🧪 开始测试联系表导出...")
+
+    assert format_parameters({'seed': 42, 'cfg_scale': 7.0, 'steps': 20}) == 'seed 42 · cfg 7 · steps 20'
+    assert format_parameters({'seed': 42, 'sampler': 'euler'}, ['seed', 'cfg_scale', 'sampler']) == 'seed 42 · euler'
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        image_dir = os.path.join(temp_dir, 'images')
+        os.makedirs(image_dir)
+        records = []
+        for i in range(7):
+            path = os.path.join(image_dir, f"seed_{i}.png")
+            Image.new('RGB', (120, 180), (i * 30, 200, 100)).save(path)
+            records.append({'file_path': path, 'prompt': f"variant {i}", 'seed': 1000 + i,
+                            'cfg_scale': 7.5, 'steps': 20})
+        records.append({'file_path': os.path.join(image_dir, 'missing.png'), 'prompt': 'missing'})
+        data_manager = DataManager(os.path.join(temp_dir, 'test.db'), data_dir=temp_dir)
+        data_manager.save_records_bulk(records)
+
+        # 缩略图缓存：第二次读取缓存文件，原图修改后重新生成
+        cache = ThumbnailCache(os.path.join(temp_dir, 'cache'), size=64)
+        thumb = cache.get(records[0]['file_path'])
+        assert thumb.size == (43, 64)
+        cache_path = cache.cache_path(records[0]['file_path'])
+        assert os.path.exists(cache_path)
+        assert cache.get(records[0]['file_path']).size == (43, 64)
+        assert cache.get(os.path.join(image_dir, 'missing.png')) is None
+        os.utime(records[0]['file_path'], (1, 1))
+        assert cache.cache_path(records[0]['file_path']) != cache_path
+
+        exporter = ContactSheetExporter(columns=2, rows=2, cell_size=64, thumbnail_cache=cache, max_workers=2)
+        progress = []
+        result = exporter.export(data_manager.iter_records(order_by='id'), os.path.join(temp_dir, 'sheet.png'),
+                                 total=8, progress_callback=lambda done, total, path: progress.append(done))
+        assert result['pages'] == 2 and result['records'] == 8
+        assert result['images'] == 7 and result['missing_images'] == 1
+        assert progress == list(range(1, 9))
+        assert [os.path.basename(path) for path in result['output_paths']] == ['sheet-001.png', 'sheet-002.png']
+        with Image.open(result['output_paths'][0]) as page:
+            first_page_size = page.size
+            # 第一个格子中是缩略图而不是背景色
+            x, y = exporter._cell_origin(0)
+            assert page.getpixel((x + 32, y + 32)) != (255, 255, 255)
+
+        result = exporter.export(data_manager.iter_records(order_by='id'), os.path.join(temp_dir, 'sheet.pdf'))
+        assert result['output_paths'] == [os.path.join(temp_dir, 'sheet.pdf')]
+        assert not os.path.exists(os.path.join(temp_dir, 'sheet.pdf.part'))
+        with open(os.path.join(temp_dir, 'sheet.pdf'), 'rb') as f:
+            # 逐页追加写入：最后一次更新的页面树中共有两页
+            assert re.findall(rb'/Count\s+(\d+)', f.read())[-1] == b'2'
+        assert first_page_size[0] == 2 * (64 + exporter.padding) + exporter.padding
+
+        # 图集：每张图集的格子数与每页相同，位置表以记录ID为键
+        atlas_dir = os.path.join(temp_dir, 'atlas')
+        atlas = exporter.export_atlas(data_manager.iter_records(order_by='id'), atlas_dir)
+        assert len(atlas['sheets']) == 2 and len(atlas['sprites']) == 7
+        with open(os.path.join(atlas_dir, 'atlas.json'), encoding='utf-8') as f:
+            assert json.load(f) == json.loads(json.dumps(atlas))
+        first_id = str(data_manager.get_record_id_by_path(records[0]['file_path']))
+        assert atlas['sprites'][first_id] == {'sheet': 0, 'column': 0, 'row': 0, 'x': 0, 'y': 0}
+        assert os.path.exists(os.path.join(atlas_dir, atlas['sheets'][1]['file']))
+
+        # HTML图库的图集模式：每页一张图集
+        gallery_dir = os.path.join(temp_dir, 'gallery')
+        result = GalleryExporter(page_size=3, thumbnail_size=48, preview_size=0, sprite_atlas=True).export(
+            data_manager.iter_records(order_by='id'), gallery_dir)
+        assert result['pages'] == 3 and result['sprite_sheets'] == 3
+        with open(os.path.join(gallery_dir, 'index.html'), encoding='utf-8') as f:
+            html = f.read()
+        assert html.count('class="sprite"') == 3 and 'assets/sprites-1.' in html
+        with open(os.path.join(gallery_dir, 'page-3.html'), encoding='utf-8') as f:
+            html = f.read()
+        assert html.count('class="sprite"') == 1 and 'no-image' in html
+
+        # 图集不超过 WebP 的尺寸上限：列数不够时增加列，仍放不下时分成多张
+        limit_dir = os.path.join(temp_dir, 'limit')
+        writer = SpriteAtlasWriter(limit_dir, cell_size=600, columns=1, per_sheet=30)
+        assert writer.columns == 2
+        tile = Image.new('RGB', (600, 600), (10, 20, 30))
+        for i in range(30):
+            writer.add(str(i), tile)
+        atlas = writer.close()
+        assert all(max(sheet['width'], sheet['height']) <= MAX_SHEET_SIZE for sheet in atlas['sheets'])
+        assert len(atlas['sprites']) == 30
+        assert SpriteAtlasWriter(limit_dir, cell_size=8000, per_sheet=10).per_sheet == 4
+
+        # 图集写出失败时图库仍然导出，卡片使用单独的缩略图
+        failed_dir = os.path.join(temp_dir, 'failed_gallery')
+        os.makedirs(os.path.join(failed_dir, 'assets', 'sprites-1.webp'))
+        result = GalleryExporter(page_size=3, thumbnail_size=48, preview_size=0, sprite_atlas=True).export(
+            data_manager.iter_records(order_by='id'), failed_dir)
+        assert result['records'] == 8 and result['sprite_sheets'] == 2
+        with open(os.path.join(failed_dir, 'index.html'), encoding='utf-8') as f:
+            html = f.read()
+        assert 'class="sprite"' not in html and html.count('assets/thumbs/') == 3
+
+    print("✅ 联系表导出测试通过")
+
+
+if __name__ == "__main__":
+    test_contact_sheet()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+训练数据集导出测试
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image
+
+from core.data_manager import DataManager
+from core.dataset_exporter import DatasetExporter, clean_caption, MANIFEST_NAME
+
+
+def test_dataset_exporter():
+    """测试标注清理、链接与转换、增量导出和参数变化后的重新生成"""
+    print("🧪 开始测试训练数据集导出...")
+
+    assert clean_caption("(masterpiece:1.2), ((1girl)), [red hair], <lora:detail:0.6>, smile, Smile") == [
+        'masterpiece', '1girl', 'red hair', 'smile']
+    assert clean_caption(r"\(cosplay\), score_9, score_8_up, solo", exclude_tokens=['score_*']) == [
+        '(cosplay)', 'solo']
+    assert clean_caption("a, b, c, d", max_tokens=2) == ['a', 'b']
+    assert clean_caption("(word:1.2)", strip_weights=False) == ['(word:1.2)']
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        image_dir = os.path.join(temp_dir, 'images')
+        os.makedirs(image_dir)
+        paths = []
+        for i in range(4):
+            path = os.path.join(image_dir, f"image {i}.png")
+            Image.new('RGB', (200, 120), (i * 50, 80, 120)).save(path)
+            paths.append(path)
+
+        data_manager = DataManager(os.path.join(temp_dir, 'test.db'), data_dir=temp_dir)
+        records = [{'file_path': path, 'prompt': f"(best quality:1.1), mystyle, girl {i}, <lora:style:0.8>",
+                    'tags': 'portrait'} for i, path in enumerate(paths)]
+        records.append({'file_path': os.path.join(image_dir, 'missing.png'), 'prompt': 'missing'})
+        data_manager.save_records_bulk(records)
+
+        # 不需要转换：链接或复制原图
+        output_dir = os.path.join(temp_dir, 'dataset')
+        exporter = DatasetExporter(caption_source='both', trigger_word='mystyle',
+                                   exclude_tokens=['best quality'])
+        result = exporter.export(data_manager.iter_records(order_by='id'), output_dir)
+        assert result['images'] == 4 and result['missing'] == 1 and result['failed'] == 0
+        assert result['linked'] + result['copied'] == 4 and result['converted'] == 0
+
+        first_record = data_manager.get_record_by_path(paths[0])
+        caption_path = os.path.join(output_dir, f"{first_record['id']}_image_0.txt")
+        with open(caption_path, encoding='utf-8') as f:
+            assert f.read() == 'mystyle, portrait, girl 0'
+        image_path = os.path.join(output_dir, f"{first_record['id']}_image_0.png")
+        with open(image_path, 'rb') as f, open(paths[0], 'rb') as original:
+            assert f.read() == original.read()
+
+        # 再次运行：没有变化时不处理图片也不重写标注
+        result = exporter.export(data_manager.iter_records(order_by='id'), output_dir)
+        assert result['unchanged'] == 4 and result['images'] == 0 and result['captions'] == 0
+
+        # 修改一张原图后只处理这一张
+        time.sleep(0.01)
+        Image.new('RGB', (210, 120), (0, 0, 0)).save(paths[1])
+        result = exporter.export(data_manager.iter_records(order_by='id'), output_dir)
+        assert result['images'] == 1 and result['unchanged'] == 3
+
+        # 缩放和转换格式：在进程池中处理，旧的链接文件被替换
+        exporter = DatasetExporter(resolution=64, square_crop=True, image_format='jpg', max_workers=2)
+        result = exporter.export(data_manager.iter_records(order_by='id'), output_dir)
+        assert result['converted'] == 4 and result['captions'] == 4
+        assert not os.path.exists(image_path)
+        with Image.open(os.path.join(output_dir, f"{first_record['id']}_image_0.jpg")) as img:
+            assert img.size == (64, 64) and img.format == 'JPEG'
+        with open(caption_path, encoding='utf-8') as f:
+            assert f.read() == 'best quality, mystyle, girl 0'
+        # 原图不受影响
+        with Image.open(paths[0]) as img:
+            assert img.size == (200, 120)
+
+        with open(os.path.join(output_dir, MANIFEST_NAME), encoding='utf-8') as f:
+            assert len(json.load(f)['entries']) == 4
+        result = exporter.export(data_manager.iter_records(order_by='id'), output_dir)
+        assert result['unchanged'] == 4 and result['converted'] == 0
+
+    print("✅ 训练数据集导出测试通过")
+
+
+if __name__ == "__main__":
+    test_dataset_exporter()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库维护功能测试
+"""
+
+import os
+import sys
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.data_manager import DataManager
+
+
+def test_db_maintenance():
+    """测试在线备份、增量VACUUM、完整性检查和任务调度"""
+    print("🧪 开始测试数据库维护功能...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        data_manager = DataManager(os.path.join(temp_dir, 'test.db'), data_dir=temp_dir)
+        maintenance = data_manager.maintenance
+        maintenance.min_free_pages = 1
+
+        for i in range(200):
+            data_manager.save_record({
+                'file_path': os.path.join(temp_dir, f'{i}.png'),
+                'prompt': 'girl, ' * 100,
+                'workflow_data': {'nodes': ['x' * 2000]},
+            })
+
+        # 分步在线备份
+        progress = []
+        backup_path = maintenance.backup(pages_per_step=8, pause=0,
+                                         progress_callback=lambda copied, total: progress.append(copied))
+        assert len(progress) > 1
+        with sqlite3.connect(backup_path) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM image_records").fetchone()[0] == 200
+
+        # 删除记录后产生空闲页，增量VACUUM回收
+        data_manager.clear_all_records()
+        stats = maintenance.get_db_stats()
+        assert stats['freelist_count'] > 0 and maintenance.needs_vacuum(stats)
+        assert maintenance.run_task('vacuum') > 0
+        stats = maintenance.get_db_stats()
+        assert stats['freelist_count'] == 0 and stats['auto_vacuum'] == 'incremental'
+
+        assert maintenance.integrity_check() == ['ok']
+
+        # 未启用增量清理的旧数据库：定时维护不会重建整个文件，只有确认后才转换
+        legacy_path = os.path.join(temp_dir, 'legacy.db')
+        with sqlite3.connect(legacy_path) as conn:
+            conn.execute("CREATE TABLE filler (data TEXT)")
+            conn.executemany("INSERT INTO filler VALUES (?)", [('x' * 2000,) for _ in range(300)])
+            conn.execute("DELETE FROM filler")
+        legacy = DataManager(legacy_path, data_dir=temp_dir).maintenance
+        legacy.min_free_pages = 1
+        assert legacy.needs_conversion() and legacy.needs_vacuum()
+        assert legacy.run_task('vacuum') == 0 and legacy.incremental_vacuum() == 0
+        assert legacy.get_db_stats()['auto_vacuum'] == 'none'
+        assert 'convert_vacuum' not in legacy.get_due_tasks()
+        assert legacy.run_task('convert_vacuum') > 0
+        assert not legacy.needs_conversion() and legacy.get_db_stats()['freelist_count'] == 0
+
+        # 调度：执行过的任务在间隔内不再到期
+        results = maintenance.run_due_tasks()
+        assert set(results) == {'optimize', 'analyze', 'integrity_check', 'backup'}
+        assert maintenance.get_due_tasks() == []
+        assert 'optimize' in maintenance.get_due_tasks(datetime.now() + timedelta(hours=7))
+
+        # 取消只对当时的任务有效，之后的定时维护照常执行
+        maintenance.cancel()
+        results = maintenance.run_due_tasks(datetime.now() + timedelta(hours=7))
+        assert 'optimize' in results and not maintenance.is_cancelled
+
+        # 备份出错时不留下不完整的文件
+        def failing_progress(copied, total):
+            raise OSError('磁盘已满')
+
+        failed_path = os.path.join(temp_dir, 'failed.db')
+        try:
+            maintenance.backup(failed_path, pages_per_step=1, pause=0, progress_callback=failing_progress)
+        except OSError:
+            pass
+        else:
+            raise AssertionError("备份出错时应当抛出异常")
+        assert not os.path.exists(failed_path + '.part') and not os.path.exists(failed_path)
+
+        # 旧备份按保留数量清理
+        maintenance.keep_backups = 1
+        maintenance.prune_backups()
+        assert len(maintenance.list_backups()) == 1
+
+    print("✅ 数据库维护功能测试通过")
+
+
+if __name__ == "__main__":
+    test_db_maintenance()
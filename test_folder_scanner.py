@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文件夹扫描功能测试
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.folder_scanner import FolderScanner
+
+
+def test_folder_scanner():
+    """测试并行扫描、隐藏目录、忽略规则和符号链接循环"""
+    print("🧪 开始测试文件夹扫描功能...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for sub in ['a', 'a/b', '.hidden', 'c', 'temp']:
+            os.makedirs(os.path.join(temp_dir, sub), exist_ok=True)
+        for name in ['1.png', 'a/2.jpg', 'a/b/3.PNG', '.hidden/4.png', 'c/5.txt',
+                     'temp/6.png', 'a/x_thumb.png']:
+            with open(os.path.join(temp_dir, name), 'w') as f:
+                f.write('x' * 10)
+
+        # 指向上级目录的符号链接不应导致无限循环
+        try:
+            os.symlink(temp_dir, os.path.join(temp_dir, 'a', 'loop'))
+        except (OSError, NotImplementedError):
+            pass
+
+        scanner = FolderScanner({'.png', '.jpg'}, ignore_patterns=['*_thumb*', 'temp'], max_workers=4)
+        counts = []
+        results = list(scanner.scan(temp_dir, progress_callback=lambda files, dirs: counts.append(files)))
+        paths = sorted(os.path.relpath(item.path, temp_dir).replace(os.sep, '/') for item in results)
+        assert paths == ['1.png', 'a/2.jpg', 'a/b/3.PNG']
+        assert all(item.size == 10 and item.mtime > 0 for item in results)
+        assert counts == [1, 2, 3]
+        assert scanner.files_found == 3
+
+        # 不递归
+        assert [os.path.basename(p) for p in scanner.scan_paths(temp_dir, recursive=False)] == ['1.png']
+
+        # 取消扫描
+        for i in range(300):
+            with open(os.path.join(temp_dir, 'c', f'{i}.png'), 'w') as f:
+                f.write('x')
+        scanner = FolderScanner({'.png'}, queue_size=4)
+        found = 0
+        for _ in scanner.scan(temp_dir):
+            found += 1
+            if found == 10:
+                scanner.cancel()
+        assert scanner.is_cancelled and found < 300
+
+        # 目录已扫描完、结果队列已满时提前关闭：工作线程也能退出
+        single = os.path.join(temp_dir, 'single')
+        os.makedirs(single)
+        for name in ('x.png', 'y.png'):
+            with open(os.path.join(single, name), 'w') as f:
+                f.write('x')
+        scanner = FolderScanner({'.png'}, max_workers=1, queue_size=1)
+        threads_before = threading.active_count()
+        results = scanner.scan(single)
+        next(results)
+        deadline = time.time() + 5
+        while scanner.dirs_scanned < 1 and time.time() < deadline:
+            time.sleep(0.01)
+        results.close()
+        assert scanner.is_cancelled
+        assert threading.active_count() == threads_before
+
+    print("✅ 文件夹扫描功能测试通过")
+
+
+if __name__ == "__main__":
+    test_folder_scanner()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文件夹监视测试
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.data_manager import DataManager
+from core.change_bus import RECORDS_ADDED
+from core.folder_scanner import FolderScanner
+from core.folder_watcher import FolderWatcher, load_watch_config, save_watch_config
+from core.ingest_pipeline import IngestPipeline
+
+
+class SimpleProcessor:
+    """与 BatchProcessor 接口相同的简单处理器（只记录文件信息，不读取图片）"""
+
+    supported_formats = {'.png', '.jpg'}
+
+    def __init__(self, data_manager):
+        self.data_manager = data_manager
+
+    def iter_changed_images(self, folder_path, recursive=True):
+        manifest = self.data_manager.get_file_manifest(folder_path)
+        for scanned in FolderScanner(self.supported_formats).scan(folder_path, recursive):
+            if manifest.get(scanned.path) != (scanned.size, scanned.mtime):
+                yield scanned.path
+
+    def process_stream(self, image_files, auto_save=True, max_workers=2, batch_size=50):
+        def extract(file_path):
+            if 'broken' in os.path.basename(file_path):
+                raise ValueError('无法读取图片')
+            stat = os.stat(file_path)
+            return {'file_path': file_path, 'file_size': stat.st_size, 'file_mtime': stat.st_mtime}
+        pipeline = IngestPipeline(extract, self.data_manager if auto_save else None,
+                                  max_workers=max_workers, batch_size=batch_size)
+        return pipeline.run(image_files)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_folder_watcher():
+    """测试写入完成判断、入库、变更通知和轮询监视"""
+    print("🧪 开始测试文件夹监视...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        data_manager = DataManager(os.path.join(temp_dir, 'test.db'), data_dir=temp_dir)
+        folder = os.path.join(temp_dir, 'outputs')
+        os.makedirs(folder)
+        events = []
+        data_manager.change_bus.subscribe(lambda event, payload: events.append((event, payload)))
+
+        # 文件大小在 settle_time 内保持不变才视为写入完成
+        clock = FakeClock()
+        watcher = FolderWatcher(SimpleProcessor(data_manager), [folder], settle_time=1.0,
+                                change_bus=data_manager.change_bus, clock=clock)
+        image_path = os.path.join(folder, 'a.png')
+        with open(image_path, 'wb') as f:
+            f.write(b'x' * 100)
+        watcher.notify(image_path)
+        watcher.notify(os.path.join(folder, 'notes.txt'))
+        watcher.notify(os.path.join(folder, '.tmp.png'))
+        assert watcher.pending_count == 1
+        assert watcher.collect_ready() == []
+
+        clock.now += 0.5
+        with open(image_path, 'ab') as f:
+            f.write(b'x' * 100)
+        os.utime(image_path, (time.time() + 5, time.time() + 5))
+        assert watcher.collect_ready() == []
+        clock.now += 0.9
+        assert watcher.collect_ready() == []
+        clock.now += 0.2
+        assert watcher.collect_ready() == [image_path]
+        assert watcher.pending_count == 0
+
+        # 写入过程中被删除的临时文件直接丢弃
+        watcher.notify(os.path.join(folder, 'gone.png'))
+        assert watcher.collect_ready() == [] and watcher.pending_count == 0
+
+        assert watcher.ingest([image_path]) == 1
+        assert data_manager.count_records() == 1
+        assert events == [(RECORDS_ADDED, {'paths': [image_path], 'count': 1, 'source': 'folder_watcher'})]
+
+        # 没有入库的文件在变化之前不再重复处理
+        broken_path = os.path.join(folder, 'broken.png')
+        with open(broken_path, 'wb') as f:
+            f.write(b'!' * 10)
+        watcher.poll_once()
+        assert watcher.pending_count == 1
+        clock.now += 0.5
+        watcher.collect_ready()
+        clock.now += 1.5
+        assert watcher.ingest(watcher.collect_ready()) == 0
+        watcher.poll_once()
+        assert watcher.pending_count == 0 and watcher.get_status()['failed'] == 1
+        with open(broken_path, 'ab') as f:
+            f.write(b'!')
+        watcher.poll_once()
+        assert watcher.pending_count == 1
+        watcher.collect_ready()
+        os.remove(broken_path)
+        assert watcher.collect_ready() == [] and watcher.pending_count == 0
+
+        # 轮询模式：启动时补扫已有文件，之后发现新文件
+        events.clear()
+        with open(os.path.join(folder, 'b.png'), 'wb') as f:
+            f.write(b'y' * 10)
+        watcher = FolderWatcher(SimpleProcessor(data_manager), [folder], settle_time=0.1,
+                                poll_interval=0.1, change_bus=data_manager.change_bus,
+                                use_native=False)
+        watcher.start()
+        try:
+            assert watcher.mode == 'polling'
+            deadline = time.time() + 5
+            while data_manager.count_records() < 2 and time.time() < deadline:
+                time.sleep(0.05)
+            with open(os.path.join(folder, 'sub.jpg'), 'wb') as f:
+                f.write(b'z' * 10)
+            while data_manager.count_records() < 3 and time.time() < deadline:
+                time.sleep(0.05)
+        finally:
+            watcher.stop()
+        assert data_manager.count_records() == 3
+        assert not watcher.is_running
+        added = sorted(os.path.basename(path) for _, payload in events for path in payload['paths'])
+        assert added == ['b.png', 'sub.jpg']
+
+        # 设置读写
+        config_path = os.path.join(temp_dir, 'watch_folders.json')
+        assert load_watch_config(config_path) == {'enabled': False, 'recursive': True, 'folders': []}
+        assert save_watch_config(config_path, {'enabled': True, 'recursive': True, 'folders': [folder]})
+        assert load_watch_config(config_path)['folders'] == [folder]
+
+    print("✅ 文件夹监视测试通过")
+
+
+if __name__ == "__main__":
+    test_folder_watcher()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTML图库导出测试
+"""
+
+import os
+import sys
+import json
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.data_manager import DataManager
+from core.gallery_exporter import GalleryExporter
+from core.batch_processor import BatchProcessor
+
+
+def load_search_index(output_dir):
+    with open(os.path.join(output_dir, 'assets', 'search-index.js'), encoding='utf-8') as f:
+        content = f.read()
+    prefix = 'window.BAIZE_GALLERY = '
+    assert content.startswith(prefix)
+    return json.loads(content[len(prefix):].rstrip().rstrip(';'))
+
+
+def test_gallery_exporter():
+    """测试分页、详情页、搜索索引、原图复制和转义"""
+    print("🧪 开始测试HTML图库导出...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        image_path = os.path.join(temp_dir, 'real.png')
+        with open(image_path, 'wb') as f:
+            f.write(b'\x89PNG\r\n\x1a\n' + b'\0' * 32)
+
+        data_manager = DataManager(os.path.join(temp_dir, 'test.db'), data_dir=temp_dir)
+        records = [{'file_path': f"/images/img{i}.png", 'prompt': f"cat number {i}", 'model': 'sdxl'}
+                   for i in range(25)]
+        records.append({'file_path': image_path, 'prompt': '<script>alert(1)</script> dog',
+                        'model': 'flux'})
+        data_manager.save_records_bulk(records)
+
+        progress = []
+        output_dir = os.path.join(temp_dir, 'gallery')
+        exporter = GalleryExporter(page_size=10, include_originals=True, max_workers=2)
+        result = exporter.export(data_manager.iter_records(order_by='id'), output_dir, total=26,
+                                 progress_callback=lambda done, total, path: progress.append(done))
+
+        assert result['records'] == 26 and result['pages'] == 3
+        assert not result['cancelled']
+        assert progress == list(range(1, 27))
+        assert result['bytes'] > 0
+
+        # 分页索引页
+        for name in ('index.html', 'page-2.html', 'page-3.html'):
+            assert os.path.exists(os.path.join(output_dir, name))
+        assert not os.path.exists(os.path.join(output_dir, 'page-4.html'))
+        with open(os.path.join(output_dir, 'index.html'), encoding='utf-8') as f:
+            index_html = f.read()
+        assert index_html.count('class="card"') == 10
+        assert 'href="page-3.html"' in index_html
+        assert 'assets/search-index.js' in index_html
+
+        # 详情页：文本已转义，原图通过相对路径引用
+        record_id = data_manager.get_record_id_by_path(image_path)
+        with open(os.path.join(output_dir, 'records', f"{record_id}.html"), encoding='utf-8') as f:
+            detail_html = f.read()
+        assert '<script>alert(1)</script>' not in detail_html
+        assert '&lt;script&gt;' in detail_html
+        assert f'src="../assets/originals/{record_id}.png"' in detail_html
+        assert 'loading="lazy"' in detail_html
+        assert 'href="../page-3.html"' in detail_html
+        assert os.path.exists(os.path.join(output_dir, 'assets', 'originals', f"{record_id}.png"))
+        assert len(os.listdir(os.path.join(output_dir, 'records'))) == 26
+
+        # 搜索索引：每条记录一项，包含所在页码
+        index = load_search_index(output_dir)
+        assert len(index['records']) == 26
+        entry = next(item for item in index['records'] if item['k'] == str(record_id))
+        assert entry['p'] == 3 and entry['m'] == 'flux' and 'dog' in entry['s']
+
+        # 取消：不再提交新的记录
+        exporter = GalleryExporter(page_size=10, thumbnail_size=0)
+
+        def cancel_after_first(done, total, path):
+            exporter.cancel()
+
+        result = exporter.export(data_manager.iter_records(), os.path.join(temp_dir, 'cancelled'),
+                                 progress_callback=cancel_after_first)
+        assert result['cancelled'] and result['records'] < 26
+
+        # 批量处理器的HTML导出同样生成图库，而不是每条记录一个内嵌原图的页面
+        batch_dir = os.path.join(temp_dir, 'batch_html')
+        result = BatchProcessor(data_manager).batch_export_html(data_manager.get_all_records(), batch_dir,
+                                                                include_images=False, page_size=10)
+        assert result['successful_count'] == 26 and result['gallery']['pages'] == 3
+        assert result['successful_exports'] == [os.path.join(batch_dir, 'index.html')]
+        assert len(os.listdir(os.path.join(batch_dir, 'records'))) == 26
+        assert not os.listdir(os.path.join(batch_dir, 'assets', 'thumbs'))
+
+    print("✅ HTML图库导出测试通过")
+
+
+if __name__ == "__main__":
+    test_gallery_exporter()
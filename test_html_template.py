@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTML模板与流式渲染测试
+"""
+
+import os
+import sys
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.html_template import HTMLTemplate, Markup, escape
+from core.html_exporter import HTMLExporter
+
+
+def test_html_template():
+    """测试模板解析、转义、流式写入和导出器共用模板"""
+    print("🧪 开始测试HTML模板...")
+
+    template = HTMLTemplate('<style>a {{ color: red; }}</style><h1 title="{title}">{title}</h1>{items}')
+    assert template.fields == {'title', 'items'}
+
+    result = template.render({'title': '"<猫>" & 狗', 'items': [Markup('<b>1</b>'), '<i>', None, 3]})
+    assert result == ('<style>a { color: red; }</style>'
+                      '<h1 title="&quot;&lt;猫&gt;&quot; &amp; 狗">&quot;&lt;猫&gt;&quot; &amp; 狗</h1>'
+                      '<b>1</b>&lt;i&gt;3')
+    assert escape(None) == '' and escape(Markup('<br>')) == '<br>'
+
+    # 生成器逐项写入
+    assert template.render({'title': '', 'items': (Markup(f'<p>{i}</p>') for i in range(3))}).endswith(
+        '<p>0</p><p>1</p><p>2</p>')
+
+    for bad in ('{value:>10}', '{value!r}'):
+        try:
+            HTMLTemplate(bad)
+            assert False, "应拒绝格式说明"
+        except ValueError:
+            pass
+    try:
+        template.render({'title': 'x'})
+        assert False, "缺少插槽应报错"
+    except KeyError:
+        pass
+
+    # 导出器共用同一个已解析的模板，单页渲染与写入文件结果一致
+    record = {
+        'file_name': 'a.png',
+        'prompt': '<lora:detail:0.6> masterpiece',
+        'negative_prompt': 'lowres </script>',
+        'lora_info': '{"loras": [{"name": "<detail>", "weight": 0.6, "hash": "0123456789ab"}]}',
+    }
+    exporter = HTMLExporter()
+    assert exporter.template is HTMLExporter().template
+    content = exporter.export_single_record(record, include_image=False)
+    assert '&lt;lora:detail:0.6&gt; masterpiece' in content
+    assert 'Hash: 01234567...' in content and '&lt;detail&gt;' in content
+    assert 'lowres </script>' not in content
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_path = os.path.join(temp_dir, 'record.html')
+        assert exporter.export_to_html(record, output_path, include_image=False,
+                                       nav_html='<a href="index.html">返回</a>')
+        with open(output_path, encoding='utf-8') as f:
+            written = f.read()
+        assert '<a href="index.html">返回</a>' in written
+        assert written.count('lora-bubble') == content.count('lora-bubble')
+
+    print("✅ HTML模板测试通过")
+
+
+if __name__ == "__main__":
+    test_html_template()
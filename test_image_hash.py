@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+感知哈希与重复图片查找测试
+"""
+
+import os
+import sys
+import random
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image
+
+from core.data_manager import DataManager
+from core.image_hash import (HashIndex, compute_dhash, dhash_from_pixels, group_similar, hamming_distance,
+                             nearest, to_signed64, to_unsigned64)
+from core.ingest_pipeline import IngestPipeline, SkipFile
+
+
+def flip_bits(value, positions):
+    """翻转指定的位"""
+    for position in positions:
+        value ^= 1 << position
+    return to_signed64(value)
+
+
+def test_image_hash():
+    """测试哈希计算、多索引查询、分组和数据库中的重复图片查找"""
+    print("🧪 开始测试感知哈希...")
+
+    # dHash：右侧像素更亮时为1
+    rising = [[column for column in range(9)] for _ in range(8)]
+    assert to_unsigned64(dhash_from_pixels(rising)) == (1 << 64) - 1
+    assert dhash_from_pixels([[5] * 9 for _ in range(8)]) == 0
+    assert dhash_from_pixels(rising) == -1  # 以有符号 64 位保存到 SQLite
+
+    rng = random.Random(7)
+    base = [rng.getrandbits(64) for _ in range(300)]
+    near = flip_bits(base[0], [1, 20, 40, 63])
+    assert hamming_distance(base[0], near) == 4
+
+    # 多索引哈希表：距离不超过阈值的都能找到（包括跨段翻转）
+    index = HashIndex((f"img{i}.png", value) for i, value in enumerate(base))
+    assert len(index) == 300
+    matches = index.query(near, max_distance=6)
+    assert matches == [(4, 'img0.png')]
+    assert index.query(near, max_distance=3) == []
+    far = flip_bits(base[5], [0, 1, 2, 3, 4, 5, 6, 7, 8])
+    assert index.find(far, max_distance=9) == 'img5.png'
+    assert index.find(far, max_distance=8) is None
+
+    # 原子的查找或添加：自身不算重复
+    assert index.match_or_add('new.png', near) == 'img0.png'
+    assert index.match_or_add('img1.png', base[1]) is None
+    unique = flip_bits(base[2], range(0, 64, 2))
+    assert index.match_or_add('unique.png', unique) is None
+    assert index.find(unique, 0) == 'unique.png'
+
+    # 线性查询
+    assert nearest(near, base, 6) == [(4, 0)]
+
+    # 分组：完全相同的哈希和距离链上的哈希连成一组
+    hashes = list(base[:50]) + [base[3], flip_bits(base[3], [10, 30]), flip_bits(base[3], [10, 30, 50, 60, 62]),
+                                base[7]]
+    groups = group_similar(hashes, max_distance=6)
+    assert groups == [[3, 50, 51, 52], [7, 53]]
+    assert group_similar(hashes, max_distance=0) == [[3, 50], [7, 53]]
+    assert group_similar([base[0]]) == []
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # 调色板、1 位和 16 位灰度的大图与 RGB 版本哈希相近（reduce 不支持这些模式）
+        source = Image.new('RGB', (400, 300))
+        source.putdata([(x * 255 // 399, (x + y) % 256, y * 255 // 299) for y in range(300) for x in range(400)])
+        source.save(os.path.join(temp_dir, 'rgb.png'))
+        source.convert('P').save(os.path.join(temp_dir, 'palette.png'))
+        source.convert('1').save(os.path.join(temp_dir, 'bitmap.png'))
+        source.convert('L').convert('I').point(lambda value: value * 256).convert('I;16').save(
+            os.path.join(temp_dir, 'gray16.png'))
+        assert Image.open(os.path.join(temp_dir, 'gray16.png')).mode == 'I;16'
+        rgb_hash = compute_dhash(os.path.join(temp_dir, 'rgb.png'))
+        for name in ('palette.png', 'bitmap.png', 'gray16.png'):
+            value = compute_dhash(os.path.join(temp_dir, name))
+            assert value is not None and hamming_distance(value, rgb_hash) <= 16, name
+
+        data_manager = DataManager(os.path.join(temp_dir, 'test.db'), data_dir=temp_dir)
+        data_manager.save_records_bulk([
+            {'file_path': '/images/a.png', 'prompt': 'a', 'image_hash': base[0]},
+            {'file_path': '/images/b.png', 'prompt': 'b', 'image_hash': base[1]},
+            {'file_path': '/images/a_copy.png', 'prompt': 'a', 'image_hash': near,
+             'duplicate_of': '/images/a.png'},
+            {'file_path': '/images/c.png', 'prompt': 'c'},
+        ])
+        a_id = data_manager.get_record_id_by_path('/images/a.png')
+        copy = data_manager.get_record_by_path('/images/a_copy.png')
+        assert copy['duplicate_of'] == a_id
+        assert copy['image_hash'] == near
+
+        # 重新导入时没有哈希不覆盖已有的值
+        data_manager.save_record({'file_path': '/images/a_copy.png', 'prompt': 'a2'})
+        assert data_manager.get_record_by_path('/images/a_copy.png')['image_hash'] == near
+
+        groups = data_manager.find_duplicate_groups(max_distance=6)
+        assert [[record['file_name'] for record in group] for group in groups] == [['a.png', 'a_copy.png']]
+        similar = data_manager.find_similar_records(a_id, max_distance=6)
+        assert [(record['file_name'], record['hash_distance']) for record in similar] == [('a_copy.png', 4)]
+
+        # 补算哈希
+        c_id = data_manager.get_record_id_by_path('/images/c.png')
+        assert data_manager.update_image_hashes({c_id: base[1]}) == 1
+        assert len(data_manager.find_duplicate_groups(max_distance=0)) == 1
+        assert data_manager.build_hash_index().find(base[1], 0) in ('/images/b.png', '/images/c.png')
+
+        # 流水线：SkipFile 计为跳过而不是失败
+        def extract(file_path):
+            if 'dup' in file_path:
+                raise SkipFile('重复')
+            return {'file_path': file_path}
+
+        pipeline = IngestPipeline(extract, data_manager, max_workers=2)
+        results = list(pipeline.run(['/images/x.png', '/images/dup.png']))
+        skipped = [result for result in results if result['skipped']]
+        assert len(skipped) == 1 and skipped[0]['file_path'] == '/images/dup.png'
+        assert pipeline.skipped_count == 1 and pipeline.failed_count == 0
+        assert data_manager.get_record_by_path('/images/dup.png') is None
+
+    print("✅ 感知哈希测试通过")
+
+
+if __name__ == "__main__":
+    test_image_hash()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量扫描清单测试
+"""
+
+import os
+import sys
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.data_manager import DataManager
+
+
+def test_incremental_manifest():
+    """测试按文件夹读取文件清单及缺失文件标记"""
+    print("🧪 开始测试增量扫描清单...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        data_manager = DataManager(os.path.join(temp_dir, 'test.db'), data_dir=temp_dir)
+        folder = os.path.join(temp_dir, 'outputs')
+        sibling = os.path.join(temp_dir, 'outputs2')
+
+        data_manager.save_records_bulk([
+            {'file_path': os.path.join(folder, 'a.png'), 'file_size': 100, 'file_mtime': 1.5},
+            {'file_path': os.path.join(folder, 'sub', 'b.png'), 'file_size': 200, 'file_mtime': 2.5},
+            {'file_path': os.path.join(sibling, 'c.png'), 'file_size': 300, 'file_mtime': 3.5},
+        ])
+
+        # 范围扫描只包含该文件夹（及子文件夹），不包含同前缀的兄弟文件夹
+        manifest = data_manager.get_file_manifest(folder)
+        assert manifest == {
+            os.path.join(folder, 'a.png'): (100, 1.5),
+            os.path.join(folder, 'sub', 'b.png'): (200, 2.5),
+        }
+
+        # 未提供文件状态的更新保留原值
+        data_manager.save_record({'file_path': os.path.join(folder, 'a.png'), 'prompt': 'girl'})
+        assert data_manager.get_file_manifest(folder)[os.path.join(folder, 'a.png')] == (100, 1.5)
+
+        # 标记缺失文件，重新入库后清除标记
+        assert data_manager.mark_files_missing([os.path.join(folder, 'sub', 'b.png')]) == 1
+        assert data_manager.mark_files_missing([os.path.join(folder, 'sub', 'b.png')]) == 0
+        missing = data_manager.get_missing_records(folder)
+        assert [record['file_name'] for record in missing] == ['b.png']
+        assert data_manager.get_missing_records(sibling) == []
+
+        data_manager.save_record({'file_path': os.path.join(folder, 'sub', 'b.png'),
+                                  'file_size': 201, 'file_mtime': 4.0})
+        assert data_manager.get_missing_records() == []
+        assert data_manager.get_file_manifest(folder)[os.path.join(folder, 'sub', 'b.png')] == (201, 4.0)
+
+    print("✅ 增量扫描清单测试通过")
+
+
+if __name__ == "__main__":
+    test_incremental_manifest()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式导入流水线测试
+"""
+
+import os
+import sys
+import sqlite3
+import tempfile
+import threading
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.data_manager import DataManager
+from core.ingest_pipeline import IngestPipeline
+
+
+def test_ingest_pipeline():
+    """测试流式提取、批量入库、背压和取消"""
+    print("🧪 开始测试流式导入流水线...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        data_manager = DataManager(os.path.join(temp_dir, 'test.db'), data_dir=temp_dir)
+
+        def extract(file_path):
+            if file_path.endswith('bad.png'):
+                return None
+            return {'file_path': file_path, 'prompt': 'girl', 'model': 'sdxl'}
+
+        # 扫描未结束时就能拿到第一条结果
+        scan_gate = threading.Event()
+
+        def slow_scan():
+            yield os.path.join(temp_dir, 'first.png')
+            scan_gate.wait(5)
+            for i in range(500):
+                yield os.path.join(temp_dir, f'{i}.png')
+            yield os.path.join(temp_dir, 'bad.png')
+            yield os.path.join(temp_dir, 'skip.txt')
+
+        pipeline = IngestPipeline(extract, data_manager=data_manager,
+                                  supported_formats={'.png'},
+                                  max_workers=3, queue_size=8, batch_size=50)
+        results = pipeline.run(slow_scan())
+        first = next(results)
+        assert first['file_path'].endswith('first.png')
+        assert not pipeline.scan_finished
+        scan_gate.set()
+
+        rest = list(results)
+        assert len(rest) == 501
+        status = pipeline.get_status()
+        assert status['scanned'] == 502 and status['scan_finished']
+        assert status['successful'] == 501 and status['failed'] == 1
+        assert status['saved'] == 501
+        assert data_manager.count_records() == 501
+        assert data_manager.library_stats.get_counts('model') == [('sdxl', 501)]
+
+        # 取消后已提取的结果仍然入库，线程正常退出
+        pipeline = IngestPipeline(extract, data_manager=data_manager,
+                                  max_workers=2, queue_size=4, batch_size=1000)
+        processed = 0
+        for result in pipeline.run(os.path.join(temp_dir, f'c{i}.png') for i in range(10000)):
+            processed += 1
+            if processed == 20:
+                pipeline.cancel()
+        assert pipeline.is_cancelled
+        assert pipeline.saved_count == pipeline.successful_count < 10000
+        assert data_manager.count_records() == 501 + pipeline.saved_count
+
+        # 写入数据库失败：该批结果返回为失败，检查点同样记为失败
+        class LockedDataManager(DataManager):
+            def save_records_bulk(self, records):
+                if any(record['file_path'].endswith('locked.png') for record in records):
+                    raise sqlite3.OperationalError('database is locked')
+                return super().save_records_bulk(records)
+
+        locked_manager = LockedDataManager(os.path.join(temp_dir, 'locked.db'), data_dir=temp_dir)
+        checkpoints = []
+        paths = [os.path.join(temp_dir, f'l{i}.png') for i in range(9)] + [os.path.join(temp_dir, 'locked.png')]
+        pipeline = IngestPipeline(extract, data_manager=locked_manager, max_workers=1, batch_size=5,
+                                  checkpoint_callback=checkpoints.extend)
+        results = list(pipeline.run(paths))
+        assert len(results) == 10
+        assert sum(1 for result in results if result['success']) == pipeline.successful_count == pipeline.saved_count
+        failed = [result for result in results if not result['success']]
+        assert len(failed) == pipeline.failed_count > 0
+        assert all(result['error_type'] == 'OperationalError' for result in failed)
+        assert locked_manager.count_records() == pipeline.saved_count
+        assert sorted(result['success'] for result in checkpoints) == sorted(result['success'] for result in results)
+
+    print("✅ 流式导入流水线测试通过")
+
+
+if __name__ == "__main__":
+    test_ingest_pipeline()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图库统计功能测试
+"""
+
+import os
+import sys
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.data_manager import DataManager
+from core.library_stats import LibraryStats
+
+
+def test_library_stats():
+    """测试统计汇总表的增量维护"""
+    print("🧪 开始测试图库统计功能...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        data_manager = DataManager(os.path.join(temp_dir, "test.db"), data_dir=temp_dir)
+        stats = data_manager.library_stats
+
+        record_id = data_manager.save_record({
+            'file_path': os.path.join(temp_dir, 'a.png'),
+            'model': 'sdxl_base',
+            'sampler': 'Euler a',
+            'steps': 20,
+            'cfg_scale': 7,
+            'tags': 'girl, dress；portrait',
+            'lora_info': {'loras': [{'name': 'detail', 'weight': 0.8}]},
+            'generation_source': 'ComfyUI',
+            'width': 1024,
+            'height': 1024,
+        })
+        data_manager.save_record({
+            'file_path': os.path.join(temp_dir, 'b.png'),
+            'model': 'sdxl_base',
+            'sampler': 'DPM++ 2M',
+            'steps': 30,
+            'cfg_scale': 5.5,
+            'tags': 'girl',
+        })
+
+        assert stats.get_total_records() == 2
+        assert stats.get_counts('model') == [('sdxl_base', 2)]
+        assert dict(stats.get_counts('tag')) == {'girl': 2, 'dress': 1, 'portrait': 1}
+        assert stats.get_counts('lora') == [('detail', 1)]
+        assert stats.get_counts('size') == [('1024x1024', 1)]
+
+        # 更新记录：旧值计数减少，新值计数增加
+        data_manager.save_record({
+            'file_path': os.path.join(temp_dir, 'a.png'),
+            'model': 'flux_dev',
+            'sampler': 'Euler a',
+            'steps': 20,
+            'tags': 'girl',
+        })
+        assert dict(stats.get_counts('model')) == {'sdxl_base': 1, 'flux_dev': 1}
+        assert stats.get_counts('lora') == []
+        assert stats.get_counts('size') == [('1024x1024', 1)]  # 未提供尺寸时保留原值
+
+        histogram = stats.get_histogram('steps', bins=2)
+        assert histogram['counts'] == [1, 1]
+        assert histogram['total'] == 2
+
+        # 删除记录
+        data_manager.delete_record(record_id)
+        assert stats.get_total_records() == 1
+        assert stats.get_counts('model') == [('sdxl_base', 1)]
+
+        # 重建结果应与增量维护一致
+        before = {dimension: stats.get_counts(dimension) for dimension in ('model', 'tag', 'day', 'cfg')}
+        LibraryStats(data_manager.db_path).rebuild()
+        after = {dimension: stats.get_counts(dimension) for dimension in ('model', 'tag', 'day', 'cfg')}
+        assert before == after
+
+        data_manager.clear_all_records()
+        assert stats.get_total_records() == 0
+
+    print("✅ 图库统计功能测试通过")
+
+
+if __name__ == "__main__":
+    test_library_stats()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图库增量同步测试
+"""
+
+import os
+import sys
+import time
+import shutil
+import sqlite3
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image
+
+from core.data_manager import DataManager
+from core.change_bus import RECORDS_REMOVED
+
+
+def edit(data_manager, file_path, **changes):
+    """像界面一样保存整条记录"""
+    record = data_manager.get_record_by_path(file_path)
+    record.update(changes)
+    data_manager.save_record(record)
+    # 修改时间为毫秒精度，保证先后顺序
+    time.sleep(0.01)
+
+
+def test_library_sync():
+    """测试变更日志、按内容哈希匹配、逐字段合并、冲突报告、删除同步和不回传"""
+    print("🧪 开始测试图库增量同步...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # 两台机器上同样的图片在不同路径
+        dir_a = os.path.join(temp_dir, 'studio', 'output')
+        dir_b = os.path.join(temp_dir, 'laptop', 'pictures')
+        os.makedirs(dir_a)
+        os.makedirs(dir_b)
+        for i in range(3):
+            Image.new('RGB', (16, 16), (i * 60, 10, 10)).save(os.path.join(dir_a, f"img{i}.png"))
+            shutil.copy(os.path.join(dir_a, f"img{i}.png"), os.path.join(dir_b, f"copy{i}.png"))
+        Image.new('RGB', (16, 16), (0, 0, 200)).save(os.path.join(dir_a, 'only_a.png'))
+
+        a = DataManager(os.path.join(temp_dir, 'a.db'), data_dir=os.path.join(temp_dir, 'data_a'))
+        b = DataManager(os.path.join(temp_dir, 'b.db'), data_dir=os.path.join(temp_dir, 'data_b'))
+        a.save_records_bulk([{'file_path': os.path.join(dir_a, name), 'prompt': 'cat', 'model': 'sdxl',
+                              'file_size': os.path.getsize(os.path.join(dir_a, name))}
+                             for name in ('img0.png', 'img1.png', 'img2.png', 'only_a.png')])
+        b.save_records_bulk([{'file_path': os.path.join(dir_b, f"copy{i}.png"), 'prompt': 'cat', 'model': 'sdxl',
+                              'file_size': os.path.getsize(os.path.join(dir_b, f"copy{i}.png"))}
+                             for i in range(3)])
+        id_a, id_b = a.get_sync_status()['library_id'], b.get_sync_status()['library_id']
+        assert id_a != id_b
+        time.sleep(0.01)
+
+        edit(a, os.path.join(dir_a, 'img0.png'), notes='来自工作室')
+        edit(b, os.path.join(dir_b, 'copy0.png'), tags='favorite')
+        edit(b, os.path.join(dir_b, 'copy1.png'), notes='笔记本上的备注')
+
+        # 第一次同步：A → B，按内容哈希找到不同路径下的同一张图片
+        changeset = os.path.join(temp_dir, 'a_to_b.baizesync.gz')
+        exported = a.export_changeset(changeset, peer=id_b)
+        assert exported['since'] == 0 and exported['records'] == 4 and exported['tombstones'] == 0
+        result = b.import_changeset(changeset)
+        assert result['added'] == 1 and result['updated'] == 1 and result['conflicts'] == []
+        assert not result['gap']
+        copy0 = b.get_record_by_path(os.path.join(dir_b, 'copy0.png'))
+        assert copy0['notes'] == '来自工作室' and copy0['tags'] == 'favorite'
+        # B 的修改比 A 的创建时间新，保留
+        assert b.get_record_by_path(os.path.join(dir_b, 'copy1.png'))['notes'] == '笔记本上的备注'
+        # 本机没有的图片以原路径新增并标记为缺失
+        added = b.get_record_by_path(os.path.join(dir_a, 'only_a.png'))
+        assert added is not None and added['content_hash']
+        assert b.library_stats.get_total_records() == 4
+
+        # B → A：只有 B 自己的修改，不回传从 A 导入的变更
+        changeset = os.path.join(temp_dir, 'b_to_a.baizesync')
+        exported = b.export_changeset(changeset, peer=id_a)
+        assert exported['records'] == 3
+        result = a.import_changeset(changeset)
+        assert result['added'] == 0 and result['conflicts'] == []
+        img0 = a.get_record_by_path(os.path.join(dir_a, 'img0.png'))
+        assert img0['notes'] == '来自工作室' and img0['tags'] == 'favorite'
+        assert a.get_record_by_path(os.path.join(dir_a, 'img1.png'))['notes'] == '笔记本上的备注'
+        assert a.get_record_by_path(os.path.join(dir_a, 'only_a.png'))['missing_since'] is None
+
+        # 同步后两边都没有新的变更
+        assert a.export_changeset(os.path.join(temp_dir, 'empty'), peer=id_b)['records'] == 0
+        assert b.export_changeset(os.path.join(temp_dir, 'empty'), peer=id_a)['records'] == 0
+
+        # 并发修改同一字段：两边都报告冲突，最后修改的一方胜出
+        edit(a, os.path.join(dir_a, 'img2.png'), notes='A 的修改')
+        edit(b, os.path.join(dir_b, 'copy2.png'), notes='B 的修改')
+        a.export_changeset(os.path.join(temp_dir, 'a2.gz'), peer=id_b)
+        b.export_changeset(os.path.join(temp_dir, 'b2.gz'), peer=id_a)
+        result = b.import_changeset(os.path.join(temp_dir, 'a2.gz'))
+        assert [c['winner'] for c in result['conflicts']] == ['local']
+        assert result['conflicts'][0]['field'] == 'notes' and result['conflicts'][0]['remote'] == 'A 的修改'
+        result = a.import_changeset(os.path.join(temp_dir, 'b2.gz'))
+        assert [c['winner'] for c in result['conflicts']] == ['remote']
+        assert a.get_record_by_path(os.path.join(dir_a, 'img2.png'))['notes'] == 'B 的修改'
+        assert b.get_record_by_path(os.path.join(dir_b, 'copy2.png'))['notes'] == 'B 的修改'
+
+        # 删除：墓碑按内容哈希删除对端记录，且不会回传
+        a.delete_record(a.get_record_id_by_path(os.path.join(dir_a, 'img1.png')))
+        changeset = os.path.join(temp_dir, 'a3.gz')
+        exported = a.export_changeset(changeset, peer=id_b)
+        assert exported['tombstones'] == 1 and exported['records'] == 0
+        assert os.path.getsize(changeset) < 1024
+        events = []
+        b.change_bus.subscribe(lambda event, payload: events.append((event, payload)))
+        result = b.import_changeset(changeset)
+        assert result['deleted'] == 1
+        assert events == [(RECORDS_REMOVED, {'count': 1, 'source': 'sync'})]
+        assert b.get_record_by_path(os.path.join(dir_b, 'copy1.png')) is None
+        assert b.library_stats.get_total_records() == 3
+        exported = b.export_changeset(os.path.join(temp_dir, 'b3.gz'), peer=id_a)
+        assert exported['tombstones'] == 0 and exported['records'] == 0
+
+        # 文件修改后内容哈希被清空，删除时重新计算，墓碑照常导出
+        shared = os.path.join(temp_dir, 'shared.png')
+        Image.new('RGB', (16, 16), (9, 9, 9)).save(shared)
+        for manager in (a, b):
+            manager.save_record({'file_path': shared, 'prompt': '共享'})
+        a.export_changeset(os.path.join(temp_dir, 'a_shared.gz'), peer=id_b)
+        with sqlite3.connect(a.db_path) as conn:
+            conn.execute("UPDATE image_records SET file_size = 1 WHERE file_path = ?", (shared,))
+            assert conn.execute("SELECT content_hash FROM image_records WHERE file_path = ?",
+                                (shared,)).fetchone()[0] is None
+        a.delete_record(a.get_record_id_by_path(shared))
+        changeset = os.path.join(temp_dir, 'a_shared2.gz')
+        exported = a.export_changeset(changeset, peer=id_b)
+        assert exported['tombstones'] == 1 and exported['skipped_tombstones'] == 0
+        assert b.import_changeset(changeset)['deleted'] == 1
+        assert b.get_record_by_path(shared) is None
+
+        # 同一路径上的另一张图片：删除时文件已不存在的墓碑不导出，哈希不同的墓碑不删除本机记录
+        comfy = os.path.join(temp_dir, 'ComfyUI', 'output')
+        os.makedirs(comfy)
+        for i, name in enumerate(('ComfyUI_00001_.png', 'ComfyUI_00002_.png')):
+            path = os.path.join(comfy, name)
+            Image.new('RGB', (16, 16), (5, 5, i)).save(path)
+            b.save_record({'file_path': path, 'prompt': 'B 的图片'})
+            a.save_record({'file_path': path, 'prompt': 'A 的图片'})
+        with sqlite3.connect(a.db_path) as conn:
+            conn.execute("UPDATE image_records SET content_hash = ? WHERE file_path = ?",
+                         ('0' * 32, os.path.join(comfy, 'ComfyUI_00002_.png')))
+        os.rename(os.path.join(comfy, 'ComfyUI_00001_.png'), os.path.join(temp_dir, 'moved.png'))
+        for name in ('ComfyUI_00001_.png', 'ComfyUI_00002_.png'):
+            a.delete_record(a.get_record_id_by_path(os.path.join(comfy, name)))
+        os.rename(os.path.join(temp_dir, 'moved.png'), os.path.join(comfy, 'ComfyUI_00001_.png'))
+        changeset = os.path.join(temp_dir, 'a_comfy.gz')
+        exported = a.export_changeset(changeset, peer=id_b)
+        assert exported['tombstones'] == 1 and exported['records'] == 0
+        assert exported['skipped_tombstones'] == 1
+        result = b.import_changeset(changeset)
+        assert result['deleted'] == 0
+        for name in ('ComfyUI_00001_.png', 'ComfyUI_00002_.png'):
+            assert b.get_record_by_path(os.path.join(comfy, name))['prompt'] == 'B 的图片'
+
+        # 漏导入中间的变更集时给出提示
+        edit(a, os.path.join(dir_a, 'img0.png'), notes='第一次')
+        a.export_changeset(os.path.join(temp_dir, 'skipped.gz'), peer=id_b)
+        edit(a, os.path.join(dir_a, 'img0.png'), notes='第二次')
+        a.export_changeset(os.path.join(temp_dir, 'a4.gz'), peer=id_b)
+        result = b.import_changeset(os.path.join(temp_dir, 'a4.gz'))
+        assert result['gap'] and result['updated'] == 1
+
+        # 自己的变更集不能导入
+        assert a.import_changeset(os.path.join(temp_dir, 'a4.gz')) is None
+
+        # 文件内容变化后内容哈希失效
+        path = os.path.join(dir_a, 'img0.png')
+        Image.new('RGB', (32, 32), (1, 2, 3)).save(path)
+        edit(a, path, file_size=os.path.getsize(path))
+        assert a.get_record_by_path(path)['content_hash'] is None
+
+        # 启用同步前已有的数据库升级后，已有记录作为基准版本
+        legacy = os.path.join(temp_dir, 'legacy.db')
+        DataManager(legacy, data_dir=os.path.join(temp_dir, 'data_legacy')).save_record(
+            {'file_path': '/old/x.png', 'prompt': 'old'})
+        with sqlite3.connect(legacy) as conn:
+            for name in ('sync_record_insert', 'sync_record_update', 'sync_record_delete', 'sync_content_changed'):
+                conn.execute(f"DROP TRIGGER {name}")
+            for name in ('sync_state', 'sync_journal', 'sync_tombstones', 'sync_peers'):
+                conn.execute(f"DROP TABLE {name}")
+            conn.execute("DROP INDEX idx_content_hash")
+            conn.execute("ALTER TABLE image_records DROP COLUMN content_hash")
+        upgraded = DataManager(legacy, data_dir=os.path.join(temp_dir, 'data_legacy'))
+        assert upgraded.get_sync_status()['version'] == 1
+        exported = upgraded.export_changeset(os.path.join(temp_dir, 'legacy.gz'))
+        assert exported['records'] == 1 and exported['until'] == 1
+
+    print("✅ 图库增量同步测试通过")
+
+
+if __name__ == "__main__":
+    test_library_sync()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多图库功能测试
+"""
+
+import os
+import sys
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.data_manager import DataManager
+from core.library_registry import DEFAULT_LIBRARY
+
+
+def test_multi_library():
+    """测试图库创建、切换、跨图库搜索统计及批量移动"""
+    print("🧪 开始测试多图库功能...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, 'records.db')
+        data_manager = DataManager(db_path, data_dir=temp_dir)
+        assert data_manager.active_library == DEFAULT_LIBRARY
+
+        ids = [data_manager.save_record({
+            'file_path': os.path.join(temp_dir, f'default_{i}.png'),
+            'prompt': 'girl, dress',
+            'model': 'sdxl',
+        }) for i in range(3)]
+
+        assert data_manager.create_library('客户A')
+        assert not data_manager.create_library('客户A')
+        assert data_manager.switch_library('客户A')
+        assert data_manager.get_all_records() == []
+        data_manager.save_record({
+            'file_path': os.path.join(temp_dir, 'client.png'),
+            'prompt': 'girl, landscape',
+            'model': 'flux',
+        })
+
+        # 当前图库在重启后保持
+        reopened = DataManager(db_path, data_dir=temp_dir)
+        assert reopened.active_library == '客户A'
+        assert len(reopened.get_all_records()) == 1
+
+        # 跨图库搜索与统计
+        results = data_manager.search_all_libraries('girl')
+        assert len(results) == 4
+        assert {r['library'] for r in results} == {DEFAULT_LIBRARY, '客户A'}
+        assert dict(data_manager.get_facet_counts_all_libraries('model')) == {'sdxl': 3, 'flux': 1}
+        assert len(data_manager.search_all_libraries('girl', libraries=[DEFAULT_LIBRARY])) == 3
+
+        # 批量移动记录
+        assert data_manager.switch_library(DEFAULT_LIBRARY)
+        assert data_manager.move_records(ids[:2], '客户A') == 2
+        assert len(data_manager.get_all_records()) == 1
+        assert data_manager.library_stats.get_total_records() == 1
+        assert dict(data_manager.get_facet_counts_all_libraries('model')) == {'sdxl': 3, 'flux': 1}
+
+        data_manager.switch_library('客户A')
+        assert data_manager.library_stats.get_total_records() == 3
+        assert dict(data_manager.library_stats.get_counts('model')) == {'sdxl': 2, 'flux': 1}
+
+        # 当前图库不能删除
+        assert not data_manager.remove_library('客户A')
+
+    print("✅ 多图库功能测试通过")
+
+
+if __name__ == "__main__":
+    test_multi_library()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Parquet导出与恢复测试
+"""
+
+import os
+import sys
+import json
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from core.data_manager import DataManager
+from core.parquet_io import ParquetExporter, record_to_row, row_to_record, split_tags
+
+
+def test_parquet_io():
+    """测试带类型的列、嵌套LoRA、字典编码、分行组写入和批量恢复"""
+    print("🧪 开始测试Parquet导出与恢复...")
+
+    assert split_tags('girl, red hair，outdoor;; ') == ['girl', 'red hair', 'outdoor']
+    assert record_to_row({'lora_info': '{"detail": "0.5"}'})['loras'] == [
+        {'name': 'detail', 'weight': 0.5, 'hash': None}]
+    assert record_to_row({'seed': 'abc', 'lora_info': 'not json'})['seed'] is None
+    # 图片读取器保存的LoRA原文不当作LoRA名称，恢复后保持原样
+    raw_info = {'raw_lora_text': 'lora foo 0.5, my_lora'}
+    row = record_to_row({'file_path': '/raw.png', 'lora_info': json.dumps(raw_info)})
+    assert row['loras'] is None and row['raw_lora_text'] == 'lora foo 0.5, my_lora'
+    assert row_to_record(row)['lora_info'] == raw_info
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source = DataManager(os.path.join(temp_dir, 'source.db'), data_dir=temp_dir)
+        records = [{
+            'file_path': f"/images/{i}.png",
+            'prompt': f"prompt {i}",
+            'model': 'sdxl' if i % 2 else 'flux',
+            'sampler': 'euler',
+            'steps': 20 + i,
+            'cfg_scale': 7.5,
+            'seed': 4294967296 + i,
+            'lora_info': {'loras': [{'name': 'detail', 'weight': 0.6, 'hash': 'abc123'}]},
+            'tags': 'girl, outdoor',
+            'workflow_data': {'nodes': [i]},
+            'image_hash': (1 << 63) + i,
+        } for i in range(5)]
+        records.append({'file_path': '/images/copy.png', 'prompt': 'copy', 'duplicate_of': '/images/0.png',
+                        'lora_info': raw_info})
+        source.save_records_bulk(records)
+
+        output = os.path.join(temp_dir, 'library.parquet')
+        result = source.export_parquet(output, exporter=ParquetExporter(row_group_size=2))
+        assert result['rows'] == 6 and result['row_groups'] == 3
+        assert not os.path.exists(output + '.part')
+
+        parquet_file = pq.ParquetFile(output)
+        assert parquet_file.metadata.num_row_groups == 3
+        schema = parquet_file.schema_arrow
+        assert schema.field('seed').type == pa.int64()
+        assert schema.field('cfg_scale').type == pa.float64()
+        assert pa.types.is_dictionary(schema.field('model').type)
+        assert pa.types.is_timestamp(schema.field('created_at').type)
+        table = parquet_file.read()
+        first = table.slice(0, 1).to_pylist()[0]
+        assert first['seed'] == 4294967296 and first['steps'] == 20
+        assert first['loras'] == [{'name': 'detail', 'weight': 0.6, 'hash': 'abc123'}]
+        assert first['tags'] == ['girl', 'outdoor']
+
+        # 恢复到新的数据库
+        target = DataManager(os.path.join(temp_dir, 'target.db'), data_dir=temp_dir)
+        progress = []
+        result = target.import_parquet(output, progress_callback=lambda rows, total: progress.append((rows, total)))
+        assert result['imported'] == 6 and result['skipped'] == 0
+        assert progress[-1] == (6, 6)
+
+        original = source.get_record_by_path('/images/3.png')
+        restored = target.get_record_by_path('/images/3.png')
+        for key in ('prompt', 'model', 'sampler', 'steps', 'cfg_scale', 'seed', 'tags',
+                    'image_hash', 'created_at'):
+            assert restored[key] == original[key], key
+        assert json.loads(restored['lora_info']) == json.loads(original['lora_info'])
+        assert json.loads(restored['workflow_data']) == {'nodes': [3]}
+
+        copy = target.get_record_by_path('/images/copy.png')
+        assert copy['duplicate_of'] == target.get_record_id_by_path('/images/0.png')
+        assert json.loads(copy['lora_info']) == raw_info
+
+        # 再次恢复：按文件路径更新，不产生重复记录
+        target.import_parquet(output)
+        assert target.count_records() == 6
+
+    print("✅ Parquet导出与恢复测试通过")
+
+
+if __name__ == "__main__":
+    test_parquet_io()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量处理进度汇总测试
+"""
+
+import os
+import sys
+import json
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.data_manager import DataManager
+from core.ingest_pipeline import IngestPipeline
+from core.progress_reporter import ProgressReporter, format_duration
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_progress_reporter():
+    """测试刷新频率合并、速度、剩余时间、错误分类、阶段耗时和任务报告"""
+    print("🧪 开始测试批量处理进度汇总...")
+
+    # 每个文件 10ms、1MB：只按刷新间隔回调
+    clock = FakeClock()
+    snapshots = []
+    reporter = ProgressReporter(callback=snapshots.append, refresh_interval=0.5, clock=clock)
+    reporter.start()
+    for i in range(200):
+        clock.now += 0.01
+        if i % 50 == 49:
+            result = {'file_path': f'{i}.png', 'success': False, 'data': None,
+                      'error': 'broken', 'error_type': 'OSError'}
+        elif i % 40 == 39:
+            result = {'file_path': f'{i}.png', 'success': False, 'data': None,
+                      'error': None, 'error_type': None}
+        else:
+            result = {'file_path': f'{i}.png', 'success': True, 'data': {'file_size': 1024 * 1024}}
+        reporter.update(result)
+
+    assert 3 <= len(snapshots) <= 4
+    last = snapshots[-1]
+    assert abs(last['files_per_sec'] - 100) < 1
+    assert 80 < last['mb_per_sec'] < 100
+    assert last['eta_seconds'] is not None and last['eta_seconds'] >= 0
+    report = reporter.finish()
+    assert report['processed'] == 200 and report['failed'] == 8
+    assert report['errors'] == {'OSError': 4, 'NoResult': 4}
+    assert report['status'] == 'completed'
+    assert abs(report['files_per_sec'] - 100) < 1
+
+    assert format_duration(None) == "--"
+    assert format_duration(8) == "8秒"
+    assert format_duration(185) == "3分5秒"
+    assert format_duration(3720) == "1小时2分"
+
+    # 与流水线配合：总数来自扫描计数，阶段耗时来自流水线
+    with tempfile.TemporaryDirectory() as temp_dir:
+        data_manager = DataManager(os.path.join(temp_dir, 'test.db'), data_dir=temp_dir)
+
+        def extract(file_path):
+            if file_path.endswith('9.png'):
+                raise ValueError('bad')
+            return {'file_path': file_path, 'file_size': 10}
+
+        pipeline = IngestPipeline(extract, data_manager=data_manager, max_workers=2, batch_size=20)
+        reporter = ProgressReporter(refresh_interval=0)
+        reporter.start(pipeline)
+        for result in pipeline.run(os.path.join(temp_dir, f'{i}.png') for i in range(100)):
+            reporter.update(result)
+        reporter.finish()
+
+        report_path = reporter.write_report(os.path.join(temp_dir, 'reports', 'job.json'),
+                                            extra={'job_id': 'abc'})
+        with open(report_path, encoding='utf-8') as f:
+            report = json.load(f)
+        assert report['job_id'] == 'abc'
+        assert report['scanned'] == 100 and report['successful'] == 90
+        assert report['errors'] == {'ValueError': 10}
+        assert report['bytes_processed'] == 900
+        assert set(report['stages']) == {'scan', 'read', 'parse', 'db'}
+        assert report['stages']['db']['count'] == 90
+        assert report['stages']['scan']['count'] >= 100
+
+    print("✅ 批量处理进度汇总测试通过")
+
+
+if __name__ == "__main__":
+    test_progress_reporter()
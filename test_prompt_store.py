@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+提示词历史增量存储测试
+"""
+
+import os
+import sys
+import json
+import sqlite3
+import tempfile
+from datetime import datetime
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.data_manager import DataManager
+
+
+def _changelog_count(data_manager):
+    with sqlite3.connect(data_manager.prompt_store.db_path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM prompt_changelog").fetchone()[0]
+
+
+def test_prompt_store():
+    """测试增量保存、检查点恢复和日志压缩"""
+    print("🧪 开始测试提示词历史存储...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # 旧版JSON文件应被自动迁移
+        legacy_data = {
+            'scenes': [
+                {'title': '通用', 'english_prompts': ['masterpiece', 'best quality'],
+                 'translation_map': {'masterpiece': '杰作'}},
+                {'title': '人物', 'english_prompts': ['girl'], 'chinese_prompts': ['女孩']}
+            ]
+        }
+        with open(os.path.join(temp_dir, 'prompt_history.json'), 'w', encoding='utf-8') as f:
+            json.dump(legacy_data, f, ensure_ascii=False)
+
+        data_manager = DataManager(os.path.join(temp_dir, 'test.db'), data_dir=temp_dir)
+        data = data_manager.load_prompt_data()
+        assert [scene['title'] for scene in data['scenes']] == ['通用', '人物']
+        assert data['scenes'][1]['chinese_prompts'] == ['女孩']
+
+        # 没有变化时不写入任何日志
+        before = _changelog_count(data_manager)
+        data_manager.save_prompt_data(data)
+        assert _changelog_count(data_manager) == before
+
+        assert data_manager.backup_prompt_data('编辑前')
+        checkpoint = data_manager.prompt_store.list_checkpoints()[0]['time']
+
+        # 修改一个提示词只产生一条变更（另一条是检查点）
+        data['scenes'][0]['english_prompts'][1] = 'ultra detailed'
+        data_manager.save_prompt_data(data)
+        assert _changelog_count(data_manager) == before + 2
+
+        # 重命名、删除、新增场景
+        data['scenes'][1]['title'] = '角色'
+        data['scenes'].append({'title': '风景', 'english_prompts': ['mountain'], 'translation_map': {}})
+        del data['scenes'][0]
+        data_manager.save_prompt_data(data)
+
+        reloaded = DataManager(os.path.join(temp_dir, 'test.db'), data_dir=temp_dir).load_prompt_data()
+        assert [scene['title'] for scene in reloaded['scenes']] == ['角色', '风景']
+        assert reloaded['scenes'][1]['english_prompts'] == ['mountain']
+
+        # 恢复到检查点
+        restored = data_manager.restore_prompt_data(checkpoint)
+        assert [scene['title'] for scene in restored['scenes']] == ['通用', '人物']
+        assert restored['scenes'][0]['english_prompts'] == ['masterpiece', 'best quality']
+        assert restored['scenes'][0]['translation_map'] == {'masterpiece': '杰作'}
+
+        # 压缩后当前状态保持不变
+        current = data_manager.load_prompt_data()['scenes']
+        removed = data_manager.compact_prompt_history(datetime.now().isoformat())
+        assert removed > 0
+        assert data_manager.load_prompt_data()['scenes'] == current
+
+    print("✅ 提示词历史存储测试通过")
+
+
+if __name__ == "__main__":
+    test_prompt_store()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON/NDJSON/CSV 记录导入测试
+"""
+
+import os
+import io
+import sys
+import csv
+import json
+import sqlite3
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.data_manager import DataManager
+from core.streaming_exporter import StreamingExporter
+from core.batch_processor import BatchProcessor
+from core.record_importer import RecordImporter, iter_json_records, normalize_record, detect_import_format
+
+
+def make_records(count):
+    records = []
+    for i in range(count):
+        records.append({
+            'file_path': f"/library/images/{i:05d}.png",
+            'prompt': f"1girl, (masterpiece:1.2), 编号 {i}",
+            'negative_prompt': 'lowres',
+            'model': f"model_{i % 3}",
+            'sampler': 'euler',
+            'steps': 20 + i % 5,
+            'cfg_scale': 7.5,
+            'seed': 1000 + i,
+            'lora_info': {'loras': [{'name': 'detail', 'weight': 0.6}]} if i % 2 else None,
+            'workflow_data': {'3': {'class_type': 'KSampler', 'inputs': {'seed': 1000 + i}}} if i % 4 == 0 else None,
+            'tags': 'portrait, 人物',
+            'notes': f"备注 {i}",
+        })
+    return records
+
+
+def test_record_importer():
+    """测试增量JSON解析、各导出格式的往返导入、字段别名、合并/跳过和按内容哈希去重"""
+    print("🧪 开始测试记录导入...")
+
+    # 值跨越读取缓冲区、外层对象中 records 前有其他字段
+    text = json.dumps({'export_time': '2025-01-01', 'total_records': 123456,
+                       'records': [{'file_path': f"/x/{i}", 'prompt': 'p' * 50} for i in range(100)]})
+    parsed = list(iter_json_records(io.StringIO(text), read_size=13))
+    assert [record['file_path'] for record in parsed] == [f"/x/{i}" for i in range(100)]
+    assert list(iter_json_records(io.StringIO('[]'))) == []
+
+    # 字段别名：批量导出的 positive_prompt，无法解析的 lora 原文
+    record = normalize_record({'id': 1, 'file_path': '/a.png', 'positive_prompt': 'cat', 'prompt': None,
+                               'lora_info': {'raw': 'lora:x'}, 'steps': '', 'generation_params': 'x'})
+    assert record['prompt'] == 'cat' and record['lora_info'] == {'raw_lora_text': 'lora:x'}
+    assert 'generation_params' not in record
+    assert normalize_record({'prompt': 'no path'}) is None
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source = DataManager(os.path.join(temp_dir, 'source.db'), data_dir=os.path.join(temp_dir, 'source'))
+        source.save_records_bulk(make_records(250))
+        source.save_record({'file_path': '/library/images/copy.png', 'prompt': 'copy',
+                            'duplicate_of': '/library/images/00003.png'})
+        expected = {record['file_path']: record for record in source.iter_records()}
+
+        json_path = os.path.join(temp_dir, 'library.json')
+        assert source.export_to_json(json_path)
+        csv_path = os.path.join(temp_dir, 'library.csv')
+        assert source.export_to_csv(csv_path)
+        ndjson_path = os.path.join(temp_dir, 'library.ndjson.gz')
+        StreamingExporter().export(source.iter_records(), ndjson_path)
+        envelope_path = os.path.join(temp_dir, 'batch.json')
+        assert BatchProcessor(source).batch_export_json(source.iter_records(), envelope_path,
+                                                        total_records=251)
+        assert detect_import_format(ndjson_path) == 'ndjson'
+
+        compare = ('prompt', 'negative_prompt', 'model', 'steps', 'cfg_scale', 'seed', 'lora_info',
+                   'workflow_data', 'tags', 'notes', 'created_at')
+        for index, path in enumerate((json_path, csv_path, ndjson_path, envelope_path)):
+            target = DataManager(os.path.join(temp_dir, f"target{index}.db"),
+                                 data_dir=os.path.join(temp_dir, f"target{index}"))
+            progress = []
+            result = RecordImporter(batch_size=100).import_file(
+                target, path, progress_callback=lambda rows, done, total: progress.append((rows, done, total)))
+            assert result['rows'] == 251 and result['added'] == 251 and result['updated'] == 0, (path, result)
+            assert progress[-1][0] == 251 and progress[-1][1] == progress[-1][2]
+            for restored in target.iter_records():
+                original = expected[restored['file_path']]
+                for field in compare:
+                    assert str(restored[field]) == str(original[field]), (path, field)
+            copy = target.get_record_by_path('/library/images/copy.png')
+            assert copy['duplicate_of'] == target.get_record_id_by_path('/library/images/00003.png')
+            assert target.library_stats.get_total_records() == 251
+
+            # 再次导入同一文件：全部为更新
+            result = target.import_records(path)
+            assert result['added'] == 0 and result['updated'] == 251
+
+        # 批量导出对话框的中文表头CSV
+        dialog_csv = os.path.join(temp_dir, 'dialog.csv')
+        with open(dialog_csv, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["ID", "文件路径", "正向提示词", "采样步数", "CFG缩放", "Lora信息", "生成参数", "备注"])
+            writer.writerow([7, '/library/images/00007.png', '新的提示词', '30', '5.0', 'detail; style', '', ''])
+            writer.writerow([8, '/library/new.png', '新图片', '', '', '', '', '新备注'])
+
+        target = DataManager(os.path.join(temp_dir, 'target0.db'), data_dir=os.path.join(temp_dir, 'target0'))
+        # 合并：本地不为空的字段保留，空字段用导入的值补充
+        result = target.import_records(dialog_csv, mode='merge')
+        assert result['added'] == 1 and result['updated'] == 1
+        merged = target.get_record_by_path('/library/images/00007.png')
+        assert merged['prompt'] == expected['/library/images/00007.png']['prompt'] and merged['steps'] == 22
+        assert target.get_record_by_path('/library/new.png')['notes'] == '新备注'
+        # 跳过已有记录
+        result = target.import_records(dialog_csv, mode='skip')
+        assert result['skipped'] == 2 and result['imported'] == 0
+        # 覆盖
+        result = target.import_records(dialog_csv)
+        updated = target.get_record_by_path('/library/images/00007.png')
+        assert updated['prompt'] == '新的提示词' and updated['steps'] == 30
+        assert json.loads(updated['lora_info']) == {'raw_lora_text': 'detail; style'}
+
+        # 路径不同但内容哈希相同：更新已有记录而不是新增
+        with sqlite3.connect(target.db_path) as conn:
+            conn.execute("UPDATE image_records SET content_hash = 'abc123' WHERE file_path = ?",
+                         ('/library/images/00010.png',))
+        moved = os.path.join(temp_dir, 'moved.ndjson')
+        with open(moved, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'file_path': '/other/machine/00010.png', 'content_hash': 'abc123',
+                                'prompt': '来自另一台机器'}, ensure_ascii=False) + '\n')
+        result = target.import_records(moved)
+        assert result['matched_by_content'] == 1 and result['added'] == 0
+        assert target.get_record_by_path('/library/images/00010.png')['prompt'] == '来自另一台机器'
+        assert target.get_record_by_path('/other/machine/00010.png') is None
+
+    print("✅ 记录导入测试通过")
+
+
+if __name__ == "__main__":
+    test_record_importer()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量处理结果接收器测试
+"""
+
+import os
+import sys
+import gzip
+import json
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.ingest_pipeline import IngestPipeline, SkipFile
+from core.result_sink import ResultSink, DiscardSink, MemorySink, NDJSONResultSink
+
+
+def extract(file_path):
+    """模拟提取：bad 开头的文件失败，dup 开头的文件跳过"""
+    name = os.path.basename(file_path)
+    if name.startswith('bad'):
+        raise OSError(f"无法读取 {name}")
+    if name.startswith('dup'):
+        raise SkipFile('重复')
+    return {'file_path': file_path, 'workflow_data': {'nodes': list(range(5))}}
+
+
+def run(sink, paths):
+    pipeline = IngestPipeline(extract, max_workers=3)
+    for result in pipeline.run(paths):
+        sink.add(result)
+    sink.close()
+    return sink
+
+
+def test_result_sink():
+    """测试计数、失败样本上限、磁盘日志与重新迭代"""
+    print("🧪 开始测试结果接收器...")
+
+    paths = [f"/images/ok{i}.png" for i in range(20)]
+    paths += [f"/images/bad{i}.png" for i in range(8)]
+    paths += ['/images/dup0.png']
+
+    # 默认：只保留计数和有限的失败样本
+    sink = run(ResultSink(max_failure_samples=3), paths)
+    assert (sink.successful_count, sink.failed_count, sink.skipped_count) == (20, 8, 1)
+    assert sink.processed_count == 29
+    assert sink.errors == {'OSError': 8}
+    assert len(sink.failure_samples) == 3
+    assert all(sample['error_type'] == 'OSError' for sample in sink.failure_samples)
+    assert list(sink.iter_results()) == []
+    assert sink.summary()['failed'] == 8
+
+    sink = run(DiscardSink(), paths)
+    assert sink.failed_count == 8 and sink.failure_samples == []
+
+    sink = run(MemorySink(), paths)
+    assert len(sink.successful_files) == 20 and len(sink.failed_files) == 8
+    assert len(sink.processed_data) == 20
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # 磁盘日志：可重新迭代，.gz 结尾时压缩
+        log_path = os.path.join(temp_dir, 'logs', 'results.ndjson.gz')
+        with NDJSONResultSink(log_path) as sink:
+            pipeline = IngestPipeline(extract, max_workers=3)
+            for result in pipeline.run(paths):
+                sink.add(result)
+        assert sink.closed
+        with gzip.open(log_path, 'rt', encoding='utf-8') as f:
+            assert len(f.readlines()) == 29
+        results = list(sink.iter_results())
+        assert sum(1 for result in results if result['success']) == 20
+        assert sum(1 for result in results if result['skipped']) == 1
+        ok = next(result for result in results if result['success'])
+        assert ok['data']['workflow_data']['nodes'] == [0, 1, 2, 3, 4]
+
+        # 不写入提取数据
+        plain_path = os.path.join(temp_dir, 'results.ndjson')
+        sink = run(NDJSONResultSink(plain_path, include_data=False), paths[:2])
+        with open(plain_path, encoding='utf-8') as f:
+            line = json.loads(f.readline())
+        assert 'data' not in line and line['success']
+        assert sink.summary()['log_path'] == plain_path
+
+    print("✅ 结果接收器测试通过")
+
+
+if __name__ == "__main__":
+    test_result_sink()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式Excel导出测试
+"""
+
+import os
+import sys
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image as PILImage
+from openpyxl import load_workbook
+
+from core.excel_exporter import ExcelExporter, StreamingExcelExporter, format_lora_info
+
+
+def test_streaming_excel():
+    """测试只写导出、内存缩略图、按工作表和文件拆分、取消"""
+    print("🧪 开始测试流式Excel导出...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        image_dir = os.path.join(temp_dir, 'images')
+        os.makedirs(image_dir)
+        image_path = os.path.join(image_dir, 'big.jpg')
+        PILImage.new('RGB', (1200, 800), (30, 60, 90)).save(image_path)
+
+        records = [{
+            'file_path': image_path if i % 2 == 0 else f"/missing/{i}.png",
+            'prompt': f"prompt {i}",
+            'seed': 123456789012345,
+            'lora_info': '{"loras": [{"name": "detail", "weight": 0.6}]}',
+            'created_at': '2024-01-02T03:04:05.123456',
+        } for i in range(7)]
+
+        # 每个工作表2行、每个文件3行
+        exporter = StreamingExcelExporter(max_rows_per_sheet=2, max_rows_per_file=3, chunk_size=2)
+        progress = []
+        result = exporter.export(iter(records), os.path.join(temp_dir, 'out.xlsx'), total_rows=7,
+                                 progress_callback=lambda rows, total, path: progress.append(rows))
+        assert result['rows'] == 7 and not result['cancelled']
+        assert [os.path.basename(path) for path in result['output_paths']] == ['out.xlsx', 'out_2.xlsx', 'out_3.xlsx']
+        assert result['sheets'] == 5
+        assert result['images'] == 4 and result['failed_images'] == 0
+        assert progress == [2, 4, 6, 7]
+
+        # 不在原图旁边写临时文件
+        assert os.listdir(image_dir) == ['big.jpg']
+
+        workbook = load_workbook(result['output_paths'][0])
+        assert workbook.sheetnames == ['AI图片信息', 'AI图片信息 2']
+        sheet = workbook.worksheets[0]
+        assert sheet['A1'].value == '图片' and sheet['B1'].value == '文件名'
+        assert sheet.max_row == 3
+        assert sheet['A3'].value == '图片不存在'
+        assert sheet['J2'].value == '123456789012345' and sheet['J2'].number_format == '@'
+        assert sheet['K2'].value == 'detail (0.6)'
+        assert sheet['N2'].value == '2024-01-02T03:04:05'
+        assert len(sheet._images) == 1
+        assert max(sheet._images[0].width, sheet._images[0].height) == 150
+
+        # 不含图片：只写数据
+        result = StreamingExcelExporter(include_images=False).export(records, os.path.join(temp_dir, 'data.xlsx'))
+        assert result['output_paths'] == [os.path.join(temp_dir, 'data.xlsx')] and result['images'] == 0
+        sheet = load_workbook(result['output_paths'][0]).active
+        assert sheet.max_row == 8 and sheet['A1'].value == '文件名' and sheet['A2'].value == 'big.jpg'
+
+        # 取消：不留下导出文件
+        exporter = StreamingExcelExporter(include_images=False, max_rows_per_file=2, chunk_size=2)
+        result = exporter.export(records, os.path.join(temp_dir, 'cancelled.xlsx'),
+                                 progress_callback=lambda rows, total, path: exporter.cancel())
+        assert result['cancelled'] and result['output_paths'] == []
+        assert not [name for name in os.listdir(temp_dir) if name.startswith('cancelled')]
+
+        # 兼容旧接口
+        assert ExcelExporter().export_records(records, os.path.join(temp_dir, 'legacy.xlsx'), include_images=False)
+
+    assert format_lora_info('{"a": 1}') == 'a (1)'
+    assert format_lora_info('not json') == ''
+
+    print("✅ 流式Excel导出测试通过")
+
+
+if __name__ == "__main__":
+    test_streaming_excel()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式导出功能测试
+"""
+
+import os
+import sys
+import csv
+import gzip
+import json
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.data_manager import DataManager
+from core.streaming_exporter import StreamingExporter, detect_export_format
+
+
+def test_streaming_export():
+    """测试JSON/NDJSON/CSV/gzip流式导出、进度和取消"""
+    print("🧪 开始测试流式导出功能...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        data_manager = DataManager(os.path.join(temp_dir, 'test.db'), data_dir=temp_dir)
+        for i in range(25):
+            data_manager.save_record({
+                'file_path': os.path.join(temp_dir, f'{i}.png'),
+                'prompt': f'girl, 第{i}张',
+                'steps': i,
+                'lora_info': {'loras': [{'name': 'detail', 'weight': 0.5}]},
+            })
+
+        assert data_manager.count_records() == 25
+        assert len(list(data_manager.iter_records(chunk_size=7))) == 25
+        assert detect_export_format('a.ndjson.gz') == ('ndjson', True)
+
+        # JSON数组（与旧版 export_to_json 输出一致）
+        json_path = os.path.join(temp_dir, 'out.json')
+        assert data_manager.export_to_json(json_path)
+        with open(json_path, encoding='utf-8') as f:
+            records = json.load(f)
+        assert records == data_manager.get_all_records()
+
+        # 带外层字段的JSON
+        exporter = StreamingExporter(chunk_size=10)
+        progress = []
+        enveloped_path = os.path.join(temp_dir, 'envelope.json')
+        result = exporter.export(data_manager.iter_records(), enveloped_path,
+                                 envelope={'total_records': 25}, indent=2,
+                                 total_rows=25,
+                                 progress_callback=lambda *args: progress.append(args))
+        with open(enveloped_path, encoding='utf-8') as f:
+            enveloped = json.load(f)
+        assert enveloped['total_records'] == 25 and len(enveloped['records']) == 25
+        assert [p[0] for p in progress] == [10, 20, 25]
+        assert progress[-1][2] == result['bytes'] == os.path.getsize(enveloped_path)
+
+        # gzip压缩的NDJSON
+        ndjson_path = os.path.join(temp_dir, 'out.ndjson.gz')
+        result = data_manager.export_records(ndjson_path)
+        assert result['rows'] == 25
+        with gzip.open(ndjson_path, 'rt', encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f]
+        assert len(lines) == 25 and lines[0]['prompt'].startswith('girl')
+
+        # CSV
+        csv_path = os.path.join(temp_dir, 'out.csv')
+        assert data_manager.export_to_csv(csv_path)
+        with open(csv_path, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        assert len(rows) == 25 and 'lora_info' in rows[0]
+
+        # 按扩展名而不是路径中的片段判断格式
+        nested_path = os.path.join(temp_dir, 'exports.csv.d', 'out.jsonl')
+        os.makedirs(os.path.dirname(nested_path))
+        assert data_manager.export_records(nested_path)['rows'] == 25
+        with open(nested_path, encoding='utf-8') as f:
+            assert len([json.loads(line) for line in f]) == 25
+        assert data_manager.export_records(os.path.join(temp_dir, 'out.txt')) is None
+
+        # 取消时不留下文件
+        exporter = StreamingExporter(chunk_size=5)
+        cancelled_path = os.path.join(temp_dir, 'cancelled.json')
+        result = exporter.export(data_manager.iter_records(), cancelled_path,
+                                 progress_callback=lambda *args: exporter.cancel())
+        assert result['cancelled'] and result['rows'] == 5
+        assert not os.path.exists(cancelled_path)
+        assert not os.path.exists(cancelled_path + '.part')
+
+    print("✅ 流式导出功能测试通过")
+
+
+if __name__ == "__main__":
+    test_streaming_export()
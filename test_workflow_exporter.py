@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ComfyUI工作流批量导出测试
+"""
+
+import os
+import sys
+import json
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
+
+from core.data_manager import DataManager
+from core.workflow_exporter import WorkflowExporter, read_png_text, apply_seeds
+
+
+def make_workflow(seed, steps=20):
+    """生成执行格式和界面格式的工作流"""
+    prompt = {
+        "3": {"class_type": "KSampler", "inputs": {"seed": seed, "steps": steps, "model": ["4", 0]}},
+        "4": {"class_type": "CheckpointLoaderSimple", "inputs": {"ckpt_name": "sdxl.safetensors"}},
+        "6": {"class_type": "CLIPTextEncode", "inputs": {"text": "一只猫"}},
+    }
+    workflow = {
+        "last_node_id": 6,
+        "nodes": [{"id": 3, "type": "KSampler", "widgets_values": [seed, "randomize", steps, 7, "euler"]},
+                  {"id": 4, "type": "CheckpointLoaderSimple", "widgets_values": ["sdxl.safetensors"]},
+                  {"id": 6, "type": "CLIPTextEncode", "widgets_values": ["一只猫"]}],
+        "extra": {"ds": {"scale": 1.0, "offset": [seed % 100, 0]}},
+    }
+    return prompt, workflow
+
+
+def save_png(path, prompt, workflow):
+    info = PngInfo()
+    info.add_text('prompt', json.dumps(prompt, ensure_ascii=False))
+    # 含中文的工作流写为 iTXt 压缩文本块
+    info.add_itxt('workflow', json.dumps(workflow, ensure_ascii=False), zip=True)
+    Image.new('RGB', (32, 32), (10, 20, 30)).save(path, pnginfo=info)
+
+
+def test_workflow_exporter():
+    """测试文件头文本块读取、种子分离去重、清单和还原原始工作流"""
+    print("🧪 开始测试工作流批量导出...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        image_dir = os.path.join(temp_dir, 'images')
+        os.makedirs(image_dir)
+        records = []
+        originals = {}
+        # 两种工作流（steps 不同），每种用 5 个不同的种子生成
+        for i in range(10):
+            path = os.path.join(image_dir, f"comfy_{i}.png")
+            prompt, workflow = make_workflow(seed=1000 + i, steps=20 if i < 5 else 30)
+            save_png(path, prompt, workflow)
+            originals[path] = (prompt, workflow)
+            records.append({'file_path': path, 'prompt': f"image {i}", 'generation_source': 'ComfyUI'})
+        records.append({'file_path': os.path.join(image_dir, 'plain.jpg'), 'prompt': 'plain'})
+        # 只有数据库中保存的执行格式
+        stored_prompt, _ = make_workflow(seed=5)
+        records.append({'file_path': os.path.join(image_dir, 'moved.png'), 'prompt': 'moved',
+                        'workflow_data': stored_prompt})
+
+        texts = read_png_text(records[0]['file_path'])
+        assert set(texts) == {'prompt', 'workflow'}
+        assert json.loads(texts['workflow']) == originals[records[0]['file_path']][1]
+        assert read_png_text(os.path.join(image_dir, 'missing.png')) == {}
+
+        data_manager = DataManager(os.path.join(temp_dir, 'test.db'), data_dir=temp_dir)
+        data_manager.save_records_bulk(records)
+
+        output_dir = os.path.join(temp_dir, 'archive')
+        progress = []
+        result = WorkflowExporter(max_workers=2).export(
+            data_manager.iter_records(order_by='id'), output_dir, total=12,
+            progress_callback=lambda done, total, path: progress.append(done))
+        assert result['records'] == 12 and result['images'] == 11 and result['no_workflow'] == 1
+        # 种子分离后：两个界面格式；执行格式另有一个来自数据库的（steps=20，与第一组相同）
+        assert result['workflows'] == 2 and result['prompts'] == 2
+        assert result['written'] == 4
+        assert progress == list(range(1, 13))
+        assert len(os.listdir(os.path.join(output_dir, 'workflows'))) == 2
+
+        with open(os.path.join(output_dir, 'manifest.json'), encoding='utf-8') as f:
+            manifest = json.load(f)
+        assert manifest['images'] == 11
+        assert sorted(entry['images'] for entry in manifest['workflows'].values()) == [5, 5]
+        assert sorted(entry['images'] for entry in manifest['prompts'].values()) == [5, 6]
+
+        # 用记录的种子还原每张图片的原始工作流（界面格式不含画布位置）
+        with open(os.path.join(output_dir, 'images.ndjson'), encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f]
+        assert len(lines) == 11
+        for line in lines[:10]:
+            with open(os.path.join(output_dir, 'prompts', line['prompt'] + '.json'), encoding='utf-8') as f:
+                prompt = json.load(f)
+            with open(os.path.join(output_dir, 'workflows', line['workflow'] + '.json'), encoding='utf-8') as f:
+                workflow = json.load(f)
+            assert 'ds' not in workflow['extra']
+            prompt, workflow = apply_seeds(prompt, workflow, line['seeds'])
+            original_prompt, original_workflow = originals[line['file_path']]
+            assert prompt == original_prompt
+            assert workflow['nodes'] == original_workflow['nodes']
+        assert lines[10]['workflow'] is None and lines[10]['seeds'] == {'prompt': {'3': {'seed': 5}}}
+
+        # 再次导出到同一目录：内容相同的文件不重复写出
+        result = WorkflowExporter().export(data_manager.iter_records(order_by='id'), output_dir)
+        assert result['written'] == 0 and result['workflows'] == 2
+
+        # 保留种子：每个种子一个文件；不导出执行格式
+        result = WorkflowExporter(include_prompt=False, dedupe_seeds=False).export(
+            data_manager.iter_records(order_by='id'), os.path.join(temp_dir, 'full'))
+        assert result['workflows'] == 10 and result['prompts'] == 0 and result['images'] == 10
+
+    print("✅ 工作流批量导出测试通过")
+
+
+if __name__ == "__main__":
+    test_workflow_exporter()
@@ -6,8 +6,6 @@ Fluent Design 批量导出对话框
 """
 
 import os
-import json
-import csv
 from datetime import datetime
 from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QFileDialog, 
                             QLabel, QProgressBar, QTextEdit, QMessageBox)
@@ -16,6 +14,10 @@ from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from qfluentwidgets import (CardWidget, PushButton, RadioButton, 
                            SubtitleLabel, BodyLabel, LineEdit, ComboBox)
 from .fluent_styles import FluentTheme, FluentIcons, FluentColors, FluentSpacing
+from core.streaming_exporter import StreamingExporter, parse_json_field
+from core.gallery_exporter import GalleryExporter
+from core.parquet_io import PYARROW_AVAILABLE, ParquetExporter
+from core.bundle_exporter import BundleExporter
 
 
 class BatchExportThread(QThread):
@@ -29,6 +31,14 @@ class BatchExportThread(QThread):
         self.export_format = export_format
         self.output_path = output_path
         self.include_images = include_images
+        self.exporter = StreamingExporter(chunk_size=100)
+        self.gallery_exporter = GalleryExporter()
+        self.excel_exporter = None
+        if export_format == "EXCEL":
+            from core.excel_exporter import StreamingExcelExporter
+            self.excel_exporter = StreamingExcelExporter(include_images=include_images)
+        self.parquet_exporter = ParquetExporter() if export_format == "PARQUET" else None
+        self.bundle_exporter = BundleExporter(include_images=include_images)
         
     def run(self):
         """执行导出"""
@@ -43,6 +53,10 @@ class BatchExportThread(QThread):
                 self.export_to_csv()
             elif self.export_format == "EXCEL":
                 self.export_to_excel()
+            elif self.export_format == "PARQUET":
+                self.export_to_parquet()
+            elif self.export_format == "ZIP":
+                self.export_to_bundle()
                 
             self.export_finished.emit(True, f"成功导出 {total_records} 条记录")
             
@@ -50,33 +64,33 @@ class BatchExportThread(QThread):
             self.export_finished.emit(False, f"导出失败: {str(e)}")
             
     def export_to_html(self):
-        """导出为HTML格式"""
-        html_content = self.generate_html_content()
-        
-        output_file = os.path.join(self.output_path, f"批量导出_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html")
-        
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(html_content)
-            
-        self.progress_updated.emit(100, f"HTML文件已保存到: {output_file}")
+        """导出为HTML图库（分页索引 + 详情页 + 缩略图）"""
+        output_dir = os.path.join(self.output_path, f"批量导出_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+        total = len(self.records)
+
+        def on_progress(done, _total, file_path):
+            self.progress_updated.emit(int(done / max(total, 1) * 95),
+                                       f"生成图库 {done}/{total}: {os.path.basename(file_path)}")
+
+        result = self.gallery_exporter.export(self.records, output_dir, total=total,
+                                              progress_callback=on_progress)
+        if result['cancelled']:
+            raise Exception("导出已取消")
+
+        message = f"HTML图库已保存到: {result['index_path']}"
+        if result['failed_images']:
+            message += f"（{result['failed_images']} 张图片无法生成缩略图）"
+        self.progress_updated.emit(100, message)
         
     def export_to_json(self):
         """导出为JSON格式"""
-        export_data = []
-        
-        for i, record in enumerate(self.records):
-            # 处理Lora信息
+        def to_export_record(record):
             lora_info_str = record.get('lora_info', '')
-            lora_data = None
-            if lora_info_str:
-                try:
-                    from core.data_manager import DataManager
-                    dm = DataManager()
-                    lora_data = dm._deserialize_lora_info(lora_info_str)
-                except:
-                    lora_data = {"raw": lora_info_str}
+            lora_data = parse_json_field(lora_info_str)
+            if lora_info_str and lora_data is None:
+                lora_data = {"raw": lora_info_str}
             
-            export_record = {
+            return {
                 "id": record.get('id'),
                 "file_path": record.get('file_path'),
                 "custom_name": record.get('custom_name'),
@@ -96,460 +110,135 @@ class BatchExportThread(QThread):
                 "created_at": record.get('created_at'),
                 "updated_at": record.get('updated_at')
             }
-            export_data.append(export_record)
-            
-            progress = int((i + 1) / len(self.records) * 100)
-            self.progress_updated.emit(progress, f"处理记录 {i+1}/{len(self.records)}")
             
         output_file = os.path.join(self.output_path, f"批量导出_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
-        
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(export_data, f, ensure_ascii=False, indent=2)
-            
-        self.progress_updated.emit(100, f"JSON文件已保存到: {output_file}")
+        self.stream_export(output_file, 'json', to_export_record, indent=2)
         
     def export_to_csv(self):
         """导出为CSV格式"""
-        output_file = os.path.join(self.output_path, f"批量导出_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
-        
-        with open(output_file, 'w', newline='', encoding='utf-8-sig') as f:
-            writer = csv.writer(f)
+        headers = [
+            "ID", "文件路径", "自定义名称", "正向提示词", "负向提示词", 
+            "模型", "采样器", "采样步数", "CFG缩放", "种子", "Lora信息", 
+            "生成参数", "生成来源", "标签", "备注", "工作流数据", "创建时间", "更新时间"
+        ]
+        
+        def to_row(record):
+            # 处理Lora信息显示
+            lora_info_str = record.get('lora_info', '')
+            lora_display = ""
+            if lora_info_str:
+                lora_info = parse_json_field(lora_info_str)
+                if lora_info is None:
+                    lora_display = "解析错误"
+                elif 'loras' in lora_info and lora_info['loras']:
+                    lora_names = [lora.get('name', '未知') for lora in lora_info['loras']]
+                    lora_display = "; ".join(lora_names)
+                elif 'raw_lora_text' in lora_info:
+                    lora_display = lora_info['raw_lora_text']
             
-            # 写入表头
-            headers = [
-                "ID", "文件路径", "自定义名称", "正向提示词", "负向提示词", 
-                "模型", "采样器", "采样步数", "CFG缩放", "种子", "Lora信息", 
-                "生成参数", "生成来源", "标签", "备注", "工作流数据", "创建时间", "更新时间"
+            values = [
+                record.get('id', ''),
+                record.get('file_path', ''),
+                record.get('custom_name', ''),
+                record.get('prompt', ''),
+                record.get('negative_prompt', ''),
+                record.get('model', ''),
+                record.get('sampler', ''),
+                record.get('steps', ''),
+                record.get('cfg_scale', ''),
+                record.get('seed', ''),
+                lora_display,
+                record.get('generation_params', ''),
+                record.get('generation_source', ''),
+                record.get('tags', ''),
+                record.get('notes', ''),
+                record.get('workflow_data', ''),
+                record.get('created_at', ''),
+                record.get('updated_at', '')
             ]
-            writer.writerow(headers)
+            return dict(zip(headers, values))
             
-            for i, record in enumerate(self.records):
-                # 处理Lora信息显示
-                lora_info_str = record.get('lora_info', '')
-                lora_display = ""
-                if lora_info_str:
-                    try:
-                        from core.data_manager import DataManager
-                        dm = DataManager()
-                        lora_info = dm._deserialize_lora_info(lora_info_str)
-                        if lora_info and 'loras' in lora_info and lora_info['loras']:
-                            lora_names = [lora.get('name', '未知') for lora in lora_info['loras']]
-                            lora_display = "; ".join(lora_names)
-                        elif lora_info and 'raw_lora_text' in lora_info:
-                            lora_display = lora_info['raw_lora_text']
-                    except:
-                        lora_display = "解析错误"
-                
-                row = [
-                    record.get('id', ''),
-                    record.get('file_path', ''),
-                    record.get('custom_name', ''),
-                    record.get('prompt', ''),
-                    record.get('negative_prompt', ''),
-                    record.get('model', ''),
-                    record.get('sampler', ''),
-                    record.get('steps', ''),
-                    record.get('cfg_scale', ''),
-                    record.get('seed', ''),
-                    lora_display,
-                    record.get('generation_params', ''),
-                    record.get('generation_source', ''),
-                    record.get('tags', ''),
-                    record.get('notes', ''),
-                    record.get('workflow_data', ''),
-                    record.get('created_at', ''),
-                    record.get('updated_at', '')
-                ]
-                writer.writerow(row)
-                
-                progress = int((i + 1) / len(self.records) * 100)
-                self.progress_updated.emit(progress, f"处理记录 {i+1}/{len(self.records)}")
-                
-        self.progress_updated.emit(100, f"CSV文件已保存到: {output_file}")
+        output_file = os.path.join(self.output_path, f"批量导出_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
+        self.stream_export(output_file, 'csv', to_row, fieldnames=headers, encoding='utf-8-sig')
         
-    def export_to_excel(self):
-        """导出为Excel格式"""
-        from core.excel_exporter import ExcelExporter
+    def stream_export(self, output_file, export_format, transform, **options):
+        """逐条转换并流式写入文件，按块报告进度"""
+        total = len(self.records)
         
-        output_file = os.path.join(self.output_path, f"批量导出_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx")
+        def on_progress(rows, total_rows, bytes_written):
+            progress = int(rows / total_rows * 100) if total_rows else 100
+            self.progress_updated.emit(progress, f"处理记录 {rows}/{total_rows}（{bytes_written / 1024:.0f} KB）")
+            
+        result = self.exporter.export(
+            self.records, output_file,
+            export_format=export_format,
+            compress=False,
+            transform=transform,
+            total_rows=total,
+            progress_callback=on_progress,
+            **options
+        )
         
-        exporter = ExcelExporter()
+        if result['cancelled']:
+            raise Exception("导出已取消")
+        self.progress_updated.emit(100, f"{export_format.upper()}文件已保存到: {output_file}")
+        
+    def cancel(self):
+        """取消导出"""
+        self.exporter.cancel()
+        self.gallery_exporter.cancel()
+        if self.excel_exporter:
+            self.excel_exporter.cancel()
+        if self.parquet_exporter:
+            self.parquet_exporter.cancel()
+        self.bundle_exporter.cancel()
+        
+    def export_to_bundle(self):
+        """打包为ZIP（记录、原图和去重的ComfyUI工作流）"""
+        output_file = os.path.join(self.output_path, f"批量导出_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip")
+        total = len(self.records)
+        
+        def on_progress(done, _total, bytes_written):
+            self.progress_updated.emit(int(done / max(total, 1) * 95),
+                                       f"打包 {done}/{total}（{bytes_written / 1024 / 1024:.1f} MB）")
+        
+        result = self.bundle_exporter.export(self.records, output_file, total=total,
+                                             progress_callback=on_progress)
+        if result['cancelled']:
+            raise Exception("导出已取消")
+        self.progress_updated.emit(100, f"ZIP包已保存到: {output_file}（{result['workflows']} 个工作流）")
+        
+    def export_to_parquet(self):
+        """导出为Parquet列式格式（带类型，便于 pandas / DuckDB 分析）"""
+        output_file = os.path.join(self.output_path, f"批量导出_{datetime.now().strftime('%Y%m%d_%H%M%S')}.parquet")
+        total = len(self.records)
+        
+        def on_progress(rows, _total, row_groups):
+            self.progress_updated.emit(int(rows / max(total, 1) * 95), f"写入Parquet {rows}/{total}")
+        
+        result = self.parquet_exporter.export(self.records, output_file, total_rows=total,
+                                              progress_callback=on_progress)
+        if result['cancelled']:
+            raise Exception("导出已取消")
+        self.progress_updated.emit(100, f"Parquet文件已保存到: {output_file}")
         
-        # 更新进度
-        self.progress_updated.emit(50, "正在生成Excel文件...")
+    def export_to_excel(self):
+        """导出为Excel格式（只写模式流式写入，缩略图在内存中生成）"""
+        output_file = os.path.join(self.output_path, f"批量导出_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx")
+        total = len(self.records)
         
-        success = exporter.export_records(
-            self.records, 
-            output_file, 
-            include_images=self.include_images
-        )
+        def on_progress(rows, _total, current_file):
+            self.progress_updated.emit(int(rows / max(total, 1) * 95), f"写入Excel {rows}/{total}")
         
-        if success:
-            self.progress_updated.emit(100, f"Excel文件已保存到: {output_file}")
-        else:
-            raise Exception("Excel导出失败")
-        
-    def generate_html_content(self):
-        """生成HTML内容"""
-        html_template = '''
-<!DOCTYPE html>
-<html lang="zh-CN">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>AI图片信息批量导出</title>
-    <style>
-        * {{
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }}
-        
-        body {{
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-            padding: 20px;
-        }}
-        
-        .container {{
-            max-width: 1200px;
-            margin: 0 auto;
-            background: white;
-            border-radius: 20px;
-            box-shadow: 0 20px 40px rgba(0,0,0,0.1);
-            overflow: hidden;
-        }}
-        
-        .header {{
-            background: linear-gradient(135deg, #4f46e5 0%, #7c3aed 100%);
-            color: white;
-            padding: 30px;
-            text-align: center;
-        }}
-        
-        .header h1 {{
-            font-size: 2.5em;
-            margin-bottom: 10px;
-            font-weight: 600;
-        }}
-        
-        .header p {{
-            font-size: 1.1em;
-            opacity: 0.9;
-        }}
-        
-        .stats {{
-            display: flex;
-            justify-content: center;
-            gap: 40px;
-            margin-top: 20px;
-            flex-wrap: wrap;
-        }}
-        
-        .stat-item {{
-            text-align: center;
-        }}
-        
-        .stat-number {{
-            font-size: 2em;
-            font-weight: bold;
-            display: block;
-        }}
-        
-        .stat-label {{
-            font-size: 0.9em;
-            opacity: 0.8;
-        }}
-        
-        .content {{
-            padding: 30px;
-        }}
-        
-        .record-card {{
-            background: #f8fafc;
-            border: 1px solid #e2e8f0;
-            border-radius: 16px;
-            margin-bottom: 30px;
-            overflow: hidden;
-            transition: all 0.3s ease;
-        }}
-        
-        .record-card:hover {{
-            transform: translateY(-2px);
-            box-shadow: 0 10px 25px rgba(0,0,0,0.1);
-        }}
-        
-        .record-header {{
-            background: linear-gradient(135deg, #f1f5f9 0%, #e2e8f0 100%);
-            padding: 20px;
-            border-bottom: 1px solid #e2e8f0;
-        }}
-        
-        .record-title {{
-            font-size: 1.3em;
-            font-weight: 600;
-            color: #1e293b;
-            margin-bottom: 8px;
-            display: flex;
-            align-items: center;
-            gap: 10px;
-        }}
-        
-        .record-meta {{
-            display: flex;
-            gap: 20px;
-            font-size: 0.9em;
-            color: #64748b;
-            flex-wrap: wrap;
-        }}
-        
-        .record-body {{
-            padding: 25px;
-        }}
-        
-        .info-grid {{
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(300px, 1fr));
-            gap: 20px;
-            margin-bottom: 20px;
-        }}
-        
-        .info-item {{
-            background: white;
-            padding: 15px;
-            border-radius: 12px;
-            border: 1px solid #e2e8f0;
-        }}
-        
-        .info-label {{
-            font-weight: 600;
-            color: #374151;
-            margin-bottom: 8px;
-            font-size: 0.9em;
-            text-transform: uppercase;
-            letter-spacing: 0.5px;
-        }}
-        
-        .info-value {{
-            color: #1f2937;
-            line-height: 1.5;
-            word-break: break-word;
-        }}
-        
-        .prompt-section {{
-            margin-top: 20px;
-        }}
-        
-        .prompt-positive, .prompt-negative {{
-            background: white;
-            border: 1px solid #e2e8f0;
-            border-radius: 12px;
-            padding: 15px;
-            margin-bottom: 15px;
-        }}
-        
-        .prompt-positive {{
-            border-left: 4px solid #10b981;
-        }}
-        
-        .prompt-negative {{
-            border-left: 4px solid #ef4444;
-        }}
-        
-        .prompt-label {{
-            font-weight: 600;
-            margin-bottom: 8px;
-            font-size: 0.9em;
-        }}
-        
-        .prompt-positive .prompt-label {{
-            color: #059669;
-        }}
-        
-        .prompt-negative .prompt-label {{
-            color: #dc2626;
-        }}
-        
-        .prompt-text {{
-            line-height: 1.6;
-            color: #374151;
-        }}
-        
-        .tag {{
-            display: inline-block;
-            background: #ddd6fe;
-            color: #5b21b6;
-            padding: 4px 12px;
-            border-radius: 20px;
-            font-size: 0.8em;
-            margin: 2px;
-            font-weight: 500;
-        }}
-        
-        .footer {{
-            background: #f8fafc;
-            padding: 20px;
-            text-align: center;
-            color: #64748b;
-            border-top: 1px solid #e2e8f0;
-        }}
-        
-        @media (max-width: 768px) {{
-            .stats {{
-                gap: 20px;
-            }}
-            
-            .record-meta {{
-                flex-direction: column;
-                gap: 8px;
-            }}
-            
-            .info-grid {{
-                grid-template-columns: 1fr;
-            }}
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>🎨 AI图片信息批量导出</h1>
-            <p>AI Image Information Batch Export</p>
-            <div class="stats">
-                <div class="stat-item">
-                    <span class="stat-number">{total_count}</span>
-                    <span class="stat-label">总记录数</span>
-                </div>
-                <div class="stat-item">
-                    <span class="stat-number">{export_time}</span>
-                    <span class="stat-label">导出时间</span>
-                </div>
-            </div>
-        </div>
-        
-        <div class="content">
-            {records_html}
-        </div>
-        
-        <div class="footer">
-            <p>由 AI图片信息提取工具 生成 | Generated by AI Image Info Extractor</p>
-            <p>导出时间: {export_time_full}</p>
-        </div>
-    </div>
-</body>
-</html>
-        '''
-        
-        # 生成记录HTML
-        records_html = ""
-        for i, record in enumerate(self.records):
-            # 处理Lora信息
-            lora_info_str = record.get('lora_info', '')
-            lora_display = "无"
-            if lora_info_str:
-                try:
-                    from core.data_manager import DataManager
-                    dm = DataManager()
-                    lora_info = dm._deserialize_lora_info(lora_info_str)
-                    if lora_info and 'loras' in lora_info and lora_info['loras']:
-                        lora_list = []
-                        for lora in lora_info['loras']:
-                            name = lora.get('name', '未知')
-                            strength = lora.get('strength', 1.0)
-                            lora_list.append(f"{name} ({strength})")
-                        lora_display = "<br>".join(lora_list)
-                    elif lora_info and 'raw_lora_text' in lora_info:
-                        lora_display = lora_info['raw_lora_text']
-                except:
-                    lora_display = "解析错误"
-            
-            # 处理标签
-            tags_html = ""
-            tags = record.get('tags', '')
-            if tags:
-                tag_list = [tag.strip() for tag in tags.split(',') if tag.strip()]
-                tags_html = ''.join([f'<span class="tag">{tag}</span>' for tag in tag_list])
-            
-            record_html = f'''
-            <div class="record-card">
-                <div class="record-header">
-                    <div class="record-title">
-                        🖼️ {record.get('custom_name', '') or os.path.basename(record.get('file_path', '未知文件'))}
-                    </div>
-                    <div class="record-meta">
-                        <span>📁 {os.path.basename(record.get('file_path', ''))}</span>
-                        <span>🔗 {record.get('generation_source', '未知')}</span>
-                        <span>📅 {record.get('created_at', '')[:16] if record.get('created_at') else ''}</span>
-                    </div>
-                </div>
-                
-                <div class="record-body">
-                    <div class="info-grid">
-                        <div class="info-item">
-                            <div class="info-label">🤖 模型</div>
-                            <div class="info-value">{record.get('model', '未知')}</div>
-                        </div>
-                        <div class="info-item">
-                            <div class="info-label">🎯 Lora</div>
-                            <div class="info-value">{lora_display}</div>
-                        </div>
-                        <div class="info-item">
-                            <div class="info-label">🎲 采样器</div>
-                            <div class="info-value">{record.get('sampler', '无')}</div>
-                        </div>
-                        <div class="info-item">
-                            <div class="info-label">🔢 采样步数</div>
-                            <div class="info-value">{record.get('steps', '无')}</div>
-                        </div>
-                        <div class="info-item">
-                            <div class="info-label">📊 CFG缩放</div>
-                            <div class="info-value">{record.get('cfg_scale', '无')}</div>
-                        </div>
-                        <div class="info-item">
-                            <div class="info-label">🌱 种子</div>
-                            <div class="info-value">{record.get('seed', '无')}</div>
-                        </div>
-                        <div class="info-item">
-                            <div class="info-label">⚙️ 生成参数</div>
-                            <div class="info-value">{record.get('generation_params', '无')}</div>
-                        </div>
-                        <div class="info-item">
-                            <div class="info-label">🏷️ 标签</div>
-                            <div class="info-value">{tags_html or '无标签'}</div>
-                        </div>
-                    </div>
-                    
-                    <div class="prompt-section">
-                        <div class="prompt-positive">
-                            <div class="prompt-label">✅ 正向提示词</div>
-                            <div class="prompt-text">{record.get('prompt', '无')}</div>
-                        </div>
-                        <div class="prompt-negative">
-                            <div class="prompt-label">❌ 负向提示词</div>
-                            <div class="prompt-text">{record.get('negative_prompt', '无')}</div>
-                        </div>
-                    </div>
-                    
-                    {f'<div class="info-item"><div class="info-label">📝 备注</div><div class="info-value">{record.get("notes", "")}</div></div>' if record.get('notes') else ''}
-                </div>
-            </div>
-            '''
-            records_html += record_html
-            
-            progress = int((i + 1) / len(self.records) * 90)
-            self.progress_updated.emit(progress, f"生成HTML内容 {i+1}/{len(self.records)}")
-        
-        # 填充模板
-        export_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        html_content = html_template.format(
-            total_count=len(self.records),
-            export_time=datetime.now().strftime('%H:%M:%S'),
-            export_time_full=export_time,
-            records_html=records_html
-        )
+        result = self.excel_exporter.export(self.records, output_file, total_rows=total,
+                                            progress_callback=on_progress)
+        if result['cancelled']:
+            raise Exception("导出已取消")
         
-        return html_content
+        message = f"Excel文件已保存到: {result['output_paths'][0]}"
+        if len(result['output_paths']) > 1:
+            message += f" 等 {len(result['output_paths'])} 个文件"
+        self.progress_updated.emit(100, message)
 
 
 class FluentBatchExportDialog(QDialog):
@@ -614,11 +303,19 @@ class FluentBatchExportDialog(QDialog):
         self.html_radio = RadioButton("HTML - 网页格式")
         self.json_radio = RadioButton("JSON - 数据格式")
         self.csv_radio = RadioButton("CSV - 表格格式")
+        self.parquet_radio = RadioButton("Parquet - 数据分析格式")
+        self.zip_radio = RadioButton("ZIP - 打包分享（含原图和工作流）")
         
         format_layout.addWidget(self.excel_radio)
         format_layout.addWidget(self.html_radio)
         format_layout.addWidget(self.json_radio)
         format_layout.addWidget(self.csv_radio)
+        format_layout.addWidget(self.zip_radio)
+        # 安装了 pyarrow 时才提供 Parquet 格式
+        if PYARROW_AVAILABLE:
+            format_layout.addWidget(self.parquet_radio)
+        else:
+            self.parquet_radio.setVisible(False)
         
         format_card.setLayout(format_layout)
         main_layout.addWidget(format_card)
@@ -742,6 +439,10 @@ class FluentBatchExportDialog(QDialog):
             export_format = "HTML"
         elif self.json_radio.isChecked():
             export_format = "JSON"
+        elif self.parquet_radio.isChecked():
+            export_format = "PARQUET"
+        elif self.zip_radio.isChecked():
+            export_format = "ZIP"
         else:
             export_format = "CSV"
             
@@ -758,6 +459,14 @@ class FluentBatchExportDialog(QDialog):
         self.export_thread.export_finished.connect(self.export_finished)
         self.export_thread.start()
         
+    def reject(self):
+        """关闭对话框时取消正在进行的导出"""
+        export_thread = getattr(self, 'export_thread', None)
+        if export_thread and export_thread.isRunning():
+            export_thread.cancel()
+            export_thread.wait(3000)
+        super().reject()
+        
     def update_progress(self, progress, message):
         """更新进度"""
         self.progress_bar.setValue(progress)
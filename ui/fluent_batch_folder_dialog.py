@@ -11,9 +11,14 @@ from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
 from PyQt5.QtCore import Qt, QThread, pyqtSignal
 
 from qfluentwidgets import (CardWidget, PushButton, SubtitleLabel, BodyLabel, 
-                           SpinBox, CheckBox)
+                           SpinBox, CheckBox, ComboBox)
 from .fluent_styles import FluentTheme, FluentIcons, FluentColors, FluentSpacing
 from core.batch_processor import BatchProcessor
+from core.folder_scanner import FolderScanner
+from core.batch_job import BatchJob
+from core.concurrency_tuner import ConcurrencyTuner
+from core.progress_reporter import ProgressReporter, format_duration
+from core.result_sink import ResultSink
 
 
 class BatchFolderProcessThread(QThread):
@@ -21,65 +26,202 @@ class BatchFolderProcessThread(QThread):
     progress_updated = pyqtSignal(int, str, int, int)  # 进度、消息、成功数、失败数
     process_finished = pyqtSignal(bool, str, int, int)  # 完成状态、消息、成功数、失败数
     
-    def __init__(self, folder_path, data_manager, include_subdirs=True, max_workers=4):
+    def __init__(self, folder_path, data_manager, include_subdirs=True, max_workers=4,
+                 incremental=True, job=None, auto_tune=True, duplicate_policy='import'):
         super().__init__()
         self.folder_path = folder_path
         self.data_manager = data_manager
         self.include_subdirs = include_subdirs
         self.max_workers = max_workers
+        self.incremental = incremental
+        self.job = job
+        self.auto_tune = auto_tune
+        self.duplicate_policy = duplicate_policy
+        self.tuner = None
+        self.reporter = None
+        self.result_sink = None
+        self.report_path = None
         self.batch_processor = None
+        self.scanner = None
         
     def run(self):
-        """执行批量处理"""
+        """执行批量处理（边扫描边处理，结果按批写入数据库）"""
         try:
             # 创建批量处理器
             self.batch_processor = BatchProcessor(self.data_manager)
             
-            # 扫描文件夹
-            image_files = self.batch_processor.scan_folder(
-                self.folder_path, 
-                recursive=self.include_subdirs
-            )
+            # 创建或继续批量任务：每批入库后记录检查点，中断后可从断点继续
+            if self.job is None:
+                self.job = BatchJob.create(self.data_manager.db_path, self.folder_path, {
+                    'include_subdirs': self.include_subdirs,
+                    'incremental': self.incremental,
+                    'duplicate_policy': self.duplicate_policy,
+                })
             
-            if not image_files:
-                self.process_finished.emit(False, "未找到支持的图片文件", 0, 0)
-                return
+            # 自动调节时以设置的线程数为起点，根据吞吐量和 I/O 等待增减
+            if self.auto_tune:
+                self.tuner = ConcurrencyTuner(initial_workers=self.max_workers)
+            
+            self.scanner = self.batch_processor.create_scanner()
+            if self.incremental:
+                # 增量模式：跳过大小和修改时间未变化的文件，并标记已删除的文件
+                image_files = self.batch_processor.iter_changed_images(
+                    self.folder_path,
+                    recursive=self.include_subdirs,
+                    scanner=self.scanner,
+                    detect_missing=True
+                )
+            else:
+                image_files = self.batch_processor.iter_folder_images(
+                    self.folder_path, 
+                    recursive=self.include_subdirs,
+                    scanner=self.scanner
+                )
             
-            # 开始批量处理
-            results = self.batch_processor.batch_process_images(
+            # 进度按固定频率汇总后再发送信号，避免小文件时信号淹没界面
+            self.reporter = ProgressReporter(callback=self.on_progress_updated)
+            # 记录已写入数据库，界面只保留计数和有限的失败样本，大批量导入后内存不会持续增长
+            self.result_sink = ResultSink(max_failure_samples=50)
+            for _ in self.batch_processor.process_stream(
                 image_files,
-                progress_callback=self.on_progress_updated,
                 auto_save=True,
-                max_workers=self.max_workers
-            )
+                max_workers=self.max_workers,
+                job=self.job,
+                tuner=self.tuner,
+                reporter=self.reporter,
+                duplicate_policy=self.duplicate_policy,
+                result_sink=self.result_sink
+            ):
+                pass
+            self.result_sink.close()
             
-            success_count = results['successful_count']
-            error_count = results['failed_count']
+            success_count = self.reporter.successful
+            error_count = self.reporter.failed
+            duplicate_count = self.reporter.skipped
+            self.reporter.finish('stopped' if self.batch_processor.pipeline.is_cancelled else 'completed')
+            self.write_report()
             
-            if error_count == 0:
-                self.process_finished.emit(
-                    True, 
-                    f"批量处理完成！成功处理 {success_count} 个文件", 
-                    success_count, 
-                    error_count
-                )
+            incremental_stats = self.batch_processor.incremental_stats if self.incremental else {}
+            unchanged_count = incremental_stats.get('unchanged', 0)
+            
+            if success_count + error_count == 0:
+                if duplicate_count:
+                    self.process_finished.emit(True, f"没有新图片（跳过 {duplicate_count} 个重复图片）", 0, 0)
+                elif self.job.skipped_count:
+                    self.process_finished.emit(True, f"任务已完成（{self.job.skipped_count} 个文件此前已处理）", 0, 0)
+                elif unchanged_count:
+                    self.process_finished.emit(True, f"没有新增或修改的文件（{unchanged_count} 个文件未变化）", 0, 0)
+                else:
+                    self.process_finished.emit(False, "未找到支持的图片文件", 0, 0)
+                return
+            
+            if self.batch_processor.pipeline.is_cancelled:
+                message = f"批量处理已停止，已处理 {success_count + error_count} 个文件，下次可从断点继续"
+            elif error_count == 0:
+                message = f"批量处理完成！成功处理 {success_count} 个文件"
             else:
-                self.process_finished.emit(
-                    True, 
-                    f"批量处理完成！成功 {success_count} 个，失败 {error_count} 个", 
-                    success_count, 
-                    error_count
-                )
+                message = f"批量处理完成！成功 {success_count} 个，失败 {error_count} 个"
+            if self.job.skipped_count:
+                message += f"，跳过 {self.job.skipped_count} 个此前已处理的文件"
+            if unchanged_count:
+                message += f"，跳过 {unchanged_count} 个未变化的文件"
+            if duplicate_count:
+                message += f"，跳过 {duplicate_count} 个重复图片"
+            if incremental_stats.get('missing'):
+                message += f"，{incremental_stats['missing']} 条记录的文件已不存在"
+            if self.reporter.errors:
+                message += "\n失败原因: " + "，".join(
+                    f"{error_type} {count} 个" for error_type, count in self.reporter.errors.most_common())
+                for sample in self.result_sink.failure_samples[:3]:
+                    message += f"\n  {os.path.basename(sample['file_path'])}: {sample['error'] or '未提取到信息'}"
+            self.process_finished.emit(True, message, success_count, error_count)
                 
         except Exception as e:
             self.process_finished.emit(False, f"批量处理失败: {str(e)}", 0, 0)
             
-    def on_progress_updated(self, current, total, current_file):
-        """处理进度更新"""
-        progress = int((current / total * 100)) if total > 0 else 0
-        message = f"正在处理: {os.path.basename(current_file)} ({current}/{total})"
-        # 这里暂时传递0作为成功和失败数，因为处理过程中无法准确统计
-        self.progress_updated.emit(progress, message, 0, 0)
+    def write_report(self):
+        """在数据目录下写出 JSON 任务报告"""
+        report_dir = os.path.join(self.data_manager.data_dir, 'batch_reports')
+        self.report_path = self.reporter.write_report(
+            os.path.join(report_dir, f"{self.job.job_id}.json"),
+            extra={
+                'job_id': self.job.job_id,
+                'folder_path': self.folder_path,
+                'options': self.job.options,
+                'skipped_completed': self.job.skipped_count,
+                'incremental': self.batch_processor.incremental_stats if self.incremental else {},
+                'concurrency': self.tuner.get_decisions() if self.tuner else [],
+                'failure_samples': self.result_sink.failure_samples,
+            }
+        )
+            
+    def on_progress_updated(self, snapshot):
+        """处理进度更新（由进度汇总按固定频率调用）"""
+        current = snapshot['processed']
+        total = snapshot['total']
+        current_file = os.path.basename(snapshot['current_file'])
+        if snapshot['scan_finished']:
+            message = f"正在处理: {current_file} ({current}/{total})"
+        else:
+            message = f"正在处理: {current_file} ({current}/{total}，仍在扫描)"
+        message += (f"\n{snapshot['files_per_sec']:.1f} 文件/秒 · {snapshot['mb_per_sec']:.1f} MB/秒"
+                    f" · 剩余 {format_duration(snapshot['eta_seconds'])}")
+        if self.tuner:
+            status = self.tuner.get_status()
+            message += f" · {status['workers']} 线程"
+            if 'throughput' in status:
+                mode = "I/O密集" if status['mode'] == 'io' else "CPU密集"
+                message += f"（{mode}）"
+        self.progress_updated.emit(snapshot['percent'], message, snapshot['successful'], snapshot['failed'])
+        
+    def pause(self):
+        """暂停处理（正在处理的文件完成后暂停）"""
+        if self.job:
+            self.job.pause()
+            
+    def resume(self):
+        """继续处理"""
+        if self.job:
+            self.job.resume()
+        
+    def stop(self):
+        """停止处理（保留检查点）"""
+        if self.scanner:
+            self.scanner.cancel()
+        if self.job:
+            self.job.cancel()
+        elif self.batch_processor:
+            self.batch_processor.stop_processing()
+
+
+class FolderScanThread(QThread):
+    """后台扫描文件夹，实时报告已发现的图片数量"""
+    count_updated = pyqtSignal(int, int)  # 已发现图片数、已扫描目录数
+    scan_finished = pyqtSignal(int, bool)  # 图片总数、是否被取消
+    
+    # 计数刷新间隔（文件数）
+    UPDATE_INTERVAL = 200
+    
+    def __init__(self, folder_path, include_subdirs=True):
+        super().__init__()
+        self.folder_path = folder_path
+        self.include_subdirs = include_subdirs
+        self.scanner = None
+        
+    def run(self):
+        """执行扫描"""
+        self.scanner = FolderScanner(BatchProcessor.SUPPORTED_FORMATS)
+        count = 0
+        for _ in self.scanner.scan(self.folder_path, recursive=self.include_subdirs):
+            count += 1
+            if count % self.UPDATE_INTERVAL == 0:
+                self.count_updated.emit(count, self.scanner.dirs_scanned)
+        self.scan_finished.emit(count, self.scanner.is_cancelled)
+        
+    def cancel(self):
+        """取消扫描"""
+        if self.scanner:
+            self.scanner.cancel()
 
 
 class FluentBatchFolderDialog(QDialog):
@@ -90,6 +232,7 @@ class FluentBatchFolderDialog(QDialog):
         self.folder_path = folder_path
         self.data_manager = data_manager
         self.process_thread = None
+        self.scan_thread = None
         self.init_ui()
         self.scan_folder()
         
@@ -160,6 +303,11 @@ class FluentBatchFolderDialog(QDialog):
         self.include_subdirs_cb.stateChanged.connect(self.scan_folder)  # 状态改变时重新扫描
         options_layout.addWidget(self.include_subdirs_cb)
         
+        # 增量处理选项
+        self.incremental_cb = CheckBox("仅处理新增或修改的文件（增量）")
+        self.incremental_cb.setChecked(True)
+        options_layout.addWidget(self.incremental_cb)
+        
         # 并发处理数设置
         workers_layout = QHBoxLayout()
         workers_label = BodyLabel("并发处理数:")
@@ -170,12 +318,35 @@ class FluentBatchFolderDialog(QDialog):
         self.workers_spinbox.setValue(4)
         self.workers_spinbox.setFixedWidth(80)
         
+        self.auto_tune_cb = CheckBox("自动调节")
+        self.auto_tune_cb.setChecked(True)
+        self.auto_tune_cb.setToolTip("根据处理速度和磁盘/网络等待自动增减线程数，上面的数值作为初始值")
+        
         workers_layout.addWidget(workers_label)
         workers_layout.addWidget(self.workers_spinbox)
+        workers_layout.addSpacing(10)
+        workers_layout.addWidget(self.auto_tune_cb)
         workers_layout.addStretch()
         
         options_layout.addLayout(workers_layout)
         
+        # 重复图片处理方式（按感知哈希判断与图库中已有图片是否相似）
+        duplicate_layout = QHBoxLayout()
+        duplicate_label = BodyLabel("重复图片:")
+        duplicate_label.setFixedWidth(100)
+        
+        self.duplicate_combo = ComboBox()
+        for text, policy in (("照常导入", 'import'), ("导入并标记为重复", 'link'), ("跳过", 'skip')):
+            self.duplicate_combo.addItem(text, userData=policy)
+        self.duplicate_combo.setFixedWidth(160)
+        self.duplicate_combo.setToolTip("与图库中已有图片内容相同或几乎相同（缩放、重新压缩）时的处理方式")
+        
+        duplicate_layout.addWidget(duplicate_label)
+        duplicate_layout.addWidget(self.duplicate_combo)
+        duplicate_layout.addStretch()
+        
+        options_layout.addLayout(duplicate_layout)
+        
         options_card.setLayout(options_layout)
         main_layout.addWidget(options_card)
         
@@ -239,6 +410,11 @@ class FluentBatchFolderDialog(QDialog):
         self.cancel_btn.setFixedSize(100, 36)
         self.cancel_btn.clicked.connect(self.reject)
         
+        self.pause_btn = PushButton("暂停")
+        self.pause_btn.setFixedSize(100, 36)
+        self.pause_btn.setVisible(False)
+        self.pause_btn.clicked.connect(self.toggle_pause)
+        
         self.start_btn = PushButton("开始处理")
         self.start_btn.setFixedSize(120, 36)
         self.start_btn.setStyleSheet(f"""
@@ -260,44 +436,78 @@ class FluentBatchFolderDialog(QDialog):
         
         button_layout.addWidget(self.cancel_btn)
         button_layout.addSpacing(10)
+        button_layout.addWidget(self.pause_btn)
+        button_layout.addSpacing(10)
         button_layout.addWidget(self.start_btn)
         
         main_layout.addLayout(button_layout)
         self.setLayout(main_layout)
         
     def scan_folder(self):
-        """扫描文件夹"""
-        try:
-            # 使用BatchProcessor来扫描文件夹
-            from core.batch_processor import BatchProcessor
-            processor = BatchProcessor()
-            
-            # 先用当前设置扫描
-            include_subdirs = self.include_subdirs_cb.isChecked()
-            image_files = processor.scan_folder(self.folder_path, recursive=include_subdirs)
-            image_count = len(image_files)
-            
+        """在后台扫描文件夹，界面显示实时计数"""
+        if self.scan_thread and self.scan_thread.isRunning():
+            self.scan_thread.cancel()
+            self.scan_thread.wait()
+        
+        self.start_btn.setEnabled(False)
+        self.stats_label.setText("正在扫描文件...")
+        self.stats_label.setStyleSheet(f"color: {FluentColors.get_color('text_tertiary')};")
+        
+        self.scan_thread = FolderScanThread(self.folder_path, self.include_subdirs_cb.isChecked())
+        self.scan_thread.count_updated.connect(self.on_scan_progress)
+        self.scan_thread.scan_finished.connect(self.on_scan_finished)
+        self.scan_thread.start()
+        
+    def on_scan_progress(self, image_count, dirs_scanned):
+        """扫描进度"""
+        self.stats_label.setText(f"正在扫描... 已发现 {image_count} 个图片文件（{dirs_scanned} 个文件夹）")
+        
+    def on_scan_finished(self, image_count, cancelled):
+        """扫描完成"""
+        if cancelled:
+            return
+        
+        if image_count == 0:
+            self.start_btn.setEnabled(False)
+            self.stats_label.setText("未发现支持的图片文件")
+            self.stats_label.setStyleSheet(f"color: {FluentColors.get_color('error')};")
+        else:
+            self.start_btn.setEnabled(True)
             self.stats_label.setText(f"发现 {image_count} 个图片文件")
+            self.stats_label.setStyleSheet(f"color: {FluentColors.get_color('text_tertiary')};")
             
-            if image_count == 0:
-                self.start_btn.setEnabled(False)
-                self.stats_label.setText("未发现支持的图片文件")
-                self.stats_label.setStyleSheet(f"color: {FluentColors.get_color('error')};")
-            else:
-                self.start_btn.setEnabled(True)
-                self.stats_label.setStyleSheet(f"color: {FluentColors.get_color('text_tertiary')};")
+    def start_processing(self):
+        """开始批量处理"""
+        # 扫描尚未结束时直接停止，处理线程会重新边扫描边处理
+        if self.scan_thread and self.scan_thread.isRunning():
+            self.scan_thread.cancel()
             
+        # 该文件夹有未完成的任务时询问是否从断点继续
+        job = None
+        try:
+            resumable = BatchJob.find_resumable(self.data_manager.db_path, self.folder_path)
         except Exception as e:
-            self.stats_label.setText(f"扫描失败: {str(e)}")
-            self.stats_label.setStyleSheet(f"color: {FluentColors.get_color('error')};")
-            self.start_btn.setEnabled(False)
+            print(f"读取批量任务失败: {e}")
+            resumable = None
+        if resumable:
+            reply = QMessageBox.question(
+                self, "继续任务",
+                f"该文件夹有未完成的批量任务（已处理 {resumable.successful_count + resumable.failed_count} 个文件），"
+                f"是否从断点继续？",
+                QMessageBox.Yes | QMessageBox.No,
+                QMessageBox.Yes
+            )
+            if reply == QMessageBox.Yes:
+                job = resumable
+            else:
+                resumable.delete()
             
-    def start_processing(self):
-        """开始批量处理"""
         # 显示进度卡片
         self.progress_card.setVisible(True)
         self.start_btn.setEnabled(False)
         self.cancel_btn.setText("停止")
+        self.pause_btn.setText("暂停")
+        self.pause_btn.setVisible(True)
         
         # 获取处理选项
         include_subdirs = self.include_subdirs_cb.isChecked()
@@ -308,12 +518,28 @@ class FluentBatchFolderDialog(QDialog):
             self.folder_path, 
             self.data_manager, 
             include_subdirs, 
-            max_workers
+            max_workers,
+            incremental=self.incremental_cb.isChecked(),
+            job=job,
+            auto_tune=self.auto_tune_cb.isChecked(),
+            duplicate_policy=self.duplicate_combo.currentData() or 'import'
         )
         self.process_thread.progress_updated.connect(self.update_progress)
         self.process_thread.process_finished.connect(self.process_finished)
         self.process_thread.start()
         
+    def toggle_pause(self):
+        """暂停或继续处理"""
+        if not (self.process_thread and self.process_thread.isRunning()):
+            return
+        if self.pause_btn.text() == "暂停":
+            self.process_thread.pause()
+            self.pause_btn.setText("继续")
+            self.progress_label.setText("⏸ 已暂停")
+        else:
+            self.process_thread.resume()
+            self.pause_btn.setText("暂停")
+        
     def update_progress(self, progress, message, success_count, error_count):
         """更新进度"""
         self.progress_bar.setValue(progress)
@@ -325,6 +551,7 @@ class FluentBatchFolderDialog(QDialog):
         """处理完成"""
         self.start_btn.setEnabled(True)
         self.cancel_btn.setText("关闭")
+        self.pause_btn.setVisible(False)
         
         self.success_label.setText(f"成功: {success_count}")
         self.error_label.setText(f"失败: {error_count}")
@@ -339,16 +566,19 @@ class FluentBatchFolderDialog(QDialog):
             
     def reject(self):
         """取消对话框"""
+        if self.scan_thread and self.scan_thread.isRunning():
+            self.scan_thread.cancel()
+            self.scan_thread.wait()
         if self.process_thread and self.process_thread.isRunning():
             # 这里可以添加停止处理的逻辑
             reply = QMessageBox.question(
-                self, "确认", "确定要停止批量处理吗？",
+                self, "确认", "确定要停止批量处理吗？已处理的进度会保留，下次可从断点继续。",
                 QMessageBox.Yes | QMessageBox.No,
                 QMessageBox.No
             )
             if reply == QMessageBox.Yes:
-                # 强制终止线程（不推荐，但在这里可以接受）
-                self.process_thread.terminate()
+                # 停止流水线，已提取的结果会先写入数据库
+                self.process_thread.stop()
                 self.process_thread.wait()
                 super().reject()
         else:
@@ -400,10 +400,16 @@ class FluentExportShare(QObject):
             )
             
             if save_path:
-                exporter.export_records(records, save_path, config)
+                include_images = config.get('include_images', True) if config else True
+                if not exporter.export_records(records, save_path, include_images=include_images):
+                    raise Exception("Excel导出失败")
+                output_paths = exporter.last_result['output_paths']
+                content = f"Excel文件已保存到: {save_path}"
+                if len(output_paths) > 1:
+                    content += f"（记录较多，已拆分为 {len(output_paths)} 个文件）"
                 InfoBar.success(
                     title="导出成功",
-                    content=f"Excel文件已保存到: {save_path}",
+                    content=content,
                     orient=Qt.Horizontal,
                     isClosable=True,
                     position=InfoBarPosition.TOP,
@@ -414,24 +420,24 @@ class FluentExportShare(QObject):
             raise e
     
     def _export_to_html(self, records, config):
-        """导出到HTML"""
+        """导出到HTML图库（所选路径去掉扩展名作为图库文件夹）"""
         try:
             # 获取保存路径
             save_path, _ = QFileDialog.getSaveFileName(
                 self.parent,
-                "导出HTML文件",
+                "导出HTML图库",
                 "图片信息导出.html",
                 "HTML文件 (*.html);;所有文件 (*)"
             )
             
             if save_path:
-                html_content = self.parent.html_exporter.export_multiple_records(records, config)
-                with open(save_path, 'w', encoding='utf-8') as f:
-                    f.write(html_content)
+                from core.gallery_exporter import GalleryExporter
+                output_dir = os.path.splitext(save_path)[0]
+                result = GalleryExporter().export(records, output_dir, total=len(records))
                 
                 InfoBar.success(
                     title="导出成功",
-                    content=f"HTML文件已保存到: {save_path}",
+                    content=f"HTML图库已保存到: {result['index_path']}",
                     orient=Qt.Horizontal,
                     isClosable=True,
                     position=InfoBarPosition.TOP,
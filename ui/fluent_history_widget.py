@@ -151,6 +151,12 @@ class FluentHistoryWidget(CardWidget):
         self.refresh_btn.setFixedHeight(36)
         self.refresh_btn.setMinimumWidth(80)
         
+        # 查找重复按钮（按感知哈希把相似图片排在一起）
+        self.find_duplicates_btn = PushButton("查找重复")
+        self.find_duplicates_btn.setFixedHeight(36)
+        self.find_duplicates_btn.setMinimumWidth(100)
+        self.find_duplicates_btn.setToolTip("列出内容相同或几乎相同的图片，相似的记录排在一起")
+        
         # 删除选中按钮
         self.delete_record_btn = PushButton("删除选中")
         self.delete_record_btn.setFixedHeight(36)
@@ -256,6 +262,7 @@ class FluentHistoryWidget(CardWidget):
         """)
         
         button_layout.addWidget(self.refresh_btn)
+        button_layout.addWidget(self.find_duplicates_btn)
         button_layout.addWidget(self.select_all_btn)
         button_layout.addWidget(self.batch_export_btn)
         button_layout.addWidget(self.delete_record_btn)
@@ -370,6 +377,7 @@ class FluentHistoryWidget(CardWidget):
         self.delete_record_btn.clicked.connect(self.delete_selected_records)
         self.delete_all_btn.clicked.connect(self.delete_all_records)
         self.refresh_btn.clicked.connect(self.load_history)
+        self.find_duplicates_btn.clicked.connect(self.show_duplicate_groups)
         self.batch_export_btn.clicked.connect(self.batch_export_selected)
         self.select_all_btn.clicked.connect(self.select_all_records)
         
@@ -591,6 +599,13 @@ class FluentHistoryWidget(CardWidget):
         view_action.triggered.connect(lambda: self.on_item_clicked(item))
         menu.addAction(view_action)
         
+        # 查找相似图片
+        row = item.row()
+        if 0 <= row < len(self.filtered_records) and self.filtered_records[row].get('image_hash') is not None:
+            similar_action = QAction("🔍 查找相似图片", self)
+            similar_action.triggered.connect(lambda: self.show_similar_records(row))
+            menu.addAction(similar_action)
+        
         menu.addSeparator()
         
         # 删除记录
@@ -598,6 +613,18 @@ class FluentHistoryWidget(CardWidget):
         delete_action.triggered.connect(self.delete_selected_records)
         menu.addAction(delete_action)
         
+        # 移动到其他图库
+        other_libraries = [library['name'] for library in self.data_manager.list_libraries()
+                           if not library['active']]
+        if other_libraries:
+            move_menu = menu.addMenu("📁 移动到图库")
+            for library_name in other_libraries:
+                move_action = QAction(library_name, self)
+                move_action.triggered.connect(
+                    lambda checked, name=library_name: self.move_selected_records(name)
+                )
+                move_menu.addAction(move_action)
+        
         # 检查文件状态
         row = item.row()
         if 0 <= row < len(self.filtered_records):
@@ -681,6 +708,52 @@ class FluentHistoryWidget(CardWidget):
                 print(f"[删除记录] 删除失败: {e}")
                 QMessageBox.critical(self, "删除失败", f"删除记录时出错: {str(e)}")
     
+    def show_duplicate_groups(self):
+        """在列表中只显示有相似图片的记录，同一组的记录排在一起（点击“重置”恢复）"""
+        try:
+            groups = self.data_manager.find_duplicate_groups()
+        except Exception as e:
+            print(f"查找重复图片失败: {e}")
+            groups = []
+        if not groups:
+            QMessageBox.information(self, "查找重复", "没有找到重复或相似的图片\n（只比较已计算感知哈希的图片）")
+            return
+        
+        self.filtered_records = [record for group in groups for record in group]
+        self.display_records(self.filtered_records)
+        self.clear_search_btn.setEnabled(True)
+        print(f"找到 {len(groups)} 组相似图片，共 {len(self.filtered_records)} 条记录")
+    
+    def show_similar_records(self, row):
+        """在列表中显示与指定记录相似的图片（该记录排在最前）"""
+        if not (0 <= row < len(self.filtered_records)):
+            return
+        record = self.filtered_records[row]
+        similar = self.data_manager.find_similar_records(record.get('id'))
+        if not similar:
+            QMessageBox.information(self, "查找相似图片", "没有找到相似的图片")
+            return
+        
+        self.filtered_records = [record] + similar
+        self.display_records(self.filtered_records)
+        self.clear_search_btn.setEnabled(True)
+    
+    def move_selected_records(self, library_name):
+        """将选中的记录移动到其他图库"""
+        selected_rows = self.history_table.selectionModel().selectedRows()
+        record_ids = [
+            self.filtered_records[index.row()].get('id')
+            for index in selected_rows
+            if 0 <= index.row() < len(self.filtered_records)
+        ]
+        record_ids = [record_id for record_id in record_ids if record_id]
+        if not record_ids:
+            return
+        
+        moved_count = self.data_manager.move_records(record_ids, library_name)
+        self.load_history()
+        QMessageBox.information(self, "移动完成", f"已将 {moved_count} 条记录移动到图库「{library_name}」")
+        
     def get_main_window(self):
         """获取主窗口引用"""
         parent = self.parent()
@@ -4,9 +4,27 @@
 界面创建组件
 """
 
-from PyQt5.QtCore import QObject
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
 from qfluentwidgets import NavigationItemPosition
 from .fluent_styles import FluentIcons
+from core.change_bus import RECORDS_ADDED, RECORDS_CHANGED, RECORDS_REMOVED
+
+
+class ChangeBusBridge(QObject):
+    """把变更总线的事件（可能来自后台线程）转为Qt信号，在主线程中处理"""
+    records_added = pyqtSignal(dict)
+    records_changed = pyqtSignal(str, dict)  # 事件名称（修改或删除）、事件数据
+    
+    def __init__(self, change_bus, parent=None):
+        super().__init__(parent)
+        self.change_bus = change_bus
+        self.change_bus.subscribe(self.on_event)
+    
+    def on_event(self, event, payload):
+        if event == RECORDS_ADDED:
+            self.records_added.emit(payload)
+        elif event in (RECORDS_CHANGED, RECORDS_REMOVED):
+            self.records_changed.emit(event, payload)
 
 
 class FluentInterfaceCreator(QObject):
@@ -51,6 +69,13 @@ class FluentInterfaceCreator(QObject):
             self.parent.event_handlers.handle_gallery_record_selected
         )
     
+    def create_stats_interface(self):
+        """创建图库统计界面"""
+        from .fluent_stats_widget import FluentStatsWidget
+        
+        self.parent.stats_interface = FluentStatsWidget(self.parent.data_manager, self.parent)
+        self.parent.stats_interface.setObjectName("stats")
+    
     def create_prompt_editor_interface(self):
         """创建提示词编辑界面"""
         from .fluent_prompt_editor_widget import FluentPromptEditorWidget
@@ -71,6 +96,42 @@ class FluentInterfaceCreator(QObject):
         
         self.parent.settings_interface = FluentSettingsWidget(self.parent)
         self.parent.settings_interface.setObjectName("settings")
+        self.parent.settings_interface.library_switched.connect(self.on_library_switched)
+        
+        # 后台导入、同步修改或删除的记录：合并短时间内的多次通知后刷新一次
+        self.change_bridge = ChangeBusBridge(self.parent.data_manager.change_bus, self)
+        self.change_bridge.records_added.connect(self.on_records_added)
+        self.change_bridge.records_changed.connect(self.on_records_changed)
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.setInterval(500)
+        self.refresh_timer.timeout.connect(self.reload_records)
+    
+    def on_library_switched(self, name):
+        """切换图库后重新加载历史记录和画廊"""
+        print(f"已切换到图库: {name}")
+        self.reload_records()
+    
+    def on_records_added(self, payload):
+        """后台导入了新记录"""
+        print(f"自动导入 {payload.get('count', 0)} 张新图片")
+        self.refresh_timer.start()
+    
+    def on_records_changed(self, event, payload):
+        """记录被修改或删除（如导入变更集）"""
+        action = '删除' if event == RECORDS_REMOVED else '更新'
+        print(f"{action}了 {payload.get('count', 0)} 条记录")
+        self.refresh_timer.start()
+    
+    def reload_records(self):
+        """重新加载历史记录和画廊，统计界面正在显示时一并刷新"""
+        if hasattr(self.parent, 'history_widget') and self.parent.history_widget:
+            self.parent.history_widget.load_history()
+        if hasattr(self.parent, 'gallery_interface') and self.parent.gallery_interface:
+            self.parent.gallery_interface.load_records()
+        stats_interface = getattr(self.parent, 'stats_interface', None)
+        if stats_interface and stats_interface.isVisible():
+            stats_interface.refresh_stats()
     
     def create_activation_interface(self):
         """创建激活界面"""
@@ -187,6 +248,14 @@ class FluentInterfaceCreator(QObject):
             position=NavigationItemPosition.TOP
         )
         
+        # 图库统计页面
+        self.parent.addSubInterface(
+            interface=self.parent.stats_interface,
+            icon=FluentIcons.get_icon('stats'),
+            text='图库统计',
+            position=NavigationItemPosition.TOP
+        )
+        
         # 提示词修改页面
         self.parent.addSubInterface(
             interface=self.parent.prompt_editor_interface,
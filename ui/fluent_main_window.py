@@ -150,6 +150,7 @@ class FluentMainWindow(FluentWindow):
         # 使用界面创建器创建各个页面
         self.interface_creator.create_extraction_interface()
         self.interface_creator.create_gallery_interface()
+        self.interface_creator.create_stats_interface()
         self.interface_creator.create_prompt_editor_interface()
         self.interface_creator.create_prompt_reverser_interface()
         self.interface_creator.create_settings_interface()
@@ -534,6 +535,7 @@ class FluentMainWindow(FluentWindow):
                 page_names = {
                     "extraction": "信息提取",
                     "gallery": "图片画廊", 
+                    "stats": "图库统计",
                     "prompt_editor": "提示词修改",
                     "prompt_reverser": "提示词反推",
                     "settings": "设置",
@@ -567,7 +569,17 @@ class FluentMainWindow(FluentWindow):
             
             # 清理AI工作线程
             self.business_logic.cleanup_ai_threads()
-            
+
+            # 停止数据库维护（取消进行中的备份）
+            maintenance_card = getattr(self.settings_interface, 'maintenance_card', None)
+            if maintenance_card:
+                maintenance_card.stop()
+
+            # 停止文件夹监视
+            watch_folder_card = getattr(self.settings_interface, 'watch_folder_card', None)
+            if watch_folder_card:
+                watch_folder_card.stop()
+
             # 保存提示词编辑器数据
             if hasattr(self, 'prompt_editor_widget') and self.prompt_editor_widget:
                 self.prompt_editor_widget.save_history_data()
@@ -2,7 +2,7 @@
 # -*- coding: utf-8 -*-
 """
 Fluent Design 设置界面组件
-包含应用程序各种设置选项，如右键菜单管理等
+包含应用程序各种设置选项，如右键菜单管理、数据库维护等
 """
 
 import os
@@ -17,17 +17,19 @@ except ImportError:
     WINDOWS_AVAILABLE = False
     reg = None  # 在非Windows平台上设为None
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-                            QMessageBox, QApplication)
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
+                            QMessageBox, QApplication, QFileDialog)
+from PyQt5.QtCore import Qt, QThread, QTimer, pyqtSignal
 from PyQt5.QtGui import QPixmap
 
 from qfluentwidgets import (CardWidget, PrimaryPushButton, PushButton, 
                            BodyLabel, SubtitleLabel, CaptionLabel,
                            InfoBar, InfoBarPosition, MessageBox,
                            SmoothScrollArea, SettingCardGroup, SwitchSettingCard,
-                           PushSettingCard, FluentIcon as FIF)
+                           PushSettingCard, ComboBox, LineEdit, SwitchButton, ListWidget,
+                           FluentIcon as FIF)
 
 from .fluent_styles import FluentSpacing, FluentColors
+from core.folder_watcher import load_watch_config, save_watch_config
 
 
 class ContextMenuWorker(QThread):
@@ -576,11 +578,456 @@ class ContextMenuCard(CardWidget):
                 )
 
 
+class DatabaseMaintenanceWorker(QThread):
+    """数据库维护异步工作类"""
+    progress = pyqtSignal(int, int)  # 备份进度(已复制页数, 总页数)
+    finished = pyqtSignal(bool, str, object)  # 完成信号(成功, 任务, 结果)
+    
+    def __init__(self, maintenance, task, parent=None):
+        super().__init__(parent)
+        self.maintenance = maintenance
+        self.task = task  # 具体任务名，或 'due' 表示执行所有到期任务
+    
+    def run(self):
+        """执行维护任务"""
+        try:
+            if self.task == 'due':
+                result = self.maintenance.run_due_tasks(progress_callback=self.progress.emit)
+            else:
+                result = self.maintenance.run_task(self.task, progress_callback=self.progress.emit)
+            self.finished.emit(True, self.task, result)
+        except Exception as e:
+            self.finished.emit(False, self.task, str(e))
+
+
+class DatabaseMaintenanceCard(CardWidget):
+    """数据库维护卡片"""
+    
+    # 自动维护检查间隔（毫秒）
+    SCHEDULE_INTERVAL = 60 * 60 * 1000
+    # 启动后首次检查的延迟（毫秒）
+    STARTUP_DELAY = 2 * 60 * 1000
+    
+    def __init__(self, data_manager, parent=None):
+        super().__init__(parent)
+        self.data_manager = data_manager
+        self.worker = None
+        self.init_ui()
+        self.refresh_stats()
+        
+        # 定期在后台执行到期的维护任务
+        self.schedule_timer = QTimer(self)
+        self.schedule_timer.timeout.connect(self.run_due_tasks)
+        self.schedule_timer.start(self.SCHEDULE_INTERVAL)
+        QTimer.singleShot(self.STARTUP_DELAY, self.run_due_tasks)
+    
+    def init_ui(self):
+        """初始化UI"""
+        layout = QVBoxLayout()
+        layout.setContentsMargins(FluentSpacing.MD, FluentSpacing.MD, 
+                                 FluentSpacing.MD, FluentSpacing.MD)
+        layout.setSpacing(FluentSpacing.SM)
+        
+        self.title_label = SubtitleLabel("数据库维护")
+        self.desc_label = CaptionLabel("后台自动备份、优化查询统计并回收空闲空间，备份期间可继续使用")
+        self.desc_label.setStyleSheet(f"color: {FluentColors.get_color('text_secondary')};")
+        layout.addWidget(self.title_label)
+        layout.addWidget(self.desc_label)
+        
+        self.stats_label = BodyLabel()
+        self.stats_label.setWordWrap(True)
+        self.stats_label.setStyleSheet(f"color: {FluentColors.get_color('text_tertiary')};")
+        layout.addWidget(self.stats_label)
+        
+        self.status_label = CaptionLabel()
+        layout.addWidget(self.status_label)
+        
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+        
+        self.backup_btn = PrimaryPushButton("立即备份")
+        self.optimize_btn = PushButton("优化数据库")
+        self.vacuum_btn = PushButton("回收空间")
+        self.check_btn = PushButton("完整性检查")
+        
+        self.backup_btn.clicked.connect(lambda: self.start_task('backup'))
+        self.optimize_btn.clicked.connect(lambda: self.start_task('analyze'))
+        self.vacuum_btn.clicked.connect(self.start_vacuum)
+        self.check_btn.clicked.connect(lambda: self.start_task('integrity_check'))
+        
+        self.buttons = [self.backup_btn, self.optimize_btn, self.vacuum_btn, self.check_btn]
+        for button in reversed(self.buttons):
+            button_layout.addWidget(button)
+        
+        layout.addLayout(button_layout)
+        self.setLayout(layout)
+    
+    def refresh_stats(self):
+        """刷新数据库大小和页面统计"""
+        try:
+            stats = self.data_manager.maintenance.get_db_stats()
+        except Exception as e:
+            self.stats_label.setText(f"读取数据库信息失败: {e}")
+            return
+        
+        last_backup = stats['last_runs'].get('backup')
+        self.stats_label.setText(
+            f"数据库大小: {stats['file_size'] / 1024 / 1024:.1f} MB"
+            f"（WAL {stats['wal_size'] / 1024 / 1024:.1f} MB）\n"
+            f"页大小: {stats['page_size']} B，总页数: {stats['page_count']}，"
+            f"空闲页: {stats['freelist_count']}（{stats['free_ratio']:.1%}），"
+            f"自动清理: {stats['auto_vacuum']}\n"
+            f"上次备份: {last_backup[:19].replace('T', ' ') if last_backup else '从未'}，"
+            f"备份数量: {len(stats['backups'])}"
+        )
+    
+    def run_due_tasks(self):
+        """定时执行到期的维护任务"""
+        if self.worker and self.worker.isRunning():
+            return
+        if not self.data_manager.maintenance.get_due_tasks():
+            return
+        self.start_task('due')
+    
+    def start_vacuum(self):
+        """回收空间；尚未启用增量清理的数据库需要确认后重建一次"""
+        try:
+            needs_conversion = self.data_manager.maintenance.needs_conversion()
+        except Exception as e:
+            self.status_label.setText(f"❌ 读取数据库信息失败: {e}")
+            return
+        if not needs_conversion:
+            self.start_task('vacuum')
+            return
+        
+        confirm_msgbox = MessageBox(
+            "回收空间",
+            "当前数据库尚未启用增量回收，需要重建一次整个数据库文件。\n\n"
+            "重建期间无法浏览或导入图片，图库较大时可能需要几分钟。之后回收空间不再需要重建。\n\n"
+            "确定现在重建吗？",
+            parent=self.window()
+        )
+        confirm_msgbox.yesButton.setText("重建")
+        confirm_msgbox.cancelButton.setText("取消")
+        if not confirm_msgbox.exec_():
+            return
+        self.start_task('convert_vacuum')
+    
+    def start_task(self, task):
+        """启动维护任务"""
+        if self.worker and self.worker.isRunning():
+            return
+        
+        for button in self.buttons:
+            button.setEnabled(False)
+        self.status_label.setText("正在执行数据库维护...")
+        
+        self.worker = DatabaseMaintenanceWorker(self.data_manager.maintenance, task)
+        self.worker.progress.connect(self.on_backup_progress)
+        self.worker.finished.connect(self.on_task_finished)
+        self.worker.start()
+    
+    def on_backup_progress(self, copied, total):
+        """备份进度"""
+        percent = int(copied / total * 100) if total else 100
+        self.status_label.setText(f"正在备份数据库... {percent}%")
+    
+    def on_task_finished(self, success, task, result):
+        """维护任务完成处理"""
+        for button in self.buttons:
+            button.setEnabled(True)
+        self.refresh_stats()
+        
+        if not success:
+            self.status_label.setText(f"❌ 数据库维护失败: {result}")
+            return
+        
+        if task == 'backup':
+            message = f"备份已保存到: {result}" if result else "备份已取消"
+        elif task == 'vacuum':
+            message = f"已回收 {result} 个空闲页"
+        elif task == 'convert_vacuum':
+            message = f"已启用增量回收，回收 {result} 个空闲页"
+        elif task == 'integrity_check':
+            message = "数据库完好" if result == ['ok'] else "发现问题: " + "; ".join(result[:3])
+        elif task == 'due':
+            message = f"已完成自动维护: {', '.join(result) or '无到期任务'}"
+        else:
+            message = "数据库统计信息已更新"
+        self.status_label.setText("✅ " + message)
+        
+        # 仅在用户手动操作时弹出提示
+        if task != 'due':
+            InfoBar.success(
+                title="数据库维护",
+                content=message,
+                orient=Qt.Horizontal,
+                isClosable=True,
+                position=InfoBarPosition.TOP,
+                duration=3000,
+                parent=self.window()
+            )
+    
+    def stop(self):
+        """停止定时维护并取消正在进行的备份"""
+        self.schedule_timer.stop()
+        if self.worker and self.worker.isRunning():
+            self.data_manager.maintenance.cancel()
+            self.worker.wait(5000)
+
+
+class LibraryCard(CardWidget):
+    """图库管理卡片"""
+    library_switched = pyqtSignal(str)  # 切换后的图库名称
+    
+    def __init__(self, data_manager, parent=None):
+        super().__init__(parent)
+        self.data_manager = data_manager
+        self.init_ui()
+        self.refresh_libraries()
+    
+    def init_ui(self):
+        """初始化UI"""
+        layout = QVBoxLayout()
+        layout.setContentsMargins(FluentSpacing.MD, FluentSpacing.MD, 
+                                 FluentSpacing.MD, FluentSpacing.MD)
+        layout.setSpacing(FluentSpacing.SM)
+        
+        self.title_label = SubtitleLabel("图库")
+        self.desc_label = CaptionLabel("按项目或客户分开保存记录，每个图库独立存储，可随时切换，也可在历史记录中跨图库移动记录")
+        self.desc_label.setStyleSheet(f"color: {FluentColors.get_color('text_secondary')};")
+        layout.addWidget(self.title_label)
+        layout.addWidget(self.desc_label)
+        
+        # 切换图库
+        switch_layout = QHBoxLayout()
+        self.library_combo = ComboBox()
+        self.library_combo.setMinimumWidth(220)
+        self.switch_btn = PrimaryPushButton("切换")
+        self.switch_btn.clicked.connect(self.switch_library)
+        switch_layout.addWidget(BodyLabel("当前图库:"))
+        switch_layout.addWidget(self.library_combo)
+        switch_layout.addWidget(self.switch_btn)
+        switch_layout.addStretch()
+        layout.addLayout(switch_layout)
+        
+        # 新建图库
+        create_layout = QHBoxLayout()
+        self.name_input = LineEdit()
+        self.name_input.setPlaceholderText("新图库名称")
+        self.name_input.setMinimumWidth(220)
+        self.create_btn = PushButton("新建图库")
+        self.create_btn.clicked.connect(self.create_library)
+        create_layout.addWidget(self.name_input)
+        create_layout.addWidget(self.create_btn)
+        create_layout.addStretch()
+        layout.addLayout(create_layout)
+        
+        self.setLayout(layout)
+    
+    def refresh_libraries(self):
+        """刷新图库列表"""
+        self.library_combo.clear()
+        for library in self.data_manager.list_libraries():
+            self.library_combo.addItem(library['name'])
+        self.library_combo.setCurrentText(self.data_manager.active_library)
+    
+    def create_library(self):
+        """新建图库"""
+        name = self.name_input.text().strip()
+        if not name:
+            return
+        
+        if self.data_manager.create_library(name):
+            self.name_input.clear()
+            self.refresh_libraries()
+            InfoBar.success(
+                title="新建图库",
+                content=f"已创建图库「{name}」",
+                orient=Qt.Horizontal,
+                isClosable=True,
+                position=InfoBarPosition.TOP,
+                duration=3000,
+                parent=self.window()
+            )
+        else:
+            InfoBar.error(
+                title="新建图库失败",
+                content=f"无法创建图库「{name}」，名称可能已存在",
+                orient=Qt.Horizontal,
+                isClosable=True,
+                position=InfoBarPosition.TOP,
+                duration=5000,
+                parent=self.window()
+            )
+    
+    def switch_library(self):
+        """切换当前图库"""
+        name = self.library_combo.currentText()
+        if not name or name == self.data_manager.active_library:
+            return
+        
+        if self.data_manager.switch_library(name):
+            self.library_switched.emit(name)
+            InfoBar.success(
+                title="切换图库",
+                content=f"当前图库: {name}",
+                orient=Qt.Horizontal,
+                isClosable=True,
+                position=InfoBarPosition.TOP,
+                duration=3000,
+                parent=self.window()
+            )
+        else:
+            self.refresh_libraries()
+
+
+class WatchFolderCard(CardWidget):
+    """监视文件夹卡片：生成工具输出文件夹中的新图片自动入库"""
+    
+    def __init__(self, data_manager, parent=None):
+        super().__init__(parent)
+        self.data_manager = data_manager
+        self.config_path = os.path.join(data_manager.data_dir, "watch_folders.json")
+        self.config = load_watch_config(self.config_path)
+        self.watcher = None
+        self.init_ui()
+        self.refresh_folders()
+        
+        # 定时刷新监视状态
+        self.status_timer = QTimer(self)
+        self.status_timer.timeout.connect(self.refresh_status)
+        self.status_timer.start(2000)
+        
+        if self.config['enabled'] and self.config['folders']:
+            self.start_watcher()
+        self.refresh_status()
+    
+    def init_ui(self):
+        """初始化UI"""
+        layout = QVBoxLayout()
+        layout.setContentsMargins(FluentSpacing.MD, FluentSpacing.MD, 
+                                 FluentSpacing.MD, FluentSpacing.MD)
+        layout.setSpacing(FluentSpacing.SM)
+        
+        header_layout = QHBoxLayout()
+        self.title_label = SubtitleLabel("监视文件夹")
+        self.enable_switch = SwitchButton()
+        self.enable_switch.setChecked(self.config['enabled'])
+        self.enable_switch.checkedChanged.connect(self.on_enabled_changed)
+        header_layout.addWidget(self.title_label)
+        header_layout.addStretch()
+        header_layout.addWidget(self.enable_switch)
+        layout.addLayout(header_layout)
+        
+        self.desc_label = CaptionLabel("ComfyUI、WebUI 等工具的输出文件夹中出现新图片时，写入完成后自动导入当前图库")
+        self.desc_label.setStyleSheet(f"color: {FluentColors.get_color('text_secondary')};")
+        layout.addWidget(self.desc_label)
+        
+        self.folder_list = ListWidget()
+        self.folder_list.setFixedHeight(110)
+        layout.addWidget(self.folder_list)
+        
+        self.status_label = CaptionLabel()
+        self.status_label.setStyleSheet(f"color: {FluentColors.get_color('text_tertiary')};")
+        layout.addWidget(self.status_label)
+        
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+        self.add_btn = PrimaryPushButton("添加文件夹")
+        self.remove_btn = PushButton("移除")
+        self.add_btn.clicked.connect(self.add_folder)
+        self.remove_btn.clicked.connect(self.remove_folder)
+        button_layout.addWidget(self.remove_btn)
+        button_layout.addWidget(self.add_btn)
+        layout.addLayout(button_layout)
+        
+        self.setLayout(layout)
+    
+    def refresh_folders(self):
+        """刷新文件夹列表"""
+        self.folder_list.clear()
+        for folder in self.config['folders']:
+            self.folder_list.addItem(folder)
+    
+    def refresh_status(self):
+        """刷新监视状态"""
+        if not self.watcher or not self.watcher.is_running:
+            self.status_label.setText("未启用" if not self.config['enabled'] else "未添加文件夹")
+            return
+        status = self.watcher.get_status()
+        mode = "系统文件事件" if status['mode'] == 'native' else "定时扫描（安装 watchdog 可即时响应）"
+        self.status_label.setText(
+            f"正在监视（{mode}），本次已导入 {status['ingested']} 张，等待写入完成 {status['pending']} 张"
+        )
+    
+    def save_config(self):
+        save_watch_config(self.config_path, self.config)
+    
+    def add_folder(self):
+        """添加监视文件夹"""
+        folder = QFileDialog.getExistingDirectory(self, "选择要监视的文件夹")
+        if not folder:
+            return
+        folder = os.path.abspath(folder)
+        if folder in self.config['folders']:
+            return
+        self.config['folders'].append(folder)
+        self.save_config()
+        self.refresh_folders()
+        self.restart_watcher()
+    
+    def remove_folder(self):
+        """移除选中的监视文件夹"""
+        item = self.folder_list.currentItem()
+        if not item:
+            return
+        self.config['folders'] = [folder for folder in self.config['folders'] if folder != item.text()]
+        self.save_config()
+        self.refresh_folders()
+        self.restart_watcher()
+    
+    def on_enabled_changed(self, checked):
+        """启用或停用监视"""
+        self.config['enabled'] = checked
+        self.save_config()
+        self.restart_watcher()
+    
+    def start_watcher(self):
+        """启动监视"""
+        from core.batch_processor import BatchProcessor
+        from core.folder_watcher import FolderWatcher
+        
+        self.watcher = FolderWatcher(
+            BatchProcessor(self.data_manager),
+            self.config['folders'],
+            recursive=self.config.get('recursive', True),
+            change_bus=self.data_manager.change_bus
+        )
+        self.watcher.start()
+    
+    def restart_watcher(self):
+        """设置变化后重新启动监视"""
+        self.stop()
+        if self.config['enabled'] and self.config['folders']:
+            self.start_watcher()
+        self.refresh_status()
+    
+    def stop(self):
+        """停止监视"""
+        if self.watcher:
+            self.watcher.stop()
+            self.watcher = None
+
+
 class FluentSettingsWidget(SmoothScrollArea):
     """Fluent Design 设置界面"""
+    library_switched = pyqtSignal(str)  # 当前图库已切换
+    
     
     def __init__(self, parent=None):
         super().__init__(parent)
+        self.data_manager = getattr(parent, 'data_manager', None)
         self.init_ui()
     
     def init_ui(self):
@@ -626,6 +1073,35 @@ class FluentSettingsWidget(SmoothScrollArea):
         integration_group.setLayout(integration_layout)
         layout.addWidget(integration_group)
         
+        # 数据管理设置组
+        if self.data_manager is not None:
+            data_group = QWidget()
+            data_layout = QVBoxLayout()
+            data_layout.setSpacing(FluentSpacing.SM)
+            
+            data_title = BodyLabel("数据管理")
+            data_title.setStyleSheet(f"""
+                QLabel {{
+                    color: {FluentColors.get_color('text_secondary')};
+                    font-weight: 500;
+                    margin-bottom: {FluentSpacing.XS}px;
+                }}
+            """)
+            data_layout.addWidget(data_title)
+            
+            self.library_card = LibraryCard(self.data_manager)
+            self.library_card.library_switched.connect(self.on_library_switched)
+            data_layout.addWidget(self.library_card)
+            
+            self.watch_folder_card = WatchFolderCard(self.data_manager)
+            data_layout.addWidget(self.watch_folder_card)
+            
+            self.maintenance_card = DatabaseMaintenanceCard(self.data_manager)
+            data_layout.addWidget(self.maintenance_card)
+            
+            data_group.setLayout(data_layout)
+            layout.addWidget(data_group)
+        
         # 添加弹性空间
         layout.addStretch()
         
@@ -635,4 +1111,10 @@ class FluentSettingsWidget(SmoothScrollArea):
         # 设置滚动属性
         self.setWidgetResizable(True)
         self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        self.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded) 
\ No newline at end of file
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded) 
+    
+    def on_library_switched(self, name):
+        """切换图库后刷新维护信息并通知主窗口"""
+        if hasattr(self, 'maintenance_card'):
+            self.maintenance_card.refresh_stats()
+        self.library_switched.emit(name)
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fluent Design 图库统计界面
+展示常用模型、LoRA、采样器、来源、标签、每日数量以及参数分布
+"""
+
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QGridLayout,
+                            QProgressBar)
+from PyQt5.QtCore import Qt
+
+from qfluentwidgets import (CardWidget, SmoothScrollArea, TitleLabel, SubtitleLabel,
+                           BodyLabel, CaptionLabel, PushButton)
+
+from .fluent_styles import FluentColors, FluentSpacing
+
+
+class StatsListCard(CardWidget):
+    """计数排行卡片"""
+
+    def __init__(self, title, parent=None):
+        super().__init__(parent)
+        self.setBorderRadius(12)
+
+        main_layout = QVBoxLayout()
+        main_layout.setContentsMargins(FluentSpacing.MD, FluentSpacing.MD,
+                                       FluentSpacing.MD, FluentSpacing.MD)
+        main_layout.setSpacing(FluentSpacing.XS)
+
+        title_label = SubtitleLabel(title)
+        title_label.setStyleSheet(f"color: {FluentColors.get_color('text_primary')};")
+        main_layout.addWidget(title_label)
+
+        self.rows_layout = QVBoxLayout()
+        self.rows_layout.setSpacing(FluentSpacing.XS)
+        main_layout.addLayout(self.rows_layout)
+        main_layout.addStretch()
+
+        self.setLayout(main_layout)
+
+    def set_rows(self, rows):
+        """
+        设置显示的行
+
+        Args:
+            rows: (标签, 数量) 列表
+        """
+        while self.rows_layout.count():
+            item = self.rows_layout.takeAt(0)
+            if item.layout():
+                while item.layout().count():
+                    child = item.layout().takeAt(0)
+                    if child.widget():
+                        child.widget().deleteLater()
+            elif item.widget():
+                item.widget().deleteLater()
+
+        if not rows:
+            empty_label = CaptionLabel("暂无数据")
+            empty_label.setStyleSheet(f"color: {FluentColors.get_color('text_tertiary')};")
+            self.rows_layout.addWidget(empty_label)
+            return
+
+        max_count = max(count for _, count in rows) or 1
+        for label, count in rows:
+            row_layout = QHBoxLayout()
+            row_layout.setSpacing(FluentSpacing.SM)
+
+            name_label = BodyLabel(str(label))
+            name_label.setFixedWidth(180)
+            name_label.setToolTip(str(label))
+
+            bar = QProgressBar()
+            bar.setFixedHeight(8)
+            bar.setTextVisible(False)
+            bar.setRange(0, max_count)
+            bar.setValue(count)
+            bar.setStyleSheet(f"""
+                QProgressBar {{
+                    border: none;
+                    border-radius: 4px;
+                    background-color: {FluentColors.get_color('bg_secondary')};
+                }}
+                QProgressBar::chunk {{
+                    border-radius: 4px;
+                    background-color: {FluentColors.get_color('primary')};
+                }}
+            """)
+
+            count_label = CaptionLabel(str(count))
+            count_label.setFixedWidth(60)
+            count_label.setAlignment(Qt.AlignRight | Qt.AlignVCenter)
+
+            row_layout.addWidget(name_label)
+            row_layout.addWidget(bar, 1)
+            row_layout.addWidget(count_label)
+            self.rows_layout.addLayout(row_layout)
+
+
+class FluentStatsWidget(SmoothScrollArea):
+    """Fluent Design 图库统计界面"""
+
+    def __init__(self, data_manager, parent=None):
+        super().__init__(parent)
+        self.data_manager = data_manager
+        self.init_ui()
+
+    def init_ui(self):
+        """初始化UI"""
+        container = QWidget()
+        layout = QVBoxLayout()
+        layout.setContentsMargins(FluentSpacing.LG, FluentSpacing.LG,
+                                 FluentSpacing.LG, FluentSpacing.LG)
+        layout.setSpacing(FluentSpacing.MD)
+
+        # 标题和刷新按钮
+        title_row = QHBoxLayout()
+        title_label = TitleLabel("📊 图库统计")
+        title_label.setStyleSheet(f"color: {FluentColors.get_color('text_primary')};")
+
+        self.total_label = BodyLabel("")
+        self.total_label.setStyleSheet(f"color: {FluentColors.get_color('text_secondary')};")
+
+        self.refresh_btn = PushButton("刷新")
+        self.refresh_btn.setFixedHeight(36)
+        self.refresh_btn.clicked.connect(self.refresh_stats)
+
+        title_row.addWidget(title_label)
+        title_row.addSpacing(FluentSpacing.MD)
+        title_row.addWidget(self.total_label)
+        title_row.addStretch()
+        title_row.addWidget(self.refresh_btn)
+        layout.addLayout(title_row)
+
+        # 统计卡片网格
+        grid = QGridLayout()
+        grid.setSpacing(FluentSpacing.MD)
+
+        self.cards = {
+            'top_models': StatsListCard("🤖 常用模型"),
+            'top_loras': StatsListCard("🎯 常用LoRA"),
+            'top_samplers': StatsListCard("🎲 常用采样器"),
+            'top_sources': StatsListCard("🔗 生成来源"),
+            'top_tags': StatsListCard("🏷️ 常用标签"),
+            'daily': StatsListCard("📅 每日图片数量（近30天）"),
+            'steps': StatsListCard("🔢 步数分布"),
+            'cfg': StatsListCard("📊 CFG分布"),
+            'size': StatsListCard("📐 尺寸分布（百万像素）"),
+            'top_sizes': StatsListCard("🖼️ 常用尺寸"),
+        }
+
+        for index, card in enumerate(self.cards.values()):
+            grid.addWidget(card, index // 2, index % 2)
+
+        layout.addLayout(grid)
+        layout.addStretch()
+
+        container.setLayout(layout)
+        self.setWidget(container)
+
+        self.setWidgetResizable(True)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setStyleSheet("QScrollArea { border: none; background: transparent; }")
+
+    def showEvent(self, event):
+        """页面显示时刷新统计（汇总表查询开销很小）"""
+        super().showEvent(event)
+        self.refresh_stats()
+
+    def refresh_stats(self):
+        """刷新统计数据"""
+        try:
+            summary = self.data_manager.library_stats.get_summary()
+        except Exception as e:
+            print(f"加载图库统计失败: {e}")
+            return
+
+        self.total_label.setText(f"共 {summary['total_records']} 条记录")
+
+        for key in ('top_models', 'top_loras', 'top_samplers', 'top_sources', 'top_tags', 'top_sizes'):
+            self.cards[key].set_rows(summary[key])
+        self.cards['daily'].set_rows(summary['daily'])
+
+        for dimension, histogram in summary['histograms'].items():
+            edges = histogram['edges']
+            rows = [
+                (f"{edges[i]:.4g} - {edges[i + 1]:.4g}", count)
+                for i, count in enumerate(histogram['counts'])
+            ]
+            self.cards[dimension].set_rows(rows)
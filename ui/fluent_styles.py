@@ -84,7 +84,8 @@ class FluentIcons:
         'add': FluentIcon.ADD,
         'folder_add': FluentIcon.FOLDER_ADD,
         'edit': FluentIcon.EDIT,
-        'magic': FluentIcon.BRUSH
+        'magic': FluentIcon.BRUSH,
+        'stats': FluentIcon.PIE_SINGLE
     }
     
     @staticmethod